@@ -314,10 +314,13 @@ async def reset_full_config(db: Session = Depends(get_db)):
     """시스템의 모든 설정을 초기화합니다 (프록시, 그룹 포함 모든 데이터 삭제)."""
     try:
         from app.models.traffic_log import TrafficLog
+        from app.models.traffic_log_snapshot import TrafficLogSnapshot
         from app.models.resource_usage import ResourceUsage
+        from app.services.traffic_log_query import bump_data_version
         
         # 1. 관련 데이터 우선 삭제
         db.query(TrafficLog).delete()
+        db.query(TrafficLogSnapshot).delete()
         db.query(ResourceUsage).delete()
         
         # 2. 메인 설정 삭제
@@ -327,6 +330,7 @@ async def reset_full_config(db: Session = Depends(get_db)):
         db.query(SessionBrowserConfig).delete()
         
         db.commit()
+        bump_data_version()
         return {"status": "success", "message": "System configuration has been reset successfully"}
     except Exception as e:
         db.rollback()
@@ -13,6 +13,8 @@ from pydantic import ValidationError
 from app.models.proxy_group import ProxyGroup
 from app.models.resource_usage import ResourceUsage
 from app.models.traffic_log import TrafficLog
+from app.models.traffic_log_snapshot import TrafficLogSnapshot
+from app.services.traffic_log_query import bump_data_version
 
 router = APIRouter()
 
@@ -171,9 +173,11 @@ def delete_proxy(proxy_id: int, db: Session = Depends(get_db)):
         db.query(ResourceUsage).filter(ResourceUsage.proxy_id == proxy_id).delete(synchronize_session=False)
         # TrafficLog has no FK constraint but we delete for data hygiene
         db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy_id).delete(synchronize_session=False)
+        db.query(TrafficLogSnapshot).filter(TrafficLogSnapshot.proxy_id == proxy_id).delete(synchronize_session=False)
 
         db.delete(db_proxy)
         db.commit()
+        bump_data_version()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Failed to delete proxy: {str(e)}")
@@ -1,22 +1,21 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timezone
 
 from app.database.database import get_db
 from app.utils.time import KST_TZ
-from app.services.resource_analysis import (
-    METRIC_FIELDS,
-    compute_percentiles,
-    compute_time_in_band,
-    compute_threshold_duration,
-    compute_heatmap_weekly,
-    compute_top_n,
-    compute_smoothed,
-)
+from app.services.resource_analysis import METRIC_FIELDS
+from app.services.analysis_pool import run_analysis
+from app.services.threshold_episodes import INTERFACE_METRIC_PREFIX
+from app.services.resource_baselines import ANOMALY_SCORE_THRESHOLD
+from app.services.resource_forecast import FORECAST_STATS
 
 router = APIRouter()
 
+# 상관 분석 최대 대상 수 (P x P 행렬 응답 크기 제한)
+MAX_CORRELATION_PROXIES = 300
+
 
 def _dt(s: Optional[str]) -> Optional[datetime]:
     if not s:
@@ -33,6 +32,7 @@ def _ids(proxy_ids: str) -> list[int]:
 
 @router.get("/resource-usage/analysis/percentiles")
 async def analysis_percentiles(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -41,11 +41,13 @@ async def analysis_percentiles(
     db: Session = Depends(get_db),
 ):
     metric_list = [m.strip() for m in metrics.split(',') if m.strip() in METRIC_FIELDS]
-    return compute_percentiles(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), business_hours, metric_list)
+    return await run_analysis(request, db, 'compute_percentiles', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), business_hours, metric_list)
 
 
 @router.get("/resource-usage/analysis/time-in-band")
 async def analysis_time_in_band(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -54,11 +56,13 @@ async def analysis_time_in_band(
     db: Session = Depends(get_db),
 ):
     m = metric if metric in METRIC_FIELDS else 'cpu'
-    return compute_time_in_band(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), business_hours, m)
+    return await run_analysis(request, db, 'compute_time_in_band', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), business_hours, m)
 
 
 @router.get("/resource-usage/analysis/threshold-duration")
 async def analysis_threshold_duration(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -66,12 +70,16 @@ async def analysis_threshold_duration(
     threshold: float = Query(80.0),
     db: Session = Depends(get_db),
 ):
-    m = metric if metric in METRIC_FIELDS else 'cpu'
-    return compute_threshold_duration(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), m, threshold)
+    # 인터페이스 지표("if:<name>:in|out")는 수집 시점에 저장된 구간으로만 제공
+    m = metric if (metric in METRIC_FIELDS or metric.startswith(INTERFACE_METRIC_PREFIX)) else 'cpu'
+    # 진행 중 구간(메모리 상태)을 포함하므로 같은 프로세스에서 실행
+    return await run_analysis(request, db, 'compute_threshold_duration', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), m, threshold, in_process=True)
 
 
 @router.get("/resource-usage/analysis/heatmap-weekly")
 async def analysis_heatmap_weekly(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -79,11 +87,13 @@ async def analysis_heatmap_weekly(
     db: Session = Depends(get_db),
 ):
     m = metric if metric in METRIC_FIELDS else 'cpu'
-    return compute_heatmap_weekly(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), m)
+    return await run_analysis(request, db, 'compute_heatmap_weekly', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), m)
 
 
 @router.get("/resource-usage/analysis/top-n")
 async def analysis_top_n(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -95,11 +105,18 @@ async def analysis_top_n(
 ):
     m = metric if metric in METRIC_FIELDS else 'cpu'
     s = stat if stat in ('p95', 'p99', 'max', 'mean') else 'p95'
-    return compute_top_n(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), business_hours, m, s, n)
+    # 파티션별 상위 n개를 모아 전체 상위 n개로 병합
+    def _merge_top(parts):
+        merged = [r for part in parts for r in part]
+        merged.sort(key=lambda x: x['value'], reverse=True)
+        return merged[:n]
+    return await run_analysis(request, db, 'compute_top_n', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), business_hours, m, s, n, merge=_merge_top)
 
 
 @router.get("/resource-usage/analysis/smoothed")
 async def analysis_smoothed(
+    request: Request,
     proxy_ids: str = Query(...),
     start_time: Optional[str] = Query(None),
     end_time: Optional[str] = Query(None),
@@ -108,4 +125,58 @@ async def analysis_smoothed(
     db: Session = Depends(get_db),
 ):
     m = metric if metric in METRIC_FIELDS else 'cpu'
-    return compute_smoothed(db, _ids(proxy_ids), _dt(start_time), _dt(end_time), m, window_min)
+    return await run_analysis(request, db, 'compute_smoothed', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), m, window_min)
+
+
+@router.get("/resource-usage/analysis/anomalies")
+async def analysis_anomalies(
+    request: Request,
+    proxy_ids: str = Query(...),
+    start_time: Optional[str] = Query(None),
+    end_time: Optional[str] = Query(None),
+    metrics: str = Query(",".join(METRIC_FIELDS)),
+    min_score: float = Query(ANOMALY_SCORE_THRESHOLD, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    metric_list = [m.strip() for m in metrics.split(',') if m.strip() in METRIC_FIELDS]
+    # 기준선 캐시(메모리 상태)를 사용하므로 같은 프로세스에서 실행
+    return await run_analysis(request, db, 'compute_anomalies', _ids(proxy_ids),
+                              _dt(start_time), _dt(end_time), metric_list, min_score, limit, in_process=True)
+
+
+@router.get("/resource-usage/analysis/correlation")
+async def analysis_correlation(
+    request: Request,
+    proxy_ids: str = Query(...),
+    start_time: Optional[str] = Query(None),
+    end_time: Optional[str] = Query(None),
+    metric: str = Query("cpu"),
+    threshold: float = Query(80.0),
+    min_overlap: int = Query(6, ge=2, description="상관계수 계산에 필요한 최소 공통 시간 수"),
+    top_pairs: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    m = metric if metric in METRIC_FIELDS else 'cpu'
+    ids = _ids(proxy_ids)
+    if len(ids) > MAX_CORRELATION_PROXIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CORRELATION_PROXIES} proxies are allowed")
+    # 프록시 쌍 비교이므로 분할하지 않고 워커 1개에서 실행
+    return await run_analysis(request, db, 'compute_correlation', ids, _dt(start_time), _dt(end_time),
+                              m, threshold, min_overlap, top_pairs, partition=False)
+
+
+@router.get("/resource-usage/analysis/forecast")
+async def analysis_forecast(
+    request: Request,
+    proxy_ids: str = Query(...),
+    metric: str = Query("cpu"),
+    stat: str = Query("p95"),
+    threshold: float = Query(80.0),
+    horizon_days: int = Query(90, ge=1, le=365),
+    db: Session = Depends(get_db),
+):
+    m = metric if metric in METRIC_FIELDS else 'cpu'
+    s = stat if stat in FORECAST_STATS else 'p95'
+    return await run_analysis(request, db, 'compute_forecast', _ids(proxy_ids), m, s, threshold, horizon_days)
@@ -32,6 +32,9 @@ from app.services.resource_collector import (
     enforce_resource_usage_retention,
     is_system_interface
 )
+from app.services.bulk_insert import insert_mappings
+from app.services.threshold_episodes import record_threshold_samples
+from app.services.resource_baselines import baseline_scorer
 
 
 router = APIRouter()
@@ -108,7 +111,7 @@ async def collect_resource_usage(payload: CollectRequest, db: Session = Depends(
     collected_models: List[ResourceUsageModel] = []
     if collected_data:
         try:
-            db.bulk_insert_mappings(ResourceUsageModel, collected_data)
+            insert_mappings(db, ResourceUsageModel, collected_data)
             db.commit()
             # Single query for all inserted records instead of N individual queries
             inserted_proxy_ids = [d["proxy_id"] for d in collected_data]
@@ -132,6 +135,13 @@ async def collect_resource_usage(payload: CollectRequest, db: Session = Depends(
                     logger.error(f"[resource_usage] Failed to insert record: {e2}")
             db.commit()
 
+    # 임계치 초과 구간 증분 검출 (백그라운드 수집과 동일 경로)
+    if collected_data:
+        try:
+            record_threshold_samples(db, collected_data)
+        except Exception as e:
+            logger.error(f"[resource_usage] Threshold episode detection failed: {e}")
+
     logger.info(f"[resource_usage] Collect completed requested={len(proxies)} succeeded={len(collected_data)} failed={len(errors)}")
     if errors:
         logger.warning(f"[resource_usage] Collection errors: {errors}")
@@ -171,7 +181,10 @@ async def latest_resource_usage(proxy_id: int, db: Session = Depends(get_db)):
     )
     if not row:
         raise HTTPException(status_code=404, detail="No resource usage found for proxy")
-    return row
+    baseline_scorer.ensure_loaded(db)
+    result = ResourceUsageSchema.model_validate(row)
+    result.anomaly_scores = baseline_scorer.score_usage(row)
+    return result
 
 
 class ActiveInterfaceItem(BaseModel):
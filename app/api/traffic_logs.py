@@ -1,28 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import insert as sa_insert
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
+import asyncio
 import csv
 import io
+import json
 import shlex
 from app.utils.ssh import ssh_exec
 
 from app.database.database import get_db
 from app.models.proxy import Proxy
 from app.schemas.traffic_log import TrafficLogResponse, TrafficLogRecord, TrafficLogDB, MultiTrafficLogResponse
-from app.models.traffic_log import TrafficLog as TrafficLogModel
-from app.utils.traffic_log_parser import parse_log_line
+from app.models.traffic_log import RECORD_COLUMNS, TrafficLog as TrafficLogModel
+from app.services.traffic_log_collector import CollectProgress, stream_collect, collect_incremental, remote_compression
+from app.services.traffic_log_query import (
+    filtered_query, ordered, cached_count, encode_cursor, decode_cursor, keyset_clause,
+)
+from app.services.traffic_log_analysis import (
+    summarize_stored_logs, summarize_remote_logs, stored_log_histogram, tail_source, REMOTE_AGG_TIMEOUT_SEC,
+)
+from app.services.traffic_log_histogram import bucket_start, chart_series, check_bucket_count, parse_interval
+from app.services.traffic_log_window import plan_window_command, plan_window_source
+from app.services.traffic_log_live import LiveSubscriber, live_tails
+from app.services.traffic_log_federated import federated_search, FEDERATED_SEARCH_DEADLINE_SEC
+from app.services.traffic_log_upload import (
+    analyze_upload, spool_upload, start_upload_analysis, upload_registry, UPLOAD_HISTOGRAM_BASE_SEC,
+)
+from app.services.traffic_log_jobs import (
+    traffic_log_jobs, ProxyBusyError, FINISHED_STATES, COMPLETED, LOADED_BLOCKS_KEPT, PREVIOUS_LOGS_KEPT,
+)
 from app.utils.crypto import decrypt_string_if_encrypted
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.utils.time import KST_TZ
 import logging
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-_live_state: Dict[int, int] = {}  # proxy_id → last known line count
+# 스트리밍 수집 상한: 줄 수, 줄당 바이트 상한(head -c), 원격 timeout 산정용 처리량
+MAX_COLLECT_LINES = 500000
+COLLECT_BYTES_PER_LINE = 4096
+COLLECT_LINES_PER_SEC = 2000
+# 원격 사전 집계 분석의 최대 줄 수
+MAX_REMOTE_AGG_LINES = 5000000
+# 작업 진행 상황 웹소켓 전송 주기 (초)
+JOB_PROGRESS_INTERVAL_SEC = 0.5
+# 실시간 감시: 전송 주기, 메시지당 최대 레코드 수, 새 레코드가 없을 때 상태 전송 주기 (초)
+LIVE_PUSH_INTERVAL_SEC = 0.25
+LIVE_BATCH_RECORDS = 500
+LIVE_HEARTBEAT_SEC = 5.0
 
 
 def _validate_query(q: Optional[str]) -> Optional[str]:
@@ -38,14 +66,19 @@ def _validate_query(q: Optional[str]) -> Optional[str]:
 	return q
 
 
-def _build_remote_command(log_path: str, q: Optional[str], limit: int, direction: str) -> str:
+def _build_remote_command(log_path: str, q: Optional[str], limit: int, direction: str, max_bytes: int = 10485760, timeout_sec: int = 15, rotated_files: int = 0, reverse: bool = False) -> str:
+	if rotated_files > 0:
+		return _build_rotated_command(log_path, q, limit, direction, rotated_files, max_bytes=max_bytes, timeout_sec=timeout_sec)
 	if ".." in log_path:
 		raise HTTPException(status_code=400, detail="log path must not contain '..'")
 	safe_path = shlex.quote(log_path)
 	limit_str = str(limit)
-	base_prefix = "timeout 15s nice -n 10 ionice -c2 -n7 "
+	base_prefix = f"timeout {int(timeout_sec)}s nice -n 10 ionice -c2 -n7 "
 	# Increased buffer from 1MB to 10MB to accommodate up to 10,000 lines (avg line length ~1KB)
-	clean_filter = " | sed -e 's/[^[:print:]\\t]//g' | head -c 10485760 | cat"
+	clean_filter = f" | sed -e 's/[^[:print:]\\t]//g' | head -c {int(max_bytes)} | cat"
+	if reverse:
+		# 결과를 마지막 줄부터 출력. 바이트 상한보다 먼저 뒤집어야 상한에 걸려도 최신 줄이 남습니다
+		clean_filter = " | tac" + clean_filter
 	if q:
 		safe_q = shlex.quote(q)
 		grep_cmd = f"grep -F -- {safe_q} {safe_path}"
@@ -57,6 +90,118 @@ def _build_remote_command(log_path: str, q: Optional[str], limit: int, direction
 		return base_prefix + f"head -n {limit_str} {safe_path}" + clean_filter
 
 
+# 순환(rotate)된 로그 검색: 최대 파일 수, 원격에서 동시에 검색하는 파일 수
+MAX_ROTATED_FILES = 30
+ROTATED_SEARCH_PARALLEL = 2
+
+# 검색 대상 파일 목록 ($p 자신 + access.log.1, access.log-20261018.gz, access20261018.log.gz 형식 형제 파일)
+_ROTATED_LIST = 'ls -1dt{order} -- "$p" "$p".* "$p"-* "${{p%.log}}"[0-9]* 2>/dev/null | while IFS= read -r f; do [ -f "$f" ] && echo "$f"; done | head -n {files}'
+# 파일 k를 압축 형식에 맞게 풀어 검색한 결과를 $t/k.out에 쓰고 $t/k.done으로 완료 표시
+_ROTATED_SEARCH_FN = (
+	's() {{ f=$(sed -n "$1p" "$t/files"); '
+	'case "$f" in *.gz) d="gzip -dc";; *.bz2) d="bzip2 -dc";; *.xz) d="xz -dc";; *) d=cat;; esac; '
+	'nice -n 10 ionice -c2 -n7 $d -- "$f" 2>/dev/null{grep} | {cut} > "$t/$1.out"; touch "$t/$1.done"; }}'
+)
+# 파일 순서대로 결과를 내보내며 limit에 도달하면 남은 검색을 종료 (kill 0: timeout이 만든 프로세스 그룹 전체)
+_ROTATED_MERGE = """left={limit}; k=1; i=1
+while [ $i -le $n ] && [ $i -le {parallel} ]; do s $i & i=$((i+1)); done
+while [ $k -le $n ]; do
+while [ ! -e "$t/$k.done" ]; do sleep 0.1; done
+c=$(wc -l < "$t/$k.out")
+if [ $c -ge $left ]; then head -n $left "$t/$k.out"; rm -rf "$t"; kill 0; fi
+cat "$t/$k.out"; left=$((left-c))
+if [ $i -le $n ]; then s $i & i=$((i+1)); fi
+k=$((k+1))
+done"""
+
+
+def _build_rotated_command(log_path: str, q: Optional[str], limit: int, direction: str, rotated_files: int,
+                           max_bytes: int = 10485760, timeout_sec: int = 15) -> str:
+	"""현재 로그와 순환된 형제 파일(.gz/.bz2/.xz 포함)을 원격에서 병렬 검색합니다.
+
+	tail: 최신 파일부터, 파일 안에서도 최신 줄부터(newest-first) limit건.
+	head: 가장 오래된 파일부터 앞에서 limit건.
+	파일별 검색은 ROTATED_SEARCH_PARALLEL개씩 미리 실행하고, 결과는 파일 순서대로 내보내며
+	limit을 채우면 나머지 파일은 풀지 않고 종료합니다.
+	"""
+	if ".." in log_path:
+		raise HTTPException(status_code=400, detail="log path must not contain '..'")
+	grep = f" | grep -F -- {shlex.quote(q)}" if q else ""
+	cut = f"tail -n {int(limit)} | tac" if direction == "tail" else f"head -n {int(limit)}"
+	script = "\n".join([
+		f"p={shlex.quote(log_path)}",
+		't=$(mktemp -d) || exit 1',
+		"trap 'rm -rf \"$t\"' EXIT",
+		_ROTATED_LIST.format(order="" if direction == "tail" else "r", files=int(rotated_files) + 1) + ' > "$t/files"',
+		'n=$(wc -l < "$t/files")',
+		_ROTATED_SEARCH_FN.format(grep=grep, cut=cut),
+		_ROTATED_MERGE.format(limit=int(limit), parallel=ROTATED_SEARCH_PARALLEL),
+	])
+	clean_filter = f" | sed -e 's/[^[:print:]\\t]//g' | head -c {int(max_bytes)} | cat"
+	return f"timeout {int(timeout_sec)}s sh -c {shlex.quote(script)}" + clean_filter
+
+
+def _collect_byte_cap(limit: int) -> int:
+	return max(10485760, limit * COLLECT_BYTES_PER_LINE)
+
+
+def _collect_command(log_path: str, q: Optional[str], limit: int, direction: str, rotated_files: int = 0) -> str:
+	"""스트리밍 수집용 원격 명령. 바이트 상한과 원격 timeout을 요청 줄 수에 비례해 늘립니다."""
+	timeout_sec = max(15, limit // COLLECT_LINES_PER_SEC)
+	return _build_remote_command(log_path, q, limit, direction, max_bytes=_collect_byte_cap(limit), timeout_sec=timeout_sec, rotated_files=rotated_files)
+
+
+def _resolve_window(start: Optional[datetime], end: Optional[datetime], rotated_files: int = 0) -> Optional[Tuple[datetime, datetime]]:
+	"""start/end 쿼리를 (start, end)로 정규화합니다. 시간대가 없으면 KST, end 생략 시 현재 시각."""
+	if start is None:
+		if end is not None:
+			raise HTTPException(status_code=400, detail="start is required when end is given")
+		return None
+	if rotated_files > 0:
+		raise HTTPException(status_code=400, detail="start/end cannot be combined with rotated_files")
+	if start.tzinfo is None:
+		start = start.replace(tzinfo=KST_TZ)
+	end = datetime.now(KST_TZ) if end is None else end if end.tzinfo else end.replace(tzinfo=KST_TZ)
+	if end < start:
+		raise HTTPException(status_code=400, detail="end must not be earlier than start")
+	return start, end
+
+
+def _event_ts_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+	"""DB 조회용 시간 구간 → (start_ts, end_ts) epoch 초. 시간대가 없으면 KST, 생략한 끝은 열린 구간."""
+	start_ts, end_ts = (
+		int((v if v.tzinfo else v.replace(tzinfo=KST_TZ)).timestamp()) if v is not None else None
+		for v in (start, end)
+	)
+	if start_ts is not None and end_ts is not None and end_ts < start_ts:
+		raise HTTPException(status_code=400, detail="end must not be earlier than start")
+	return start_ts, end_ts
+
+
+def _window_command(p: Proxy, q: Optional[str], limit: int, direction: str, window: Tuple[datetime, datetime],
+                    max_bytes: int = 10485760, timeout_sec: int = 15, reverse: bool = False) -> str:
+	"""원격 파일에서 구간 시작 위치를 이분 탐색한 뒤 그 구간만 읽는 명령을 만듭니다."""
+	try:
+		return plan_window_command(p, p.traffic_log_path, window[0], window[1], q, limit, direction,
+		                           max_bytes=max_bytes, timeout_sec=timeout_sec, reverse=reverse)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+
+
+def _stream_collect_proxy(db: Session, p: Proxy, q: Optional[str], limit: int, direction: str, rotated_files: int = 0,
+                          window: Optional[Tuple[datetime, datetime]] = None, **kwargs):
+	"""교체 모드 수집. 원격에 압축 도구가 있으면 압축 전송하며 바이트 상한은 해제된 크기에 적용됩니다.
+
+	window가 있으면 파일 전체 대신 해당 시간 구간 주변만 읽습니다.
+	"""
+	if window:
+		command = _window_command(p, q, limit, direction, window, max_bytes=_collect_byte_cap(limit),
+		                          timeout_sec=max(15, limit // COLLECT_LINES_PER_SEC))
+	else:
+		command = _collect_command(p.traffic_log_path, q, limit, direction, rotated_files)
+	return stream_collect(db, p, command, compression=remote_compression(p), max_bytes=_collect_byte_cap(limit), **kwargs)
+
+
 def _ssh_exec(host: str, port: int, username: str, password: Optional[str], command: str) -> str:
     try:
         return ssh_exec(
@@ -74,54 +219,54 @@ def _ssh_exec(host: str, port: int, username: str, password: Optional[str], comm
         raise HTTPException(status_code=502, detail=f"ssh error: {str(e)}")
 
 
-def _fetch_and_parse_for_proxy(db_proxy: Proxy, q: Optional[str], limit: int, direction: str, db: Session) -> Tuple[List[TrafficLogRecord], str | None]:
+def _fetch_and_parse_for_proxy(db_proxy: Proxy, q: Optional[str], limit: int, direction: str, db: Session, keep_records: bool = True, rotated_files: int = 0, window: Optional[Tuple[datetime, datetime]] = None) -> Tuple[List[TrafficLogRecord], int, str | None]:
+    """SSH 출력을 스트리밍으로 파싱해 DB에 블록 단위로 적재합니다. (응답 레코드, 적재 건수, 오류)를 돌려줍니다.
+
+    keep_records=False이면 응답용 레코드(행 dict·TrafficLogRecord)를 만들지 않아 적재가 빨라지고
+    메모리 사용량이 수집 크기와 무관해집니다.
+    """
+    records: List[TrafficLogRecord] = []
+    progress = CollectProgress()
+
+    def _keep(lines: List[str], rows: List[Dict[str, Any]]) -> None:
+        proxy_id = str(db_proxy.id)
+        for row in rows:
+            rec = {k: v for k, v in row.items() if k != "collected_at"}
+            rec["proxy_id"] = proxy_id
+            records.append(TrafficLogRecord(**rec))
+
     try:
-        command = _build_remote_command(db_proxy.traffic_log_path, q, limit, direction)
-        raw = _ssh_exec(db_proxy.host, db_proxy.port or 22, db_proxy.username, decrypt_string_if_encrypted(db_proxy.password), command)
-        lines = [ln for ln in raw.split("\n") if ln]
-        
-        records: List[TrafficLogRecord] = []
-        to_insert: List[Dict[str, Any]] = []
-        collected_ts = datetime.utcnow()
-        
-        for ln in lines:
-            try:
-                rec_dict = parse_log_line(ln)
-                # Ensure proxy_id is set in the record
-                rec_dict["proxy_id"] = str(db_proxy.id)
-                rec_dict["_raw_line_"] = ln
-                records.append(TrafficLogRecord(**rec_dict))
-                # SQLAlchemy 2.0: proxy_id는 int, _raw_line_은 별도 지정 (언더스코어 속성 충돌 방지)
-                row = {"proxy_id": db_proxy.id, "collected_at": collected_ts}
-                row.update({k: v for k, v in rec_dict.items() if k not in ("proxy_id", "_raw_line_")})
-                to_insert.append(row)
-            except Exception:
-                # Add unparseable line as url_path for some visibility
-                records.append(TrafficLogRecord(url_path=ln, proxy_id=str(db_proxy.id)))
-        
-        try:
-            db.query(TrafficLogModel).filter(TrafficLogModel.proxy_id == db_proxy.id).delete(synchronize_session=False)
-            if to_insert:
-                db.execute(sa_insert(TrafficLogModel), to_insert)
-            db.commit()
-        except Exception as e:
-            db.rollback()
-            logger.error(f"DB insert failed for proxy {db_proxy.id}: {e}")
-        
-        return records, None
+        _stream_collect_proxy(db, db_proxy, q, limit, direction, rotated_files, window, progress=progress,
+                              on_block=_keep if keep_records else None)
+        return records, progress.inserted, None
+    except HTTPException as e:
+        return records, progress.inserted, str(e.detail)
     except Exception as e:
-        return [], str(e)
+        logger.error(f"Streaming collection failed for proxy {db_proxy.id}: {e}")
+        return records, progress.inserted, f"ssh error: {str(e)}"
 
 
-@router.post("/traffic-logs/collect")
+@router.post("/traffic-logs/collect", status_code=202)
 def collect_traffic_logs_task(
     proxy_ids: str = Query(..., description="Comma-separated list of proxy IDs"),
     db: Session = Depends(get_db),
     q: Optional[str] = Query(default=None, max_length=256),
-    limit: int = Query(default=5000, ge=1, le=50000),
+    limit: int = Query(default=5000, ge=1, le=MAX_COLLECT_LINES),
     direction: str = Query(default="tail", pattern=r"^(head|tail)$"),
+    mode: str = Query(default="replace", pattern=r"^(replace|incremental)$"),
+    rotated_files: int = Query(default=0, ge=0, le=MAX_ROTATED_FILES),
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
 ):
-    """프록시에서 로그를 읽어와 DB에 저장합니다 (완료 후 응답)."""
+    """프록시 로그 수집 작업을 등록하고 작업 ID를 즉시 반환합니다.
+
+    수집은 백그라운드 실행기에서 프록시별로 스트리밍 적재되며, 진행 상황은
+    GET /traffic-logs/jobs/{job_id} 또는 웹소켓 /ws/traffic-logs/jobs/{job_id}로 확인합니다.
+    mode=incremental이면 마지막 수집 이후 추가된 바이트만 가져와 기존 로그에 추가합니다
+    (limit/direction 미사용, q는 지정할 수 없음).
+    rotated_files > 0이면 교체 모드에서 순환된 로그(.gz 등)도 최신 파일부터 함께 검색합니다.
+    start/end가 있으면 교체 모드에서 해당 시간 구간만 읽습니다 (시간대 생략 시 KST, end 생략 시 현재).
+    """
     try:
         p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
     except ValueError:
@@ -132,44 +277,87 @@ def collect_traffic_logs_task(
         raise HTTPException(status_code=404, detail="No active proxies found")
 
     q_valid = _validate_query(q)
+    if mode == "incremental" and q_valid:
+        # 증분 커서는 걸러진 줄도 지나가므로 필터를 적용하면 그 줄은 이후 수집에서 다시 읽을 수 없습니다
+        raise HTTPException(status_code=400, detail="q is not supported with mode=incremental")
+    window = _resolve_window(start, end, rotated_files) if mode == "replace" else None
 
     from app.database.database import SessionLocal
 
-    errors: Dict[str, str] = {}
+    def collect_one(local_db: Session, p: Proxy, progress, cancel) -> None:
+        if mode == "incremental":
+            collect_incremental(local_db, p, progress=progress, cancel=cancel)
+        else:
+            _stream_collect_proxy(local_db, p, q_valid, limit, direction, rotated_files, window, progress=progress, cancel=cancel)
 
-    def collect_one(p):
-        local_db = SessionLocal()
-        try:
-            logger.info(f"[traffic_logs] Collecting for proxy {p.id}")
-            _, err = _fetch_and_parse_for_proxy(p, q_valid, limit, direction, local_db)
-            if err:
-                logger.error(f"[traffic_logs] Collection failed for proxy {p.id}: {err}")
-                errors[str(p.id)] = err
-            else:
-                logger.info(f"[traffic_logs] Done collecting for proxy {p.id}")
-        except Exception as e:
-            logger.error(f"[traffic_logs] Collection failed for proxy {p.id}: {e}")
-            errors[str(p.id)] = str(e)
-        finally:
-            local_db.close()
-
-    with ThreadPoolExecutor(max_workers=min(len(proxies), 4)) as executor:
-        futures = [executor.submit(collect_one, p) for p in proxies]
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception:
-                pass
+    try:
+        job = traffic_log_jobs.submit(
+            proxies, collect_one, SessionLocal,
+            params={"q": q_valid, "limit": limit, "direction": direction, "mode": mode, "rotated_files": rotated_files,
+                    "start": window[0].isoformat() if window else None, "end": window[1].isoformat() if window else None},
+        )
+    except ProxyBusyError as e:
+        raise HTTPException(status_code=409, detail=f"이미 수집 중인 프록시가 있습니다: {e.proxy_ids}")
 
     return {
-        "message": "Collection complete",
+        "message": "Collection started",
+        "job_id": job.id,
         "proxies": [p.id for p in proxies],
-        "succeeded": len(proxies) - len(errors),
-        "failed": len(errors),
-        "errors": errors,
+        "status": job.status,
     }
 
 
+@router.get("/traffic-logs/jobs")
+def list_traffic_log_jobs():
+    """최근 수집 작업 목록"""
+    return [job.as_dict() for job in traffic_log_jobs.list_jobs()]
+
+
+@router.get("/traffic-logs/jobs/{job_id}")
+def get_traffic_log_job(job_id: str):
+    """수집 작업 상태와 프록시별 진행 상황"""
+    job = traffic_log_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
+
+
+@router.delete("/traffic-logs/jobs/{job_id}")
+def cancel_traffic_log_job(job_id: str):
+    """수집 작업을 취소합니다.
+
+    교체 모드는 적재 중이던 새 로그를 버리고 이전 로그를 유지하며, 증분 모드는 이미 적재된 블록을 유지합니다.
+    프록시별 결과는 작업이 끝난 뒤 proxies[].note로 확인합니다.
+    """
+    job = traffic_log_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = job.as_dict()
+    if job.cancel_event.is_set():
+        result["message"] = LOADED_BLOCKS_KEPT if job.params.get("mode") == "incremental" else PREVIOUS_LOGS_KEPT
+    return result
+
+
+@router.websocket("/ws/traffic-logs/jobs/{job_id}")
+async def traffic_log_job_progress(websocket: WebSocket, job_id: str):
+    """작업이 끝날 때까지 진행 상황을 주기적으로 전송합니다."""
+    await websocket.accept()
+    try:
+        while True:
+            job = traffic_log_jobs.get(job_id)
+            if not job:
+                await websocket.send_json({"type": "error", "detail": "Job not found"})
+                break
+            snapshot = job.as_dict()
+            await websocket.send_json({"type": "progress", "data": snapshot})
+            if snapshot["status"] in FINISHED_STATES:
+                break
+            await asyncio.sleep(JOB_PROGRESS_INTERVAL_SEC)
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+
 @router.get("/traffic-logs", response_model=MultiTrafficLogResponse)
 def get_multi_proxy_traffic_logs(
     proxy_ids: str = Query(..., description="Comma-separated list of proxy IDs"),
@@ -181,10 +369,12 @@ def get_multi_proxy_traffic_logs(
     filter_col: Optional[str] = Query(default=None),
     filter_val: Optional[str] = Query(default=None),
     search: Optional[str] = Query(default=None, max_length=256),
+    start: Optional[datetime] = Query(default=None, description="Event time from (KST if no timezone)"),
+    end: Optional[datetime] = Query(default=None, description="Event time to, inclusive (KST if no timezone)"),
+    cursor: Optional[str] = Query(default=None, description="이전 응답의 next_cursor (지정 시 offset 대신 사용)"),
+    count_mode: str = Query(default="exact", pattern=r"^(exact|estimated)$"),
 ):
     """DB에 저장된 로그를 페이징/정렬하여 조회합니다."""
-    from sqlalchemy import or_
-
     try:
         p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
     except ValueError:
@@ -193,57 +383,30 @@ def get_multi_proxy_traffic_logs(
     if not p_ids:
         return MultiTrafficLogResponse(requested=0, succeeded=0, failed=0, records=[], count=0, total_count=0)
 
-    query = db.query(TrafficLogModel).filter(TrafficLogModel.proxy_id.in_(p_ids))
-
-    # 전체 텍스트 검색 (결과 내 검색)
-    if search and search.strip():
-        s = search.strip()
-        query = query.filter(or_(
-            TrafficLogModel.url_host.contains(s),
-            TrafficLogModel.client_ip.contains(s),
-            TrafficLogModel.url_path.contains(s),
-            TrafficLogModel.username.contains(s),
-            TrafficLogModel.action_names.contains(s),
-            TrafficLogModel.url_categories.contains(s),
-            TrafficLogModel.comm_name.contains(s),
-        ))
-
-    # 컬럼 필터 적용
-    if filter_col and filter_val:
-        col_attr = getattr(TrafficLogModel, filter_col, None)
-        if col_attr is not None:
-            col_type = col_attr.property.columns[0].type.__class__.__name__
-            if col_type in ("Integer", "Float"):
-                try:
-                    numeric_val = float(filter_val)
-                    query = query.filter(col_attr == numeric_val)
-                except ValueError:
-                    pass
-            else:
-                query = query.filter(col_attr.contains(filter_val))
-
-    # 전체 카운트 (페이징 전)
-    total_count = query.count()
-
-    # 정렬 적용
-    if sort_col:
-        col_attr = getattr(TrafficLogModel, sort_col, None)
-        if col_attr:
-            if sort_dir == "desc":
-                query = query.order_by(col_attr.desc())
-            else:
-                query = query.order_by(col_attr.asc())
+    start_ts, end_ts = _event_ts_range(start, end)
+    query = filtered_query(db, p_ids, search, filter_col, filter_val, start_ts, end_ts)
+
+    # 전체 카운트 (페이징 전, 필터 조건 + 데이터 버전별 캐시)
+    count_key = (tuple(sorted(set(p_ids))), (search or "").strip(), filter_col or "", filter_val or "",
+                 start_ts, end_ts)
+    total_count, count_estimated = cached_count(db, query, count_key, estimated=count_mode == "estimated")
+
+    # 정렬 + 페이징 적용 (커서가 있으면 키셋, 없으면 OFFSET)
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor)
+            query = query.filter(keyset_clause(sort_col, sort_dir, last_value, last_id))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows = ordered(query, sort_col, sort_dir).limit(limit).all()
     else:
-        query = query.order_by(TrafficLogModel.id.desc())
+        rows = ordered(query, sort_col, sort_dir).offset(offset).limit(limit).all()
 
-    # 페이징 적용
-    rows = query.offset(offset).limit(limit).all()
-    
     # ORM 객체를 TrafficLogRecord 스키마로 변환
     records = []
     for row in rows:
         # dict 변환 시 _sa_instance_state 제외
-        d = {c.name: getattr(row, c.name) for c in row.__table__.columns}
+        d = {name: getattr(row, name) for name in RECORD_COLUMNS}
         # proxy_id는 DB에서 int로 오지만 스키마는 Optional[str]이므로 변환
         if d.get('proxy_id') is not None:
             d['proxy_id'] = str(d['proxy_id'])
@@ -256,8 +419,10 @@ def get_multi_proxy_traffic_logs(
         records=records,
         count=len(records),
         total_count=total_count,
+        count_estimated=count_estimated,
         offset=offset,
-        limit=limit
+        limit=limit,
+        next_cursor=encode_cursor(rows[-1], sort_col) if len(rows) == limit else None,
     )
 
 
@@ -270,10 +435,10 @@ def export_traffic_logs(
     filter_col: Optional[str] = Query(default=None),
     filter_val: Optional[str] = Query(default=None),
     search: Optional[str] = Query(default=None, max_length=256),
+    start: Optional[datetime] = Query(default=None, description="Event time from (KST if no timezone)"),
+    end: Optional[datetime] = Query(default=None, description="Event time to, inclusive (KST if no timezone)"),
 ):
     """필터/정렬 상태 그대로 전체 데이터를 CSV로 내보냅니다."""
-    from sqlalchemy import or_
-
     try:
         p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
     except ValueError:
@@ -282,41 +447,10 @@ def export_traffic_logs(
     if not p_ids:
         raise HTTPException(status_code=400, detail="proxy_ids is required")
 
-    query = db.query(TrafficLogModel).filter(TrafficLogModel.proxy_id.in_(p_ids))
-
-    if search and search.strip():
-        s = search.strip()
-        query = query.filter(or_(
-            TrafficLogModel.url_host.contains(s),
-            TrafficLogModel.client_ip.contains(s),
-            TrafficLogModel.url_path.contains(s),
-            TrafficLogModel.username.contains(s),
-            TrafficLogModel.action_names.contains(s),
-            TrafficLogModel.url_categories.contains(s),
-            TrafficLogModel.comm_name.contains(s),
-        ))
-
-    if filter_col and filter_val:
-        col_attr = getattr(TrafficLogModel, filter_col, None)
-        if col_attr is not None:
-            col_type = col_attr.property.columns[0].type.__class__.__name__
-            if col_type in ("Integer", "Float"):
-                try:
-                    numeric_val = float(filter_val)
-                    query = query.filter(col_attr == numeric_val)
-                except ValueError:
-                    pass
-            else:
-                query = query.filter(col_attr.contains(filter_val))
-
-    if sort_col:
-        col_attr = getattr(TrafficLogModel, sort_col, None)
-        if col_attr:
-            query = query.order_by(col_attr.desc() if sort_dir == "desc" else col_attr.asc())
-    else:
-        query = query.order_by(TrafficLogModel.id.desc())
+    start_ts, end_ts = _event_ts_range(start, end)
+    query = ordered(filtered_query(db, p_ids, search, filter_col, filter_val, start_ts, end_ts), sort_col, sort_dir)
 
-    columns = [c.name for c in TrafficLogModel.__table__.columns]
+    columns = RECORD_COLUMNS
 
     def generate_csv():
         buf = io.StringIO()
@@ -339,108 +473,67 @@ def export_traffic_logs(
     )
 
 
-def _human_bytes(n: int) -> str:
-    n = int(n or 0)
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if n < 1024:
-            return f"{n:.1f}{unit}"
-        n //= 1024
-    return f"{n:.1f}PB"
-
-
-def _detect_traffic_anomalies(
-    clients: List[Dict[str, Any]],
-    client_blocked: Any,
-    client_errors: Any,
-) -> List[Dict[str, Any]]:
-    import math
-
-    if not clients:
-        return []
-
-    def _sigma(values: List[float]):
-        if not values:
-            return 0.0, 0.0
-        mean = sum(values) / len(values)
-        variance = sum((v - mean) ** 2 for v in values) / len(values)
-        return mean, math.sqrt(variance)
-
-    req_mean, req_std = _sigma([float(c["requests"]) for c in clients])
-    recv_mean, recv_std = _sigma([float(c["recv_bytes"]) for c in clients])
-
-    anomalies: List[Dict[str, Any]] = []
-
-    for c in clients:
-        ip = c["client_ip"]
-        reqs = c["requests"]
-        recv = c["recv_bytes"]
-        blocked_n = client_blocked.get(ip, 0)
-        errors_n = client_errors.get(ip, 0)
-
-        # 차단율 이상
-        if reqs >= 5 and blocked_n > 0:
-            rate = blocked_n / reqs
-            if rate >= 0.3:
-                anomalies.append({
-                    "type": "block_heavy",
-                    "severity": "critical" if rate >= 0.6 else "warning",
-                    "label": "차단 과다",
-                    "subject": ip,
-                    "detail": f"{rate:.0%} 차단율 ({blocked_n:,}/{reqs:,}건)",
-                    "_sv": rate,
-                })
+@router.get("/traffic-logs/search")
+def federated_traffic_log_search(
+    db: Session = Depends(get_db),
+    proxy_ids: Optional[str] = Query(default=None, description="Comma-separated proxy IDs (default: all active)"),
+    q: str = Query(..., min_length=1, max_length=256, description="Fixed-string search (grep -F)"),
+    limit: int = Query(default=1000, ge=1, le=10000),
+    direction: str = Query(default="tail", pattern=r"^(head|tail)$"),
+    rotated_files: int = Query(default=0, ge=0, le=MAX_ROTATED_FILES),
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+):
+    """여러 프록시에서 동시에 검색해 시각 순으로 병합한 결과를 NDJSON으로 스트리밍합니다 (DB 적재 없음).
 
-        # HTTP 오류율 이상 (4xx/5xx)
-        if reqs >= 5 and errors_n > 0:
-            rate = errors_n / reqs
-            if rate >= 0.3:
-                anomalies.append({
-                    "type": "error_heavy",
-                    "severity": "critical" if rate >= 0.6 else "warning",
-                    "label": "오류 집중",
-                    "subject": ip,
-                    "detail": f"{rate:.0%} 오류율 ({errors_n:,}/{reqs:,}건, 4xx/5xx)",
-                    "_sv": rate,
-                })
+    tail은 최신 로그부터, head는 오래된 로그부터 전체 limit건까지 내보냅니다.
+    줄마다 {"type": "record", "data": {...}}, 마지막 줄은 프록시별 상태가 담긴 {"type": "summary", "data": {...}}입니다.
+    """
+    q_valid = _validate_query(q)
+    window = _resolve_window(start, end, rotated_files)
+    query = db.query(Proxy).filter(Proxy.is_active == True)
+    if proxy_ids:
+        try:
+            p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid proxy_ids format")
+        query = query.filter(Proxy.id.in_(p_ids))
+    proxies = [p for p in query.all() if p.traffic_log_path]
+    if not proxies:
+        raise HTTPException(status_code=404, detail="No active proxies found")
+    deadline = FEDERATED_SEARCH_DEADLINE_SEC
+    # rotated 검색의 tail 결과는 이미 최신 줄부터이며, 나머지 tail 결과는 원격에서 뒤집어 최신 줄부터 병합
+    reverse = direction == "tail" and not rotated_files
 
-        # 요청 수 통계적 이상 (> 평균+2σ)
-        if req_std > 0:
-            z = (reqs - req_mean) / req_std
-            if z > 2.0:
-                anomalies.append({
-                    "type": "request_heavy",
-                    "severity": "critical" if z > 3.0 else "warning",
-                    "label": "요청 과다",
-                    "subject": ip,
-                    "detail": f"{reqs:,}건 요청 (평균 대비 {z:.1f}σ)",
-                    "_sv": z,
-                })
+    def command_for(p: Proxy) -> str:
+        if window:
+            return _window_command(p, q_valid, limit, direction, window, timeout_sec=deadline, reverse=reverse)
+        return _build_remote_command(p.traffic_log_path, q_valid, limit, direction, timeout_sec=deadline,
+                                     rotated_files=rotated_files, reverse=reverse)
 
-        # 수신 트래픽 통계적 이상 (> 평균+2σ)
-        if recv_std > 0:
-            z = (recv - recv_mean) / recv_std
-            if z > 2.0:
-                anomalies.append({
-                    "type": "traffic_heavy",
-                    "severity": "critical" if z > 3.0 else "warning",
-                    "label": "트래픽 과다",
-                    "subject": ip,
-                    "detail": f"수신 {_human_bytes(recv)} (평균 대비 {z:.1f}σ)",
-                    "_sv": z,
-                })
+    def generate():
+        for msg in federated_search(proxies, command_for, limit, newest_first=direction == "tail",
+                                    deadline_sec=deadline):
+            yield json.dumps(msg, ensure_ascii=False) + "\n"
 
-    anomalies.sort(key=lambda x: (0 if x["severity"] == "critical" else 1, -x.get("_sv", 0)))
-    for a in anomalies:
-        a.pop("_sv", None)
-    return anomalies
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/traffic-logs/analyze")
 def analyze_db_traffic_logs(
     proxy_ids: str = Query(..., description="Comma-separated proxy IDs"),
     db: Session = Depends(get_db),
+    source: str = Query(default="db", pattern=r"^(db|remote)$", description="db: 저장된 로그, remote: 프록시에서 직접 집계"),
+    lines: int = Query(default=50000, ge=1, le=MAX_REMOTE_AGG_LINES, description="remote: 집계할 마지막 줄 수"),
+    q: Optional[str] = Query(default=None, max_length=256, description="remote: 이 문자열이 포함된 줄만 집계"),
+    start: Optional[datetime] = Query(default=None, description="remote: 구간 시작 (지정 시 lines 대신 사용)"),
+    end: Optional[datetime] = Query(default=None),
 ):
-    """DB에 저장된 전체 트래픽 로그를 분석합니다 (Top N 제한 없음)."""
+    """트래픽 로그를 분석합니다 (Top N 제한 없음).
+
+    source=db는 DB에 저장된 전체 로그를, source=remote는 각 프록시에서 마지막 lines줄(또는 start~end 구간)을
+    awk로 집계해 키별 합계 표만 받아 합칩니다. remote 응답에는 프록시별 실패 사유("errors")가 추가됩니다.
+    """
     try:
         p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
     except ValueError:
@@ -449,186 +542,129 @@ def analyze_db_traffic_logs(
     if not p_ids:
         raise HTTPException(status_code=400, detail="proxy_ids required")
 
-    from collections import Counter, defaultdict
+    if source == "db":
+        return summarize_stored_logs(db, p_ids)
 
-    rows = db.query(TrafficLogModel).filter(TrafficLogModel.proxy_id.in_(p_ids)).all()
+    q_valid = _validate_query(q)
+    window = _resolve_window(start, end)
+    proxies = [
+        p for p in db.query(Proxy).filter(Proxy.id.in_(p_ids)).filter(Proxy.is_active == True).all()
+        if p.traffic_log_path
+    ]
+    if not proxies:
+        raise HTTPException(status_code=404, detail="No active proxies found")
 
-    host_counter: Counter = Counter()
-    client_req_counter: Counter = Counter()
-    status_counter: Counter = Counter()
-    proxy_counter: Counter = Counter()
-    client_recv: defaultdict = defaultdict(int)
-    client_sent: defaultdict = defaultdict(int)
-    client_blocked: defaultdict = defaultdict(int)
-    client_errors: defaultdict = defaultdict(int)
-    host_recv: defaultdict = defaultdict(int)
-    host_sent: defaultdict = defaultdict(int)
+    def source_for(p: Proxy) -> str:
+        if window:
+            return plan_window_source(p, p.traffic_log_path, window[0], window[1], REMOTE_AGG_TIMEOUT_SEC)
+        return tail_source(p.traffic_log_path, lines)
 
-    blocked = 0
-    total_recv = 0
-    total_sent = 0
-    unique_clients: set = set()
-    unique_hosts: set = set()
+    return summarize_remote_logs(proxies, source_for, q_valid)
 
-    proxy_map: Dict[int, str] = {}
-    for p in db.query(Proxy).filter(Proxy.id.in_(p_ids)).all():
-        proxy_map[p.id] = p.host
 
-    for row in rows:
-        client_ip = str(row.client_ip or "")
-        url_host = str(row.url_host or "")
-        status = str(row.response_statuscode or "Unknown")
-        recv_b = int(row.recv_byte or 0)
-        sent_b = int(row.sent_byte or 0)
-        action = str(row.action_names or "")
-        proxy_label = proxy_map.get(row.proxy_id, f"#{row.proxy_id}")
-
-        if client_ip:
-            client_req_counter[client_ip] += 1
-            unique_clients.add(client_ip)
-            client_recv[client_ip] += max(0, recv_b)
-            client_sent[client_ip] += max(0, sent_b)
-            if action.strip().lower() == "block":
-                client_blocked[client_ip] += 1
-            try:
-                sc = int(row.response_statuscode or 0)
-                if 400 <= sc < 600:
-                    client_errors[client_ip] += 1
-            except Exception:
-                pass
-        if url_host:
-            host_counter[url_host] += 1
-            unique_hosts.add(url_host)
-            host_recv[url_host] += max(0, recv_b)
-            host_sent[url_host] += max(0, sent_b)
-
-        status_counter[status] += 1
-        proxy_counter[proxy_label] += 1
-
-        if action.strip().lower() == "block":
-            blocked += 1
-        total_recv += max(0, recv_b)
-        total_sent += max(0, sent_b)
-
-    hosts = [
-        {"host": h, "requests": c, "recv_bytes": host_recv[h], "sent_bytes": host_sent[h]}
-        for h, c in host_counter.most_common()
-    ]
-    clients = [
-        {"client_ip": ip, "requests": c, "recv_bytes": client_recv[ip], "sent_bytes": client_sent[ip]}
-        for ip, c in client_req_counter.most_common()
-    ]
-    statuses = [{"status": s, "count": c} for s, c in status_counter.most_common()]
-    proxies_dist = [{"proxy": p, "count": c} for p, c in proxy_counter.most_common()]
-    anomalies = _detect_traffic_anomalies(clients, client_blocked, client_errors)
+def _interval_sec(interval: str) -> int:
+    try:
+        return parse_interval(interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {
-        "summary": {
-            "total": len(rows),
-            "blocked": blocked,
-            "unique_clients": len(unique_clients),
-            "unique_hosts": len(unique_hosts),
-            "total_recv_bytes": total_recv,
-            "total_sent_bytes": total_sent,
-        },
-        "hosts": hosts,
-        "clients": clients,
-        "statuses": statuses,
-        "proxies": proxies_dist,
-        "anomalies": anomalies,
-    }
+
+@router.get("/traffic-logs/histogram")
+def traffic_log_histogram(
+    proxy_ids: str = Query(..., description="Comma-separated proxy IDs"),
+    db: Session = Depends(get_db),
+    interval: str = Query(default="1m", description="구간 간격 (10s, 1m, 5m, 1h 또는 초)"),
+    start: Optional[datetime] = Query(default=None, description="Event time from (KST if no timezone)"),
+    end: Optional[datetime] = Query(default=None, description="Event time to, inclusive (KST if no timezone)"),
+):
+    """저장된 로그의 시간 구간별 요청 수/수신·송신 바이트/차단/4xx/5xx (프록시별 + 합계).
+
+    timestamps는 구간 시작 epoch 밀리초이고, 지표 배열은 같은 순서로 빈 구간까지 0으로 채워집니다.
+    event_ts(로그 시각)가 없는 행은 제외됩니다.
+    """
+    try:
+        p_ids = [int(x.strip()) for x in proxy_ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid proxy_ids format")
+
+    if not p_ids:
+        raise HTTPException(status_code=400, detail="proxy_ids required")
+
+    interval_sec = _interval_sec(interval)
+    start_ts, end_ts = _event_ts_range(start, end)
+    try:
+        if start_ts is not None and end_ts is not None:
+            check_bucket_count(bucket_start(start_ts, interval_sec), end_ts, interval_sec)
+        tables = stored_log_histogram(db, p_ids, interval_sec, start_ts, end_ts)
+        result = chart_series(tables, interval_sec, start_ts, end_ts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    hosts = {p.id: p.host for p in db.query(Proxy.id, Proxy.host).filter(Proxy.id.in_(p_ids))}
+    result["series"] = [
+        {"proxy_id": pid, "proxy": hosts.get(pid, f"#{pid}"), **metrics}
+        for pid, metrics in result["series"].items()
+    ]
+    return result
 
 
-@router.get("/traffic-logs/live/{proxy_id}")
-def get_live_log(
+@router.websocket("/ws/traffic-logs/live/{proxy_id}")
+async def traffic_log_live_tail(
+    websocket: WebSocket,
     proxy_id: int,
-    initial_lines: int = Query(default=100, ge=1, le=1000),
     q: Optional[str] = Query(default=None, max_length=256),
     client_ip: Optional[str] = Query(default=None, max_length=64),
     url_host: Optional[str] = Query(default=None, max_length=256),
+    initial_lines: int = Query(default=100, ge=0, le=1000),
     db: Session = Depends(get_db),
 ):
-    """SSH로 로그 파일의 새 줄만 가져옵니다 (라인 오프셋 기반 폴링, 파싱 후 반환)."""
-    q_valid = _validate_query(q)
-    if not q_valid:
-        raise HTTPException(status_code=400, detail="키워드(q)는 필수입니다.")
-
-    db_proxy = db.query(Proxy).filter(Proxy.id == proxy_id).first()
-    if not db_proxy:
-        raise HTTPException(status_code=404, detail="Proxy not found")
-    if not db_proxy.traffic_log_path:
-        raise HTTPException(status_code=400, detail="traffic_log_path가 설정되지 않은 프록시입니다.")
-
-    safe_path = shlex.quote(db_proxy.traffic_log_path)
-    safe_q = shlex.quote(q_valid)
-    password = decrypt_string_if_encrypted(db_proxy.password)
-    host, port, username = db_proxy.host, db_proxy.port or 22, db_proxy.username
-    clean = " | sed -e 's/[^[:print:]\\t]//g'"
+    """원격 로그의 새 줄을 tail -F 채널로 받아 파싱된 레코드를 전송합니다.
 
+    같은 프록시·키워드의 구독자는 채널 하나를 공유하며, client_ip/url_host는 구독자별로 적용됩니다.
+    메시지: {"type": "records", "data": [...], "dropped": 버린 건수, "matched": 채널 누적 건수}
+    """
+    await websocket.accept()
     try:
-        wc_out = ssh_exec(host, port, username, password, f"wc -l < {safe_path}", timeout_sec=5)
-        current_count = int(wc_out.strip().split()[0])
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"ssh error: {str(e)}")
-
-    def _parse_and_filter(raw: str) -> List[Dict[str, Any]]:
-        records = []
-        for ln in raw.split("\n"):
-            if not ln:
-                continue
-            fields = ln.split(" :| ")
-            if client_ip and (len(fields) < 3 or client_ip not in fields[2]):
-                continue
-            if url_host and (len(fields) < 10 or url_host not in fields[9]):
-                continue
-            try:
-                records.append(parse_log_line(ln))
-            except Exception:
-                records.append({"_raw_line_": ln})
-        return records
-
-    is_initial = proxy_id not in _live_state
-
-    if is_initial:
-        cmd = (
-            f"timeout 10s nice -n 10 ionice -c2 -n7 "
-            f"tail -n {initial_lines * 10} {safe_path} | grep -F -- {safe_q} | tail -n {initial_lines}"
-            + clean
-        )
-        try:
-            raw = ssh_exec(host, port, username, password, cmd, timeout_sec=12)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"ssh error: {str(e)}")
-        records = _parse_and_filter(raw)
-        _live_state[proxy_id] = current_count
-        return {"records": records, "total_count": current_count, "is_initial": True, "new_lines": len(records)}
-
-    last_count = _live_state[proxy_id]
-    if current_count <= last_count:
-        return {"records": [], "total_count": current_count, "is_initial": False, "new_lines": 0}
-
-    offset = last_count + 1
-    fetch_count = min(current_count - last_count, 2000)
-    cmd = (
-        f"timeout 10s nice -n 10 ionice -c2 -n7 "
-        f"tail -n +{offset} {safe_path} | head -n {fetch_count} | grep -F -- {safe_q} | head -n 500"
-        + clean
-    )
+        q_valid = _validate_query(q)
+    except HTTPException as e:
+        q_valid, error = None, e.detail
+    else:
+        error = None if q_valid else "키워드(q)는 필수입니다."
+    db_proxy = db.query(Proxy).filter(Proxy.id == proxy_id).first() if not error else None
+    if not error and not db_proxy:
+        error = "Proxy not found"
+    elif db_proxy and not db_proxy.traffic_log_path:
+        error = "traffic_log_path가 설정되지 않은 프록시입니다."
+    if error:
+        await websocket.send_json({"type": "error", "detail": error})
+        await websocket.close()
+        return
+
+    subscriber = LiveSubscriber(client_ip, url_host, initial_lines)
+    tail = live_tails.subscribe(db_proxy, q_valid, subscriber)
+    db.close()
+    idle = 0.0
     try:
-        raw = ssh_exec(host, port, username, password, cmd, timeout_sec=12)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"ssh error: {str(e)}")
-
-    records = _parse_and_filter(raw)
-    _live_state[proxy_id] = current_count
-    return {"records": records, "total_count": current_count, "is_initial": False, "new_lines": len(records)}
-
-
-@router.delete("/traffic-logs/live/{proxy_id}")
-def reset_live_log_state(proxy_id: int):
-    """실시간 감시 상태(라인 오프셋)를 초기화합니다."""
-    _live_state.pop(proxy_id, None)
-    return {"reset": True}
+        while True:
+            records, dropped = subscriber.drain(LIVE_BATCH_RECORDS)
+            if records or dropped or idle >= LIVE_HEARTBEAT_SEC:
+                await websocket.send_json({
+                    "type": "records", "data": records, "dropped": dropped,
+                    "matched": tail.matched, "live": tail.live,
+                })
+                idle = 0.0
+            if tail.finished and not subscriber.pending:
+                await websocket.send_json({"type": "error", "detail": tail.error or "live tail closed"})
+                break
+            if subscriber.pending:
+                continue
+            await asyncio.sleep(LIVE_PUSH_INTERVAL_SEC)
+            idle += LIVE_PUSH_INTERVAL_SEC
+    except (WebSocketDisconnect, RuntimeError):
+        return
+    finally:
+        live_tails.unsubscribe(tail, subscriber)
+    await websocket.close()
 
 
 @router.get("/traffic-logs/{proxy_id}", response_model=TrafficLogResponse)
@@ -639,24 +675,39 @@ def get_proxy_traffic_logs(
 	limit: int = Query(default=200, ge=1, le=10000),
 	direction: str = Query(default="tail", pattern=r"^(head|tail)$"),
 	parsed: bool = Query(default=False),
+	count_only: bool = Query(default=False, description="With parsed=true, store the records and return only the count"),
+	rotated_files: int = Query(default=0, ge=0, le=MAX_ROTATED_FILES, description="Also search up to N rotated archives (newest-first)"),
+	start: Optional[datetime] = Query(default=None, description="Window start (KST if no timezone); reads only this time range"),
+	end: Optional[datetime] = Query(default=None, description="Window end (defaults to now)"),
 ):
 	db_proxy = db.query(Proxy).filter(Proxy.id == proxy_id).first()
 	if not db_proxy:
 		raise HTTPException(status_code=404, detail="Proxy not found")
 
 	q_valid = _validate_query(q)
+	window = _resolve_window(start, end, rotated_files)
 
 	if not parsed:
 		# Raw mode: fetch once via SSH and return lines without parsing or DB insert
-		command = _build_remote_command(db_proxy.traffic_log_path, q_valid, limit, direction)
+		if window:
+			try:
+				command = _window_command(db_proxy, q_valid, limit, direction, window)
+			except HTTPException:
+				raise
+			except Exception as e:
+				raise HTTPException(status_code=502, detail=f"ssh error: {str(e)}")
+		else:
+			command = _build_remote_command(db_proxy.traffic_log_path, q_valid, limit, direction, rotated_files=rotated_files)
 		raw = _ssh_exec(db_proxy.host, db_proxy.port or 22, db_proxy.username, decrypt_string_if_encrypted(db_proxy.password), command)
 		lines = [ln for ln in raw.split("\n") if ln]
 		return TrafficLogResponse(proxy_id=proxy_id, lines=lines, records=None, truncated=len(lines) == limit, count=len(lines))
 
-	records, err = _fetch_and_parse_for_proxy(db_proxy, q_valid, limit, direction, db)
+	records, count, err = _fetch_and_parse_for_proxy(db_proxy, q_valid, limit, direction, db, keep_records=not count_only,
+	                                                 rotated_files=rotated_files, window=window)
 	if err:
 		raise HTTPException(status_code=502, detail=err)
-	return TrafficLogResponse(proxy_id=proxy_id, lines=None, records=records, truncated=len(records) == limit, count=len(records))
+	return TrafficLogResponse(proxy_id=proxy_id, lines=None, records=None if count_only else records,
+	                          truncated=count == limit, count=count)
 
 
 @router.get("/traffic-logs/item/{record_id}", response_model=TrafficLogDB)
@@ -668,157 +719,119 @@ def get_traffic_log_detail(record_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/traffic-logs/analyze-upload")
-async def analyze_traffic_log_upload(
+def analyze_traffic_log_upload(
 	logfile: UploadFile = File(..., description="Traffic log file to analyze"),
 	topN: int = Query(default=20, ge=1, le=100),
+	background: bool = Query(default=False, description="Return upload_id immediately and analyze in the background"),
 ):
-	"""Analyze an uploaded traffic-log file in a streaming manner and return summary data.
+	"""Analyze an uploaded traffic-log file and return summary data.
 
-	This endpoint does not persist any data. It parses the uploaded file line-by-line and
-	computes aggregates helpful for detecting proxy overload causes (heavy downloads/uploads,
-	request spikes, blocks, hot URLs/hosts/clients, status distribution).
+	This endpoint does not persist any data to the main DB. The file is spooled to disk,
+	split into newline-aligned byte ranges and aggregated per range (in the analysis process
+	pool for large files), then the partial aggregates are merged. Top-N tables come from
+	Space-Saving sketches and unique counts from HyperLogLog. Parsed records are spilled to a
+	temporary store; the result carries the first page and `upload_id` for paging the rest.
+
+	With `background=true` the response is the upload status; progress is available from
+	GET /traffic-logs/analyze-upload/{upload_id} or the websocket of the same path under /ws.
 	"""
 
 	# Defensive: restrict unbounded filenames/content-types
 	if not logfile:
 		raise HTTPException(status_code=400, detail="file is required")
 
-	from collections import Counter, defaultdict
-
-	host_counter: Counter[str] = Counter()
-	url_counter: Counter[str] = Counter()
-	client_req_counter: Counter[str] = Counter()
-	# Data-centric counters: proxy perspective (recv/sent)
-	client_recv_bytes: defaultdict[str, int] = defaultdict(int)
-	client_sent_bytes: defaultdict[str, int] = defaultdict(int)
-	host_recv_bytes: defaultdict[str, int] = defaultdict(int)
-	host_sent_bytes: defaultdict[str, int] = defaultdict(int)
-	blocked_count = 0
-	total_recv = 0
-	total_sent = 0
-	parsed_lines = 0
-	unparsed_lines = 0
-	unique_clients: set[str] = set()
-	unique_hosts: set[str] = set()
-	earliest_dt = None
-	latest_dt = None
-	parsed_records: List[Dict[str, Any]] = []  # 파싱된 레코드 저장
-
-	# Stream decode lines from the uploaded file without additional wrappers
 	try:
-		for bline in logfile.file:
-			if not bline:
-				continue
-			line = bline.decode("utf-8", "ignore").rstrip("\n")
-			if not line:
-				continue
-			try:
-				rec = parse_log_line(line)
-				parsed_lines += 1
-				# 파싱된 레코드 저장 (그리드 표시용)
-				parsed_records.append(rec)
-			except Exception:
-				unparsed_lines += 1
-				continue
-
-			client_ip = str(rec.get("client_ip") or "")
-			url_host = str(rec.get("url_host") or "")
-			url_path = str(rec.get("url_path") or "")
-			status = rec.get("response_statuscode")
-			recv_b = rec.get("recv_byte") or 0
-			sent_b = rec.get("sent_byte") or 0
-			action_names = str(rec.get("action_names") or "")
-			block_id = str(rec.get("block_id") or "")
-			dt_str = rec.get("datetime")
-
-			# Counters
-			if client_ip:
-				client_req_counter[client_ip] += 1
-				unique_clients.add(client_ip)
-			if url_host:
-				host_counter[url_host] += 1
-				unique_hosts.add(url_host)
-			# Join host and path for URL hotness (truncate key length reasonably)
-			if url_host or url_path:
-				url_key = (url_host + url_path)[:2048]
-				url_counter[url_key] += 1
-
-			# Byte aggregations per client
-			if client_ip and isinstance(recv_b, int):
-				v = max(0, recv_b)
-				client_recv_bytes[client_ip] += v
-				total_recv += v
-			if client_ip and isinstance(sent_b, int):
-				v = max(0, sent_b)
-				client_sent_bytes[client_ip] += v
-				total_sent += v
-			if url_host and isinstance(recv_b, int):
-				host_recv_bytes[url_host] += max(0, recv_b)
-			if url_host and isinstance(sent_b, int):
-				host_sent_bytes[url_host] += max(0, sent_b)
-
-			# Blocked detection: action includes 'block' or block_id present
-			act_eq_block = action_names.strip().lower() == "block"
-			if act_eq_block:
-				blocked_count += 1
-
-			# Track time range if datetime present
-			if dt_str:
-				try:
-					s = str(dt_str).strip()
-					if s.startswith("[") and s.endswith("]"):
-						s = s[1:-1]
-					from datetime import datetime as _dt
-					dt_val = _dt.strptime(s, "%d/%b/%Y:%H:%M:%S %z")
-					if earliest_dt is None or dt_val < earliest_dt:
-						earliest_dt = dt_val
-					if latest_dt is None or dt_val > latest_dt:
-						latest_dt = dt_val
-				except Exception:
-					pass
-
+		job = spool_upload(logfile.file, logfile.filename)
 	except Exception as e:
 		raise HTTPException(status_code=400, detail=f"failed to read file: {str(e)}")
 
-	def top_n(counter_like, n: int):
-		try:
-			return counter_like.most_common(n)
-		except AttributeError:
-			# for dict-like totals
-			items = list(counter_like.items())
-			items.sort(key=lambda kv: kv[1], reverse=True)
-			return items[:n]
-
-	result = {
-		"summary": {
-			"total_lines": parsed_lines + unparsed_lines,
-			"parsed_lines": parsed_lines,
-			"unparsed_lines": unparsed_lines,
-			"unique_clients": len(unique_clients),
-			"unique_hosts": len(unique_hosts),
-			"total_recv_bytes": total_recv,
-			"total_sent_bytes": total_sent,
-			"blocked_requests": blocked_count,
-			"time_range_start": (earliest_dt.isoformat() if earliest_dt else None),
-			"time_range_end": (latest_dt.isoformat() if latest_dt else None),
-		},
-		"top": {
-			"hosts_by_requests": top_n(host_counter, topN),
-			"urls_by_requests": top_n(url_counter, topN),
-			"clients_by_requests": top_n(client_req_counter, topN),
-			# New data-centric keys
-			"clients_by_recv_bytes": top_n(client_recv_bytes, topN),
-			"clients_by_sent_bytes": top_n(client_sent_bytes, topN),
-			"hosts_by_recv_bytes": top_n(host_recv_bytes, topN),
-			"hosts_by_sent_bytes": top_n(host_sent_bytes, topN),
-			# Backward compatibility
-			"clients_by_download_bytes": top_n(client_recv_bytes, topN),
-			"clients_by_upload_bytes": top_n(client_sent_bytes, topN),
-			"hosts_by_download_bytes": top_n(host_recv_bytes, topN),
-			"hosts_by_upload_bytes": top_n(host_sent_bytes, topN),
-		},
-		"records": parsed_records,  # 파싱된 레코드 배열 추가
-	}
+	if background:
+		start_upload_analysis(job, topN)
+		return job.as_dict()
+
+	analyze_upload(job, topN)
+	if job.status != COMPLETED:
+		upload_registry.discard(job.id)
+		raise HTTPException(status_code=400, detail=f"failed to read file: {job.error}")
+	return job.result
+
+
+def _get_upload_job(upload_id: str):
+	job = upload_registry.get(upload_id)
+	if job is None:
+		raise HTTPException(status_code=404, detail="upload not found or expired")
+	return job
+
 
+@router.get("/traffic-logs/analyze-upload/{upload_id}")
+def get_traffic_log_upload(upload_id: str):
+	"""업로드 분석 진행 상황. 완료되면 result에 분석 결과가 들어갑니다."""
+	job = _get_upload_job(upload_id)
+	return {**job.as_dict(), "result": job.result}
+
+
+@router.delete("/traffic-logs/analyze-upload/{upload_id}")
+def delete_traffic_log_upload(upload_id: str):
+	"""진행 중이면 취소하고 임시 파일을 삭제합니다."""
+	job = upload_registry.discard(upload_id)
+	if job is None:
+		raise HTTPException(status_code=404, detail="upload not found or expired")
+	return job.as_dict()
+
+
+@router.get("/traffic-logs/analyze-upload/{upload_id}/records")
+def get_uploaded_traffic_log_records(
+	upload_id: str,
+	offset: int = Query(default=0, ge=0),
+	limit: int = Query(default=100, ge=1, le=1000),
+):
+	job = _get_upload_job(upload_id)
+	if job.store is None:
+		raise HTTPException(status_code=409, detail=f"upload analysis is {job.status}")
+	return {"records": job.store.page(offset, limit), "total_count": job.store.count}
+
+
+@router.get("/traffic-logs/analyze-upload/{upload_id}/histogram")
+def get_uploaded_traffic_log_histogram(
+	upload_id: str,
+	interval: str = Query(default="1m", description="구간 간격 (10s, 1m, 5m, 1h 또는 초)"),
+):
+	"""업로드 파일의 시간 구간별 요청 수/바이트/차단/4xx/5xx (/traffic-logs/histogram과 같은 형식, series 없음).
+
+	분석 중 기본 구간(UPLOAD_HISTOGRAM_BASE_SEC)별로 집계해 두므로 interval은 그 배수여야 합니다.
+	"""
+	job = _get_upload_job(upload_id)
+	if job.histogram is None:
+		raise HTTPException(status_code=409, detail=f"upload analysis is {job.status}")
+	interval_sec = _interval_sec(interval)
+	if interval_sec % UPLOAD_HISTOGRAM_BASE_SEC:
+		raise HTTPException(status_code=400, detail=f"interval must be a multiple of {UPLOAD_HISTOGRAM_BASE_SEC}s")
+	try:
+		result = chart_series({None: job.histogram}, interval_sec)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	result["series"] = []
 	return result
 
+
+@router.websocket("/ws/traffic-logs/analyze-upload/{upload_id}")
+async def traffic_log_upload_progress(websocket: WebSocket, upload_id: str):
+	"""분석이 끝날 때까지 진행 상황을 주기적으로 전송하고, 완료되면 결과를 전송합니다."""
+	await websocket.accept()
+	try:
+		while True:
+			job = upload_registry.get(upload_id)
+			if not job:
+				await websocket.send_json({"type": "error", "detail": "upload not found or expired"})
+				break
+			snapshot = job.as_dict()
+			await websocket.send_json({"type": "progress", "data": snapshot})
+			if snapshot["status"] in FINISHED_STATES:
+				if job.result is not None:
+					await websocket.send_json({"type": "result", "data": job.result})
+				break
+			await asyncio.sleep(JOB_PROGRESS_INTERVAL_SEC)
+	except WebSocketDisconnect:
+		return
+	await websocket.close()
+
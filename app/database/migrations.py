@@ -0,0 +1,30 @@
+"""
+한 번만 실행하면 되는 데이터 마이그레이션의 완료 기록 (schema_migrations)
+
+컬럼 추가 같은 스키마 변경은 DDL 자체로 멱등하게 확인할 수 있지만, 테이블 전체를 훑는 데이터 변환은
+완료를 따로 남기지 않으면 앱을 시작할 때마다 다시 스캔합니다. 마이그레이션 이름마다 완료 시각을 한 행 기록합니다.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+def _ensure_table(conn: Connection) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} "
+        "(name VARCHAR(128) PRIMARY KEY, done_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def migration_done(conn: Connection, name: str) -> bool:
+    """이름의 마이그레이션이 완료로 기록되어 있는지"""
+    _ensure_table(conn)
+    return conn.execute(text(f"SELECT 1 FROM {MIGRATIONS_TABLE} WHERE name = :name"), {"name": name}).first() is not None
+
+
+def mark_migration_done(conn: Connection, name: str) -> None:
+    """마이그레이션 완료를 기록합니다 (conn의 트랜잭션과 함께 커밋됨)."""
+    _ensure_table(conn)
+    if not migration_done(conn, name):
+        conn.execute(text(f"INSERT INTO {MIGRATIONS_TABLE} (name) VALUES (:name)"), {"name": name})
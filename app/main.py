@@ -13,6 +13,13 @@ from app.models import resource_usage as resource_usage_model
 from app.models import resource_config as resource_config_model
 from app.models import session_browser_config as session_browser_config_model
 from app.models import traffic_log as traffic_log_model
+from app.models import threshold_episode as threshold_episode_model
+from app.models import resource_rollup as resource_rollup_model
+from app.models import resource_baseline as resource_baseline_model
+from app.models import resource_daily as resource_daily_model
+from app.models import resource_forecast_fit as resource_forecast_fit_model
+from app.models import traffic_log_cursor as traffic_log_cursor_model
+from app.models import traffic_log_snapshot as traffic_log_snapshot_model
 from app.api import proxies, proxy_groups, config_management
 from app.api import resource_usage as resource_usage_api
 from app.api import resource_config as resource_config_api
@@ -145,6 +152,13 @@ resource_usage_model.Base.metadata.create_all(bind=engine)
 resource_config_model.Base.metadata.create_all(bind=engine)
 session_browser_config_model.Base.metadata.create_all(bind=engine)
 traffic_log_model.Base.metadata.create_all(bind=engine)
+threshold_episode_model.Base.metadata.create_all(bind=engine)
+resource_rollup_model.Base.metadata.create_all(bind=engine)
+resource_baseline_model.Base.metadata.create_all(bind=engine)
+resource_daily_model.Base.metadata.create_all(bind=engine)
+resource_forecast_fit_model.Base.metadata.create_all(bind=engine)
+traffic_log_cursor_model.Base.metadata.create_all(bind=engine)
+traffic_log_snapshot_model.Base.metadata.create_all(bind=engine)
 
 _app_start_time = _time.monotonic()
 
@@ -381,12 +395,66 @@ def migrate_resource_config_interval_sec():
         pass
 
 
+# One-time startup migration: dictionary-encode repeated traffic_logs string columns (existing DB)
+@app.on_event("startup")
+def migrate_traffic_log_dictionary():
+    from app.services.traffic_log_dict import ensure_traffic_log_dictionary
+    try:
+        ensure_traffic_log_dictionary(engine)
+    except Exception as e:
+        _startup_logger.warning(f"[DB] traffic_logs 사전 인코딩 마이그레이션 실패: {e}")
+
+
+# One-time startup migration: FTS5 search index for traffic_logs (existing DB)
+@app.on_event("startup")
+def migrate_traffic_log_fts():
+    from app.services.traffic_log_search import ensure_traffic_log_fts
+    ensure_traffic_log_fts(engine)
+
+
+# One-time startup migration: event_ts column/index for traffic_logs + backfill (existing DB)
+@app.on_event("startup")
+def migrate_traffic_log_event_ts():
+    from app.services.traffic_log_query import ensure_traffic_log_event_ts
+    try:
+        ensure_traffic_log_event_ts(engine)
+    except Exception as e:
+        _startup_logger.warning(f"[DB] traffic_logs.event_ts 마이그레이션 실패: {e}")
+
+
+# One-time startup migration: snapshot_id column/index for traffic_logs + unfinished snapshot cleanup
+@app.on_event("startup")
+def migrate_traffic_log_snapshots():
+    from app.services.traffic_log_snapshots import ensure_traffic_log_snapshots
+    try:
+        ensure_traffic_log_snapshots(engine)
+    except Exception as e:
+        _startup_logger.warning(f"[DB] traffic_logs 스냅샷 마이그레이션 실패: {e}")
+
+
+# One-time startup migration: threshold_episodes.is_open + restore episodes left open at last shutdown
+@app.on_event("startup")
+def load_threshold_episodes():
+    from app.services.threshold_episodes import ensure_threshold_episode_schema, load_open_episodes
+    try:
+        ensure_threshold_episode_schema(engine)
+        db = SessionLocal()
+        try:
+            load_open_episodes(db)
+        finally:
+            db.close()
+    except Exception as e:
+        _startup_logger.warning(f"[DB] 열린 임계치 초과 구간 복원 실패: {e}")
+
+
 # Start retention policy background task on startup
 @app.on_event("startup")
 async def start_background_tasks():
     from app.utils.background_collector import background_collector
     # Start retention policy task (runs every hour)
     await background_collector.start_retention_policy(interval_sec=3600)
+    # Start hourly rollup / baseline task (runs every 5 minutes)
+    await background_collector.start_rollup_job(interval_sec=300)
     # Auto-start resource collection using DB config
     await background_collector.start_on_startup()
 
@@ -395,3 +463,29 @@ async def stop_background_tasks():
     from app.utils.background_collector import background_collector
     # Stop retention policy task
     await background_collector.stop_retention_policy()
+    await background_collector.stop_rollup_job()
+    # 분석 프로세스 풀 종료
+    from app.services.analysis_pool import shutdown_analysis_pool
+    shutdown_analysis_pool()
+    # 진행 중인 트래픽 로그 수집 작업 취소
+    from app.services.traffic_log_jobs import traffic_log_jobs
+    traffic_log_jobs.shutdown()
+    # 업로드 분석 임시 저장소 삭제
+    from app.services.traffic_log_upload import upload_registry
+    upload_registry.clear()
+    # 실시간 감시 채널 종료
+    from app.services.traffic_log_live import live_tails
+    live_tails.clear()
+    # 대기 중인 스냅샷 삭제 취소 (다음 시작 시 정리)
+    from app.services.traffic_log_snapshots import snapshot_purger
+    snapshot_purger.cancel()
+    # 진행 중인 임계치 초과 구간 저장 (메모리 상태 유실 방지)
+    try:
+        from app.services.threshold_episodes import flush_open_episodes
+        db = SessionLocal()
+        try:
+            flush_open_episodes(db)
+        finally:
+            db.close()
+    except Exception as e:
+        _startup_logger.error("Failed to flush open threshold episodes: %s", e)
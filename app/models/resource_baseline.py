@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
+from app.database.database import Base
+from app.utils.time import now_kst
+
+
+class ResourceBaseline(Base):
+    """프록시/지표별 요일-시간(hour-of-week, 0=월 00시 ~ 167=일 23시) 기준선"""
+    __tablename__ = "resource_baselines"
+    __table_args__ = (
+        Index('idx_resource_baseline_key', 'proxy_id', 'metric', 'hour_of_week', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(64), nullable=False)
+    hour_of_week = Column(Integer, nullable=False)
+
+    # 가중 샘플 수 / 평균 / 편차제곱합 (Welford·Chan 병합으로 증분 갱신)
+    count = Column(Float, nullable=False, default=0.0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+
+    updated_at = Column(DateTime(timezone=True), default=now_kst, onupdate=now_kst)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float, Index
+from app.database.database import Base
+
+
+class ResourceUsageDaily(Base):
+    """resource_usage 일 단위 집계 (KST 날짜 기준, 종료된 날만 저장)"""
+    __tablename__ = "resource_usage_daily"
+    __table_args__ = (
+        Index('idx_resource_usage_daily_key', 'proxy_id', 'metric', 'day', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(64), nullable=False)
+    day = Column(Date, nullable=False, index=True)
+
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    p95 = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
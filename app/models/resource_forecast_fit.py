@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Float, Text, Index
+from app.database.database import Base
+from app.utils.time import now_kst
+
+
+class ResourceForecastFit(Base):
+    """프록시/지표/일별 통계값별 예측 모델 상태 (새 날이 닫힐 때마다 증분 갱신)"""
+    __tablename__ = "resource_forecast_fits"
+    __table_args__ = (
+        Index('idx_resource_forecast_fit_key', 'proxy_id', 'metric', 'stat', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(64), nullable=False)
+    stat = Column(String(16), nullable=False)  # p95 / mean / max
+
+    # 가법 Holt-Winters (주간 계절성) 상태
+    level = Column(Float, nullable=False)
+    trend = Column(Float, nullable=False)
+    season_json = Column(Text, nullable=False)  # 요일(월=0)별 계절 성분 [7]
+    last_day = Column(Date, nullable=False)
+    n_days = Column(Integer, nullable=False, default=0)
+    # 1일 앞 예측 오차 (적합도)
+    abs_err_sum = Column(Float, nullable=False, default=0.0)
+    err_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), default=now_kst, onupdate=now_kst)
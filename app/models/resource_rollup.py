@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
+from app.database.database import Base
+
+
+class ResourceUsageHourly(Base):
+    """resource_usage 시간 단위 롤업 (KST 정시 기준, 종료된 시간만 저장)"""
+    __tablename__ = "resource_usage_hourly"
+    __table_args__ = (
+        Index('idx_resource_usage_hourly_key', 'proxy_id', 'metric', 'bucket_start', unique=True),
+        Index('idx_resource_usage_hourly_bucket', 'bucket_start'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(64), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    sum_sq = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
@@ -0,0 +1,41 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Float, Index
+from app.database.database import Base
+from app.utils.time import now_kst
+
+
+class ThresholdEpisode(Base):
+    """임계치 초과 구간 (수집 시점에 증분 검출되어 종료 시 저장)"""
+    __tablename__ = "threshold_episodes"
+    __table_args__ = (
+        Index('idx_threshold_episode_lookup', 'proxy_id', 'metric', 'threshold', 'start_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), nullable=False)
+
+    # cpu, mem, ... 또는 인터페이스 지표 "if:<name>:in" / "if:<name>:out"
+    metric = Column(String(128), nullable=False)
+    threshold = Column(Float, nullable=False)
+
+    start_at = Column(DateTime(timezone=True), nullable=False)
+    end_at = Column(DateTime(timezone=True), nullable=False)
+    max_value = Column(Float, nullable=False)
+    mean_value = Column(Float, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    # 종료 시(또는 백필 끝에) 아직 열려 있던 구간. 시작 시 검출기로 복원되어 같은 구간으로 이어집니다
+    is_open = Column(Boolean, nullable=False, default=False, server_default="0")
+
+    created_at = Column(DateTime(timezone=True), default=now_kst)
+
+
+class ThresholdEpisodeCoverage(Base):
+    """지표별로 현재 임계치의 구간이 빠짐없이 저장되기 시작한 시각
+
+    key는 지표 이름 또는 인터페이스 설정 키("if:<name>")이며, 임계치가 바뀌거나 설정에서 빠지면 다시 기록됩니다.
+    since 이전 구간은 저장된 행이 없거나 일부만 있을 수 있으므로 원시 데이터로 재생합니다.
+    """
+    __tablename__ = "threshold_episode_coverage"
+
+    key = Column(String(128), primary_key=True)
+    threshold = Column(Float, nullable=False)
+    since = Column(DateTime(timezone=True), nullable=False)
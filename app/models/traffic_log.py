@@ -1,19 +1,45 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Index, UniqueConstraint, event, select, text
+from sqlalchemy.orm import column_property
 from app.database.database import Base
 from datetime import datetime
 
 
+# 반복 값이 많은 문자열 컬럼: traffic_log_values에 한 번만 저장하고 행에는 정수 ID(<컬럼>_id)만 둡니다
+DICT_COLUMNS = (
+    "url_categories", "url_reputationstring", "mediatype_header", "user_agent",
+    "application_name", "currentruleset", "currentrule",
+)
+DICT_TABLE = "traffic_log_values"
+
+
+class TrafficLogValue(Base):
+    """사전 인코딩 컬럼의 값 테이블 ((field, value)당 1행, 삭제하지 않음)"""
+    __tablename__ = DICT_TABLE
+
+    id = Column(Integer, primary_key=True)
+    field = Column(String(32), nullable=False)
+    value = Column(String(2048), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("field", "value", name="uq_traffic_log_values_field_value"),
+    )
+
+
 class TrafficLog(Base):
     __tablename__ = "traffic_logs"
 
     id = Column(Integer, primary_key=True, index=True)
 
     # Source context
-    proxy_id = Column(Integer, index=True, nullable=False)
+    proxy_id = Column(Integer, nullable=False)
+    # 적재한 교체 수집의 스냅샷 (traffic_log_snapshots.id, 스냅샷 도입 전 행은 0)
+    snapshot_id = Column(Integer, nullable=False, default=0, server_default="0")
     collected_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
 
     # Parsed fields (mirror app/utils/traffic_log_parser.py FIELDS)
     datetime = Column(String(64), index=True)
+    # datetime 필드를 파싱한 UTC epoch 초 (시간 구간 조회/정렬용, 형식이 다르면 NULL)
+    event_ts = Column(Integer)
     username = Column(String(256), index=True)
     client_ip = Column(String(64), index=True)
     url_destination_ip = Column(String(64))
@@ -26,18 +52,18 @@ class TrafficLog(Base):
     url_path = Column(String(2048))
     url_parametersstring = Column(String(2048))
     url_port = Column(Integer)
-    url_categories = Column(String(512))
-    url_reputationstring = Column(String(128))
+    url_categories_id = Column(Integer, ForeignKey("traffic_log_values.id"))
+    url_reputationstring_id = Column(Integer, ForeignKey("traffic_log_values.id"))
     url_reputation = Column(Integer)
-    mediatype_header = Column(String(256))
+    mediatype_header_id = Column(Integer, ForeignKey("traffic_log_values.id"))
     recv_byte = Column(Integer)
     sent_byte = Column(Integer)
-    user_agent = Column(String(2048))
+    user_agent_id = Column(Integer, ForeignKey("traffic_log_values.id"))
     referer = Column(String(2048))
     url_geolocation = Column(String(128))
-    application_name = Column(String(256))
-    currentruleset = Column(String(256))
-    currentrule = Column(String(256))
+    application_name_id = Column(Integer, ForeignKey("traffic_log_values.id"))
+    currentruleset_id = Column(Integer, ForeignKey("traffic_log_values.id"))
+    currentrule_id = Column(Integer, ForeignKey("traffic_log_values.id"))
     action_names = Column(String(256))
     block_id = Column(String(128), index=True)
     ssl_certificate_cn = Column(String(512))
@@ -46,3 +72,92 @@ class TrafficLog(Base):
     content_lenght = Column(Integer)
     _raw_line_ = Column(String(8192))
 
+    __table_args__ = (
+        # 프록시의 현재 스냅샷 조회와 교체된 스냅샷 삭제 (proxy_id 단독 조회도 이 인덱스 사용)
+        Index("ix_traffic_logs_proxy_snapshot", "proxy_id", "snapshot_id"),
+        # 프록시별 시간 구간 조회를 인덱스 범위 스캔으로 처리합니다
+        Index("ix_traffic_logs_proxy_event_ts", "proxy_id", "event_ts"),
+    )
+
+
+# 사전 인코딩 컬럼은 읽기 전용 속성으로 원래 이름의 문자열 값을 돌려줍니다 (조회/필터/정렬에 그대로 사용)
+for _name in DICT_COLUMNS:
+    setattr(TrafficLog, _name, column_property(
+        select(TrafficLogValue.value)
+        .where(TrafficLogValue.id == getattr(TrafficLog, f"{_name}_id"))
+        .correlate_except(TrafficLogValue)
+        .scalar_subquery()
+    ))
+del _name
+
+# 레코드 컬럼 이름 (테이블 컬럼 순서, <컬럼>_id 대신 원래 이름, 내부용 snapshot_id 제외) — 그리드/CSV/스키마 변환용
+RECORD_COLUMNS = [
+    c.name[:-3] if c.name.endswith("_id") and c.name[:-3] in DICT_COLUMNS else c.name
+    for c in TrafficLog.__table__.columns if c.name != "snapshot_id"
+]
+
+
+# 전체 텍스트 검색(search) 대상 컬럼과 SQLite FTS5 trigram 외부 콘텐츠 인덱스
+SEARCH_COLUMNS = (
+    "url_host", "client_ip", "url_path", "username", "action_names", "url_categories", "comm_name",
+)
+FTS_TABLE = "traffic_logs_fts"
+# FTS 외부 콘텐츠: 사전 인코딩 컬럼을 문자열로 풀어 보여주는 뷰
+FTS_CONTENT_VIEW = "traffic_logs_fts_content"
+# 지연 색인 플래그: 대량 적재 트랜잭션 안에서만 행이 있는 테이블 (커밋 전에 비우므로 다른 연결에는 항상 비어 보임)
+FTS_DEFER_TABLE = "traffic_logs_fts_deferred"
+
+
+def _search_value(row: str, col: str) -> str:
+    if col in DICT_COLUMNS:
+        return f"(SELECT value FROM {DICT_TABLE} WHERE id = {row}.{col}_id)"
+    return f"{row}.{col}"
+
+
+def traffic_log_fts_insert_trigger() -> str:
+    cols = ", ".join(SEARCH_COLUMNS)
+    new_vals = ", ".join(_search_value("new", c) for c in SEARCH_COLUMNS)
+    return (f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON traffic_logs "
+            f"WHEN NOT EXISTS (SELECT 1 FROM {FTS_DEFER_TABLE}) BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+
+
+def traffic_log_fts_ddl() -> list:
+    cols = ", ".join(SEARCH_COLUMNS)
+    stored_cols = ", ".join(f"{c}_id" if c in DICT_COLUMNS else c for c in SEARCH_COLUMNS)
+    view_cols = ", ".join(f"{_search_value('t', c)} AS {c}" for c in SEARCH_COLUMNS)
+    new_vals = ", ".join(_search_value("new", c) for c in SEARCH_COLUMNS)
+    old_vals = ", ".join(_search_value("old", c) for c in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIEW IF NOT EXISTS {FTS_CONTENT_VIEW} AS SELECT t.id AS id, {view_cols} FROM traffic_logs t",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, content='{FTS_CONTENT_VIEW}', content_rowid='id', tokenize='trigram')",
+        # 대량 적재 트랜잭션은 플래그 행을 넣어 INSERT 트리거를 건너뛰고 INSERT ... SELECT 한 번으로 색인합니다
+        # (FTS5는 문장마다 메모리 색인을 flush하므로 행 단위 트리거는 대량 INSERT에서 매우 느림).
+        # 플래그 행은 적재 트랜잭션 안에서만 존재하므로 트리거는 스키마에 그대로 두고 다른 연결은 항상 트리거로 색인합니다.
+        f"DROP TABLE IF EXISTS {FTS_TABLE}_state",
+        f"CREATE TABLE IF NOT EXISTS {FTS_DEFER_TABLE} (id INTEGER PRIMARY KEY)",
+        # 이전 버전의 트리거(WHEN 조건 없음)는 바꿉니다
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+        traffic_log_fts_insert_trigger(),
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON traffic_logs BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        # 검색 컬럼이 바뀐 UPDATE만 재색인합니다 (event_ts 백필 등 다른 컬럼 UPDATE는 건너뜀)
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {stored_cols} ON traffic_logs BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+@event.listens_for(TrafficLog.__table__, "after_create")
+def _create_traffic_log_fts(target, connection, **kw):
+    """새 DB: traffic_logs 생성 직후 FTS 인덱스와 동기화 트리거를 만듭니다 (SQLite 전용)."""
+    if connection.dialect.name != "sqlite":
+        return
+    try:
+        for stmt in traffic_log_fts_ddl():
+            connection.execute(text(stmt))
+    except Exception:
+        # FTS5/trigram 미지원 SQLite 빌드: 검색은 LIKE로 동작
+        pass
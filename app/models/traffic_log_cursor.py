@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger
+from app.database.database import Base
+from datetime import datetime
+
+
+class TrafficLogCursor(Base):
+    """프록시별 증분 수집 위치 (원격 로그 파일 inode와 적재 완료 바이트 오프셋)"""
+    __tablename__ = "traffic_log_cursors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="CASCADE"), unique=True, nullable=False)
+
+    log_path = Column(String(1024), nullable=False)
+    inode = Column(BigInteger, nullable=False)
+    # 다음 수집을 시작할 바이트 위치 (적재된 마지막 완전한 줄의 개행 다음)
+    offset = Column(BigInteger, nullable=False, default=0)
+    # 마지막 stat 시점의 파일 크기 (로테이션/truncate 판별용)
+    size = Column(BigInteger, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
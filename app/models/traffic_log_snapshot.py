@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database.database import Base
+from datetime import datetime
+
+
+class TrafficLogSnapshot(Base):
+    """프록시별 트래픽 로그 스냅샷 (교체 수집 1회 = 1개, traffic_logs.snapshot_id가 가리킴)
+
+    조회에는 프록시마다 state=current인 스냅샷 하나만 보입니다. 스냅샷이 없는 프록시는
+    snapshot_id=0 행(스냅샷 도입 전 적재분)이 보입니다.
+    """
+    __tablename__ = "traffic_log_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    proxy_id = Column(Integer, index=True, nullable=False)
+    # building(적재 중) → current(조회 대상) → retired(백그라운드 삭제 대기)
+    state = Column(String(16), nullable=False, default="building")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
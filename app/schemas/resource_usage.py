@@ -25,6 +25,8 @@ class ResourceUsage(ResourceUsageBase, TimestampModel):
     community: Optional[str] = None
     oids_raw: Optional[str] = None
     collected_at: datetime
+    # 요일-시간 기준선 대비 z-score {metric: score} (latest 응답에서만 채움)
+    anomaly_scores: Optional[Dict[str, float]] = None
 
     @field_validator('interface_mbps', mode='before')
     @classmethod
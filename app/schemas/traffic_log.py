@@ -55,8 +55,12 @@ class MultiTrafficLogResponse(BaseModel):
 	records: List[TrafficLogRecord]
 	count: int
 	total_count: int = 0
+	# count_mode=estimated 에서 상한까지만 센 경우 True (total_count는 하한값)
+	count_estimated: bool = False
 	offset: int = 0
 	limit: int = 100
+	# 다음 페이지 키셋 커서 (마지막 페이지면 None)
+	next_cursor: Optional[str] = None
 
 
 class TrafficLogDB(BaseModel):
@@ -0,0 +1,205 @@
+"""
+자원 분석 작업 실행기
+
+분석 함수(app.services.resource_analysis.compute_*)를 이벤트 루프 밖에서 실행합니다.
+- 프로세스 풀(ANALYSIS_POOL_WORKERS)이 활성화되어 있으면 프록시 목록을 분할해 워커 프로세스에서 병렬 실행 후 병합
+- 풀이 꺼져 있거나 요청 세션이 앱 DB가 아닌 경우(인메모리 SQLite 등)에는 스레드에서 실행
+- 프록시 목록은 ANALYSIS_CHUNK_PROXIES개 이하의 작은 파티션으로 나누고, 요청당 워커 수만큼만 동시에 제출
+- 클라이언트 연결이 끊기거나 요청당 시간 예산(ANALYSIS_TIMEOUT_SEC)을 넘기면 다음 파티션을 제출(스레드 실행은
+  다음 파티션으로 진행)하지 않습니다. 이미 실행 중인 파티션은 끝까지 실행된 뒤 결과가 버려지므로, 취소 후 남는
+  작업은 요청당 최대 워커 수 × 파티션 1개입니다 (분할할 수 없는 분석은 전체가 파티션 1개).
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database.database import engine
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_POOL_WORKERS = max(0, int(os.getenv("ANALYSIS_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))))
+ANALYSIS_TIMEOUT_SEC = float(os.getenv("ANALYSIS_TIMEOUT_SEC", "60"))
+# 파티션 하나의 최대 프록시 수 (취소/시간 초과 후에도 계속 실행되는 작업량의 상한)
+ANALYSIS_CHUNK_PROXIES = max(1, int(os.getenv("ANALYSIS_CHUNK_PROXIES", "4")))
+# 프록시가 적을 때도 워커 수보다 잘게 분할
+_PARTITIONS_PER_WORKER = 2
+_DISCONNECT_POLL_SEC = 0.5
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 이벤트 루프/DB 커넥션을 가진 부모를 fork하지 않도록 spawn 사용
+            _pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"[analysis_pool] Started process pool (workers={ANALYSIS_POOL_WORKERS})")
+        return _pool
+
+
+def get_analysis_pool() -> Optional[ProcessPoolExecutor]:
+    """DB 없이 실행하는 작업(업로드 로그 분석 등)용 공유 풀. 풀이 꺼져 있으면 None."""
+    if ANALYSIS_POOL_WORKERS <= 0:
+        return None
+    return _get_pool()
+
+
+def shutdown_analysis_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _partitions(proxy_ids: List[int], workers: int) -> List[List[int]]:
+    if not proxy_ids:
+        return [[]]
+    size = max(1, min(ANALYSIS_CHUNK_PROXIES, math.ceil(len(proxy_ids) / (max(1, workers) * _PARTITIONS_PER_WORKER))))
+    return [proxy_ids[i:i + size] for i in range(0, len(proxy_ids), size)]
+
+
+def _can_use_pool(db: Session) -> bool:
+    """워커 프로세스가 같은 DB를 열 수 있는 경우에만 풀 사용"""
+    if ANALYSIS_POOL_WORKERS <= 0:
+        return False
+    bind = db.get_bind()
+    url = bind.url
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return False
+    return str(url) == str(engine.url)
+
+
+def _run_partition(func_name: str, proxy_ids: List[int], args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """워커 프로세스 진입점: 자체 세션으로 분석 함수 실행"""
+    from app.database.database import SessionLocal
+    # spawn 워커는 app.main을 거치지 않으므로 관계 설정에 필요한 모델을 직접 등록
+    from app.models import proxy, proxy_group  # noqa: F401
+    from app.services import resource_analysis
+
+    db = SessionLocal()
+    try:
+        return getattr(resource_analysis, func_name)(db, proxy_ids, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def _run_in_thread(bind, func_name: str, parts: List[List[int]], args: tuple, kwargs: Dict[str, Any],
+                   stop: threading.Event) -> List[Any]:
+    """스레드 실행: 요청 세션과 분리된 세션을 같은 엔진에 열어 파티션을 차례로 실행 (시간 초과 후 요청 세션이
+    닫혀도 안전). stop이 설정되면 다음 파티션으로 진행하지 않습니다."""
+    from app.services import resource_analysis
+
+    func = getattr(resource_analysis, func_name)
+    results = []
+    db = sessionmaker(autocommit=False, autoflush=False, bind=bind)()
+    try:
+        for part in parts:
+            if stop.is_set():
+                break
+            results.append(func(db, part, *args, **kwargs))
+        return results
+    finally:
+        db.close()
+
+
+async def _run_in_pool(func_name: str, parts: List[List[int]], args: tuple, kwargs: Dict[str, Any]) -> List[Any]:
+    """파티션을 워커 수만큼만 동시에 풀에 제출하고 끝나는 대로 다음 파티션을 제출합니다 (결과는 파티션 순서).
+
+    작업이 취소되면 아직 제출하지 않은 파티션은 실행되지 않고, 대기열에 있던 파티션은 취소됩니다.
+    """
+    loop = asyncio.get_running_loop()
+    results: List[Any] = [None] * len(parts)
+    pending: Dict[asyncio.Future, int] = {}
+    next_part = 0
+    try:
+        while next_part < len(parts) or pending:
+            while next_part < len(parts) and len(pending) < ANALYSIS_POOL_WORKERS:
+                fut = loop.run_in_executor(_get_pool(), _run_partition, func_name, parts[next_part], args, kwargs)
+                pending[fut] = next_part
+                next_part += 1
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                results[pending.pop(fut)] = fut.result()
+        return results
+    except asyncio.CancelledError:
+        for fut in pending:
+            fut.cancel()
+        raise
+
+
+def _concat(parts: List[Any]) -> Any:
+    out: List[Any] = []
+    for p in parts:
+        out.extend(p)
+    return out
+
+
+async def _wait_disconnect(request: Optional[Request]) -> None:
+    if request is None:
+        await asyncio.Event().wait()
+        return
+    while not await request.is_disconnected():
+        await asyncio.sleep(_DISCONNECT_POLL_SEC)
+
+
+async def run_analysis(
+    request: Optional[Request],
+    db: Session,
+    func_name: str,
+    proxy_ids: List[int],
+    *args: Any,
+    merge: Callable[[List[Any]], Any] = _concat,
+    in_process: bool = False,
+    partition: bool = True,
+    timeout_sec: Optional[float] = None,
+    **kwargs: Any,
+) -> Any:
+    """분석 함수를 파티션별로 실행하고 결과를 병합해 반환합니다.
+
+    in_process=True 는 프로세스 메모리 상태(진행 중 구간, 기준선 캐시)에 의존하는 분석용으로 스레드에서 실행합니다.
+    partition=False 는 프록시 간 비교처럼 분할할 수 없는 분석을 워커 1개에서 실행합니다.
+    클라이언트 연결이 끊기면 499, 시간 예산을 넘기면 504를 반환하며, 이때 남은 파티션은 실행하지 않습니다.
+    실행 중인 파티션은 중단할 수 없으므로 끝난 뒤 결과만 버립니다.
+    """
+    budget = ANALYSIS_TIMEOUT_SEC if timeout_sec is None else timeout_sec
+    parts = _partitions(proxy_ids, ANALYSIS_POOL_WORKERS) if partition else [proxy_ids]
+    stop = threading.Event()
+
+    if not in_process and _can_use_pool(db):
+        work = asyncio.ensure_future(_run_in_pool(func_name, parts, args, kwargs))
+    else:
+        work = asyncio.ensure_future(
+            asyncio.to_thread(_run_in_thread, db.get_bind(), func_name, parts, args, kwargs, stop)
+        )
+
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({work, watcher}, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+
+    if work in done:
+        return merge(work.result())
+
+    # 남은 파티션은 제출하지 않고, 실행 중인 파티션(스레드 실행은 현재 파티션)은 끝난 뒤 결과를 버림
+    stop.set()
+    work.cancel()
+    if watcher in done:
+        logger.info(f"[analysis_pool] Client disconnected, cancelled {func_name}")
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    logger.warning(f"[analysis_pool] {func_name} exceeded time budget ({budget}s, proxies={len(proxy_ids)})")
+    raise HTTPException(status_code=504, detail=f"Analysis exceeded time budget ({budget:.0f}s)")
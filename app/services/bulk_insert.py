@@ -0,0 +1,75 @@
+"""
+DBAPI 대량 INSERT
+
+ORM 매핑(bulk_insert_mappings)이나 insert(Model) + 행 dict 목록은 행마다 dict를 만들고 키를 맞춰 보므로,
+수만 행 블록에서는 INSERT 자체보다 파이썬 쪽 비용이 큽니다. insert_columns()는 컬럼 순서대로 묶은 튜플을
+미리 준비한 INSERT 문 하나로 cursor.executemany()에 넘깁니다 (SQLite). 값 변환은 컬럼 타입의 bind processor를
+컬럼마다 한 번 골라 적용하므로 저장 형식(DateTime 문자열 등)은 ORM 경로와 같습니다.
+세션의 연결/트랜잭션을 그대로 사용하며 커밋은 호출자가 합니다. Python 쪽 default는 적용하지 않으므로
+필요한 컬럼 값은 모두 넘겨야 합니다 (server_default는 적용됨).
+"""
+from itertools import repeat
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+def _table(target):
+    return getattr(target, "__table__", target)
+
+
+def insert_columns(
+    db: Session,
+    target,
+    columns: Mapping[str, Sequence[Any]],
+    constants: Optional[Mapping[str, Any]] = None,
+) -> int:
+    """컬럼별 값 목록(길이가 같아야 함)과 모든 행에 같은 상수 값을 INSERT합니다. INSERT한 행 수를 돌려줍니다.
+
+    SQLite가 아니면 insert(table) + 행 dict 목록으로 같은 결과를 냅니다.
+    """
+    table = _table(target)
+    constants = dict(constants or {})
+    n = len(next(iter(columns.values()))) if columns else 0
+    if n == 0:
+        return 0
+    names = list(columns) + list(constants)
+    conn = db.connection()
+    dialect = conn.dialect
+    if dialect.name != "sqlite":
+        values = zip(*columns.values(), *(repeat(v, n) for v in constants.values()))
+        db.execute(insert(table), [dict(zip(names, row)) for row in values])
+        return n
+
+    def _processor(name: str):
+        type_ = table.c[name].type
+        return type_.dialect_impl(dialect).bind_processor(dialect)
+
+    prepared: List[Sequence[Any]] = []
+    for name, values in columns.items():
+        proc = _processor(name)
+        prepared.append(values if proc is None else list(map(proc, values)))
+    for name, value in constants.items():
+        proc = _processor(name)
+        prepared.append(repeat(value if proc is None else proc(value), n))
+
+    quote = dialect.identifier_preparer.quote
+    sql = (f"INSERT INTO {quote(table.name)} ({', '.join(map(quote, names))}) "
+           f"VALUES ({', '.join('?' * len(names))})")
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(sql, zip(*prepared))
+    finally:
+        cursor.close()
+    return n
+
+
+def insert_mappings(db: Session, target, rows: Sequence[Mapping[str, Any]]) -> int:
+    """bulk_insert_mappings()와 같은 행 dict 목록을 insert_columns()로 INSERT합니다 (없는 키는 NULL)."""
+    if not rows:
+        return 0
+    names: Dict[str, None] = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    return insert_columns(db, target, {name: [row.get(name) for row in rows] for name in names})
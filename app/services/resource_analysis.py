@@ -3,9 +3,27 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.resource_usage import ResourceUsage as ResourceUsageModel
 from app.models.proxy import Proxy
-from app.utils.time import KST_TZ
+from app.utils.time import KST_TZ, now_kst
+from app.services.threshold_episodes import (
+    ThresholdEpisodeDetector,
+    episode_to_dict,
+    query_episodes,
+    tracked_since,
+)
+from app.services.resource_rollups import hourly_aggregates
+from app.services.resource_baselines import baseline_scorer, hour_of_week
+from app.services.resource_forecast import (
+    LINEAR_MIN_DAYS,
+    first_crossing,
+    forecast_window_start,
+    linear_forecast,
+    load_fits,
+    recent_daily,
+)
 import bisect
 
+import numpy as np
+
 METRIC_FIELDS = ['cpu', 'mem', 'disk', 'cc', 'cs', 'http', 'https', 'http2', 'blocked']
 
 WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
@@ -125,6 +143,64 @@ def compute_time_in_band(
     return results
 
 
+def _episodes_from_samples(
+    db: Session,
+    proxy_ids: List[int],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    metric: str,
+    threshold: float,
+    before: Optional[datetime] = None,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, datetime]]:
+    """원시 시계열을 재생하여 구간을 도출합니다 (설정되지 않은 임계치, 저장 범위 이전 기간용).
+
+    before가 주어지면 그 이전 샘플만 재생하되, before 시점에 열려 있던 구간은 이후 샘플로 이어서 종료 시점까지
+    재생합니다. 반환값: (프록시별 구간, 이렇게 before를 넘어 이어진 구간의 프록시별 종료 시각)
+    """
+    col = getattr(ResourceUsageModel, metric)
+
+    def _samples(ids: List[int], lo: Optional[datetime], hi: Optional[datetime], hi_inclusive: bool):
+        q = db.query(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at, col)
+        if ids:
+            q = q.filter(ResourceUsageModel.proxy_id.in_(ids))
+        if lo:
+            q = q.filter(ResourceUsageModel.collected_at >= lo)
+        if hi:
+            q = q.filter(ResourceUsageModel.collected_at <= hi if hi_inclusive else ResourceUsageModel.collected_at < hi)
+        return q.order_by(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at).yield_per(5000)
+
+    detector = ThresholdEpisodeDetector()
+    grouped: Dict[int, List[Dict[str, Any]]] = {}
+    extended: Dict[int, datetime] = {}
+
+    def _add(rec: Dict[str, Any]):
+        grouped.setdefault(rec['proxy_id'], []).append(episode_to_dict(
+            rec['start_at'], rec['end_at'], rec['max_value'], rec['mean_value'], rec['sample_count']))
+
+    for pid, ts, val in _samples(proxy_ids, start_time, before or end_time, before is None):
+        _, closed = detector.observe(pid, metric, threshold, ts, val)
+        if closed:
+            _add(closed)
+    if before is not None:
+        for pid in detector.open_episodes(proxy_ids, metric, threshold):
+            for _, ts, val in _samples([pid], before, end_time, True):
+                _, closed = detector.observe(pid, metric, threshold, ts, val)
+                if closed:
+                    _add(closed)
+                    extended[pid] = closed['end_at']
+                    break
+    for rec in detector.drain():
+        _add(rec)
+        if before is not None and _naive(rec['end_at']) >= _naive(before):
+            extended[rec['proxy_id']] = rec['end_at']
+    return grouped, extended
+
+
+def _naive(dt: datetime) -> datetime:
+    # 저장된 시각은 KST 벽시계(naive), 메모리 상태는 KST aware이므로 벽시계끼리 비교합니다
+    return dt.replace(tzinfo=None)
+
+
 def compute_threshold_duration(
     db: Session,
     proxy_ids: List[int],
@@ -134,59 +210,37 @@ def compute_threshold_duration(
     threshold: float,
 ) -> List[Dict[str, Any]]:
     pmap = _proxy_map(db, proxy_ids)
-    q = _base_query(db, proxy_ids, start_time, end_time)
-    q = q.order_by(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at)
-
-    grouped: Dict[int, List[Tuple[datetime, float]]] = {}
-    for row in q.all():
-        val = _get_val(row, metric)
-        if val is not None:
-            grouped.setdefault(row.proxy_id, []).append((row.collected_at, val))
+    # 설정된 임계치는 저장 범위(since) 이후를 수집 시점에 저장된 구간으로 인덱스 조회하고,
+    # 그 이전 기간과 설정되지 않은 임계치는 원시 데이터를 재생합니다
+    since = tracked_since(db, metric, threshold)
+    if since is not None and end_time is not None and _naive(end_time) < _naive(since):
+        since = None  # 조회 기간 전체가 저장 범위 이전
+    if since is None:
+        grouped = (_episodes_from_samples(db, proxy_ids, start_time, end_time, metric, threshold)[0]
+                   if metric in METRIC_FIELDS else {})
+    elif start_time is not None and _naive(start_time) >= _naive(since):
+        grouped = query_episodes(db, proxy_ids, metric, threshold, start_time, end_time)
+    else:
+        grouped = query_episodes(db, proxy_ids, metric, threshold, since, end_time)
+        earlier, extended = (
+            _episodes_from_samples(db, proxy_ids, start_time, end_time, metric, threshold, before=since)
+            if metric in METRIC_FIELDS else ({}, {})
+        )
+        for pid, eps in earlier.items():
+            stored = grouped.get(pid, [])
+            if pid in extended:
+                # since에 걸친 구간은 재생 결과로 대체 (저장된 쪽은 같은 구간의 since 이후 부분)
+                cut = _naive(extended[pid])
+                dropped = [ep for ep in stored if _naive(datetime.fromisoformat(ep['start'])) <= cut]
+                stored = stored[len(dropped):]
+                if any(ep.get('ongoing') for ep in dropped):
+                    eps[-1]['ongoing'] = True
+            grouped[pid] = eps + stored
 
     results = []
     for pid in proxy_ids:
-        points = grouped.get(pid, [])
-        episodes = []
-        total_min = 0.0
-        in_ep = False
-        ep_start = None
-        ep_vals = []
-
-        for i, (ts, val) in enumerate(points):
-            if val >= threshold:
-                if not in_ep:
-                    in_ep = True
-                    ep_start = ts
-                    ep_vals = [val]
-                else:
-                    ep_vals.append(val)
-            else:
-                if in_ep:
-                    ep_end = points[i - 1][0]
-                    dur = round((ep_end - ep_start).total_seconds() / 60, 1)
-                    episodes.append({
-                        'start': ep_start.isoformat(), 'end': ep_end.isoformat(),
-                        'duration_min': dur,
-                        'max_value': round(max(ep_vals), 2),
-                        'mean_value': round(sum(ep_vals) / len(ep_vals), 2),
-                        'sample_count': len(ep_vals),
-                    })
-                    total_min += dur
-                    in_ep = False
-                    ep_vals = []
-
-        if in_ep and ep_vals:
-            ep_end = points[-1][0]
-            dur = round((ep_end - ep_start).total_seconds() / 60, 1)
-            episodes.append({
-                'start': ep_start.isoformat(), 'end': ep_end.isoformat(),
-                'duration_min': dur,
-                'max_value': round(max(ep_vals), 2),
-                'mean_value': round(sum(ep_vals) / len(ep_vals), 2),
-                'sample_count': len(ep_vals),
-            })
-            total_min += dur
-
+        episodes = grouped.get(pid, [])
+        total_min = sum(ep['duration_min'] for ep in episodes)
         results.append({
             'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
             'metric': metric, 'threshold': threshold,
@@ -205,22 +259,19 @@ def compute_heatmap_weekly(
     metric: str,
 ) -> List[Dict[str, Any]]:
     pmap = _proxy_map(db, proxy_ids)
-    # {proxy_id: {weekday: {hour: [values]}}}
+    # 롤업된 시간은 resource_usage_hourly에서, 경계/최근 구간만 원시 행에서 집계
+    # {proxy_id: {weekday: {hour: [sum, count]}}}
     grouped: Dict[int, Dict[int, Dict[int, List[float]]]] = {}
-
-    for row in _base_query(db, proxy_ids, start_time, end_time).all():
-        val = _get_val(row, metric)
-        if val is None:
-            continue
-        local = row.collected_at.astimezone(KST_TZ)
-        wd, hr = local.weekday(), local.hour
-        grouped.setdefault(row.proxy_id, {}).setdefault(wd, {}).setdefault(hr, []).append(val)
+    for (pid, bucket), agg in hourly_aggregates(db, proxy_ids, metric, start_time, end_time).items():
+        cell = grouped.setdefault(pid, {}).setdefault(bucket.weekday(), {}).setdefault(bucket.hour, [0.0, 0])
+        cell[0] += agg.sum
+        cell[1] += agg.count
 
     results = []
     for pid in proxy_ids:
         data = {}
         for wd, hours in grouped.get(pid, {}).items():
-            data[wd] = {hr: round(sum(v) / len(v), 2) for hr, v in hours.items()}
+            data[wd] = {hr: round(total / cnt, 2) for hr, (total, cnt) in hours.items() if cnt}
         results.append({
             'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
             'metric': metric, 'data': data,
@@ -228,6 +279,62 @@ def compute_heatmap_weekly(
     return results
 
 
+def compute_anomalies(
+    db: Session,
+    proxy_ids: List[int],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    metrics: List[str],
+    min_score: float,
+    limit: int = 500,
+) -> List[Dict[str, Any]]:
+    """프록시별 최신 샘플 점수와, 기간이 주어지면 |z| >= min_score 인 샘플 목록"""
+    pmap = _proxy_map(db, proxy_ids)
+    baseline_scorer.ensure_loaded(db)
+
+    anomalies: Dict[int, List[Dict[str, Any]]] = {}
+    if start_time or end_time:
+        cols = [getattr(ResourceUsageModel, m) for m in metrics]
+        q = db.query(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at, *cols)
+        if proxy_ids:
+            q = q.filter(ResourceUsageModel.proxy_id.in_(proxy_ids))
+        if start_time:
+            q = q.filter(ResourceUsageModel.collected_at >= start_time)
+        if end_time:
+            q = q.filter(ResourceUsageModel.collected_at <= end_time)
+        for pid, ts, *vals in q.yield_per(5000):
+            for m, v in zip(metrics, vals):
+                z = baseline_scorer.score(pid, m, ts, v)
+                if z is None or abs(z) < min_score:
+                    continue
+                base = baseline_scorer.baseline(pid, m, hour_of_week(ts))
+                anomalies.setdefault(pid, []).append({
+                    'collected_at': ts.isoformat(), 'metric': m, 'value': round(v, 2),
+                    'expected': round(base[0], 2) if base else None, 'score': z,
+                })
+
+    results = []
+    for pid in proxy_ids:
+        row = (
+            db.query(ResourceUsageModel)
+            .filter(ResourceUsageModel.proxy_id == pid)
+            .order_by(ResourceUsageModel.collected_at.desc())
+            .first()
+        )
+        scores = baseline_scorer.score_usage(row) if row else {}
+        items = sorted(anomalies.get(pid, []), key=lambda x: abs(x['score']), reverse=True)
+        results.append({
+            'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
+            'latest': {
+                'collected_at': row.collected_at.isoformat() if row else None,
+                'scores': {m: scores[m] for m in metrics if m in scores},
+            },
+            'anomaly_count': len(items),
+            'anomalies': items[:limit],
+        })
+    return results
+
+
 def compute_top_n(
     db: Session,
     proxy_ids: List[int],
@@ -298,3 +405,167 @@ def compute_smoothed(
         results.append({'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
                         'metric': metric, 'points': smoothed})
     return results
+
+
+def _hourly_grid(
+    db: Session,
+    proxy_ids: List[int],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    metric: str,
+) -> Tuple[List[datetime], np.ndarray, np.ndarray]:
+    """선택 프록시를 공통 시간 격자에 정렬합니다. (버킷 목록, 시간 평균[P, T], 시간 최대[P, T]) — 값 없음은 NaN"""
+    aggs = hourly_aggregates(db, proxy_ids, metric, start_time, end_time)
+    buckets = sorted({bucket for _, bucket in aggs})
+    col = {b: i for i, b in enumerate(buckets)}
+    row = {pid: i for i, pid in enumerate(proxy_ids)}
+    means = np.full((len(proxy_ids), len(buckets)), np.nan)
+    maxes = np.full((len(proxy_ids), len(buckets)), np.nan)
+    for (pid, bucket), agg in aggs.items():
+        if pid in row and agg.count:
+            means[row[pid], col[bucket]] = agg.sum / agg.count
+            maxes[row[pid], col[bucket]] = agg.max
+    return buckets, means, maxes
+
+
+def _pairwise_corr(x: np.ndarray, min_overlap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """결측(NaN)을 쌍별로 제외한 피어슨 상관행렬과 겹치는 시간 수를 행렬 연산으로 계산합니다."""
+    mask = (~np.isnan(x)).astype(float)
+    x0 = np.where(mask > 0, x, 0.0)
+    n = mask @ mask.T
+    sx = x0 @ mask.T            # sx[i, j] = j가 있는 시간의 x_i 합
+    sxx = (x0 * x0) @ mask.T
+    sxy = x0 @ x0.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        var_j = var_i.T
+        r = cov / np.sqrt(var_i * var_j)
+    r[(n < min_overlap) | ~np.isfinite(r)] = np.nan
+    np.fill_diagonal(r, np.where(np.diag(n) >= min_overlap, 1.0, np.nan))
+    return np.clip(r, -1.0, 1.0), n
+
+
+def _matrix_to_list(m: np.ndarray, digits: int) -> List[List[Optional[float]]]:
+    return [[None if np.isnan(v) else round(float(v), digits) for v in row] for row in m]
+
+
+def compute_correlation(
+    db: Session,
+    proxy_ids: List[int],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    metric: str,
+    threshold: float,
+    min_overlap: int = 6,
+    top_pairs: int = 20,
+) -> Dict[str, Any]:
+    """프록시 간 시간 평균 상관행렬과 임계치 동시 초과(co-exceedance) 시간 수
+
+    시간 롤업 격자(1시간)를 사용하며, 초과 여부는 해당 시간의 최대값 >= threshold 기준입니다.
+    """
+    pmap = _proxy_map(db, proxy_ids)
+    buckets, means, maxes = _hourly_grid(db, proxy_ids, start_time, end_time, metric)
+    p = len(proxy_ids)
+
+    if buckets:
+        corr, overlap = _pairwise_corr(means, min_overlap)
+        exceed = np.nan_to_num(maxes, nan=-np.inf) >= threshold
+        ex = exceed.astype(float)
+        co = ex @ ex.T
+        ex_hours = np.diag(co)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            jaccard = co / (ex_hours[:, None] + ex_hours[None, :] - co)
+    else:
+        corr = np.full((p, p), np.nan)
+        overlap = co = jaccard = np.zeros((p, p))
+        ex_hours = np.zeros(p)
+
+    pairs = []
+    iu, ju = np.triu_indices(p, k=1)
+    if len(iu):
+        r_vals = corr[iu, ju]
+        order = np.argsort(-np.nan_to_num(r_vals, nan=-2.0), kind='stable')[:top_pairs]
+        for k in order:
+            if np.isnan(r_vals[k]):
+                break
+            i, j = int(iu[k]), int(ju[k])
+            pairs.append({
+                'proxy_a': proxy_ids[i], 'proxy_b': proxy_ids[j],
+                'host_a': pmap.get(proxy_ids[i], f'#{proxy_ids[i]}'),
+                'host_b': pmap.get(proxy_ids[j], f'#{proxy_ids[j]}'),
+                'correlation': round(float(r_vals[k]), 3),
+                'overlap_hours': int(overlap[i, j]),
+                'co_exceed_hours': int(co[i, j]),
+                'co_exceed_ratio': None if np.isnan(jaccard[i, j]) else round(float(jaccard[i, j]), 3),
+            })
+
+    return {
+        'metric': metric, 'threshold': threshold,
+        'proxies': [{'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
+                     'exceed_hours': int(ex_hours[i])} for i, pid in enumerate(proxy_ids)],
+        'grid': {
+            'start': buckets[0].isoformat() if buckets else None,
+            'end': buckets[-1].isoformat() if buckets else None,
+            'step_min': 60, 'points': len(buckets),
+        },
+        'correlation': _matrix_to_list(corr, 3),
+        'co_exceedance': [[int(v) for v in row] for row in co],
+        'top_pairs': pairs,
+    }
+
+
+def compute_forecast(
+    db: Session,
+    proxy_ids: List[int],
+    metric: str,
+    stat: str,
+    threshold: float,
+    horizon_days: int,
+) -> List[Dict[str, Any]]:
+    """일별 통계(stat)의 추세 예측과 임계치 도달 예상일
+
+    캐시된 Holt-Winters 상태를 사용하고, 이력이 2주 미만이면 최근 일별 집계의 선형 추세로 대체합니다.
+    """
+    pmap = _proxy_map(db, proxy_ids)
+    today = now_kst().date()
+    fits = load_fits(db, proxy_ids, metric, stat)
+    daily = recent_daily(db, proxy_ids, metric, forecast_window_start(today))
+
+    results = []
+    for pid in proxy_ids:
+        rows = daily.get(pid, [])
+        item: Dict[str, Any] = {
+            'proxy_id': pid, 'host': pmap.get(pid, f'#{pid}'),
+            'metric': metric, 'stat': stat, 'threshold': threshold,
+            'model': None, 'days_observed': len(rows),
+            'last_day': rows[-1].day.isoformat() if rows else None,
+            'last_value': round(getattr(rows[-1], stat), 2) if rows else None,
+            'trend_per_day': None, 'mae': None,
+            'days_to_threshold': None, 'projected_date': None, 'forecast': [],
+        }
+        state = fits.get(pid)
+        if state is not None:
+            values = state.forecast(horizon_days)
+            base_day = state.last_day
+            item.update(model='holt_winters', days_observed=state.n_days,
+                        trend_per_day=round(state.trend, 3),
+                        mae=round(state.mae, 2) if state.mae is not None else None)
+        elif len(rows) >= LINEAR_MIN_DAYS:
+            values, slope, mae = linear_forecast([r.day for r in rows], [getattr(r, stat) for r in rows], horizon_days)
+            base_day = rows[-1].day
+            item.update(model='linear', trend_per_day=round(slope, 3), mae=round(mae, 2))
+        else:
+            results.append(item)
+            continue
+
+        crossing = first_crossing(values, threshold)
+        if crossing is not None:
+            item['days_to_threshold'] = crossing
+            item['projected_date'] = (base_day + timedelta(days=crossing)).isoformat()
+        item['forecast'] = [
+            {'day': (base_day + timedelta(days=i + 1)).isoformat(), 'value': round(float(v), 2)}
+            for i, v in enumerate(values)
+        ]
+        results.append(item)
+    return results
@@ -0,0 +1,188 @@
+"""
+요일-시간(hour-of-week) 계절 기준선과 실시간 이상 점수
+
+롤업 작업이 새로 만든 시간 롤업을 (프록시, 지표, hour_of_week) 기준선에 Chan 병합으로 누적합니다.
+가중치는 BASELINE_WINDOW_WEEKS 주 분량으로 상한을 두어 오래된 패턴이 점차 잊히도록 합니다.
+수집된 샘플은 메모리에 캐시된 기준선으로 O(1) z-score를 계산합니다.
+"""
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.resource_baseline import ResourceBaseline
+from app.services.resource_rollups import ROLLUP_METRICS, rollup_closed_hours, to_kst
+
+logger = logging.getLogger(__name__)
+
+BASELINE_WINDOW_WEEKS = int(os.getenv("RU_BASELINE_WINDOW_WEEKS", "8"))
+BASELINE_MIN_SAMPLES = int(os.getenv("RU_BASELINE_MIN_SAMPLES", "20"))
+ANOMALY_SCORE_THRESHOLD = float(os.getenv("RU_ANOMALY_SCORE_THRESHOLD", "3.0"))
+
+
+def hour_of_week(dt: datetime) -> int:
+    local = to_kst(dt)
+    return local.weekday() * 24 + local.hour
+
+
+def _merge_rollup(row: ResourceBaseline, rollup: Dict[str, Any]) -> None:
+    """시간 롤업 1건을 기준선에 병합 (Chan et al. 병렬 분산 공식)"""
+    n_b = float(rollup["count"])
+    if n_b <= 0:
+        return
+    mean_b = rollup["sum"] / n_b
+    m2_b = max(0.0, rollup["sum_sq"] - rollup["sum"] * mean_b)
+    n_a = float(row.count or 0.0)
+    mean_a = float(row.mean or 0.0)
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    row.mean = mean_a + delta * n_b / n
+    row.m2 = float(row.m2 or 0.0) + m2_b + delta * delta * n_a * n_b / n
+    row.count = n
+    cap = n_b * BASELINE_WINDOW_WEEKS
+    if row.count > cap:
+        scale = cap / row.count
+        row.count = cap
+        row.m2 *= scale
+
+
+def merge_baselines(db: Session, rollups: List[Dict[str, Any]]) -> List[ResourceBaseline]:
+    """새 롤업들을 기준선 행에 병합하고 갱신된 행을 반환합니다 (커밋은 호출자)."""
+    if not rollups:
+        return []
+    proxy_ids = {r["proxy_id"] for r in rollups}
+    existing: Dict[Tuple[int, str, int], ResourceBaseline] = {
+        (b.proxy_id, b.metric, b.hour_of_week): b
+        for b in db.query(ResourceBaseline).filter(ResourceBaseline.proxy_id.in_(proxy_ids)).all()
+    }
+    touched: Dict[Tuple[int, str, int], ResourceBaseline] = {}
+    for r in sorted(rollups, key=lambda x: x["bucket_start"]):
+        key = (r["proxy_id"], r["metric"], hour_of_week(r["bucket_start"]))
+        row = existing.get(key)
+        if row is None:
+            row = ResourceBaseline(proxy_id=key[0], metric=key[1], hour_of_week=key[2],
+                                   count=0.0, mean=0.0, m2=0.0)
+            db.add(row)
+            existing[key] = row
+        _merge_rollup(row, r)
+        touched[key] = row
+    return list(touched.values())
+
+
+def update_baselines(db: Session, rollups: List[Dict[str, Any]]) -> List[ResourceBaseline]:
+    """새 롤업들을 기준선에 반영(커밋)하고 갱신된 기준선 행을 반환합니다."""
+    rows = merge_baselines(db, rollups)
+    db.commit()
+    return rows
+
+
+class BaselineScorer:
+    """기준선 메모리 캐시와 O(1) 이상 점수 계산기"""
+
+    def __init__(self):
+        # {(proxy_id, metric, hour_of_week): (mean, std, count)}
+        self._baselines: Dict[Tuple[int, str, int], Tuple[float, float, float]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(row: ResourceBaseline) -> Tuple[float, float, float]:
+        count = float(row.count or 0.0)
+        std = math.sqrt(row.m2 / count) if count > 1 and row.m2 > 0 else 0.0
+        return float(row.mean), std, count
+
+    def load(self, db: Session) -> None:
+        data = {
+            (b.proxy_id, b.metric, b.hour_of_week): self._entry(b)
+            for b in db.query(ResourceBaseline).all()
+        }
+        with self._lock:
+            self._baselines = data
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def invalidate(self) -> None:
+        """다음 ensure_loaded()에서 DB로부터 다시 읽도록 표시합니다."""
+        self._loaded = False
+
+    def update(self, rows: List[ResourceBaseline]) -> None:
+        self.update_entries({(b.proxy_id, b.metric, b.hour_of_week): self._entry(b) for b in rows})
+
+    def update_entries(self, entries: Dict[Tuple[int, str, int], Tuple[float, float, float]]) -> None:
+        with self._lock:
+            self._baselines.update(entries)
+
+    def baseline(self, proxy_id: int, metric: str, how: int) -> Optional[Tuple[float, float, float]]:
+        return self._baselines.get((proxy_id, metric, how))
+
+    def score(self, proxy_id: int, metric: str, ts: datetime, value: Optional[float]) -> Optional[float]:
+        """기준선 대비 z-score. 값이 없거나 기준선 표본이 부족하면 None"""
+        if value is None:
+            return None
+        entry = self._baselines.get((proxy_id, metric, hour_of_week(ts)))
+        if entry is None:
+            return None
+        mean, std, count = entry
+        if count < BASELINE_MIN_SAMPLES:
+            return None
+        # 거의 일정한 지표에서 미세한 변동이 과대평가되지 않도록 분모 하한 적용
+        denom = max(std, 0.01 * abs(mean), 1e-3)
+        return round((value - mean) / denom, 2)
+
+    def score_usage(self, row: Any) -> Dict[str, float]:
+        """resource_usage 행(모델 또는 매핑)의 지표별 점수 {metric: z}"""
+        get = row.get if isinstance(row, dict) else (lambda k: getattr(row, k, None))
+        proxy_id, ts = get("proxy_id"), get("collected_at")
+        if proxy_id is None or ts is None:
+            return {}
+        scores: Dict[str, float] = {}
+        for m in ROLLUP_METRICS:
+            z = self.score(proxy_id, m, ts, get(m))
+            if z is not None:
+                scores[m] = z
+        return scores
+
+
+# 전역 인스턴스
+baseline_scorer = BaselineScorer()
+
+
+def score_collected_rows(db: Session, rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
+    """수집 직후 행들의 점수 {proxy_id: {metric: z}} (점수가 있는 프록시만)"""
+    baseline_scorer.ensure_loaded(db)
+    out: Dict[int, Dict[str, float]] = {}
+    for row in rows:
+        scores = baseline_scorer.score_usage(row)
+        if scores:
+            out[row["proxy_id"]] = scores
+    return out
+
+
+def run_baseline_cycle(db: Session) -> int:
+    """종료된 시간을 롤업하고 기준선/캐시를 갱신합니다. 반영된 롤업 수를 반환합니다.
+
+    기준선은 롤업 창마다 롤업 INSERT와 같은 트랜잭션에서 병합하므로, 중간에 실패해도 워터마크가 지난
+    시간은 모두 기준선에 반영되어 있습니다. 캐시에는 기준선 키별 최신 값만 모아 끝난 뒤 반영합니다.
+    """
+    baseline_scorer.ensure_loaded(db)
+    entries: Dict[Tuple[int, str, int], Tuple[float, float, float]] = {}
+
+    def _merge(rollups: List[Dict[str, Any]]) -> None:
+        for row in merge_baselines(db, rollups):
+            entries[(row.proxy_id, row.metric, row.hour_of_week)] = BaselineScorer._entry(row)
+
+    try:
+        count = rollup_closed_hours(db, on_window=_merge)
+    except Exception:
+        # 커밋되지 않은 창의 값이 섞였을 수 있으므로 캐시는 다음 사용 시 DB에서 다시 읽습니다
+        baseline_scorer.invalidate()
+        raise
+    baseline_scorer.update_entries(entries)
+    return count
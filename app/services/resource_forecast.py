@@ -0,0 +1,198 @@
+"""
+일별 집계 기반 용량 추세 예측
+
+종료된 날의 일별 통계(p95/mean/max)로 프록시/지표별 가법 Holt-Winters(주간 계절성) 상태를 증분 갱신해
+resource_forecast_fits에 저장합니다. 예측 API는 저장된 상태만 읽으므로 원시 행을 다시 읽지 않습니다.
+"""
+import json
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.resource_daily import ResourceUsageDaily
+from app.models.resource_forecast_fit import ResourceForecastFit
+
+logger = logging.getLogger(__name__)
+
+FORECAST_STATS = ('p95', 'mean', 'max')
+SEASON_LENGTH = 7
+# Holt-Winters 평활 계수 (수준 / 추세 / 계절)
+HW_ALPHA = 0.3
+HW_BETA = 0.05
+HW_GAMMA = 0.2
+# 초기화에 필요한 최소 일수 (2주), 그보다 짧으면 선형 추세로 대체
+HW_MIN_DAYS = 2 * SEASON_LENGTH
+LINEAR_MIN_DAYS = 3
+
+
+class HoltWintersState:
+    """가법 Holt-Winters 상태. 계절 성분은 요일(월=0)로 인덱싱하여 결측일이 있어도 정렬이 유지됩니다."""
+
+    def __init__(self, level: float, trend: float, season: List[float], last_day: date,
+                 n_days: int = 0, abs_err_sum: float = 0.0, err_count: int = 0):
+        self.level = level
+        self.trend = trend
+        self.season = season
+        self.last_day = last_day
+        self.n_days = n_days
+        self.abs_err_sum = abs_err_sum
+        self.err_count = err_count
+
+    @classmethod
+    def initialize(cls, days: List[date], values: List[float]) -> "HoltWintersState":
+        """첫 2주 관측으로 초기 상태를 만들고 나머지 관측을 반영합니다."""
+        w1, w2 = values[:SEASON_LENGTH], values[SEASON_LENGTH:HW_MIN_DAYS]
+        m1, m2 = sum(w1) / len(w1), sum(w2) / len(w2)
+        season_sum = [0.0] * SEASON_LENGTH
+        season_cnt = [0] * SEASON_LENGTH
+        for i in range(HW_MIN_DAYS):
+            wd = days[i].weekday()
+            season_sum[wd] += values[i] - (m1 if i < SEASON_LENGTH else m2)
+            season_cnt[wd] += 1
+        season = [season_sum[k] / season_cnt[k] if season_cnt[k] else 0.0 for k in range(SEASON_LENGTH)]
+        state = cls(m2, (m2 - m1) / SEASON_LENGTH, season, days[HW_MIN_DAYS - 1], HW_MIN_DAYS)
+        for d, v in zip(days[HW_MIN_DAYS:], values[HW_MIN_DAYS:]):
+            state.update(d, v)
+        return state
+
+    def update(self, day: date, value: float) -> None:
+        """하루치 관측 반영 (O(1)). 결측일은 추세만큼 수준을 전진시킵니다."""
+        gap = (day - self.last_day).days
+        if gap <= 0:
+            return
+        for _ in range(gap - 1):
+            self.level += self.trend
+        wd = day.weekday()
+        err = value - (self.level + self.trend + self.season[wd])
+        prev_level = self.level
+        self.level = HW_ALPHA * (value - self.season[wd]) + (1 - HW_ALPHA) * (self.level + self.trend)
+        self.trend = HW_BETA * (self.level - prev_level) + (1 - HW_BETA) * self.trend
+        self.season[wd] = HW_GAMMA * (value - self.level) + (1 - HW_GAMMA) * self.season[wd]
+        self.abs_err_sum += abs(err)
+        self.err_count += 1
+        self.last_day = day
+        self.n_days += 1
+
+    def forecast(self, horizon_days: int) -> np.ndarray:
+        h = np.arange(1, horizon_days + 1)
+        wds = (self.last_day.weekday() + h) % SEASON_LENGTH
+        return self.level + h * self.trend + np.asarray(self.season)[wds]
+
+    @property
+    def mae(self) -> Optional[float]:
+        return self.abs_err_sum / self.err_count if self.err_count else None
+
+    @classmethod
+    def from_row(cls, row: ResourceForecastFit) -> "HoltWintersState":
+        return cls(row.level, row.trend, json.loads(row.season_json), row.last_day,
+                   row.n_days, row.abs_err_sum, row.err_count)
+
+    def to_row(self, row: ResourceForecastFit) -> None:
+        row.level = self.level
+        row.trend = self.trend
+        row.season_json = json.dumps(self.season)
+        row.last_day = self.last_day
+        row.n_days = self.n_days
+        row.abs_err_sum = self.abs_err_sum
+        row.err_count = self.err_count
+
+
+def linear_forecast(days: List[date], values: List[float], horizon_days: int) -> Tuple[np.ndarray, float, float]:
+    """짧은 이력용 선형 추세 (예측값, 일별 기울기, 평균 절대 잔차)"""
+    t = np.array([(d - days[0]).days for d in days], dtype=float)
+    y = np.asarray(values, dtype=float)
+    slope, intercept = np.polyfit(t, y, 1)
+    mae = float(np.mean(np.abs(y - (intercept + slope * t))))
+    h = t[-1] + np.arange(1, horizon_days + 1)
+    return intercept + slope * h, float(slope), mae
+
+
+def refresh_forecast_fits(db: Session, daily_records: List[Dict[str, Any]]) -> int:
+    """새로 닫힌 날의 일별 집계를 예측 상태에 반영합니다. 갱신된 상태 수를 반환합니다.
+
+    상태가 없는 (프록시, 지표, 통계)는 일별 이력이 HW_MIN_DAYS 이상 쌓였을 때 이력 전체로 초기화합니다.
+    """
+    proxy_ids = sorted({r["proxy_id"] for r in daily_records})
+    updated = 0
+    for pid in proxy_ids:
+        fits = {
+            (f.metric, f.stat): f
+            for f in db.query(ResourceForecastFit).filter(ResourceForecastFit.proxy_id == pid).all()
+        }
+        metrics = {r["metric"] for r in daily_records if r["proxy_id"] == pid}
+        missing = any((m, s) not in fits for m in metrics for s in FORECAST_STATS)
+        q = db.query(ResourceUsageDaily).filter(ResourceUsageDaily.proxy_id == pid,
+                                                ResourceUsageDaily.metric.in_(metrics))
+        if not missing:
+            q = q.filter(ResourceUsageDaily.day > min(f.last_day for f in fits.values()))
+        history: Dict[str, List[ResourceUsageDaily]] = {}
+        for row in q.order_by(ResourceUsageDaily.day).all():
+            history.setdefault(row.metric, []).append(row)
+
+        for m in metrics:
+            rows = history.get(m, [])
+            for stat in FORECAST_STATS:
+                fit = fits.get((m, stat))
+                if fit is None:
+                    if len(rows) < HW_MIN_DAYS:
+                        continue
+                    state = HoltWintersState.initialize([r.day for r in rows], [getattr(r, stat) for r in rows])
+                    fit = ResourceForecastFit(proxy_id=pid, metric=m, stat=stat)
+                    db.add(fit)
+                else:
+                    state = HoltWintersState.from_row(fit)
+                    for r in rows:
+                        if r.day > state.last_day:
+                            state.update(r.day, getattr(r, stat))
+                state.to_row(fit)
+                updated += 1
+        db.commit()
+    return updated
+
+
+def run_forecast_cycle(db: Session) -> int:
+    """종료된 날을 일별 집계하고 예측 상태를 갱신합니다. 새 일별 레코드 수를 반환합니다."""
+    from app.services.resource_rollups import rollup_closed_days
+
+    records = rollup_closed_days(db)
+    if records:
+        refresh_forecast_fits(db, records)
+    return len(records)
+
+
+def first_crossing(values: np.ndarray, threshold: float) -> Optional[int]:
+    """예측값이 처음 임계치 이상이 되는 날 (1일 후 = 1), 없으면 None"""
+    hits = np.nonzero(values >= threshold)[0]
+    return int(hits[0]) + 1 if hits.size else None
+
+
+def recent_daily(db: Session, proxy_ids: List[int], metric: str, since: date) -> Dict[int, List[ResourceUsageDaily]]:
+    q = (
+        db.query(ResourceUsageDaily)
+        .filter(ResourceUsageDaily.proxy_id.in_(proxy_ids))
+        .filter(ResourceUsageDaily.metric == metric)
+        .filter(ResourceUsageDaily.day >= since)
+        .order_by(ResourceUsageDaily.proxy_id, ResourceUsageDaily.day)
+    )
+    grouped: Dict[int, List[ResourceUsageDaily]] = {}
+    for row in q.all():
+        grouped.setdefault(row.proxy_id, []).append(row)
+    return grouped
+
+
+def load_fits(db: Session, proxy_ids: List[int], metric: str, stat: str) -> Dict[int, HoltWintersState]:
+    q = (
+        db.query(ResourceForecastFit)
+        .filter(ResourceForecastFit.proxy_id.in_(proxy_ids))
+        .filter(ResourceForecastFit.metric == metric)
+        .filter(ResourceForecastFit.stat == stat)
+    )
+    return {f.proxy_id: HoltWintersState.from_row(f) for f in q.all()}
+
+
+def forecast_window_start(today: date) -> date:
+    """선형 대체와 최근값 조회에 쓰는 일별 이력 범위 시작일"""
+    return today - timedelta(days=HW_MIN_DAYS * 2)
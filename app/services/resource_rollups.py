@@ -0,0 +1,273 @@
+"""
+resource_usage 시간/일 단위 롤업
+
+종료된 KST 정시 구간을 (프록시, 지표)별 count/sum/sum_sq/min/max로 집계해 resource_usage_hourly에,
+종료된 KST 날짜를 count/mean/p95/max로 집계해 resource_usage_daily에 저장합니다.
+장기 구간 분석은 원시 행 대신 롤업을 읽고, 롤업되지 않은 경계 구간만 원시 데이터로 보충합니다.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.resource_daily import ResourceUsageDaily
+from app.models.resource_rollup import ResourceUsageHourly
+from app.models.resource_usage import ResourceUsage as ResourceUsageModel
+from app.utils.time import KST_TZ, now_kst
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_METRICS = ['cpu', 'mem', 'disk', 'cc', 'cs', 'http', 'https', 'http2', 'blocked']
+
+HOUR = timedelta(hours=1)
+# 한 번에 집계하는 원시 데이터 범위 (최초 백필 시 메모리 제한)
+_ROLLUP_WINDOW = timedelta(days=1)
+# 일 집계 시 한 번에 읽는 프록시 수
+_DAILY_PROXY_CHUNK = 20
+
+
+def to_kst(dt: datetime) -> datetime:
+    """DB에서 읽은 시각을 KST aware datetime으로 변환 (SQLite는 KST 벽시계 값을 naive로 반환)"""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=KST_TZ)
+    return dt.astimezone(KST_TZ)
+
+
+def floor_hour(dt: datetime) -> datetime:
+    return to_kst(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(dt: datetime) -> datetime:
+    floored = floor_hour(dt)
+    return floored if floored == to_kst(dt) else floored + HOUR
+
+
+@dataclass
+class HourAgg:
+    count: int = 0
+    sum: float = 0.0
+    sum_sq: float = 0.0
+    min: float = float('inf')
+    max: float = float('-inf')
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.sum_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "HourAgg") -> None:
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+def _aggregate_raw(
+    db: Session,
+    proxy_ids: Optional[List[int]],
+    metrics: List[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    end_inclusive: bool = False,
+) -> Dict[Tuple[int, str, datetime], HourAgg]:
+    """원시 행을 (proxy_id, metric, 정시) 단위로 집계합니다."""
+    cols = [getattr(ResourceUsageModel, m) for m in metrics]
+    q = db.query(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at, *cols)
+    if proxy_ids:
+        q = q.filter(ResourceUsageModel.proxy_id.in_(proxy_ids))
+    if start is not None:
+        q = q.filter(ResourceUsageModel.collected_at >= start)
+    if end is not None:
+        q = q.filter(ResourceUsageModel.collected_at <= end if end_inclusive else ResourceUsageModel.collected_at < end)
+
+    aggs: Dict[Tuple[int, str, datetime], HourAgg] = {}
+    for pid, ts, *values in q.yield_per(5000):
+        bucket = floor_hour(ts)
+        for m, v in zip(metrics, values):
+            if v is None:
+                continue
+            key = (pid, m, bucket)
+            agg = aggs.get(key)
+            if agg is None:
+                agg = aggs[key] = HourAgg()
+            agg.add(v)
+    return aggs
+
+
+def rollup_watermark(db: Session) -> Optional[datetime]:
+    """롤업이 끝난 시각 (마지막 롤업 버킷의 종료 시각)"""
+    last = db.query(func.max(ResourceUsageHourly.bucket_start)).scalar()
+    return to_kst(last) + HOUR if last is not None else None
+
+
+def rollup_closed_hours(
+    db: Session,
+    now: Optional[datetime] = None,
+    on_window: Optional[Callable[[List[Dict]], None]] = None,
+) -> int:
+    """워터마크 이후 종료된 시간들을 롤업하고 새로 생성된 롤업 레코드 수를 반환합니다.
+
+    _ROLLUP_WINDOW 단위로 집계/커밋하며, on_window(records)는 창마다 커밋 전에 (같은 트랜잭션에서) 호출됩니다.
+    레코드는 창이 끝나면 버리므로 최초 백필에서도 메모리는 창 크기에 비례합니다.
+    """
+    end = floor_hour(now or now_kst())
+    q = db.query(func.min(ResourceUsageModel.collected_at))
+    watermark = rollup_watermark(db)
+    if watermark is not None:
+        q = q.filter(ResourceUsageModel.collected_at >= watermark)
+    first = q.scalar()
+    if first is None:
+        return 0
+    # 수집이 비어 있던 구간은 건너뛰고 다음 원시 데이터가 있는 시간부터 집계
+    start = floor_hour(first)
+
+    created = 0
+    while start < end:
+        window_end = min(start + _ROLLUP_WINDOW, end)
+        aggs = _aggregate_raw(db, None, ROLLUP_METRICS, start, window_end)
+        records = [
+            {
+                "proxy_id": pid, "metric": m, "bucket_start": bucket,
+                "count": a.count, "sum": a.sum, "sum_sq": a.sum_sq, "min": a.min, "max": a.max,
+            }
+            for (pid, m, bucket), a in aggs.items()
+        ]
+        if records:
+            db.bulk_insert_mappings(ResourceUsageHourly, records)
+            if on_window is not None:
+                on_window(records)
+            db.commit()
+            created += len(records)
+        start = window_end
+    if created:
+        logger.info(f"[resource_rollups] Rolled up {created} proxy/metric hours")
+    return created
+
+
+def hourly_aggregates(
+    db: Session,
+    proxy_ids: List[int],
+    metric: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Dict[Tuple[int, datetime], HourAgg]:
+    """[start_time, end_time] 범위를 {(proxy_id, 정시): HourAgg}로 반환합니다.
+
+    구간 안에 완전히 포함되고 롤업된 시간은 롤업 테이블에서, 나머지 경계는 원시 행에서 읽습니다.
+    """
+    watermark = rollup_watermark(db)
+    lo = ceil_hour(start_time) if start_time else None
+    hi = watermark
+    if hi is not None and end_time is not None:
+        hi = min(hi, floor_hour(end_time))
+    covered = hi is not None and (lo is None or lo < hi)
+
+    out: Dict[Tuple[int, datetime], HourAgg] = {}
+
+    def _merge(pid: int, bucket: datetime, agg: HourAgg):
+        key = (pid, bucket)
+        if key in out:
+            out[key].merge(agg)
+        else:
+            out[key] = agg
+
+    if not covered:
+        for (pid, _, bucket), agg in _aggregate_raw(db, proxy_ids, [metric], start_time, end_time, True).items():
+            _merge(pid, bucket, agg)
+        return out
+
+    q = db.query(ResourceUsageHourly).filter(ResourceUsageHourly.metric == metric)
+    if proxy_ids:
+        q = q.filter(ResourceUsageHourly.proxy_id.in_(proxy_ids))
+    if lo is not None:
+        q = q.filter(ResourceUsageHourly.bucket_start >= lo)
+    q = q.filter(ResourceUsageHourly.bucket_start < hi)
+    for r in q.yield_per(5000):
+        _merge(r.proxy_id, to_kst(r.bucket_start), HourAgg(r.count, r.sum, r.sum_sq, r.min, r.max))
+
+    if start_time is not None and lo is not None and start_time < lo:
+        for (pid, _, bucket), agg in _aggregate_raw(db, proxy_ids, [metric], start_time, lo).items():
+            _merge(pid, bucket, agg)
+    for (pid, _, bucket), agg in _aggregate_raw(db, proxy_ids, [metric], hi, end_time, True).items():
+        _merge(pid, bucket, agg)
+    return out
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=KST_TZ)
+
+
+def rollup_closed_days(db: Session, now: Optional[datetime] = None) -> List[Dict]:
+    """종료된 KST 날짜를 (프록시, 지표)별 count/mean/p95/max로 집계하고 새 레코드를 반환합니다.
+
+    p95는 원시 샘플이 필요하므로 날짜별로 원시 행을 읽으며, 프록시를 나눠 메모리를 제한합니다.
+    """
+    today = to_kst(now or now_kst()).date()
+    last = db.query(func.max(ResourceUsageDaily.day)).scalar()
+    q = db.query(func.min(ResourceUsageModel.collected_at))
+    if last is not None:
+        q = q.filter(ResourceUsageModel.collected_at >= _day_start(last + timedelta(days=1)))
+    first = q.scalar()
+    if first is None:
+        return []
+
+    created: List[Dict] = []
+    day = to_kst(first).date()
+    while day < today:
+        start, end = _day_start(day), _day_start(day + timedelta(days=1))
+        proxy_ids = [
+            pid for (pid,) in db.query(ResourceUsageModel.proxy_id)
+            .filter(ResourceUsageModel.collected_at >= start, ResourceUsageModel.collected_at < end)
+            .distinct()
+        ]
+        records: List[Dict] = []
+        cols = [getattr(ResourceUsageModel, m) for m in ROLLUP_METRICS]
+        for i in range(0, len(proxy_ids), _DAILY_PROXY_CHUNK):
+            chunk = proxy_ids[i:i + _DAILY_PROXY_CHUNK]
+            values: Dict[Tuple[int, str], List[float]] = {}
+            q = (
+                db.query(ResourceUsageModel.proxy_id, *cols)
+                .filter(ResourceUsageModel.proxy_id.in_(chunk))
+                .filter(ResourceUsageModel.collected_at >= start, ResourceUsageModel.collected_at < end)
+            )
+            for pid, *vals in q.yield_per(5000):
+                for m, v in zip(ROLLUP_METRICS, vals):
+                    if v is not None:
+                        values.setdefault((pid, m), []).append(v)
+            for (pid, m), vals in values.items():
+                arr = np.asarray(vals, dtype=float)
+                records.append({
+                    "proxy_id": pid, "metric": m, "day": day, "count": int(arr.size),
+                    "mean": float(arr.mean()), "p95": float(np.percentile(arr, 95)), "max": float(arr.max()),
+                })
+        if records:
+            db.bulk_insert_mappings(ResourceUsageDaily, records)
+            db.commit()
+            created.extend(records)
+        day += timedelta(days=1)
+    if created:
+        logger.info(f"[resource_rollups] Rolled up {len(created)} proxy/metric days")
+    return created
+
+
+def enforce_rollup_retention(db: Session, days: int = 400) -> None:
+    cutoff = now_kst() - timedelta(days=days)
+    try:
+        db.query(ResourceUsageHourly).filter(ResourceUsageHourly.bucket_start < cutoff).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        logger.error(f"[resource_rollups] Retention failed: {e}")
+        db.rollback()
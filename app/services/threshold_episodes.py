@@ -0,0 +1,377 @@
+"""
+임계치 초과 구간(episode) 증분 검출기
+
+수집 시점에 샘플 1건당 O(1)로 프록시/지표별 열린 구간 상태를 갱신하고,
+구간이 종료되면 threshold_episodes 테이블에 저장합니다.
+종료 시 열린 구간은 is_open 행으로 저장했다가 시작 시 검출기로 복원하므로 재시작해도 구간이 나뉘지 않습니다.
+임계치 지속시간 분석 API는 현재 임계치의 저장 범위(threshold_episode_coverage) 안에서는 저장된 구간을
+인덱스로 조회하고, 그 이전 기간은 원시 데이터를 재생합니다.
+"""
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.resource_config import ResourceConfig as ResourceConfigModel
+from app.models.threshold_episode import ThresholdEpisode, ThresholdEpisodeCoverage
+
+logger = logging.getLogger(__name__)
+
+INTERFACE_METRIC_PREFIX = "if:"
+
+
+def interface_metric_key(if_name: str, direction: str) -> str:
+    """인터페이스 지표 키 ("if:<name>:in" / "if:<name>:out")"""
+    return f"{INTERFACE_METRIC_PREFIX}{if_name}:{direction}"
+
+
+def coverage_key(metric: str) -> str:
+    """지표의 임계치 설정 키 (인터페이스 지표는 방향을 뺀 "if:<name>")"""
+    if metric.startswith(INTERFACE_METRIC_PREFIX):
+        return metric.rsplit(":", 1)[0]
+    return metric
+
+
+def episode_to_dict(start_at: datetime, end_at: datetime, max_value: float,
+                    mean_value: float, sample_count: int) -> Dict[str, Any]:
+    """분석 API 응답 형식의 구간 dict"""
+    return {
+        'start': start_at.isoformat(), 'end': end_at.isoformat(),
+        'duration_min': round((end_at - start_at).total_seconds() / 60, 1),
+        'max_value': round(max_value, 2),
+        'mean_value': round(mean_value, 2),
+        'sample_count': sample_count,
+    }
+
+
+@dataclass
+class _OpenEpisode:
+    threshold: float
+    start_at: datetime
+    last_at: datetime
+    max_value: float
+    total: float
+    count: int
+    # 저장된 열린 구간에서 복원한 경우 그 행 ID (종료 시 새 행 대신 이 행을 갱신)
+    row_id: Optional[int] = None
+
+    def to_record(self, proxy_id: int, metric: str) -> Dict[str, Any]:
+        rec = {
+            "proxy_id": proxy_id,
+            "metric": metric,
+            "threshold": self.threshold,
+            "start_at": self.start_at,
+            "end_at": self.last_at,
+            "max_value": self.max_value,
+            "mean_value": self.total / self.count,
+            "sample_count": self.count,
+            "is_open": False,
+        }
+        if self.row_id is not None:
+            rec["id"] = self.row_id
+        return rec
+
+
+class ThresholdEpisodeDetector:
+    """프록시/지표별 열린 구간 상태를 메모리에 유지하는 증분 검출기"""
+
+    def __init__(self):
+        self._open: Dict[Tuple[int, str], _OpenEpisode] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        proxy_id: int,
+        metric: str,
+        threshold: Optional[float],
+        ts: datetime,
+        value: Optional[float],
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """샘플 1건 반영. (구간 시작 여부, 종료된 구간 레코드 또는 None)을 반환합니다.
+
+        값이 없는 샘플은 무시하며, 임계치가 바뀌면 기존 구간을 마지막 초과 샘플 기준으로 종료합니다.
+        """
+        if value is None:
+            return False, None
+        key = (proxy_id, metric)
+        closed: Optional[Dict[str, Any]] = None
+        with self._lock:
+            ep = self._open.get(key)
+            if ep is not None and ep.threshold != threshold:
+                closed = self._open.pop(key).to_record(proxy_id, metric)
+                ep = None
+            if threshold is None:
+                return False, closed
+            if value >= threshold:
+                if ep is None:
+                    self._open[key] = _OpenEpisode(threshold, ts, ts, value, value, 1)
+                    return True, closed
+                ep.last_at = ts
+                ep.max_value = max(ep.max_value, value)
+                ep.total += value
+                ep.count += 1
+            elif ep is not None:
+                closed = self._open.pop(key).to_record(proxy_id, metric)
+        return False, closed
+
+    def observe_usage(
+        self,
+        row: Dict[str, Any],
+        thresholds: Dict[str, float],
+        interface_thresholds: Dict[str, float],
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """수집 행 1건(resource_usage 매핑)의 설정된 지표를 모두 반영합니다. (opened, closed) 반환"""
+        proxy_id = row["proxy_id"]
+        ts = row["collected_at"]
+        samples: List[Tuple[str, Optional[float], Optional[float]]] = [
+            (m, thr, row.get(m)) for m, thr in thresholds.items()
+        ]
+        if interface_thresholds:
+            if_data = row.get("interface_mbps")
+            if isinstance(if_data, str):
+                try:
+                    if_data = json.loads(if_data)
+                except Exception:
+                    if_data = None
+            if not isinstance(if_data, dict):
+                if_data = {}
+            for info in if_data.values():
+                if not isinstance(info, dict) or not info.get("name"):
+                    continue
+                thr = interface_thresholds.get(info.get("name"))
+                if thr is None:
+                    continue
+                samples.append((interface_metric_key(info["name"], "in"), thr, info.get("in_mbps")))
+                samples.append((interface_metric_key(info["name"], "out"), thr, info.get("out_mbps")))
+
+        opened: List[Dict[str, Any]] = []
+        closed: List[Dict[str, Any]] = []
+        for metric, thr, value in samples:
+            is_open, rec = self.observe(proxy_id, metric, thr, ts, value)
+            if rec is not None:
+                closed.append(rec)
+            if is_open:
+                opened.append({"proxy_id": proxy_id, "metric": metric, "threshold": thr,
+                               "start_at": ts, "value": value})
+        return opened, closed
+
+    def open_episodes(self, proxy_ids: Iterable[int], metric: str, threshold: float) -> Dict[int, Dict[str, Any]]:
+        """진행 중인 구간 스냅샷 {proxy_id: record}"""
+        with self._lock:
+            return {
+                pid: ep.to_record(pid, metric)
+                for pid in proxy_ids
+                if (ep := self._open.get((pid, metric))) is not None and ep.threshold == threshold
+            }
+
+    def restore(self, rec: Dict[str, Any]) -> None:
+        """저장된 열린 구간 레코드로 상태를 복원합니다 (다음 샘플부터 같은 구간으로 이어짐)."""
+        with self._lock:
+            self._open[(rec["proxy_id"], rec["metric"])] = _OpenEpisode(
+                rec["threshold"], rec["start_at"], rec["end_at"], rec["max_value"],
+                rec["mean_value"] * rec["sample_count"], rec["sample_count"], rec.get("id"),
+            )
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """열린 구간을 모두 마지막 초과 샘플 기준으로 종료하고 반환합니다."""
+        with self._lock:
+            records = [ep.to_record(pid, metric) for (pid, metric), ep in self._open.items()]
+            self._open.clear()
+        return records
+
+
+# 전역 인스턴스
+threshold_episode_detector = ThresholdEpisodeDetector()
+
+
+def _numeric_map(raw: Any) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(raw, dict):
+        for k, v in raw.items():
+            try:
+                out[str(k)] = float(v)
+            except (TypeError, ValueError):
+                continue
+    return out
+
+
+def get_threshold_config(db: Session) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """설정의 __thresholds__ / __interface_thresholds__ 를 (지표 임계치, 인터페이스 임계치)로 반환"""
+    cfg = db.query(ResourceConfigModel).order_by(ResourceConfigModel.id.asc()).first()
+    if not cfg:
+        return {}, {}
+    try:
+        oids = json.loads(cfg.oids_json or '{}')
+    except Exception:
+        return {}, {}
+    if not isinstance(oids, dict):
+        return {}, {}
+    return _numeric_map(oids.get('__thresholds__')), _numeric_map(oids.get('__interface_thresholds__'))
+
+
+def configured_thresholds(thresholds: Dict[str, float], interface_thresholds: Dict[str, float]) -> Dict[str, float]:
+    """설정 키(coverage_key) → 임계치"""
+    keys = dict(thresholds)
+    keys.update({f"{INTERFACE_METRIC_PREFIX}{name}": thr for name, thr in interface_thresholds.items()})
+    return keys
+
+
+def sync_coverage(db: Session, configured: Dict[str, float], since: datetime) -> None:
+    """저장 범위를 현재 설정에 맞춥니다. 새로 추적하거나 임계치가 바뀐 키는 since부터, 설정에서 빠진 키는 삭제."""
+    current = {c.key: c for c in db.query(ThresholdEpisodeCoverage)}
+    changed = False
+    for key, row in current.items():
+        if key not in configured:
+            db.delete(row)
+            changed = True
+    for key, thr in configured.items():
+        row = current.get(key)
+        if row is None:
+            db.add(ThresholdEpisodeCoverage(key=key, threshold=thr, since=since))
+            changed = True
+        elif row.threshold != thr:
+            row.threshold = thr
+            row.since = since
+            changed = True
+    if changed:
+        db.commit()
+
+
+def tracked_since(db: Session, metric: str, threshold: float) -> Optional[datetime]:
+    """해당 지표/임계치의 구간이 빠짐없이 저장되기 시작한 시각 (수집 시점에 검출되지 않는 조합이면 None)"""
+    row = db.get(ThresholdEpisodeCoverage, coverage_key(metric))
+    if row is None or row.threshold != threshold:
+        return None
+    return row.since
+
+
+def persist_episodes(db: Session, records: List[Dict[str, Any]]) -> None:
+    """구간 레코드를 저장합니다. 복원된 열린 구간(id 있음)은 기존 행을 갱신합니다."""
+    if not records:
+        return
+    updates = [r for r in records if r.get("id") is not None]
+    inserts = [r for r in records if r.get("id") is None]
+    if updates:
+        db.bulk_update_mappings(ThresholdEpisode, updates)
+    if inserts:
+        db.bulk_insert_mappings(ThresholdEpisode, inserts)
+    db.commit()
+
+
+def record_threshold_samples(db: Session, rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """수집된 resource_usage 매핑들을 검출기에 반영하고 종료된 구간을 저장합니다.
+
+    반환값은 알림용 이벤트 {"opened": [...], "closed": [...]} 입니다.
+    """
+    thresholds, interface_thresholds = get_threshold_config(db)
+    opened: List[Dict[str, Any]] = []
+    closed: List[Dict[str, Any]] = []
+    if thresholds or interface_thresholds:
+        for row in rows:
+            o, c = threshold_episode_detector.observe_usage(row, thresholds, interface_thresholds)
+            opened.extend(o)
+            closed.extend(c)
+    try:
+        if rows:
+            sync_coverage(db, configured_thresholds(thresholds, interface_thresholds),
+                          min(row["collected_at"] for row in rows))
+        persist_episodes(db, closed)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"[threshold_episodes] Failed to persist {len(closed)} episodes: {e}")
+    return {"opened": opened, "closed": closed}
+
+
+def flush_open_episodes(db: Session) -> int:
+    """종료 시 열린 구간을 is_open 행으로 저장합니다 (다음 시작 시 load_open_episodes()가 복원)."""
+    records = threshold_episode_detector.drain()
+    for rec in records:
+        rec["is_open"] = True
+    persist_episodes(db, records)
+    return len(records)
+
+
+def load_open_episodes(db: Session) -> int:
+    """저장된 열린 구간 중 현재 설정의 임계치와 같은 것을 검출기로 복원합니다.
+
+    설정이 바뀐 구간은 종료된 것으로 표시하고, 같은 프록시/지표의 열린 행이 여러 개면(백필과 종료 저장이
+    겹친 경우) 가장 최근 행만 복원하고 나머지는 지웁니다. 복원한 구간 수를 반환합니다.
+    """
+    configured = configured_thresholds(*get_threshold_config(db))
+    rows = (
+        db.query(ThresholdEpisode)
+        .filter(ThresholdEpisode.is_open == True)  # noqa: E712
+        .order_by(ThresholdEpisode.end_at.desc())
+        .all()
+    )
+    restored = set()
+    for ep in rows:
+        key = (ep.proxy_id, ep.metric)
+        if configured.get(coverage_key(ep.metric)) != ep.threshold:
+            ep.is_open = False
+        elif key in restored:
+            db.delete(ep)
+        else:
+            threshold_episode_detector.restore({
+                "id": ep.id, "proxy_id": ep.proxy_id, "metric": ep.metric, "threshold": ep.threshold,
+                "start_at": ep.start_at, "end_at": ep.end_at, "max_value": ep.max_value,
+                "mean_value": ep.mean_value, "sample_count": ep.sample_count,
+            })
+            restored.add(key)
+    db.commit()
+    return len(restored)
+
+
+def ensure_threshold_episode_schema(engine: Engine) -> None:
+    """기존 DB용 마이그레이션: threshold_episodes.is_open 컬럼을 추가합니다 (멱등)."""
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE threshold_episodes ADD COLUMN is_open BOOLEAN NOT NULL DEFAULT 0"))
+            logger.info("[DB] threshold_episodes.is_open 컬럼 추가 완료")
+        except Exception:
+            pass  # 컬럼이 이미 존재하면 무시
+
+
+def query_episodes(
+    db: Session,
+    proxy_ids: List[int],
+    metric: str,
+    threshold: float,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Dict[int, List[Dict[str, Any]]]:
+    """조회 구간과 겹치는 저장된 구간 + 진행 중 구간을 프록시별로 반환합니다."""
+    q = (
+        db.query(ThresholdEpisode)
+        .filter(ThresholdEpisode.proxy_id.in_(proxy_ids))
+        .filter(ThresholdEpisode.metric == metric)
+        .filter(ThresholdEpisode.threshold == threshold)
+        # 열린 채 저장된 행은 검출기로 복원되어 아래 진행 중 구간으로 반환됩니다
+        .filter(ThresholdEpisode.is_open == False)  # noqa: E712
+    )
+    if end_time:
+        q = q.filter(ThresholdEpisode.start_at <= end_time)
+    if start_time:
+        q = q.filter(ThresholdEpisode.end_at >= start_time)
+    q = q.order_by(ThresholdEpisode.proxy_id, ThresholdEpisode.start_at)
+
+    grouped: Dict[int, List[Dict[str, Any]]] = {}
+    for ep in q.all():
+        grouped.setdefault(ep.proxy_id, []).append(
+            episode_to_dict(ep.start_at, ep.end_at, ep.max_value, ep.mean_value, ep.sample_count)
+        )
+
+    for pid, rec in threshold_episode_detector.open_episodes(proxy_ids, metric, threshold).items():
+        if end_time and rec["start_at"] > end_time:
+            continue
+        item = episode_to_dict(rec["start_at"], rec["end_at"], rec["max_value"],
+                               rec["mean_value"], rec["sample_count"])
+        item['ongoing'] = True
+        grouped.setdefault(pid, []).append(item)
+    return grouped
@@ -0,0 +1,405 @@
+"""
+트래픽 로그 분석
+
+- 저장된 로그: 호스트/클라이언트/상태 코드/프록시별 분포를 GROUP BY 쿼리로 DB에서 집계하고, 필요한 컬럼만 읽습니다.
+  ORM 객체를 만들지 않으므로 메모리는 행 수가 아니라 결과 그룹 수에 비례합니다.
+- 시간 히스토그램: 프록시별 event_ts 인덱스 범위를 읽어 구간별 요청/바이트/차단/4xx·5xx 합계를 구합니다.
+- 원격 사전 집계: 같은 분포를 프록시에서 awk로 집계해 키별 합계 표만 받아 프록시 간에 합칩니다.
+  원본 줄을 전송·파싱하지 않으므로 전송량과 로컬 CPU는 줄 수가 아니라 고유 키 수에 비례합니다.
+"""
+import logging
+import math
+import os
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.proxy import Proxy
+from app.models.traffic_log import TrafficLog
+from app.services.traffic_log_histogram import KST_OFFSET_SEC
+from app.services.traffic_log_snapshots import current_snapshots, visible_clause
+from app.utils.crypto import decrypt_string_if_encrypted
+from app.utils.ssh import ssh_exec
+from app.utils.traffic_log_parser import FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 원격 사전 집계: 동시에 실행하는 프록시 수, 프록시별 원격 timeout (초)
+REMOTE_AGG_CONCURRENCY = int(os.getenv("TRAFFIC_LOG_REMOTE_AGG_CONCURRENCY", "8"))
+REMOTE_AGG_TIMEOUT_SEC = 60
+
+# 키별 합계를 탭 구분 표로 출력 (H: 호스트, C: 클라이언트, S: 상태 코드). ci/hi/...는 필드 번호 (-v로 전달)
+_REMOTE_AGG_AWK = r"""BEGIN { FS = " :[|] " }
+{
+  ip = $ci; host = $hi; st = $si + 0; r = $ri + 0; s = $xi + 0
+  if (r < 0) r = 0
+  if (s < 0) s = 0
+  a = tolower($ai); gsub(/^[ \t\r\n]+|[ \t\r\n]+$/, "", a); b = (a == "block")
+  e = (st >= 400 && st <= 599)
+  if (host != "") { hn[host]++; hr[host] += r; hs[host] += s }
+  if (ip != "") { cn[ip]++; cr[ip] += r; cs[ip] += s; cb[ip] += b; ce[ip] += e }
+  k = st ? st : "Unknown"; sn[k]++; sr[k] += r; ss[k] += s; sb[k] += b
+}
+END {
+  for (k in hn) printf "H\t%s\t%d\t%.0f\t%.0f\n", k, hn[k], hr[k], hs[k]
+  for (k in cn) printf "C\t%s\t%d\t%.0f\t%.0f\t%d\t%d\n", k, cn[k], cr[k], cs[k], cb[k], ce[k]
+  for (k in sn) printf "S\t%s\t%d\t%.0f\t%.0f\t%d\n", k, sn[k], sr[k], ss[k], sb[k]
+}"""
+
+
+def human_bytes(n: int) -> str:
+    n = int(n or 0)
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if n < 1024:
+            return f"{n:.1f}{unit}"
+        n //= 1024
+    return f"{n:.1f}PB"
+
+
+def detect_traffic_anomalies(
+    clients: List[Dict[str, Any]],
+    client_blocked: Mapping[str, int],
+    client_errors: Mapping[str, int],
+) -> List[Dict[str, Any]]:
+    if not clients:
+        return []
+
+    def _sigma(values: List[float]):
+        if not values:
+            return 0.0, 0.0
+        mean = sum(values) / len(values)
+        variance = sum((v - mean) ** 2 for v in values) / len(values)
+        return mean, math.sqrt(variance)
+
+    req_mean, req_std = _sigma([float(c["requests"]) for c in clients])
+    recv_mean, recv_std = _sigma([float(c["recv_bytes"]) for c in clients])
+
+    anomalies: List[Dict[str, Any]] = []
+
+    for c in clients:
+        ip = c["client_ip"]
+        reqs = c["requests"]
+        recv = c["recv_bytes"]
+        blocked_n = client_blocked.get(ip, 0)
+        errors_n = client_errors.get(ip, 0)
+
+        # 차단율 이상
+        if reqs >= 5 and blocked_n > 0:
+            rate = blocked_n / reqs
+            if rate >= 0.3:
+                anomalies.append({
+                    "type": "block_heavy",
+                    "severity": "critical" if rate >= 0.6 else "warning",
+                    "label": "차단 과다",
+                    "subject": ip,
+                    "detail": f"{rate:.0%} 차단율 ({blocked_n:,}/{reqs:,}건)",
+                    "_sv": rate,
+                })
+
+        # HTTP 오류율 이상 (4xx/5xx)
+        if reqs >= 5 and errors_n > 0:
+            rate = errors_n / reqs
+            if rate >= 0.3:
+                anomalies.append({
+                    "type": "error_heavy",
+                    "severity": "critical" if rate >= 0.6 else "warning",
+                    "label": "오류 집중",
+                    "subject": ip,
+                    "detail": f"{rate:.0%} 오류율 ({errors_n:,}/{reqs:,}건, 4xx/5xx)",
+                    "_sv": rate,
+                })
+
+        # 요청 수 통계적 이상 (> 평균+2σ)
+        if req_std > 0:
+            z = (reqs - req_mean) / req_std
+            if z > 2.0:
+                anomalies.append({
+                    "type": "request_heavy",
+                    "severity": "critical" if z > 3.0 else "warning",
+                    "label": "요청 과다",
+                    "subject": ip,
+                    "detail": f"{reqs:,}건 요청 (평균 대비 {z:.1f}σ)",
+                    "_sv": z,
+                })
+
+        # 수신 트래픽 통계적 이상 (> 평균+2σ)
+        if recv_std > 0:
+            z = (recv - recv_mean) / recv_std
+            if z > 2.0:
+                anomalies.append({
+                    "type": "traffic_heavy",
+                    "severity": "critical" if z > 3.0 else "warning",
+                    "label": "트래픽 과다",
+                    "subject": ip,
+                    "detail": f"수신 {human_bytes(recv)} (평균 대비 {z:.1f}σ)",
+                    "_sv": z,
+                })
+
+    anomalies.sort(key=lambda x: (0 if x["severity"] == "critical" else 1, -x.get("_sv", 0)))
+    for a in anomalies:
+        a.pop("_sv", None)
+    return anomalies
+
+
+def _positive_sum(col):
+    return func.coalesce(func.sum(case((col > 0, col), else_=0)), 0)
+
+
+def _count_if(cond):
+    return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+
+def _is_block():
+    return func.lower(func.trim(TrafficLog.action_names, " \t\r\n")) == "block"
+
+
+def _is_http_error():
+    return TrafficLog.response_statuscode.between(400, 599)
+
+
+def _grouped(db: Session, key, visible, *extra):
+    """key별 (key, 건수, 수신 합, 송신 합, *extra, 첫 행 id) — 빈 key 제외, 건수 내림차순"""
+    n = func.count()
+    stmt = (
+        select(key, n, _positive_sum(TrafficLog.recv_byte), _positive_sum(TrafficLog.sent_byte),
+               *extra, func.min(TrafficLog.id))
+        .where(visible, key.isnot(None), key != "")
+        .group_by(key)
+        .order_by(n.desc(), func.min(TrafficLog.id))
+    )
+    return db.execute(stmt).all()
+
+
+def summarize_stored_logs(db: Session, proxy_ids: List[int]) -> Dict[str, Any]:
+    """/traffic-logs/analyze 응답 (summary, hosts, clients, statuses, proxies, anomalies)"""
+    visible = visible_clause(db, proxy_ids)
+    host_rows = _grouped(db, TrafficLog.url_host, visible)
+    hosts = [
+        {"host": h, "requests": c, "recv_bytes": recv, "sent_bytes": sent}
+        for h, c, recv, sent, _ in host_rows
+    ]
+
+    client_rows = _grouped(db, TrafficLog.client_ip, visible, _count_if(_is_block()), _count_if(_is_http_error()))
+    clients = []
+    client_blocked: Dict[str, int] = {}
+    client_errors: Dict[str, int] = {}
+    for ip, c, recv, sent, blocked_n, errors_n, _ in client_rows:
+        clients.append({"client_ip": ip, "requests": c, "recv_bytes": recv, "sent_bytes": sent})
+        if blocked_n:
+            client_blocked[ip] = blocked_n
+        if errors_n:
+            client_errors[ip] = errors_n
+
+    # 상태 코드별 집계 한 번으로 전체 합계도 구합니다 (NULL/0 → "Unknown")
+    n = func.count()
+    status_rows = db.execute(
+        select(TrafficLog.response_statuscode, n, _positive_sum(TrafficLog.recv_byte),
+               _positive_sum(TrafficLog.sent_byte), _count_if(_is_block()), func.min(TrafficLog.id))
+        .where(visible)
+        .group_by(TrafficLog.response_statuscode)
+    ).all()
+    status_counts: Dict[str, List[int]] = {}
+    total = blocked = total_recv = total_sent = 0
+    for sc, c, recv, sent, blocked_n, first_id in status_rows:
+        label = str(sc or "Unknown")
+        entry = status_counts.setdefault(label, [0, first_id])
+        entry[0] += c
+        entry[1] = min(entry[1], first_id)
+        total += c
+        blocked += blocked_n
+        total_recv += recv
+        total_sent += sent
+    statuses = [
+        {"status": s, "count": c}
+        for s, (c, _) in sorted(status_counts.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+    ]
+
+    # 같은 호스트 주소의 프록시는 한 항목으로 합칩니다
+    proxy_map = {p.id: p.host for p in db.query(Proxy.id, Proxy.host).filter(Proxy.id.in_(proxy_ids))}
+    proxy_counts: Dict[str, List[int]] = {}
+    for pid, c, first_id in db.execute(
+        select(TrafficLog.proxy_id, func.count(), func.min(TrafficLog.id))
+        .where(visible)
+        .group_by(TrafficLog.proxy_id)
+    ):
+        entry = proxy_counts.setdefault(proxy_map.get(pid, f"#{pid}"), [0, first_id])
+        entry[0] += c
+        entry[1] = min(entry[1], first_id)
+    proxies_dist = [
+        {"proxy": p, "count": c}
+        for p, (c, _) in sorted(proxy_counts.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+    ]
+
+    return _analysis_result(hosts, clients, client_blocked, client_errors, statuses, proxies_dist,
+                            total, blocked, total_recv, total_sent)
+
+
+def stored_log_histogram(
+    db: Session,
+    proxy_ids: List[int],
+    interval_sec: int,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+) -> Dict[int, Dict[int, List[int]]]:
+    """프록시 ID → {구간 시작 epoch 초: HISTOGRAM_METRICS 값} (event_ts가 없는 행 제외)
+
+    프록시마다 (proxy_id, event_ts) 인덱스 범위를 순서대로 읽으며 초 단위로 먼저 묶고 (정렬 없는 GROUP BY),
+    그 결과(고유 초 수만큼)만 구간으로 다시 묶습니다. 구간 식으로 바로 묶으면 전체 행을 임시 B-tree로 정렬합니다.
+    """
+    block = _count_if(and_(TrafficLog.action_names.like("%block%"), _is_block()))
+    per_second = (
+        select(
+            TrafficLog.event_ts.label("ts"),
+            func.count().label("n"),
+            _positive_sum(TrafficLog.recv_byte).label("recv"),
+            _positive_sum(TrafficLog.sent_byte).label("sent"),
+            block.label("blocked"),
+            _count_if(TrafficLog.response_statuscode.between(400, 499)).label("s4"),
+            _count_if(TrafficLog.response_statuscode.between(500, 599)).label("s5"),
+        )
+        .group_by(TrafficLog.event_ts)
+    )
+    if start_ts is not None:
+        per_second = per_second.where(TrafficLog.event_ts >= start_ts)
+    if end_ts is not None:
+        per_second = per_second.where(TrafficLog.event_ts <= end_ts)
+
+    tables: Dict[int, Dict[int, List[int]]] = {}
+    for proxy_id, snapshot_id in current_snapshots(db, proxy_ids).items():
+        sub = per_second.where(
+            TrafficLog.proxy_id == proxy_id, TrafficLog.snapshot_id == snapshot_id, TrafficLog.event_ts.isnot(None),
+        ).subquery()
+        # bucket_start()와 같은 KST 기준 구간
+        bucket = (sub.c.ts - (sub.c.ts + KST_OFFSET_SEC) % interval_sec).label("bucket")
+        rows = db.execute(
+            select(bucket, func.sum(sub.c.n), func.sum(sub.c.recv), func.sum(sub.c.sent),
+                   func.sum(sub.c.blocked), func.sum(sub.c.s4), func.sum(sub.c.s5))
+            .group_by(bucket)
+        ).all()
+        tables[proxy_id] = {row[0]: list(row[1:]) for row in rows}
+    return tables
+
+
+def _analysis_result(hosts, clients, client_blocked, client_errors, statuses, proxies_dist,
+                     total: int, blocked: int, total_recv: int, total_sent: int) -> Dict[str, Any]:
+    return {
+        "summary": {
+            "total": total,
+            "blocked": blocked,
+            "unique_clients": len(clients),
+            "unique_hosts": len(hosts),
+            "total_recv_bytes": total_recv,
+            "total_sent_bytes": total_sent,
+        },
+        "hosts": hosts,
+        "clients": clients,
+        "statuses": statuses,
+        "proxies": proxies_dist,
+        "anomalies": detect_traffic_anomalies(clients, client_blocked, client_errors),
+    }
+
+
+def remote_aggregate_command(source: str, q: Optional[str] = None) -> str:
+    """source(로그 줄을 출력하는 원격 명령) 뒤에 붙여 키별 합계 표만 출력하는 명령"""
+    cols = " ".join(f"-v {name}={FIELDS.index(field) + 1}" for name, field in (
+        ("ci", "client_ip"), ("hi", "url_host"), ("si", "response_statuscode"),
+        ("ri", "recv_byte"), ("xi", "sent_byte"), ("ai", "action_names"),
+    ))
+    grep = f" | grep -F -- {shlex.quote(q)}" if q else ""
+    return f"{source}{grep} | LC_ALL=C awk {cols} {shlex.quote(_REMOTE_AGG_AWK)}"
+
+
+def tail_source(log_path: str, lines: int, timeout_sec: int = REMOTE_AGG_TIMEOUT_SEC) -> str:
+    """로그 파일 마지막 lines줄을 출력하는 원격 명령"""
+    if not log_path or ".." in log_path:
+        raise ValueError("invalid traffic_log_path")
+    return f"timeout {int(timeout_sec)}s nice -n 10 ionice -c2 -n7 tail -n {int(lines)} {shlex.quote(log_path)}"
+
+
+class AggregateTables:
+    """원격 집계 표를 프록시 간에 합칩니다."""
+
+    def __init__(self):
+        self.hosts: Dict[str, List[int]] = {}     # host → [건수, 수신, 송신]
+        self.clients: Dict[str, List[int]] = {}   # ip → [건수, 수신, 송신, 차단, 오류]
+        self.statuses: Dict[str, List[int]] = {}  # 상태 → [건수, 수신, 송신, 차단]
+        self.proxy_counts: Dict[str, int] = {}
+
+    def add_output(self, proxy_label: str, text: str) -> None:
+        tables = {"H": (self.hosts, 3), "C": (self.clients, 5), "S": (self.statuses, 4)}
+        total = 0
+        for line in text.split("\n"):
+            parts = line.split("\t")
+            table = tables.get(parts[0])
+            if table is None or len(parts) != table[1] + 2:
+                continue
+            target, width = table
+            try:
+                values = [int(float(v)) for v in parts[2:]]
+            except ValueError:
+                continue
+            acc = target.setdefault(parts[1], [0] * width)
+            for i, v in enumerate(values):
+                acc[i] += v
+            if parts[0] == "S":
+                total += values[0]
+        if total:
+            self.proxy_counts[proxy_label] = self.proxy_counts.get(proxy_label, 0) + total
+
+    def result(self) -> Dict[str, Any]:
+        """summarize_stored_logs와 같은 형식 (동률은 키 순)"""
+        def _ranked(table: Dict[str, List[int]]) -> List[Tuple[str, List[int]]]:
+            return sorted(table.items(), key=lambda kv: (-kv[1][0], kv[0]))
+
+        hosts = [{"host": h, "requests": c, "recv_bytes": r, "sent_bytes": s}
+                 for h, (c, r, s) in _ranked(self.hosts)]
+        clients = []
+        client_blocked: Dict[str, int] = {}
+        client_errors: Dict[str, int] = {}
+        for ip, (c, r, s, b, e) in _ranked(self.clients):
+            clients.append({"client_ip": ip, "requests": c, "recv_bytes": r, "sent_bytes": s})
+            if b:
+                client_blocked[ip] = b
+            if e:
+                client_errors[ip] = e
+        statuses = [{"status": k, "count": v[0]} for k, v in _ranked(self.statuses)]
+        totals = [sum(v[i] for v in self.statuses.values()) for i in range(4)]
+        proxies_dist = [{"proxy": p, "count": c}
+                        for p, c in sorted(self.proxy_counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+        return _analysis_result(hosts, clients, client_blocked, client_errors, statuses, proxies_dist,
+                                totals[0], totals[3], totals[1], totals[2])
+
+
+def summarize_remote_logs(
+    proxies: List[Proxy],
+    source_for: Callable[[Proxy], str],
+    q: Optional[str] = None,
+    concurrency: int = REMOTE_AGG_CONCURRENCY,
+) -> Dict[str, Any]:
+    """프록시마다 원격에서 집계한 표를 합쳐 summarize_stored_logs와 같은 형식으로 반환합니다.
+
+    source_for(proxy)는 집계할 로그 줄을 출력하는 원격 명령입니다. 실패한 프록시는 "errors"에 담깁니다.
+    """
+    def _fetch(p: Proxy) -> str:
+        return ssh_exec(
+            p.host, p.port or 22, p.username, decrypt_string_if_encrypted(p.password),
+            remote_aggregate_command(source_for(p), q),
+            timeout_sec=REMOTE_AGG_TIMEOUT_SEC + 5, auth_timeout_sec=5, banner_timeout_sec=5,
+        )
+
+    tables = AggregateTables()
+    errors: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(proxies) or 1))) as pool:
+        futures = [(p, pool.submit(_fetch, p)) for p in proxies]
+        for p, fut in futures:
+            try:
+                tables.add_output(p.host, fut.result())
+            except Exception as e:
+                logger.warning("원격 집계 실패 (proxy %s): %s", p.id, e)
+                errors[str(p.id)] = str(getattr(e, "detail", e))
+    result = tables.result()
+    result["errors"] = errors
+    return result
@@ -0,0 +1,483 @@
+"""
+트래픽 로그 스트리밍 수집
+
+SSH 채널을 청크 단위로 읽어(읽기) 고정 크기 줄 블록으로 파싱하고(파싱), 크기 제한 큐를 거쳐
+COLLECT_COMMIT_ROWS행이 모이면 한 트랜잭션으로 INSERT 후 커밋합니다(적재). 읽기·파싱은 별도 스레드,
+적재는 호출 스레드에서 수행되며 큐가 가득 차면 SSH 읽기가 멈추므로(백프레셔) 메모리 사용량은 수집 크기와
+무관하게 일정합니다. 배치가 찰 때까지는 파싱된 블록을 메모리에 두므로 SSH 출력을 기다리는 동안에는
+쓰기 트랜잭션이 열려 있지 않습니다 (다른 수집·리소스 수집기의 쓰기가 잠금을 기다리지 않음).
+"""
+import logging
+import os
+import queue
+import shlex
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.proxy import Proxy
+from app.models.traffic_log import TrafficLog
+from app.models.traffic_log_cursor import TrafficLogCursor
+from app.services.bulk_insert import insert_columns
+from app.services.traffic_log_dict import encode_columns
+from app.services.traffic_log_query import bump_data_version
+from app.services.traffic_log_search import deferred_fts_index
+from app.services.traffic_log_snapshots import abandon_snapshot, begin_snapshot, current_snapshots, publish_snapshot
+from app.utils.crypto import decrypt_string_if_encrypted
+from app.utils.ssh import ssh_exec, ssh_exec_stream
+from app.utils.traffic_log_parser import FIELDS, epoch_column, parse_log_lines
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 파싱·INSERT 단위 줄 수
+COLLECT_BLOCK_LINES = int(os.getenv("TRAFFIC_LOG_BLOCK_LINES", "5000"))
+# 트랜잭션 하나에 커밋하는 최소 행 수 (블록 여러 개를 메모리에 모았다가 한 번에 적재해 커밋·FTS 색인 문장 수를 줄임)
+COLLECT_COMMIT_ROWS = int(os.getenv("TRAFFIC_LOG_COMMIT_ROWS", "20000"))
+# 파서와 적재 사이에 대기할 수 있는 최대 블록 수 (메모리 상한 = 블록 크기 × 이 값)
+COLLECT_QUEUE_BLOCKS = int(os.getenv("TRAFFIC_LOG_QUEUE_BLOCKS", "4"))
+# SSH 청크 사이 최대 대기 시간 (초)
+COLLECT_READ_TIMEOUT_SEC = 30
+
+# 증분 수집: 커서가 없을 때 파일 끝에서 거슬러 읽을 바이트 수, 1회 최대 전송 바이트 수
+INCREMENTAL_INITIAL_BYTES = int(os.getenv("TRAFFIC_LOG_INCREMENTAL_INITIAL_BYTES", str(10 * 1024 * 1024)))
+INCREMENTAL_MAX_BYTES = int(os.getenv("TRAFFIC_LOG_INCREMENTAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 원격 압축 전송: auto(원격에 zstd/gzip이 있으면 사용) | gzip | zstd | off
+TRAFFIC_LOG_COMPRESSION = os.getenv("TRAFFIC_LOG_COMPRESSION", "auto").strip().lower()
+COMPRESSION_CACHE_TTL_SEC = 3600
+
+# proxy_id는 로그 필드가 아니라 수집 대상 프록시 ID로 채웁니다
+INSERT_FIELDS = [f for f in FIELDS if f != "proxy_id"]
+
+_DONE = object()
+
+
+@dataclass
+class CollectProgress:
+    """프록시 1대 수집 진행 상황 (바이트/줄 수)"""
+    bytes_read: int = 0
+    # SSH로 실제 수신한 바이트 (압축 전송 시 압축된 크기)
+    wire_bytes: int = 0
+    fetched: int = 0
+    parsed: int = 0
+    inserted: int = 0
+    # 커밋된 마지막 블록 끝의 바이트 위치 (증분 수집 커서 갱신용)
+    committed_bytes: int = 0
+    # 교체 수집이 실패/취소되어 새 스냅샷을 버리고 이전 로그를 유지함
+    discarded: bool = False
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "bytes_read": self.bytes_read,
+            "wire_bytes": self.wire_bytes,
+            "fetched": self.fetched,
+            "parsed": self.parsed,
+            "inserted": self.inserted,
+        }
+
+
+def iter_line_blocks(
+    chunks: Iterable[bytes],
+    block_lines: int = COLLECT_BLOCK_LINES,
+    *,
+    keep_partial: bool = True,
+    skip_first: bool = False,
+    with_offsets: bool = False,
+) -> Iterator[Any]:
+    """바이트 청크 스트림을 최대 block_lines 줄의 블록으로 나눕니다. 빈 줄은 건너뜁니다.
+
+    줄은 바이트 단위로 나눈 뒤 블록마다 디코딩하므로 청크 경계의 멀티바이트 문자가 잘리지 않습니다.
+    keep_partial=False이면 개행으로 끝나지 않은 마지막 조각을 버리고, skip_first=True이면 첫 줄
+    (파일 중간부터 읽은 잘린 줄)을 버립니다. with_offsets=True이면 (줄 목록, 블록 끝 바이트 위치)를
+    반환하며 위치는 블록 마지막 줄의 개행 다음입니다.
+    """
+    pending = b""
+    block: List[bytes] = []
+    pos = 0
+
+    def _emit(raw: List[bytes], end: int):
+        lines = [ln for ln in b"\n".join(raw).decode(errors="ignore").split("\n") if ln]
+        return (lines, end) if with_offsets else lines
+
+    for chunk in chunks:
+        cut = chunk.rfind(b"\n")
+        if cut < 0:
+            pending += chunk
+            continue
+        parts = (pending + chunk[:cut]).split(b"\n")
+        pending = chunk[cut + 1:]
+        for part in parts:
+            pos += len(part) + 1
+            if skip_first:
+                skip_first = False
+                continue
+            if part:
+                block.append(part)
+                if len(block) >= block_lines:
+                    yield _emit(block, pos)
+                    block = []
+    if pending and keep_partial and not skip_first:
+        pos += len(pending)
+        block.append(pending)
+    if block:
+        yield _emit(block, pos)
+
+
+_COMPRESSORS = {
+    "gzip": "nice -n 10 gzip -1 -c",
+    "zstd": "nice -n 10 zstd -1 -c -q",
+}
+_compression_cache: Dict[Tuple[str, int], Tuple[Optional[str], float]] = {}
+_compression_lock = threading.Lock()
+
+
+def _local_codecs() -> List[str]:
+    """로컬에서 해제 가능한 압축 형식 (선호 순)"""
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def remote_compression(proxy: Proxy) -> Optional[str]:
+    """원격 출력에 사용할 압축 형식. auto 모드는 프록시별로 한 번 감지해 캐시합니다.
+
+    감지 실패 시 압축하지 않습니다 (다음 감지는 캐시 만료 후).
+    """
+    mode = TRAFFIC_LOG_COMPRESSION
+    if mode in ("", "off", "none"):
+        return None
+    if mode in _COMPRESSORS:
+        return mode if mode in _local_codecs() else None
+
+    key = (proxy.host, proxy.port or 22)
+    now = time.monotonic()
+    with _compression_lock:
+        cached = _compression_cache.get(key)
+        if cached is not None and now - cached[1] < COMPRESSION_CACHE_TTL_SEC:
+            return cached[0]
+
+    codecs = _local_codecs()
+    probe = "; ".join(f"command -v {c} >/dev/null 2>&1 && echo {c}" for c in codecs) + "; true"
+    codec = None
+    try:
+        out = ssh_exec(
+            proxy.host, proxy.port or 22, proxy.username, decrypt_string_if_encrypted(proxy.password), probe,
+            timeout_sec=7, auth_timeout_sec=5, banner_timeout_sec=5,
+        )
+        available = set(out.split())
+        codec = next((c for c in codecs if c in available), None)
+    except Exception as e:
+        logger.warning(f"[traffic_log_collector] Compression probe failed for {proxy.host}: {e}")
+    with _compression_lock:
+        _compression_cache[key] = (codec, now)
+    return codec
+
+
+def compress_command(command: str, codec: Optional[str]) -> str:
+    """원격 명령 출력을 codec으로 압축하도록 파이프를 덧붙입니다."""
+    return f"{command} | {_COMPRESSORS[codec]}" if codec else command
+
+
+def decompress_chunks(chunks: Iterable[bytes], codec: str, max_bytes: Optional[int] = None) -> Iterator[bytes]:
+    """압축된 청크 스트림을 해제하며 반환합니다. max_bytes를 넘는 출력은 잘라내고 중단합니다."""
+    if codec == "gzip":
+        d = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    elif codec == "zstd" and zstandard is not None:
+        d = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"unsupported compression: {codec}")
+
+    total = 0
+
+    def _cap(out: bytes) -> bytes:
+        nonlocal total
+        if max_bytes is not None and total + len(out) > max_bytes:
+            out = out[:max_bytes - total]
+        total += len(out)
+        return out
+
+    for chunk in chunks:
+        out = d.decompress(chunk)
+        if out:
+            out = _cap(out)
+            if out:
+                yield out
+            if max_bytes is not None and total >= max_bytes:
+                return
+    tail = d.flush() if hasattr(d, "flush") else b""
+    if tail:
+        tail = _cap(tail)
+        if tail:
+            yield tail
+
+
+def _rows_from_columns(columns: Dict[str, List[Any]], proxy_id: int, collected_at: datetime) -> List[Dict[str, Any]]:
+    names = list(columns)
+    event_ts = epoch_column(columns["datetime"]) if "datetime" in columns else None
+    rows = []
+    for i, values in enumerate(zip(*columns.values())):
+        row = dict(zip(names, values))
+        row["proxy_id"] = proxy_id
+        if event_ts is not None:
+            row["event_ts"] = event_ts[i]
+        row["collected_at"] = collected_at
+        rows.append(row)
+    return rows
+
+
+def _insert_block(db: Session, columns: Dict[str, List[Any]], constants: Dict[str, Any]) -> int:
+    """parse_log_lines() 컬럼 블록을 행 dict 없이 DBAPI executemany로 INSERT합니다 (사전 인코딩·event_ts 포함)."""
+    encoded = encode_columns(db, columns)
+    if "datetime" in columns:
+        encoded["event_ts"] = epoch_column(columns["datetime"])
+    return insert_columns(db, TrafficLog, encoded, constants)
+
+
+def stream_collect(
+    db: Session,
+    proxy: Proxy,
+    command: str,
+    *,
+    replace: bool = True,
+    progress: Optional[CollectProgress] = None,
+    on_block: Optional[Callable[[List[str], List[Dict[str, Any]]], None]] = None,
+    block_lines: int = COLLECT_BLOCK_LINES,
+    cancel: Optional[threading.Event] = None,
+    line_filter: Optional[str] = None,
+    keep_partial: bool = True,
+    skip_first: bool = False,
+    compression: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> CollectProgress:
+    """원격 명령 출력을 스트리밍으로 파싱해 traffic_logs에 블록 단위로 적재합니다.
+
+    블록은 최소 COLLECT_COMMIT_ROWS행이 모일 때까지 메모리에 두었다가 한 트랜잭션에서 DBAPI executemany로
+    INSERT하고 (FTS 색인과 함께) 커밋합니다. 트랜잭션은 SSH 출력을 기다리는 동안 열려 있지 않습니다.
+
+    replace=True이면 새 스냅샷으로 적재하고 끝나면 프록시의 조회 대상을 한 번에 바꿉니다 (적재 중에는
+    이전 로그가 그대로 보이며, 이전 스냅샷은 백그라운드에서 삭제). replace=False이면 현재 스냅샷에 추가합니다.
+    on_block(lines, rows)는 커밋한 블록마다 호출됩니다 (원시 줄과 레코드 행, 사전 인코딩 전 문자열 값).
+    응답용 레코드가 필요 없으면 생략해 행 dict를 만들지 않습니다.
+    SSH·파싱 오류는 호출자에게 전파되며, 교체 수집이면 새 스냅샷을 버리고 이전 로그를 유지합니다.
+    cancel이 설정되면 다음 블록 경계에서 SSH 채널을 닫고 반환합니다. 추가 수집은 그때까지 적재한 블록을
+    유지하고, 교체 수집은 일부만 적재된 스냅샷을 버리고 이전 로그를 유지합니다 (progress.discarded).
+    line_filter가 주어지면 해당 문자열을 포함한 줄만 적재합니다 (원격 grep -F와 동일).
+    keep_partial/skip_first는 iter_line_blocks()와 같으며, progress.committed_bytes는
+    커밋된 마지막 블록 끝의 바이트 위치입니다.
+    compression이 주어지면 원격 출력을 압축해 받고 스트리밍으로 해제하며, max_bytes는 해제된 크기 상한입니다.
+    """
+    progress = progress or CollectProgress()
+    host, port, username = proxy.host, proxy.port or 22, proxy.username
+    password = decrypt_string_if_encrypted(proxy.password)
+    proxy_id = proxy.id
+    collected_at = datetime.utcnow()
+
+    blocks: "queue.Queue" = queue.Queue(maxsize=max(1, COLLECT_QUEUE_BLOCKS))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _counted(chunks: Iterable[bytes], attr: str) -> Iterator[bytes]:
+        for chunk in chunks:
+            setattr(progress, attr, getattr(progress, attr) + len(chunk))
+            yield chunk
+
+    def _produce() -> None:
+        try:
+            chunks = ssh_exec_stream(host, port, username, password, compress_command(command, compression),
+                                     timeout_sec=COLLECT_READ_TIMEOUT_SEC, auth_timeout_sec=5, banner_timeout_sec=5)
+            try:
+                source = _counted(chunks, "wire_bytes")
+                if compression:
+                    source = decompress_chunks(source, compression, max_bytes)
+                blocks_iter = iter_line_blocks(_counted(source, "bytes_read"), block_lines, keep_partial=keep_partial,
+                                               skip_first=skip_first, with_offsets=True)
+                for lines, end in blocks_iter:
+                    if cancel is not None and cancel.is_set():
+                        break
+                    progress.fetched += len(lines)
+                    if line_filter:
+                        lines = [ln for ln in lines if line_filter in ln]
+                    columns = parse_log_lines(lines, fields=INSERT_FIELDS)
+                    progress.parsed += len(lines)
+                    if not _put((lines, columns, end)):
+                        break
+            finally:
+                chunks.close()
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(_DONE)
+
+    snapshot_id = begin_snapshot(db, proxy_id) if replace else current_snapshots(db, [proxy_id])[proxy_id]
+    constants = {"proxy_id": proxy_id, "snapshot_id": snapshot_id, "collected_at": collected_at}
+    # 적재를 기다리는 파싱된 블록 (lines, columns, end). 쓰기 트랜잭션은 배치가 찬 뒤 _flush()에서만 열어
+    # SSH 출력을 기다리는 동안 DB 쓰기 잠금을 잡지 않습니다.
+    pending: List[Tuple[List[str], Dict[str, List[Any]], int]] = []
+    pending_rows = 0
+
+    def _flush() -> None:
+        nonlocal pending_rows
+        with deferred_fts_index(db):
+            for _, columns, _ in pending:
+                progress.inserted += _insert_block(db, columns, constants)
+        db.commit()
+        if not replace:
+            bump_data_version()
+        progress.committed_bytes = pending[-1][2]
+        if on_block is not None:
+            for lines, columns, _ in pending:
+                on_block(lines, _rows_from_columns(columns, proxy_id, collected_at))
+        pending.clear()
+        pending_rows = 0
+
+    def _discard() -> None:
+        abandon_snapshot(db, snapshot_id)
+        progress.committed_bytes = 0
+        progress.discarded = True
+
+    reader = threading.Thread(target=_produce, name=f"traffic-log-reader-{proxy_id}", daemon=True)
+    reader.start()
+    discard = False
+    try:
+        while True:
+            item = blocks.get()
+            if item is _DONE or (cancel is not None and cancel.is_set()):
+                break
+            lines, columns, end = item
+            rows = len(next(iter(columns.values()))) if columns else 0
+            if not rows and not pending:
+                progress.committed_bytes = end
+                if on_block is not None:
+                    on_block(lines, [])
+                continue
+            pending.append((lines, columns, end))
+            pending_rows += rows
+            if pending_rows >= COLLECT_COMMIT_ROWS:
+                _flush()
+        # 교체 수집이 실패/취소되면 일부만 적재된 스냅샷을 조회 대상으로 만들지 않습니다
+        discard = replace and bool(errors or (cancel is not None and cancel.is_set()))
+        if pending and not discard:
+            _flush()
+    except Exception:
+        db.rollback()
+        if replace:
+            _discard()
+        raise
+    finally:
+        stop.set()
+        reader.join()
+
+    if discard:
+        _discard()
+    if errors:
+        raise errors[0]
+    if replace and not discard:
+        publish_snapshot(db, proxy_id, snapshot_id)
+        bump_data_version()
+    return progress
+
+
+def stat_remote_log(proxy: Proxy, log_path: str) -> Tuple[int, int]:
+    """원격 로그 파일의 (inode, 크기). 심볼릭 링크는 대상 파일 기준입니다."""
+    out = ssh_exec(
+        proxy.host, proxy.port or 22, proxy.username, decrypt_string_if_encrypted(proxy.password),
+        f"stat -L -c '%i %s' {shlex.quote(log_path)}",
+        timeout_sec=7, auth_timeout_sec=5, banner_timeout_sec=5,
+    )
+    parts = out.split()
+    if len(parts) < 2:
+        raise RuntimeError(f"unexpected stat output: {out.strip()!r}")
+    return int(parts[0]), int(parts[1])
+
+
+def plan_incremental_read(cursor: Optional[TrafficLogCursor], log_path: str, inode: int, size: int) -> Tuple[int, bool, bool]:
+    """(시작 바이트, 첫 줄 버림 여부, 기존 로그 교체 여부)
+
+    - 커서 없음 / 경로 변경: 파일 끝에서 INCREMENTAL_INITIAL_BYTES 전부터 읽고 기존 로그를 교체
+    - inode 변경 또는 크기 감소(로테이션/truncate): 새 파일 처음부터 추가
+    - 그 외: 마지막 적재 위치부터 추가
+    """
+    if cursor is None or cursor.log_path != log_path:
+        start = max(0, size - INCREMENTAL_INITIAL_BYTES)
+        return start, start > 0, True
+    if cursor.inode != inode or size < cursor.offset:
+        return 0, False, False
+    return cursor.offset, False, False
+
+
+def _save_cursor(db: Session, proxy_id: int, log_path: str, inode: int, offset: int, size: int) -> None:
+    cursor = db.query(TrafficLogCursor).filter(TrafficLogCursor.proxy_id == proxy_id).first()
+    if cursor is None:
+        cursor = TrafficLogCursor(proxy_id=proxy_id)
+        db.add(cursor)
+    cursor.log_path = log_path
+    cursor.inode = inode
+    cursor.offset = offset
+    cursor.size = size
+
+
+def collect_incremental(
+    db: Session,
+    proxy: Proxy,
+    *,
+    progress: Optional[CollectProgress] = None,
+    cancel: Optional[threading.Event] = None,
+) -> CollectProgress:
+    """원격 로그에 새로 추가된 바이트만 가져와 traffic_logs에 추가합니다.
+
+    커서(inode, 오프셋)는 커밋된 마지막 완전한 줄 끝으로 전진하므로 쓰는 중인 마지막 줄이나
+    취소로 적재되지 않은 블록은 다음 수집에서 다시 읽습니다. SSH 오류로 중단되어도 그때까지 커밋된 위치는 저장합니다.
+    커서는 읽은 모든 줄을 지나가므로 줄 필터는 받지 않습니다 (걸러진 줄은 이후 수집에서 다시 읽을 수 없음).
+    오래된 로그 삭제는 주기적 보존 작업(traffic_log_snapshots.purge_expired_traffic_logs)이 합니다.
+    """
+    progress = progress or CollectProgress()
+    log_path = proxy.traffic_log_path
+    if not log_path or ".." in log_path:
+        raise ValueError("invalid traffic_log_path")
+
+    inode, size = stat_remote_log(proxy, log_path)
+    cursor = db.query(TrafficLogCursor).filter(TrafficLogCursor.proxy_id == proxy.id).first()
+    start, skip_first, replace = plan_incremental_read(cursor, log_path, inode, size)
+    length = min(size - start, INCREMENTAL_MAX_BYTES)
+
+    if length > 0:
+        timeout_sec = max(15, length // (1024 * 1024))
+        command = (
+            f"timeout {timeout_sec}s nice -n 10 ionice -c2 -n7 "
+            f"tail -c +{start + 1} {shlex.quote(log_path)} | head -c {length}"
+        )
+        try:
+            stream_collect(db, proxy, command, replace=replace, progress=progress, cancel=cancel,
+                           keep_partial=False, skip_first=skip_first,
+                           compression=remote_compression(proxy), max_bytes=length)
+        except Exception:
+            # 추가 수집은 실패 전에 커밋된 블록이 남으므로, 커서를 그 위치로 옮겨 다음 수집에서 다시 넣지 않습니다
+            if not replace and progress.committed_bytes:
+                _save_cursor(db, proxy.id, log_path, inode, start + progress.committed_bytes, size)
+                db.commit()
+            raise
+        if progress.discarded or (skip_first and progress.committed_bytes == 0):
+            # 교체 수집이 취소되었거나 완전한 줄을 하나도 받지 못함: 다음 수집에서 다시 처음 위치를 정함
+            return progress
+
+    _save_cursor(db, proxy.id, log_path, inode, start + progress.committed_bytes, size)
+    db.commit()
+    bump_data_version()
+    return progress
@@ -0,0 +1,139 @@
+"""
+트래픽 로그 사전 인코딩 컬럼 (DICT_COLUMNS)
+
+user_agent, url_categories 등 같은 값이 수백만 행에 반복되는 문자열 컬럼은 traffic_log_values에
+(field, value)당 한 번만 저장하고 traffic_logs에는 정수 ID(<컬럼>_id)만 둡니다.
+적재 시 encode_columns()가 블록의 서로 다른 값만 ID로 바꾸고(프로세스 캐시 → 없으면 조회/INSERT),
+읽기는 모델의 같은 이름 속성(스칼라 서브쿼리)이 문자열로 돌려주므로 조회/필터/정렬/CSV는 그대로입니다.
+값 행은 삭제하지 않으므로 커밋된 ID는 계속 유효하며, 롤백된 트랜잭션에서 받은 ID는 캐시에 넣지 않습니다.
+"""
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.database.migrations import mark_migration_done, migration_done
+from app.models.traffic_log import DICT_COLUMNS, DICT_TABLE, FTS_TABLE, TrafficLogValue
+
+logger = logging.getLogger(__name__)
+
+# (DB, field, value) → id 캐시 최대 항목 수 (넘으면 비우고 다시 채움)
+DICT_CACHE_MAX = 200000
+# IN 조회 한 번에 넣는 값 수 (SQLite 바인드 변수 제한 이내)
+DICT_LOOKUP_CHUNK = 500
+
+_PENDING_KEY = "traffic_log_dict_pending"
+
+_cache: Dict[Tuple[str, str, str], int] = {}
+_cache_lock = threading.Lock()
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    with _cache_lock:
+        if len(_cache) + len(pending) > DICT_CACHE_MAX:
+            _cache.clear()
+        _cache.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _select_ids(db: Session, field: str, values: List[str]) -> Dict[str, int]:
+    found: Dict[str, int] = {}
+    for i in range(0, len(values), DICT_LOOKUP_CHUNK):
+        chunk = values[i:i + DICT_LOOKUP_CHUNK]
+        found.update((v, vid) for vid, v in db.execute(
+            select(TrafficLogValue.id, TrafficLogValue.value)
+            .where(TrafficLogValue.field == field, TrafficLogValue.value.in_(chunk))
+        ))
+    return found
+
+
+def value_ids(db: Session, field: str, values: Iterable[str]) -> Dict[str, int]:
+    """field의 값들 → ID (없는 값은 traffic_log_values에 추가). 커밋은 호출자가 합니다."""
+    url = str(db.get_bind().url)
+    pending: Dict[Tuple[str, str, str], int] = db.info.setdefault(_PENDING_KEY, {})
+    ids: Dict[str, int] = {}
+    missing = []
+    with _cache_lock:
+        for v in values:
+            vid = _cache.get((url, field, v)) or pending.get((url, field, v))
+            if vid is None:
+                missing.append(v)
+            else:
+                ids[v] = vid
+    if missing:
+        found = _select_ids(db, field, missing)
+        new = [v for v in missing if v not in found]
+        if new:
+            db.execute(insert(TrafficLogValue).prefix_with("OR IGNORE", dialect="sqlite"),
+                       [{"field": field, "value": v} for v in new])
+            found.update(_select_ids(db, field, new))
+        ids.update(found)
+        pending.update(((url, field, v), vid) for v, vid in found.items())
+    return ids
+
+
+def encode_columns(db: Session, columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """parse_log_lines() 컬럼 → INSERT용 컬럼 (DICT_COLUMNS는 <컬럼>_id 정수 목록으로 교체)"""
+    out: Dict[str, List[Any]] = {}
+    for name, values in columns.items():
+        if name not in DICT_COLUMNS:
+            out[name] = values
+            continue
+        ids = value_ids(db, name, {v for v in values if v is not None})
+        out[f"{name}_id"] = list(map(ids.get, values))
+    return out
+
+
+def ensure_traffic_log_dictionary(engine: Engine) -> Optional[int]:
+    """기존 DB용 마이그레이션: 문자열로 저장된 DICT_COLUMNS를 값 테이블 + <컬럼>_id로 옮깁니다 (멱등).
+
+    옮긴 컬럼 수를 돌려줍니다 (SQLite가 아니면 None). 이전 FTS 트리거는 문자열 컬럼을 참조하므로
+    지우고, 인덱스는 이어서 실행되는 ensure_traffic_log_fts()가 콘텐츠 뷰 기준으로 다시 만듭니다.
+    DROP COLUMN을 못 해 값만 비운 컬럼은 schema_migrations에 기록해 다음 시작 때 다시 훑지 않습니다.
+    줄어든 파일 크기는 VACUUM 후에 반영됩니다.
+    """
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.begin() as conn:
+        existing = {c["name"] for c in inspect(conn).get_columns("traffic_logs")}
+        legacy = [c for c in DICT_COLUMNS if c in existing and not migration_done(conn, _cleared_marker(c))]
+        if not legacy:
+            return 0
+        logger.info("[traffic_log_dict] Encoding %s into %s...", ", ".join(legacy), DICT_TABLE)
+        TrafficLogValue.__table__.create(conn, checkfirst=True)
+        for trigger in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}"))
+        for c in DICT_COLUMNS:
+            if f"{c}_id" not in existing:
+                conn.execute(text(f"ALTER TABLE traffic_logs ADD COLUMN {c}_id INTEGER REFERENCES {DICT_TABLE}(id)"))
+        for c in legacy:
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {DICT_TABLE} (field, value) "
+                f"SELECT DISTINCT :f, {c} FROM traffic_logs WHERE {c} IS NOT NULL"
+            ), {"f": c})
+            conn.execute(text(
+                f"UPDATE traffic_logs SET {c}_id = (SELECT id FROM {DICT_TABLE} WHERE field = :f AND value = traffic_logs.{c}) "
+                f"WHERE {c} IS NOT NULL"
+            ), {"f": c})
+            try:
+                conn.execute(text(f"ALTER TABLE traffic_logs DROP COLUMN {c}"))
+            except Exception:
+                # DROP COLUMN 불가(SQLite < 3.35, 컬럼 인덱스 등): 값만 비워 둡니다 (모델은 이 컬럼을 읽지 않음)
+                conn.execute(text(f"UPDATE traffic_logs SET {c} = NULL"))
+                mark_migration_done(conn, _cleared_marker(c))
+    return len(legacy)
+
+
+def _cleared_marker(column: str) -> str:
+    return f"traffic_log_dictionary:{column}"
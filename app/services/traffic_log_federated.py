@@ -0,0 +1,188 @@
+"""
+여러 프록시 동시 검색 (fan-out + k-way merge)
+
+선택한 프록시마다 원격 검색 명령을 동시에 실행하고(SSH 동시 실행 수 제한), 각 프록시의 결과 스트림을
+시각 순으로 병합해 바로 내보냅니다. 각 스트림은 이미 시각 순(oldest-first 또는 newest-first)이므로
+스트림마다 맨 앞 레코드 하나만 힙에 두면 되며, 전체 limit에 도달하면 남은 원격 명령을 모두 닫습니다.
+프록시마다 시작 시점부터 deadline이 적용되어 느린 프록시 하나가 전체 결과를 붙잡지 않습니다.
+프록시별 결과 큐는 몇 블록까지만 담으므로, 병합이 다른 프록시를 기다리는 동안 빠른 프록시의 작업 스레드는
+SSH 읽기를 멈추고 메모리는 프록시 수 × 큐 블록 수에 비례합니다.
+"""
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from app.models.proxy import Proxy
+from app.services.traffic_log_collector import iter_line_blocks
+from app.utils.crypto import decrypt_string_if_encrypted
+from app.utils.ssh import ssh_exec_stream
+from app.utils.traffic_log_parser import columns_to_records, epoch_column, parse_log_lines
+
+logger = logging.getLogger(__name__)
+
+# 동시에 SSH 검색을 실행하는 프록시 수, 프록시별 검색 제한 시간 (초)
+FEDERATED_SEARCH_CONCURRENCY = int(os.getenv("TRAFFIC_LOG_SEARCH_CONCURRENCY", "8"))
+FEDERATED_SEARCH_DEADLINE_SEC = int(os.getenv("TRAFFIC_LOG_SEARCH_DEADLINE_SEC", "30"))
+# 파싱 단위 줄 수, 프록시별 결과 큐에 쌓아 두는 최대 블록 수
+FEDERATED_BLOCK_LINES = 500
+FEDERATED_QUEUE_BLOCKS = 4
+
+_END = object()
+
+
+@dataclass
+class _ProxyStream:
+    """프록시 1대의 검색 상태와 결과 큐 (작업 스레드 → 병합, 블록 단위)"""
+    proxy: Proxy
+    status: str = "queued"
+    lines: int = 0
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    cancel: threading.Event = field(default_factory=threading.Event)
+    items: "queue.Queue[Any]" = field(default_factory=lambda: queue.Queue(maxsize=FEDERATED_QUEUE_BLOCKS))
+    # 병합 쪽에서 꺼낸 블록의 남은 (시각, 레코드)
+    pending: Deque[Any] = field(default_factory=deque)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"status": self.status, "lines": self.lines, "error": self.error}
+
+
+def _put(stream: _ProxyStream, item: Any, expires: Optional[float] = None) -> bool:
+    """큐에 자리가 날 때까지 기다려 넣습니다. 취소되거나 expires가 지나면 넣지 않고 False."""
+    while not stream.cancel.is_set():
+        wait = 0.5 if expires is None else min(0.5, expires - time.monotonic())
+        if wait <= 0:
+            return False
+        try:
+            stream.items.put(item, timeout=wait)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _search_proxy(stream: _ProxyStream, command_for: Callable[[Proxy], str], deadline_sec: float) -> None:
+    p = stream.proxy
+    if stream.cancel.is_set():
+        stream.status = "cancelled"
+        stream.items.put(_END)
+        return
+    stream.status = "running"
+    stream.started_at = time.monotonic()
+    expires = stream.started_at + deadline_sec
+    last_ts = None
+    try:
+        command = command_for(p)
+        chunks = ssh_exec_stream(
+            p.host, p.port or 22, p.username, decrypt_string_if_encrypted(p.password), command,
+            timeout_sec=int(deadline_sec), auth_timeout_sec=5, banner_timeout_sec=5,
+            stop=lambda: stream.cancel.is_set() or time.monotonic() > expires,
+        )
+        for lines in iter_line_blocks(chunks, FEDERATED_BLOCK_LINES):
+            columns = parse_log_lines(lines)
+            block = []
+            for rec, ts in zip(columns_to_records(columns), epoch_column(columns["datetime"])):
+                ts = last_ts = ts if ts is not None else last_ts
+                rec["proxy_id"] = str(p.id)
+                block.append((ts or 0, rec))
+            if not _put(stream, block, expires):
+                break
+            stream.lines += len(block)
+        if time.monotonic() > expires:
+            stream.status = "timeout"
+        elif stream.cancel.is_set():
+            stream.status = "cancelled"
+        else:
+            stream.status = "done"
+    except Exception as e:
+        logger.warning("동시 검색 실패 (proxy %s): %s", p.id, e)
+        stream.status = "error"
+        stream.error = str(getattr(e, "detail", e))
+    finally:
+        # 종료 표시는 deadline이 지나도 넣습니다 (병합 쪽이 남은 블록을 꺼내면 자리가 남)
+        _put(stream, _END)
+
+
+def _next_item(stream: _ProxyStream, deadline_sec: float) -> Optional[Any]:
+    """스트림의 다음 (시각, 레코드). 끝났거나 deadline을 넘기면 None."""
+    if stream.pending:
+        return stream.pending.popleft()
+    while True:
+        if stream.started_at is None:
+            wait = 0.5
+        else:
+            wait = stream.started_at + deadline_sec - time.monotonic()
+            if wait <= 0:
+                if stream.items.empty():
+                    stream.cancel.set()
+                    stream.status = "timeout"
+                    return None
+                wait = 0
+        try:
+            item = stream.items.get(timeout=wait) if wait > 0 else stream.items.get_nowait()
+        except queue.Empty:
+            continue
+        if item is _END:
+            return None
+        if item:
+            stream.pending.extend(item)
+            return stream.pending.popleft()
+
+
+def federated_search(
+    proxies: List[Proxy],
+    command_for: Callable[[Proxy], str],
+    limit: int,
+    *,
+    newest_first: bool = True,
+    concurrency: int = FEDERATED_SEARCH_CONCURRENCY,
+    deadline_sec: float = FEDERATED_SEARCH_DEADLINE_SEC,
+) -> Iterator[Dict[str, Any]]:
+    """프록시들을 동시에 검색해 시각 순으로 병합한 메시지를 내보냅니다.
+
+    command_for(proxy)의 출력은 newest_first에 맞는 시각 순이어야 합니다.
+    메시지: {"type": "record", "data": 레코드} … 마지막에 {"type": "summary", "data": {...}}
+    제너레이터를 닫으면(클라이언트 연결 종료) 진행 중인 원격 명령도 모두 닫습니다.
+    """
+    streams = [_ProxyStream(p) for p in proxies]
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(streams) or 1)),
+                                  thread_name_prefix="tl-search")
+    for s in streams:
+        executor.submit(_search_proxy, s, command_for, deadline_sec)
+    sign = -1.0 if newest_first else 1.0
+    heap: List[Any] = []
+    seq = 0
+    emitted = 0
+    try:
+        for idx, s in enumerate(streams):
+            item = _next_item(s, deadline_sec)
+            if item is not None:
+                heapq.heappush(heap, (sign * item[0], idx, seq, item[1]))
+                seq += 1
+        while heap and emitted < limit:
+            _, idx, _, rec = heapq.heappop(heap)
+            yield {"type": "record", "data": rec}
+            emitted += 1
+            item = _next_item(streams[idx], deadline_sec)
+            if item is not None:
+                heapq.heappush(heap, (sign * item[0], idx, seq, item[1]))
+                seq += 1
+        truncated = emitted >= limit and bool(heap)
+        for s in streams:
+            s.cancel.set()
+        yield {"type": "summary", "data": {
+            "count": emitted,
+            "truncated": truncated,
+            "proxies": {str(s.proxy.id): s.summary() for s in streams},
+        }}
+    finally:
+        for s in streams:
+            s.cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+"""
+트래픽 로그 시간 히스토그램
+
+요청 수/수신·송신 바이트/차단/4xx/5xx를 시간 구간(bucket)별로 합친 차트용 시계열을 만듭니다.
+- 저장된 로그는 traffic_log_analysis.stored_log_histogram()이 event_ts 인덱스로 SQL에서 집계합니다.
+- 업로드 파일은 UploadAnalyzer가 파싱하면서 기본 구간(UPLOAD_HISTOGRAM_BASE_SEC)별로 합치고,
+  조회할 때 요청한 간격으로 다시 묶습니다.
+두 경로 모두 {구간 시작 epoch 초: [지표 값...]} 표를 만들고, chart_series()가 빈 구간을 0으로 채워 응답을 만듭니다.
+구간 경계는 KST 기준입니다 (1d 구간은 KST 자정부터 시작하며, 1시간의 약수 간격은 UTC 기준과 같음).
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Mapping, MutableMapping, Optional, Sequence
+
+from app.utils.time import KST_TZ
+
+HISTOGRAM_METRICS = ("requests", "recv_bytes", "sent_bytes", "blocked", "status_4xx", "status_5xx")
+# 한 응답의 최대 구간 수 (간격에 비해 구간이 너무 길면 400)
+HISTOGRAM_MAX_BUCKETS = int(os.getenv("TRAFFIC_LOG_HISTOGRAM_MAX_BUCKETS", "10000"))
+
+_INTERVAL_RE = re.compile(r"^\s*(\d+)\s*([smhd]?)\s*$", re.IGNORECASE)
+_UNIT_SEC = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+# 구간 경계를 KST 벽시계에 맞추기 위한 UTC 오프셋 (서머타임 없음)
+KST_OFFSET_SEC = int(datetime.now(KST_TZ).utcoffset().total_seconds())
+
+
+def parse_interval(value: str) -> int:
+    """'10s', '1m', '5m', '1h', '1d' 또는 초 단위 정수 → 초. 잘못된 값은 ValueError"""
+    m = _INTERVAL_RE.match(value or "")
+    sec = int(m.group(1)) * _UNIT_SEC[m.group(2).lower()] if m else 0
+    if sec <= 0:
+        raise ValueError(f"invalid interval: {value!r} (e.g. 10s, 1m, 5m, 1h)")
+    return sec
+
+
+def bucket_start(ts: int, interval_sec: int) -> int:
+    """epoch 초 ts가 속한 KST 기준 구간의 시작 epoch 초"""
+    return ts - (ts + KST_OFFSET_SEC) % interval_sec
+
+
+def add_bucket(table: MutableMapping[int, List[int]], bucket: int, values: Sequence[int]) -> None:
+    acc = table.get(bucket)
+    if acc is None:
+        table[bucket] = list(values)
+    else:
+        for i, v in enumerate(values):
+            acc[i] += v
+
+
+def merge_buckets(table: MutableMapping[int, List[int]], other: Mapping[int, Sequence[int]]) -> None:
+    for bucket, values in other.items():
+        add_bucket(table, bucket, values)
+
+
+def chart_series(
+    tables: Mapping[Hashable, Mapping[int, Sequence[int]]],
+    interval_sec: int,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+) -> Dict[str, Any]:
+    """키(프록시 등)별 구간 표 → 빈 구간을 0으로 채운 시계열
+
+    표의 구간 시작은 interval_sec의 약수 단위(bucket_start 기준)여야 하며 (SQL 집계는 interval_sec 단위 그대로),
+    구간 범위는 start_ts/end_ts(생략 시 데이터의 처음/끝)를 KST 기준 interval_sec 경계로 내림한 값입니다.
+    반환값: {"interval_sec", "timestamps"(구간 시작 epoch 밀리초), "total": {지표: [...]}, "series": {키: {지표: [...]}}}
+    """
+    rebucketed: Dict[Hashable, Dict[int, List[int]]] = {}
+    for key, table in tables.items():
+        out: Dict[int, List[int]] = {}
+        for ts, values in table.items():
+            add_bucket(out, bucket_start(ts, interval_sec), values)
+        rebucketed[key] = out
+
+    seen = [ts for out in rebucketed.values() for ts in out]
+    first = start_ts if start_ts is not None else min(seen, default=None)
+    last = end_ts if end_ts is not None else max(seen, default=None)
+    if first is None or last is None or last < first:
+        timestamps: List[int] = []
+    else:
+        first = bucket_start(first, interval_sec)
+        last = bucket_start(last, interval_sec)
+        check_bucket_count(first, last, interval_sec)
+        timestamps = list(range(first, last + 1, interval_sec))
+
+    index = {ts: i for i, ts in enumerate(timestamps)}
+    width = len(HISTOGRAM_METRICS)
+    total = [[0] * len(timestamps) for _ in range(width)]
+    series: Dict[Hashable, Dict[str, List[int]]] = {}
+    for key, out in rebucketed.items():
+        columns = [[0] * len(timestamps) for _ in range(width)]
+        for ts, values in out.items():
+            i = index.get(ts)
+            if i is None:
+                continue
+            for m in range(width):
+                columns[m][i] += values[m]
+                total[m][i] += values[m]
+        series[key] = dict(zip(HISTOGRAM_METRICS, columns))
+
+    return {
+        "interval_sec": interval_sec,
+        "timestamps": [ts * 1000 for ts in timestamps],
+        "total": dict(zip(HISTOGRAM_METRICS, total)),
+        "series": series,
+    }
+
+
+def check_bucket_count(start_ts: int, end_ts: int, interval_sec: int) -> None:
+    """구간 수가 HISTOGRAM_MAX_BUCKETS를 넘으면 ValueError"""
+    n = (end_ts - start_ts) // interval_sec + 1
+    if n > HISTOGRAM_MAX_BUCKETS:
+        raise ValueError(
+            f"too many buckets ({n} > {HISTOGRAM_MAX_BUCKETS}); use a larger interval or a shorter range"
+        )
@@ -0,0 +1,209 @@
+"""
+트래픽 로그 수집 작업(Job) 관리
+
+수집 요청을 작업으로 등록하고 제한된 스레드 풀에서 프록시별 수집 함수를 실행합니다.
+HTTP 요청은 작업 ID를 즉시 반환하고, 진행 상황(가져온/파싱한/적재한 줄 수)은 상태 조회와
+웹소켓으로 확인합니다. 작업은 취소할 수 있으며 같은 프록시에 동시에 실행되는 작업 수는 제한됩니다.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.proxy import Proxy
+from app.services.traffic_log_collector import CollectProgress
+
+# collect_fn(db, proxy, progress, cancel_event): 프록시 1대 수집 (stream_collect/collect_incremental 래퍼)
+CollectFn = Callable[[Any, Proxy, CollectProgress, threading.Event], Any]
+
+logger = logging.getLogger(__name__)
+
+# 동시에 수집하는 프록시 수 (전체 작업 공유)
+TRAFFIC_LOG_JOB_WORKERS = int(os.getenv("TRAFFIC_LOG_JOB_WORKERS", "4"))
+# 프록시당 동시에 진행할 수 있는 작업 수
+TRAFFIC_LOG_JOBS_PER_PROXY = int(os.getenv("TRAFFIC_LOG_JOBS_PER_PROXY", "1"))
+# 종료된 작업 상태 보관 시간 (초)
+FINISHED_JOB_TTL_SEC = 3600
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# 취소된 프록시 작업의 기존 로그 상태
+PREVIOUS_LOGS_KEPT = "cancelled, previous logs kept"
+LOADED_BLOCKS_KEPT = "cancelled, loaded blocks kept"
+
+
+class ProxyBusyError(Exception):
+    """프록시별 동시 작업 상한 초과"""
+
+    def __init__(self, proxy_ids: List[int]):
+        super().__init__(f"collection already running for proxies: {proxy_ids}")
+        self.proxy_ids = proxy_ids
+
+
+@dataclass
+class ProxyTask:
+    proxy_id: int
+    host: str
+    status: str = QUEUED
+    error: Optional[str] = None
+    progress: CollectProgress = field(default_factory=CollectProgress)
+
+    @property
+    def note(self) -> Optional[str]:
+        """취소된 작업: 교체 수집은 새 스냅샷을 버려 이전 로그가 그대로이고, 추가 수집은 적재된 블록이 남습니다."""
+        if self.status != CANCELLED:
+            return None
+        if self.progress.discarded or not self.progress.inserted:
+            return PREVIOUS_LOGS_KEPT
+        return LOADED_BLOCKS_KEPT
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"proxy_id": self.proxy_id, "host": self.host, "status": self.status,
+                "error": self.error, "note": self.note, **self.progress.as_dict()}
+
+
+@dataclass
+class CollectJob:
+    id: str
+    params: Dict[str, Any]
+    tasks: Dict[int, ProxyTask]
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def status(self) -> str:
+        states = [t.status for t in self.tasks.values()]
+        if any(s in (QUEUED, RUNNING) for s in states):
+            return RUNNING if any(s != QUEUED for s in states) else QUEUED
+        if self.cancel_event.is_set():
+            return CANCELLED
+        return FAILED if states and all(s == FAILED for s in states) else COMPLETED
+
+    def as_dict(self) -> Dict[str, Any]:
+        tasks = [t.as_dict() for t in self.tasks.values()]
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "proxies": tasks,
+            "succeeded": sum(1 for t in self.tasks.values() if t.status == COMPLETED),
+            "failed": sum(1 for t in self.tasks.values() if t.status == FAILED),
+            "inserted": sum(t.progress.inserted for t in self.tasks.values()),
+            "errors": {str(t.proxy_id): t.error for t in self.tasks.values() if t.error},
+        }
+
+
+class TrafficLogJobManager:
+    """수집 작업 등록/실행/취소. 실행기는 첫 작업 등록 시 생성됩니다."""
+
+    def __init__(self, max_workers: int = TRAFFIC_LOG_JOB_WORKERS, per_proxy: int = TRAFFIC_LOG_JOBS_PER_PROXY):
+        self.max_workers = max(1, max_workers)
+        self.per_proxy = max(1, per_proxy)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, CollectJob] = {}
+        self._active: Dict[int, int] = {}  # proxy_id → 진행 중 작업 수
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="traffic-log-job")
+        return self._executor
+
+    def submit(
+        self,
+        proxies: List[Proxy],
+        collect_fn: CollectFn,
+        session_factory: Callable[[], Any],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> CollectJob:
+        """프록시 목록 수집 작업을 등록합니다. 상한을 넘는 프록시가 있으면 ProxyBusyError."""
+        with self._lock:
+            self._prune()
+            busy = [p.id for p in proxies if self._active.get(p.id, 0) >= self.per_proxy]
+            if busy:
+                raise ProxyBusyError(busy)
+            job = CollectJob(
+                id=uuid.uuid4().hex,
+                params=params or {},
+                tasks={p.id: ProxyTask(proxy_id=p.id, host=p.host) for p in proxies},
+            )
+            for p in proxies:
+                self._active[p.id] = self._active.get(p.id, 0) + 1
+            self._jobs[job.id] = job
+            executor = self._get_executor()
+            for p in proxies:
+                executor.submit(self._run_task, job, p, collect_fn, session_factory)
+        logger.info(f"[traffic_log_jobs] Job {job.id} submitted for proxies {list(job.tasks)}")
+        return job
+
+    def _run_task(self, job: CollectJob, proxy: Proxy, collect_fn: CollectFn,
+                  session_factory: Callable[[], Any]) -> None:
+        task = job.tasks[proxy.id]
+        db = None
+        try:
+            if job.cancel_event.is_set():
+                task.status = CANCELLED
+                return
+            task.status = RUNNING
+            db = session_factory()
+            # 잘못된 로그 경로, SSH 오류 등은 해당 프록시 작업의 오류로 남깁니다
+            collect_fn(db, proxy, task.progress, job.cancel_event)
+            task.status = CANCELLED if job.cancel_event.is_set() else COMPLETED
+        except Exception as e:
+            logger.error(f"[traffic_log_jobs] Collection failed for proxy {proxy.id} (job {job.id}): {e}")
+            task.status = FAILED
+            task.error = str(getattr(e, "detail", e))
+        finally:
+            if db is not None:
+                db.close()
+            with self._lock:
+                remaining = self._active.get(proxy.id, 1) - 1
+                if remaining > 0:
+                    self._active[proxy.id] = remaining
+                else:
+                    self._active.pop(proxy.id, None)
+                if job.status in FINISHED_STATES and job.finished_at is None:
+                    job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[CollectJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[CollectJob]:
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED_STATES:
+            job.cancel_event.set()
+        return job
+
+    def list_jobs(self) -> List[CollectJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - FINISHED_JOB_TTL_SEC
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        """실행 중 작업을 취소하고 실행기를 종료합니다."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+traffic_log_jobs = TrafficLogJobManager()
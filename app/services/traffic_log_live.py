@@ -0,0 +1,216 @@
+"""
+트래픽 로그 실시간 감시 (tail -F 스트리밍)
+
+(프록시, 키워드)마다 원격 `tail -F | grep -F` 채널 하나를 유지하고, 새로 들어온 줄을 한 번만 파싱해
+모든 구독자(브라우저 탭)에게 나눠 줍니다. 채널을 열 때 최근 LIVE_SCAN_LINES줄에서 찾은 레코드를 먼저 받고
+(새 구독자의 초기 표시용), 이후에는 그 시점의 파일 끝부터 따라가므로 원격 디스크 I/O는 새로 기록된 바이트에만 비례합니다.
+구독자마다 버퍼 상한이 있어 느린 클라이언트는 오래된 레코드부터 버려지며, 버린 건수는 다음 전송에 함께 보고됩니다.
+마지막 구독자가 나가면 채널을 닫습니다.
+"""
+import logging
+import os
+import shlex
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from app.models.proxy import Proxy
+from app.utils.crypto import decrypt_string_if_encrypted
+from app.utils.ssh import ssh_exec_stream
+from app.utils.traffic_log_parser import columns_to_records, parse_log_lines
+
+logger = logging.getLogger(__name__)
+
+# 채널을 열 때 키워드를 찾는 최근 줄 수, 새 구독자에게 보여줄 최근 레코드 보관 수
+LIVE_SCAN_LINES = 10000
+LIVE_BACKLOG_RECORDS = 1000
+# 구독자별 미전송 레코드 상한 (초과 시 오래된 것부터 버림)
+LIVE_SUBSCRIBER_MAX_RECORDS = int(os.getenv("TRAFFIC_LOG_LIVE_SUBSCRIBER_MAX_RECORDS", "2000"))
+
+
+class LiveSubscriber:
+    """구독자 한 명의 필터와 미전송 버퍼"""
+
+    def __init__(self, client_ip: Optional[str] = None, url_host: Optional[str] = None, initial_lines: int = 100,
+                 max_records: int = LIVE_SUBSCRIBER_MAX_RECORDS):
+        self.initial_lines = initial_lines
+        self.client_ip = client_ip or None
+        self.url_host = url_host or None
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        if self.client_ip and self.client_ip not in (record.get("client_ip") or ""):
+            return False
+        if self.url_host and self.url_host not in (record.get("url_host") or ""):
+            return False
+        return True
+
+    def offer(self, records: List[Dict[str, Any]]) -> None:
+        kept = [r for r in records if self.matches(r)]
+        if not kept:
+            return
+        with self._lock:
+            overflow = len(self._buffer) + len(kept) - self._buffer.maxlen
+            if overflow > 0:
+                self._dropped += overflow
+            self._buffer.extend(kept)
+
+    def drain(self, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """최대 limit건과 마지막 drain 이후 버린 건수"""
+        with self._lock:
+            n = min(limit, len(self._buffer))
+            records = [self._buffer.popleft() for _ in range(n)]
+            dropped, self._dropped = self._dropped, 0
+        return records, dropped
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+
+_LIVE_MARK = b"@@LIVE\n"
+
+
+def live_command(log_path: str, q: str, scan_lines: int = LIVE_SCAN_LINES, backlog: int = LIVE_BACKLOG_RECORDS) -> str:
+    """끝나지 않는 원격 명령.
+
+    최근 scan_lines줄에서 키워드가 포함된 마지막 backlog줄, '@@LIVE' 표시 줄, 이후 추가되는 줄을 차례로 출력합니다.
+    """
+    safe_path = shlex.quote(log_path)
+    safe_q = shlex.quote(q)
+    script = (
+        f"s=$(stat -L -c %s {safe_path}) || exit 1; "
+        f"tail -n {int(scan_lines)} {safe_path} | grep -F -- {safe_q} | tail -n {int(backlog)}; "
+        f"echo @@LIVE; "
+        f"tail -c +$((s + 1)) -F {safe_path} 2>/dev/null | grep --line-buffered -F -- {safe_q}"
+    )
+    return f"nice -n 10 ionice -c2 -n7 sh -c {shlex.quote(script)} | sed -u -e 's/[^[:print:]\\t]//g'"
+
+
+class LiveTail:
+    """(프록시, 키워드) 하나의 tail -F 채널과 구독자 목록"""
+
+    def __init__(self, proxy: Proxy, q: str):
+        self.proxy_id = proxy.id
+        self.q = q
+        self._host = proxy.host
+        self._port = proxy.port or 22
+        self._username = proxy.username
+        self._password = decrypt_string_if_encrypted(proxy.password)
+        self._log_path = proxy.traffic_log_path
+        self._subscribers: Set[LiveSubscriber] = set()
+        self._backlog: Deque[Dict[str, Any]] = deque(maxlen=LIVE_BACKLOG_RECORDS)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.live = False
+        self.matched = 0
+        self.bytes_read = 0
+        self.error: Optional[str] = None
+        self.finished = False
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"live-tail-{self.proxy_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _offer_recent(self, subscriber: LiveSubscriber) -> None:
+        if subscriber.initial_lines:
+            subscriber.offer([r for r in self._backlog if subscriber.matches(r)][-subscriber.initial_lines:])
+
+    def subscribe(self, subscriber: LiveSubscriber) -> None:
+        """구독자를 추가하고 최근 레코드 중 필터에 맞는 마지막 initial_lines건을 넣어 줍니다
+        (채널이 초기 레코드를 받는 중이면 다 받은 뒤)."""
+        with self._lock:
+            if self.live:
+                self._offer_recent(subscriber)
+            self._subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber: LiveSubscriber) -> int:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            return len(self._subscribers)
+
+    def _publish(self, data: bytes) -> None:
+        if not self.live:
+            mark = 0 if data.startswith(_LIVE_MARK) else data.find(b"\n" + _LIVE_MARK) + 1
+            if mark <= 0 and not data.startswith(_LIVE_MARK):
+                self._backlog.extend(columns_to_records(parse_log_lines(data)))
+                return
+            self._backlog.extend(columns_to_records(parse_log_lines(data[:mark])))
+            data = data[mark + len(_LIVE_MARK):]
+            with self._lock:
+                self.live = True
+                for subscriber in self._subscribers:
+                    self._offer_recent(subscriber)
+        records = columns_to_records(parse_log_lines(data)) if data else []
+        if not records:
+            return
+        with self._lock:
+            self.matched += len(records)
+            self._backlog.extend(records)
+            for subscriber in self._subscribers:
+                subscriber.offer(records)
+
+    def _run(self) -> None:
+        pending = b""
+        try:
+            for chunk in ssh_exec_stream(
+                self._host, self._port, self._username, self._password,
+                live_command(self._log_path, self.q),
+                timeout_sec=10, auth_timeout_sec=5, banner_timeout_sec=5,
+                stop=self._stop.is_set,
+            ):
+                self.bytes_read += len(chunk)
+                pending += chunk
+                cut = pending.rfind(b"\n")
+                if cut < 0:
+                    continue
+                complete, pending = pending[: cut + 1], pending[cut + 1:]
+                self._publish(complete)
+                if self._stop.is_set():
+                    break
+        except Exception as e:
+            logger.warning("실시간 감시 채널 종료 (proxy %s): %s", self.proxy_id, e)
+            self.error = f"ssh error: {e}"
+        finally:
+            self.finished = True
+
+
+class LiveTailRegistry:
+    """(프록시, 키워드)별 LiveTail 공유"""
+
+    def __init__(self):
+        self._tails: Dict[Tuple[int, str], LiveTail] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, proxy: Proxy, q: str, subscriber: LiveSubscriber) -> LiveTail:
+        key = (proxy.id, q)
+        with self._lock:
+            tail = self._tails.get(key)
+            if tail is None or tail.finished:
+                tail = LiveTail(proxy, q)
+                self._tails[key] = tail
+                tail.start()
+            tail.subscribe(subscriber)
+            return tail
+
+    def unsubscribe(self, tail: LiveTail, subscriber: LiveSubscriber) -> None:
+        with self._lock:
+            if tail.unsubscribe(subscriber) == 0:
+                tail.stop()
+                if self._tails.get((tail.proxy_id, tail.q)) is tail:
+                    del self._tails[(tail.proxy_id, tail.q)]
+
+    def clear(self) -> None:
+        with self._lock:
+            for tail in self._tails.values():
+                tail.stop()
+            self._tails.clear()
+
+
+live_tails = LiveTailRegistry()
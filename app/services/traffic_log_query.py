@@ -0,0 +1,246 @@
+"""
+트래픽 로그 그리드 조회 (필터/정렬/키셋 페이징/건수 캐시)
+
+무한 스크롤은 OFFSET 대신 커서(마지막 행의 정렬값 + id)로 다음 페이지를 찾습니다.
+기본 정렬(id)은 커서 위치부터 rowid 순으로 읽다가 한 페이지가 차면 멈추므로 깊이와 무관합니다
+(여러 프록시면 선택되지 않은 프록시/스냅샷 행을 건너뛰는 만큼 더 읽습니다). 단일 컬럼 인덱스가 있는
+컬럼(url_host, client_ip, ...)도 인덱스 순서로 읽지만, 인덱스가 없는 컬럼과 사전 인코딩 컬럼(값 테이블
+상관 서브쿼리로 정렬)은 커서 이후의 조건에 맞는 행 전체를 임시 B-tree로 정렬하므로 페이지마다 O(남은 행)입니다.
+전체 건수는 (필터 조건, 데이터 버전)별로 캐시하고,
+필요하면 상한까지만 세는 추정 모드를 사용합니다.
+시간 구간 조건과 datetime 정렬은 문자열 대신 파싱된 event_ts(UTC epoch 초) 컬럼을 사용합니다.
+"""
+import base64
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from app.database.migrations import mark_migration_done, migration_done
+from app.models.traffic_log import RECORD_COLUMNS, TrafficLog
+from app.services.traffic_log_search import search_clause
+from app.services.traffic_log_snapshots import visible_clause
+from app.utils.traffic_log_parser import parse_epoch
+
+logger = logging.getLogger(__name__)
+
+# 건수 캐시 항목 수 / 유효 시간 (다른 경로의 삭제 등 버전에 잡히지 않는 변경 대비)
+COUNT_CACHE_SIZE = 256
+COUNT_CACHE_TTL_SEC = 30
+# count_mode=estimated 에서 세는 최대 행 수
+ESTIMATED_COUNT_CAP = 10000
+# event_ts 백필 시 한 번에 처리하는 서로 다른 datetime 값 수, 완료 기록 이름
+EVENT_TS_BACKFILL_BATCH = 2000
+EVENT_TS_BACKFILL_MIGRATION = "traffic_logs.event_ts backfill"
+
+_data_version = 0
+_version_lock = threading.Lock()
+
+
+def bump_data_version() -> None:
+    """traffic_logs 행이 추가/삭제되었음을 알립니다 (건수 캐시 무효화)."""
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+
+
+def data_version(db: Session) -> Tuple[int, int]:
+    """(프로세스 내 변경 카운터, MAX(id)). MAX(id)는 PK 끝만 읽으므로 O(1)입니다."""
+    max_id = db.query(func.max(TrafficLog.id)).scalar() or 0
+    return _data_version, max_id
+
+
+class CountCache:
+    """필터 조건별 전체 건수 LRU 캐시"""
+
+    def __init__(self, size: int = COUNT_CACHE_SIZE, ttl_sec: float = COUNT_CACHE_TTL_SEC):
+        self.size = size
+        self.ttl_sec = ttl_sec
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None and now - hit[0] < self.ttl_sec:
+                self._items.move_to_end(key)
+                return hit[1]
+        value = compute()
+        with self._lock:
+            self._items[key] = (now, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+count_cache = CountCache()
+
+
+def ensure_traffic_log_event_ts(engine: Engine) -> int:
+    """기존 DB용 마이그레이션: event_ts 컬럼/인덱스를 추가하고 비어 있는 행을 채웁니다 (멱등).
+
+    같은 초의 행은 datetime 문자열이 같으므로 서로 다른 값 단위로 파싱해 UPDATE합니다.
+    끝까지 채우면 schema_migrations에 완료를 기록하므로, 형식이 달라 NULL로 남는 행을 다음 시작 때
+    다시 훑지 않습니다 (이후 적재되는 행은 수집 시 event_ts가 채워짐). 반환값은 채운 행 수입니다.
+    """
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE traffic_logs ADD COLUMN event_ts INTEGER"))
+            logger.info("[DB] traffic_logs.event_ts 컬럼 추가 완료")
+        except Exception:
+            pass  # 컬럼이 이미 존재하면 무시
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_traffic_logs_proxy_event_ts ON traffic_logs (proxy_id, event_ts)"
+        ))
+
+    with engine.begin() as conn:
+        if migration_done(conn, EVENT_TS_BACKFILL_MIGRATION):
+            return 0
+
+    filled = 0
+    last = ""
+    while True:
+        with engine.begin() as conn:
+            values = conn.execute(text(
+                "SELECT DISTINCT datetime FROM traffic_logs WHERE event_ts IS NULL AND datetime > :last "
+                "ORDER BY datetime LIMIT :n"
+            ), {"last": last, "n": EVENT_TS_BACKFILL_BATCH}).scalars().all()
+            if not values:
+                break
+            last = values[-1]
+            params = [{"ts": ts, "dt": v} for v, ts in ((v, parse_epoch(v)) for v in values) if ts is not None]
+            if params:
+                result = conn.execute(text(
+                    "UPDATE traffic_logs SET event_ts = :ts WHERE datetime = :dt AND event_ts IS NULL"
+                ), params)
+                filled += max(result.rowcount, 0)
+    with engine.begin() as conn:
+        mark_migration_done(conn, EVENT_TS_BACKFILL_MIGRATION)
+    if filled:
+        logger.info("[DB] traffic_logs.event_ts 백필 완료: %d행", filled)
+        bump_data_version()
+    return filled
+
+
+def filtered_query(db: Session, proxy_ids, search: Optional[str] = None,
+                   filter_col: Optional[str] = None, filter_val: Optional[str] = None,
+                   start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Query:
+    """프록시(현재 스냅샷)/결과 내 검색/컬럼 필터/시간 구간(event_ts, 양끝 포함)을 적용한 조회 (정렬 전)"""
+    query = db.query(TrafficLog).filter(visible_clause(db, proxy_ids))
+
+    # 시간 구간: (proxy_id, event_ts) 인덱스 범위 스캔
+    if start_ts is not None:
+        query = query.filter(TrafficLog.event_ts >= start_ts)
+    if end_ts is not None:
+        query = query.filter(TrafficLog.event_ts <= end_ts)
+
+    # 전체 텍스트 검색 (결과 내 검색)
+    if search and search.strip():
+        query = query.filter(search_clause(db, search.strip()))
+
+    # 컬럼 필터 적용
+    if filter_col and filter_val:
+        col_attr = sort_column(filter_col)
+        if col_attr is not None:
+            col_type = col_attr.property.columns[0].type.__class__.__name__
+            if col_type in ("Integer", "Float"):
+                try:
+                    query = query.filter(col_attr == float(filter_val))
+                except ValueError:
+                    pass
+            else:
+                query = query.filter(col_attr.contains(filter_val))
+    return query
+
+
+def sort_column(name: Optional[str]):
+    """컬럼 이름 → 모델 속성. 레코드 컬럼이 아니면 None
+
+    사전 인코딩 컬럼은 문자열 값 속성(상관 서브쿼리)이라 정렬에 인덱스를 쓰지 못합니다 (모듈 설명 참고).
+    """
+    if not name or name not in RECORD_COLUMNS:
+        return None
+    return getattr(TrafficLog, name, None)
+
+
+def _order_column(name: Optional[str]):
+    """정렬/커서용 컬럼. datetime 문자열은 사전 순이 시각 순과 다르므로 event_ts로 정렬합니다."""
+    if name == "datetime":
+        return TrafficLog.event_ts
+    return sort_column(name) or TrafficLog.id
+
+
+def ordered(query: Query, sort_col: Optional[str], sort_dir: str) -> Query:
+    """정렬 컬럼 + id 보조 정렬 (같은 값 사이의 순서를 고정해야 커서가 행을 건너뛰지 않습니다)"""
+    col_attr = _order_column(sort_col)
+    if sort_dir == "desc":
+        order = [col_attr.desc()]
+        if col_attr is not TrafficLog.id:
+            order.append(TrafficLog.id.desc())
+    else:
+        order = [col_attr.asc()]
+        if col_attr is not TrafficLog.id:
+            order.append(TrafficLog.id.asc())
+    return query.order_by(*order)
+
+
+def encode_cursor(row: TrafficLog, sort_col: Optional[str]) -> str:
+    col_attr = _order_column(sort_col)
+    value = getattr(row, col_attr.key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"v": value, "id": row.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """커서 → (정렬값, id). 형식이 잘못되면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return data["v"], int(data["id"])
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {e}")
+
+
+def keyset_clause(sort_col: Optional[str], sort_dir: str, value: Any, last_id: int):
+    """커서 다음 행 조건. SQLite는 NULL을 가장 작은 값으로 정렬합니다 (ASC 앞, DESC 뒤)."""
+    col_attr = _order_column(sort_col)
+    if col_attr is TrafficLog.id:
+        return TrafficLog.id < last_id if sort_dir == "desc" else TrafficLog.id > last_id
+    if value is not None and col_attr.property.columns[0].type.__class__.__name__ == "DateTime":
+        value = datetime.fromisoformat(value)
+    if sort_dir == "desc":
+        if value is None:
+            return and_(col_attr.is_(None), TrafficLog.id < last_id)
+        return or_(col_attr < value, and_(col_attr == value, TrafficLog.id < last_id), col_attr.is_(None))
+    if value is None:
+        return or_(and_(col_attr.is_(None), TrafficLog.id > last_id), col_attr.isnot(None))
+    return or_(col_attr > value, and_(col_attr == value, TrafficLog.id > last_id))
+
+
+def cached_count(db: Session, query: Query, key: Hashable, estimated: bool = False) -> Tuple[int, bool]:
+    """(건수, 추정 여부). 추정 모드는 ESTIMATED_COUNT_CAP까지만 세며 상한에 닿으면 추정으로 표시합니다."""
+    full_key = (key, estimated, data_version(db))
+    if estimated:
+        def _compute():
+            n = db.query(func.count()).select_from(
+                query.with_entities(TrafficLog.id).limit(ESTIMATED_COUNT_CAP + 1).subquery()
+            ).scalar()
+            return min(n, ESTIMATED_COUNT_CAP), n > ESTIMATED_COUNT_CAP
+        return count_cache.get_or_compute(full_key, _compute)
+    return count_cache.get_or_compute(full_key, lambda: (query.count(), False))
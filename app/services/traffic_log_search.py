@@ -0,0 +1,106 @@
+"""
+트래픽 로그 전체 텍스트 검색
+
+`search`(결과 내 검색)는 SEARCH_COLUMNS 중 하나라도 부분 문자열을 포함하는 행을 찾습니다.
+SQLite에서는 FTS5 trigram 외부 콘텐츠 인덱스(traffic_logs_fts, 트리거로 INSERT/DELETE/UPDATE 동기화)를
+사용하고, 3자 미만 검색어나 인덱스가 없는 DB에서는 기존 LIKE 조건으로 대체합니다.
+대량 적재는 deferred_fts_index()로 감싸 행 단위 트리거 대신 트랜잭션 단위로 색인합니다 (스키마 변경 없음).
+"""
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.traffic_log import (
+    FTS_CONTENT_VIEW, FTS_DEFER_TABLE, FTS_TABLE, SEARCH_COLUMNS, TrafficLog, traffic_log_fts_ddl,
+)
+
+logger = logging.getLogger(__name__)
+
+# trigram 토크나이저는 3자 이상 검색어만 인덱스로 찾을 수 있습니다
+FTS_MIN_QUERY_LEN = 3
+
+_fts_available: Dict[str, bool] = {}
+
+
+def ensure_traffic_log_fts(engine: Engine) -> bool:
+    """기존 DB용 마이그레이션: FTS 인덱스/트리거가 없으면 만들고 기존 행으로 채웁니다 (멱등).
+
+    traffic_logs를 직접 콘텐츠로 쓰던 이전 인덱스는 콘텐츠 뷰 기준으로 다시 만듭니다.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.begin() as conn:
+            sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FTS_TABLE}
+            ).scalar()
+            exists = sql is not None and FTS_CONTENT_VIEW in sql
+            if sql is not None and not exists:
+                for trigger in ("ai", "ad", "au"):
+                    conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}"))
+                conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+            for stmt in traffic_log_fts_ddl():
+                conn.execute(text(stmt))
+            if not exists:
+                logger.info(f"[traffic_log_search] Building {FTS_TABLE} from existing rows...")
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        _fts_available[str(engine.url)] = True
+        return True
+    except Exception as e:
+        logger.warning(f"[traffic_log_search] FTS5 index unavailable, falling back to LIKE search: {e}")
+        _fts_available[str(engine.url)] = False
+        return False
+
+
+def fts_available(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fts_available:
+        if bind.dialect.name != "sqlite":
+            _fts_available[key] = False
+        else:
+            row = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FTS_TABLE}
+            ).first()
+            _fts_available[key] = row is not None
+    return _fts_available[key]
+
+
+def fts_phrase(s: str) -> str:
+    """검색어를 FTS5 문자열 구문으로 감쌉니다 (연산자/특수문자를 그대로 부분 문자열로 검색)."""
+    return '"' + s.replace('"', '""') + '"'
+
+
+def search_clause(db: Session, s: str):
+    """search 파라미터에 해당하는 WHERE 조건"""
+    if len(s) >= FTS_MIN_QUERY_LEN and fts_available(db):
+        return TrafficLog.id.in_(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_q").bindparams(fts_q=fts_phrase(s))
+        )
+    return or_(*(getattr(TrafficLog, c).contains(s) for c in SEARCH_COLUMNS))
+
+
+@contextmanager
+def deferred_fts_index(db: Session) -> Iterator[None]:
+    """대량 INSERT를 감싸 FTS 색인을 문장 1개(INSERT ... SELECT)로 처리합니다.
+
+    같은 트랜잭션 안에서 플래그 행(FTS_DEFER_TABLE)을 넣어 INSERT 트리거를 건너뛰고, 새로 생긴 id 범위를
+    한 번에 색인한 뒤 플래그 행을 지웁니다. 커밋/롤백은 호출자가 합니다 (플래그는 커밋되지 않으므로 다른 연결이나
+    중단된 적재 이후의 INSERT는 항상 트리거로 색인됨). 블록 여러 개를 한 번에 감쌀수록 FTS 세그먼트가 적게 생깁니다.
+    """
+    if not fts_available(db):
+        yield
+        return
+    cols = ", ".join(SEARCH_COLUMNS)
+    db.execute(text(f"INSERT INTO {FTS_DEFER_TABLE} DEFAULT VALUES"))
+    last_id = db.execute(text("SELECT COALESCE(MAX(id), 0) FROM traffic_logs")).scalar()
+    yield
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, {cols}) SELECT id, {cols} FROM {FTS_CONTENT_VIEW} WHERE id > :last_id"),
+        {"last_id": last_id},
+    )
+    db.execute(text(f"DELETE FROM {FTS_DEFER_TABLE}"))
@@ -0,0 +1,222 @@
+"""
+트래픽 로그 스냅샷 교체
+
+교체 수집은 기존 행을 지우지 않고 새 스냅샷(traffic_logs.snapshot_id)으로 적재한 뒤, 끝나면 한 트랜잭션에서
+프록시의 current 스냅샷을 바꿉니다. 조회는 visible_clause()로 current 스냅샷 행만 보므로 적재 중인 부분
+데이터나 빈 테이블이 보이지 않고, 실패한 수집은 이전 스냅샷을 그대로 남깁니다.
+교체된(retired) 스냅샷의 행은 요청 경로 밖에서 SnapshotPurger가 작은 트랜잭션으로 나눠 삭제합니다.
+증분 수집으로 계속 추가되는 current 스냅샷의 오래된 행은 주기적 보존 작업이 purge_expired_traffic_logs()로 삭제합니다.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, select, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.traffic_log import TrafficLog
+from app.models.traffic_log_cursor import TrafficLogCursor
+from app.models.traffic_log_snapshot import TrafficLogSnapshot
+
+logger = logging.getLogger(__name__)
+
+# 교체 후 이전 스냅샷 삭제를 시작하기까지 대기 (초, 음수면 자동 삭제 안 함 — 다음 시작 시 정리)
+SNAPSHOT_PURGE_DELAY_SEC = float(os.getenv("TRAFFIC_LOG_SNAPSHOT_PURGE_DELAY_SEC", "10"))
+# 삭제 트랜잭션 하나에서 지우는 행 수 (WAL 크기와 쓰기 잠금 시간 제한)
+SNAPSHOT_PURGE_CHUNK = int(os.getenv("TRAFFIC_LOG_SNAPSHOT_PURGE_CHUNK", "5000"))
+# 증분 수집 프록시의 current 스냅샷에서 유지할 로그 보존 시간 (collected_at 기준, 0이면 삭제 안 함)
+TRAFFIC_LOG_RETENTION_HOURS = float(os.getenv("TRAFFIC_LOG_RETENTION_HOURS", "24"))
+
+BUILDING = "building"
+CURRENT = "current"
+RETIRED = "retired"
+
+
+def current_snapshots(db: Session, proxy_ids: Iterable[int]) -> Dict[int, int]:
+    """프록시 ID → current 스냅샷 ID (스냅샷이 없는 프록시는 0)"""
+    ids = list(proxy_ids)
+    current = {p: 0 for p in ids}
+    if ids:
+        current.update(db.execute(
+            select(TrafficLogSnapshot.proxy_id, TrafficLogSnapshot.id)
+            .where(TrafficLogSnapshot.proxy_id.in_(ids), TrafficLogSnapshot.state == CURRENT)
+        ).all())
+    return current
+
+
+def visible_clause(db: Session, proxy_ids: Iterable[int]):
+    """프록시들의 current 스냅샷 행 조건 ((proxy_id, snapshot_id) 인덱스 조회)
+
+    프록시가 하나면 등호 조건으로 만들어 인덱스 안의 id 순서를 그대로 정렬에 쓰게 합니다
+    (행 값 IN 목록은 SQLite가 순서를 알 수 없어 임시 B-tree로 정렬합니다).
+    """
+    pairs = list(current_snapshots(db, proxy_ids).items())
+    if len(pairs) == 1:
+        (proxy_id, snapshot_id), = pairs
+        return and_(TrafficLog.proxy_id == proxy_id, TrafficLog.snapshot_id == snapshot_id)
+    return tuple_(TrafficLog.proxy_id, TrafficLog.snapshot_id).in_(pairs)
+
+
+def begin_snapshot(db: Session, proxy_id: int) -> int:
+    """적재할 새 스냅샷을 만들고 커밋합니다 (조회에는 아직 보이지 않음)."""
+    snapshot = TrafficLogSnapshot(proxy_id=proxy_id, state=BUILDING)
+    db.add(snapshot)
+    db.commit()
+    return snapshot.id
+
+
+def publish_snapshot(db: Session, proxy_id: int, snapshot_id: int) -> None:
+    """스냅샷을 프록시의 current로 바꾸고 이전 스냅샷을 retired로 표시합니다 (한 트랜잭션).
+
+    전체 교체 후에는 증분 커서가 DB 내용과 맞지 않으므로 함께 초기화합니다.
+    """
+    db.execute(
+        update(TrafficLogSnapshot)
+        .where(TrafficLogSnapshot.proxy_id == proxy_id, TrafficLogSnapshot.state == CURRENT)
+        .values(state=RETIRED)
+    )
+    db.execute(update(TrafficLogSnapshot).where(TrafficLogSnapshot.id == snapshot_id).values(state=CURRENT))
+    db.execute(delete(TrafficLogCursor).where(TrafficLogCursor.proxy_id == proxy_id))
+    db.commit()
+    snapshot_purger.schedule(db.get_bind())
+
+
+def abandon_snapshot(db: Session, snapshot_id: int) -> None:
+    """실패한 수집의 스냅샷을 버립니다 (이전 current 유지, 적재된 행은 백그라운드 삭제)."""
+    try:
+        db.rollback()
+        db.execute(update(TrafficLogSnapshot).where(TrafficLogSnapshot.id == snapshot_id).values(state=RETIRED))
+        db.commit()
+        snapshot_purger.schedule(db.get_bind())
+    except Exception as e:
+        # 표시하지 못한 스냅샷은 다음 시작 시 ensure_traffic_log_snapshots()가 정리
+        logger.warning("스냅샷 %s 폐기 표시 실패: %s", snapshot_id, e)
+        db.rollback()
+
+
+def _purge_targets(db: Session) -> List[Tuple[int, int, Optional[int]]]:
+    """(proxy_id, snapshot_id, 스냅샷 행 ID) — retired 스냅샷과, 스냅샷이 생긴 프록시의 도입 전(0) 행"""
+    targets = [(p, sid, sid) for sid, p in db.execute(
+        select(TrafficLogSnapshot.id, TrafficLogSnapshot.proxy_id).where(TrafficLogSnapshot.state == RETIRED)
+    )]
+    for p in db.execute(select(TrafficLogSnapshot.proxy_id).where(TrafficLogSnapshot.state == CURRENT)).scalars():
+        legacy = db.execute(
+            select(TrafficLog.id).where(TrafficLog.proxy_id == p, TrafficLog.snapshot_id == 0).limit(1)
+        ).first()
+        if legacy is not None:
+            targets.append((p, 0, None))
+    return targets
+
+
+def purge_retired_snapshots(bind, chunk: int = SNAPSHOT_PURGE_CHUNK) -> int:
+    """retired 스냅샷의 행을 chunk 행씩 나눠 커밋하며 삭제합니다. 삭제한 행 수를 돌려줍니다."""
+    deleted = 0
+    with sessionmaker(bind=bind)() as db:
+        for proxy_id, snapshot_id, row_id in _purge_targets(db):
+            while True:
+                ids = db.execute(
+                    select(TrafficLog.id)
+                    .where(TrafficLog.proxy_id == proxy_id, TrafficLog.snapshot_id == snapshot_id)
+                    .limit(chunk)
+                ).scalars().all()
+                if not ids:
+                    break
+                db.execute(delete(TrafficLog).where(TrafficLog.id.in_(ids)))
+                db.commit()
+                deleted += len(ids)
+            if row_id is not None:
+                db.execute(delete(TrafficLogSnapshot).where(TrafficLogSnapshot.id == row_id))
+                db.commit()
+    if deleted:
+        logger.info("교체된 트래픽 로그 스냅샷 %d행 삭제", deleted)
+    return deleted
+
+
+def purge_expired_traffic_logs(
+    bind, retention_hours: float = TRAFFIC_LOG_RETENTION_HOURS, chunk: int = SNAPSHOT_PURGE_CHUNK,
+) -> int:
+    """증분 수집 중인(커서가 있는) 프록시의 current 스냅샷에서 retention_hours보다 오래된 행을
+    chunk 행씩 나눠 커밋하며 삭제합니다. 적재 중인 스냅샷과 교체 수집만 하는 프록시의 로그는 건드리지 않습니다."""
+    if not retention_hours or retention_hours <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = 0
+    with sessionmaker(bind=bind)() as db:
+        proxy_ids = db.execute(select(TrafficLogCursor.proxy_id)).scalars().all()
+        for proxy_id, snapshot_id in current_snapshots(db, proxy_ids).items():
+            while True:
+                ids = db.execute(
+                    select(TrafficLog.id)
+                    .where(TrafficLog.proxy_id == proxy_id, TrafficLog.snapshot_id == snapshot_id,
+                           TrafficLog.collected_at < cutoff)
+                    .limit(chunk)
+                ).scalars().all()
+                if not ids:
+                    break
+                db.execute(delete(TrafficLog).where(TrafficLog.id.in_(ids)))
+                db.commit()
+                deleted += len(ids)
+    if deleted:
+        logger.info("보존 기간이 지난 트래픽 로그 %d행 삭제", deleted)
+    return deleted
+
+
+class SnapshotPurger:
+    """교체 후 delay_sec 뒤에 retired 스냅샷 삭제를 한 번 실행합니다 (대기 중이면 합쳐짐)."""
+
+    def __init__(self, delay_sec: float = SNAPSHOT_PURGE_DELAY_SEC):
+        self.delay_sec = delay_sec
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def schedule(self, bind) -> None:
+        if self.delay_sec < 0:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay_sec, self._run, args=(bind,))
+            self._timer.daemon = True
+            self._timer.name = "traffic-log-snapshot-purge"
+            self._timer.start()
+
+    def _run(self, bind) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            purge_retired_snapshots(bind)
+        except Exception as e:
+            logger.warning("트래픽 로그 스냅샷 삭제 실패: %s", e)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+snapshot_purger = SnapshotPurger()
+
+
+def ensure_traffic_log_snapshots(engine: Engine) -> None:
+    """기존 DB용 마이그레이션: snapshot_id 컬럼/인덱스를 추가하고 (멱등), 이전 실행에서 적재 중이던
+    스냅샷은 완료되지 않았으므로 retired로 바꿔 백그라운드 삭제 대상으로 넘깁니다."""
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE traffic_logs ADD COLUMN snapshot_id INTEGER NOT NULL DEFAULT 0"))
+            logger.info("[DB] traffic_logs.snapshot_id 컬럼 추가 완료")
+        except Exception:
+            pass  # 컬럼이 이미 존재하면 무시
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_traffic_logs_proxy_snapshot ON traffic_logs (proxy_id, snapshot_id)"
+        ))
+        # (proxy_id, snapshot_id) 인덱스가 proxy_id 단독 조회도 처리합니다
+        conn.execute(text("DROP INDEX IF EXISTS ix_traffic_logs_proxy_id"))
+        conn.execute(
+            update(TrafficLogSnapshot).where(TrafficLogSnapshot.state == BUILDING).values(state=RETIRED)
+        )
+    snapshot_purger.schedule(engine)
@@ -0,0 +1,602 @@
+"""
+업로드한 트래픽 로그 파일 분석
+
+업로드 파일을 디스크에 내려 받은 뒤 줄 경계에 맞춘 바이트 구간(chunk)으로 나누고, 구간마다 블록 단위로
+파싱·집계합니다. 큰 파일은 분석 프로세스 풀(app.services.analysis_pool)에서 구간을 병렬 처리하고,
+구간별 부분 집계(UploadAnalyzer)를 병합합니다.
+- 상위 N 표는 SpaceSaving, 고유 클라이언트/호스트 수는 HyperLogLog로 집계합니다 (둘 다 병합 가능).
+- 파싱된 레코드는 구간별 임시 SQLite 파일(shard)에 기록되고, 그리드는 upload_id로 페이지 조회합니다.
+- 진행 상황(바이트/구간 수)은 UploadJob으로 조회합니다.
+메모리는 파일 크기가 아니라 스케치 크기(TRAFFIC_LOG_UPLOAD_SKETCH_CAPACITY)와 블록 크기에 비례합니다.
+"""
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from app.services.traffic_log_histogram import HISTOGRAM_METRICS, bucket_start, merge_buckets
+from app.services.traffic_log_jobs import CANCELLED, COMPLETED, FAILED, FINISHED_STATES, QUEUED, RUNNING
+from app.utils.sketches import HyperLogLog, SpaceSaving
+from app.utils.traffic_log_parser import FIELDS, parse_epoch, parse_log_lines
+
+logger = logging.getLogger(__name__)
+
+# 상위 N 추정기당 유지하는 키 수 (실제 메모리는 최대 2배)
+UPLOAD_SKETCH_CAPACITY = int(os.getenv("TRAFFIC_LOG_UPLOAD_SKETCH_CAPACITY", "10000"))
+# 한 번에 읽어 파싱/기록하는 바이트 수
+UPLOAD_BLOCK_BYTES = int(os.getenv("TRAFFIC_LOG_UPLOAD_BLOCK_BYTES", str(4 * 1024 * 1024)))
+# 구간 크기 상한 (진행률 단위이자 워커 1회 작업량)
+UPLOAD_CHUNK_BYTES = int(os.getenv("TRAFFIC_LOG_UPLOAD_CHUNK_BYTES", str(64 * 1024 * 1024)))
+# 이보다 작은 파일은 프로세스 풀 없이 요청 스레드에서 분석
+UPLOAD_PARALLEL_MIN_BYTES = int(os.getenv("TRAFFIC_LOG_UPLOAD_PARALLEL_MIN_BYTES", str(32 * 1024 * 1024)))
+# 임시 저장소에 기록하는 최대 레코드 수 (집계는 파일 전체에 대해 계속합니다)
+UPLOAD_MAX_STORED_ROWS = int(os.getenv("TRAFFIC_LOG_UPLOAD_MAX_STORED_ROWS", "5000000"))
+# 보관하는 업로드 수와 보관 시간 (초)
+UPLOAD_RETAIN = int(os.getenv("TRAFFIC_LOG_UPLOAD_RETAIN", "3"))
+UPLOAD_TTL_SEC = int(os.getenv("TRAFFIC_LOG_UPLOAD_TTL_SEC", "3600"))
+# 시간 히스토그램 기본 구간 (초). 조회 간격은 이 값의 배수여야 합니다
+UPLOAD_HISTOGRAM_BASE_SEC = int(os.getenv("TRAFFIC_LOG_UPLOAD_HISTOGRAM_BASE_SEC", "10"))
+# 분석 응답에 함께 싣는 첫 페이지 레코드 수
+UPLOAD_PREVIEW_ROWS = 100
+# 워커당 구간 수 (진행률/부하 분산용)
+_CHUNKS_PER_WORKER = 4
+_SPOOL_COPY_BYTES = 1024 * 1024
+_CANCEL_POLL_SEC = 0.5
+
+_URL_KEY_MAX = 2048
+
+
+def _tmp_dir() -> str:
+    base = os.getenv("TRAFFIC_LOG_UPLOAD_TMP_DIR") or os.path.join(tempfile.gettempdir(), "traffic_log_uploads")
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+_COLUMNS_SQL = ", ".join(f'"{name}"' for name in FIELDS)
+_INSERT_SQL = f"INSERT INTO records ({_COLUMNS_SQL}) VALUES ({', '.join('?' * len(FIELDS))})"
+
+
+class RecordShard:
+    """구간 1개의 파싱된 레코드를 담는 임시 SQLite 파일 (쓰기 전용, 워커 프로세스에서 사용)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"CREATE TABLE records (id INTEGER PRIMARY KEY, {_COLUMNS_SQL})")
+
+    def append(self, columns: Dict[str, List[Any]]) -> None:
+        rows = list(zip(*(columns[name] for name in FIELDS)))
+        self._conn.executemany(_INSERT_SQL, rows)
+        self._conn.commit()
+        self.count += len(rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class UploadRecordStore:
+    """업로드 1건의 shard들을 순서대로 이어 붙여 페이지 조회합니다"""
+
+    def __init__(self, shards: List[Tuple[str, int]]):
+        self._shards = [(path, count) for path, count in shards if count > 0]
+        self.count = sum(count for _, count in self._shards)
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def _conn(self, path: str) -> sqlite3.Connection:
+        conn = self._conns.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            self._conns[path] = conn
+        return conn
+
+    def page(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        with self._lock:
+            base = 0
+            for path, count in self._shards:
+                if len(records) >= limit:
+                    break
+                if offset >= base + count:
+                    base += count
+                    continue
+                # shard 안의 rowid는 1부터 연속이므로 OFFSET 스캔 없이 PK 범위로 찾습니다
+                cur = self._conn(path).execute(
+                    "SELECT * FROM records WHERE id > ? ORDER BY id LIMIT ?",
+                    (max(0, offset - base), limit - len(records)),
+                )
+                names = [d[0] for d in cur.description]
+                records.extend(dict(zip(names, row)) for row in cur.fetchall())
+                base += count
+        for rec in records:
+            if rec.get("web_socket") is not None:
+                rec["web_socket"] = bool(rec["web_socket"])
+        return records
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._conns.clear()
+
+
+def _cap_shards(shards: List[Tuple[str, int]], max_rows: int) -> List[Tuple[str, int]]:
+    """레코드 상한을 넘는 shard는 잘라내거나 삭제합니다"""
+    kept: List[Tuple[str, int]] = []
+    room = max_rows
+    for path, count in shards:
+        if room <= 0:
+            os.remove(path)
+            continue
+        if count > room:
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("DELETE FROM records WHERE id > ?", (room,))
+                conn.commit()
+            finally:
+                conn.close()
+            count = room
+        kept.append((path, count))
+        room -= count
+    return kept
+
+
+@dataclass
+class UploadJob:
+    id: str
+    directory: str
+    filename: Optional[str] = None
+    status: str = QUEUED
+    error: Optional[str] = None
+    bytes_total: int = 0
+    bytes_done: int = 0
+    chunks_total: int = 0
+    chunks_done: int = 0
+    workers: int = 0
+    result: Optional[Dict[str, Any]] = None
+    store: Optional[UploadRecordStore] = None
+    # UploadAnalyzer.histogram (기본 구간별 표, 완료 후 설정)
+    histogram: Optional[Dict[int, List[int]]] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def spool_path(self) -> str:
+        return os.path.join(self.directory, "upload.log")
+
+    def shard_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"shard_{index:05d}.db")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "bytes_total": self.bytes_total,
+            "bytes_done": self.bytes_done,
+            "chunks_total": self.chunks_total,
+            "chunks_done": self.chunks_done,
+            "workers": self.workers,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def close(self) -> None:
+        self.cancel_event.set()
+        if self.store is not None:
+            self.store.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class UploadRegistry:
+    """업로드 작업 보관 (개수/시간 초과분은 디렉터리째 삭제, 진행 중 작업은 개수 제한에서 제외)"""
+
+    def __init__(self, retain: int = UPLOAD_RETAIN, ttl_sec: int = UPLOAD_TTL_SEC):
+        self.retain = retain
+        self.ttl_sec = ttl_sec
+        self._jobs: "OrderedDict[str, UploadJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, filename: Optional[str] = None) -> UploadJob:
+        upload_id = uuid.uuid4().hex
+        directory = os.path.join(_tmp_dir(), f"upload_{upload_id}")
+        os.makedirs(directory, exist_ok=True)
+        job = UploadJob(id=upload_id, directory=directory, filename=filename)
+        with self._lock:
+            self._jobs[upload_id] = job
+            expired = self._expire_locked()
+        for old in expired:
+            old.close()
+        return job
+
+    def get(self, upload_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            expired = self._expire_locked()
+            job = self._jobs.get(upload_id)
+        for old in expired:
+            old.close()
+        return job
+
+    def discard(self, upload_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            job = self._jobs.pop(upload_id, None)
+        if job:
+            job.close()
+        return job
+
+    def clear(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            job.close()
+
+    def _expire_locked(self) -> List[UploadJob]:
+        now = time.time()
+        expired = [j for j in self._jobs.values() if now - j.created_at > self.ttl_sec]
+        for j in expired:
+            self._jobs.pop(j.id, None)
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATES]
+        for j in finished[: max(0, len(self._jobs) - self.retain)]:
+            self._jobs.pop(j.id, None)
+            expired.append(j)
+        return expired
+
+
+upload_registry = UploadRegistry()
+
+
+def _parse_log_datetime(value: str) -> Optional[datetime]:
+    s = value.strip()
+    if s.startswith("[") and s.endswith("]"):
+        s = s[1:-1]
+    try:
+        return datetime.strptime(s, "%d/%b/%Y:%H:%M:%S %z")
+    except ValueError:
+        return None
+
+
+_SKETCHES = ("hosts", "urls", "clients", "client_recv", "client_sent", "host_recv", "host_sent")
+
+
+class UploadAnalyzer:
+    """파싱된 컬럼 블록의 요약/상위 N 부분 집계 (구간별로 만들고 merge로 합칩니다)"""
+
+    def __init__(self, capacity: int = UPLOAD_SKETCH_CAPACITY):
+        self.parsed_lines = 0
+        self.blocked = 0
+        self.total_recv = 0
+        self.total_sent = 0
+        # (epoch 초, 원본 datetime 문자열): 비교는 정수로, 결과 표시 때만 datetime으로 변환
+        self.earliest: Optional[Tuple[int, str]] = None
+        self.latest: Optional[Tuple[int, str]] = None
+        self.unique_clients = HyperLogLog()
+        self.unique_hosts = HyperLogLog()
+        self.hosts = SpaceSaving(capacity)
+        self.urls = SpaceSaving(capacity)
+        self.clients = SpaceSaving(capacity)
+        self.client_recv = SpaceSaving(capacity)
+        self.client_sent = SpaceSaving(capacity)
+        self.host_recv = SpaceSaving(capacity)
+        self.host_sent = SpaceSaving(capacity)
+        # 기본 구간 시작 epoch 초 → HISTOGRAM_METRICS 값
+        self.histogram: Dict[int, List[int]] = {}
+
+    def consume(self, cols: Dict[str, List[Any]]) -> None:
+        self.parsed_lines += len(cols["client_ip"])
+
+        # 같은 초의 시각 문자열은 블록 안에서 한 번만 파싱합니다
+        epochs = {s: parse_epoch(s) if s else None for s in set(cols["datetime"])}
+        base = UPLOAD_HISTOGRAM_BASE_SEC
+        histogram = self.histogram
+
+        # 같은 클라이언트/호스트는 블록 안에서 한 번만 HLL에 넣습니다
+        seen_clients = set()
+        seen_hosts = set()
+        for client_ip, url_host, url_path, recv_b, sent_b, action_names, status, dt in zip(
+            cols["client_ip"], cols["url_host"], cols["url_path"], cols["recv_byte"],
+            cols["sent_byte"], cols["action_names"], cols["response_statuscode"], cols["datetime"],
+        ):
+            recv_v = max(0, recv_b) if isinstance(recv_b, int) else None
+            sent_v = max(0, sent_b) if isinstance(sent_b, int) else None
+
+            if client_ip:
+                self.clients.add(client_ip)
+                seen_clients.add(client_ip)
+                if recv_v is not None:
+                    self.client_recv.add(client_ip, recv_v)
+                    self.total_recv += recv_v
+                if sent_v is not None:
+                    self.client_sent.add(client_ip, sent_v)
+                    self.total_sent += sent_v
+            if url_host:
+                self.hosts.add(url_host)
+                seen_hosts.add(url_host)
+                if recv_v is not None:
+                    self.host_recv.add(url_host, recv_v)
+                if sent_v is not None:
+                    self.host_sent.add(url_host, sent_v)
+            if url_host or url_path:
+                self.urls.add((url_host + url_path)[:_URL_KEY_MAX])
+
+            blocked = action_names.strip().lower() == "block"
+            if blocked:
+                self.blocked += 1
+
+            ts = epochs[dt]
+            if ts is not None:
+                bucket = bucket_start(ts, base)
+                acc = histogram.get(bucket)
+                if acc is None:
+                    acc = histogram[bucket] = [0] * len(HISTOGRAM_METRICS)
+                acc[0] += 1
+                acc[1] += recv_v or 0
+                acc[2] += sent_v or 0
+                acc[3] += blocked
+                if isinstance(status, int):
+                    acc[4] += 400 <= status <= 499
+                    acc[5] += 500 <= status <= 599
+
+        for ip in seen_clients:
+            self.unique_clients.add(ip)
+        for host in seen_hosts:
+            self.unique_hosts.add(host)
+        for s, ts in epochs.items():
+            if ts is not None:
+                self._observe_time((ts, s))
+
+    def _observe_time(self, t: Tuple[int, str]) -> None:
+        if self.earliest is None or t[0] < self.earliest[0]:
+            self.earliest = t
+        if self.latest is None or t[0] > self.latest[0]:
+            self.latest = t
+
+    def merge(self, other: "UploadAnalyzer") -> None:
+        self.parsed_lines += other.parsed_lines
+        self.blocked += other.blocked
+        self.total_recv += other.total_recv
+        self.total_sent += other.total_sent
+        for t in (other.earliest, other.latest):
+            if t is not None:
+                self._observe_time(t)
+        merge_buckets(self.histogram, other.histogram)
+        self.unique_clients.merge(other.unique_clients)
+        self.unique_hosts.merge(other.unique_hosts)
+        for name in _SKETCHES:
+            getattr(self, name).merge(getattr(other, name))
+
+    def result(self, top_n: int) -> Dict[str, Any]:
+        sketches = [getattr(self, name) for name in _SKETCHES]
+        earliest = _parse_log_datetime(self.earliest[1]) if self.earliest else None
+        latest = _parse_log_datetime(self.latest[1]) if self.latest else None
+        return {
+            "summary": {
+                "total_lines": self.parsed_lines,
+                "parsed_lines": self.parsed_lines,
+                "unparsed_lines": 0,
+                "unique_clients": self.unique_clients.count(),
+                "unique_hosts": self.unique_hosts.count(),
+                "total_recv_bytes": self.total_recv,
+                "total_sent_bytes": self.total_sent,
+                "blocked_requests": self.blocked,
+                "time_range_start": (earliest.isoformat() if earliest else None),
+                "time_range_end": (latest.isoformat() if latest else None),
+                "top_exact": all(s.exact for s in sketches),
+                "unique_counts_estimated": True,
+            },
+            "top": {
+                "hosts_by_requests": self.hosts.top(top_n),
+                "urls_by_requests": self.urls.top(top_n),
+                "clients_by_requests": self.clients.top(top_n),
+                "clients_by_recv_bytes": self.client_recv.top(top_n),
+                "clients_by_sent_bytes": self.client_sent.top(top_n),
+                "hosts_by_recv_bytes": self.host_recv.top(top_n),
+                "hosts_by_sent_bytes": self.host_sent.top(top_n),
+                # Backward compatibility
+                "clients_by_download_bytes": self.client_recv.top(top_n),
+                "clients_by_upload_bytes": self.client_sent.top(top_n),
+                "hosts_by_download_bytes": self.host_recv.top(top_n),
+                "hosts_by_upload_bytes": self.host_sent.top(top_n),
+            },
+        }
+
+
+
+
+def split_byte_ranges(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """파일을 chunk_bytes 내외의 [start, end) 구간으로 나눕니다. 각 구간 끝은 줄바꿈 직후로 맞춥니다."""
+    size = os.path.getsize(path)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = start + max(1, chunk_bytes)
+            if end < size:
+                f.seek(end - 1)
+                f.readline()
+                end = min(f.tell(), size)
+            else:
+                end = size
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def analyze_chunk(
+    path: str,
+    start: int,
+    end: int,
+    shard_path: Optional[str],
+    capacity: int = UPLOAD_SKETCH_CAPACITY,
+    block_bytes: int = UPLOAD_BLOCK_BYTES,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Tuple[UploadAnalyzer, int]:
+    """파일의 [start, end) 구간을 집계하고 레코드를 shard_path에 기록합니다 (프로세스 풀 진입점).
+
+    반환값: (부분 집계, shard에 기록한 레코드 수)
+    """
+    analyzer = UploadAnalyzer(capacity)
+    shard = RecordShard(shard_path) if shard_path else None
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            tail = b""
+            while remaining > 0:
+                data = f.read(min(block_bytes, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                data = tail + data
+                if remaining > 0:
+                    cut = data.rfind(b"\n") + 1
+                    if cut == 0:
+                        # 블록보다 긴 줄: 줄바꿈이 나올 때까지 이어 읽습니다
+                        tail = data
+                        continue
+                    data, tail = data[:cut], data[cut:]
+                else:
+                    tail = b""
+                cols = parse_log_lines(data)
+                analyzer.consume(cols)
+                if shard is not None:
+                    shard.append(cols)
+                if on_progress is not None:
+                    on_progress(len(data))
+    finally:
+        if shard is not None:
+            shard.close()
+    return analyzer, (shard.count if shard is not None else 0)
+
+
+def spool_upload(fileobj: BinaryIO, filename: Optional[str] = None) -> UploadJob:
+    """업로드 스트림을 작업 디렉터리에 파일로 내려 받고 작업을 등록합니다."""
+    job = upload_registry.create(filename)
+    try:
+        with open(job.spool_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, _SPOOL_COPY_BYTES)
+    except Exception:
+        upload_registry.discard(job.id)
+        raise
+    job.bytes_total = os.path.getsize(job.spool_path)
+    return job
+
+
+def _chunk_bytes_for(size: int, workers: int) -> int:
+    # 워커마다 여러 구간이 돌아가도록 나누되 구간 크기는 UPLOAD_CHUNK_BYTES 이하
+    per_chunk = math.ceil(size / max(1, workers * _CHUNKS_PER_WORKER))
+    return max(UPLOAD_BLOCK_BYTES, min(UPLOAD_CHUNK_BYTES, per_chunk))
+
+
+def _pool_for(size: int) -> Tuple[Optional[Executor], int]:
+    if size < UPLOAD_PARALLEL_MIN_BYTES:
+        return None, 1
+    from app.services.analysis_pool import ANALYSIS_POOL_WORKERS, get_analysis_pool
+    pool = get_analysis_pool()
+    return (pool, ANALYSIS_POOL_WORKERS) if pool is not None else (None, 1)
+
+
+def run_upload_analysis(job: UploadJob, top_n: int, executor: Optional[Executor] = None,
+                        workers: int = 1, chunk_bytes: Optional[int] = None) -> None:
+    """내려 받은 업로드 파일을 구간별로 분석하고 병합해 job.result/job.store를 채웁니다.
+
+    executor가 없으면 현재 스레드에서 구간을 차례로 처리합니다 (블록 단위 진행률).
+    """
+    job.status = RUNNING
+    job.workers = workers
+    try:
+        ranges = split_byte_ranges(job.spool_path, chunk_bytes or _chunk_bytes_for(job.bytes_total, workers))
+        job.chunks_total = len(ranges)
+        merged = UploadAnalyzer()
+        shard_counts: Dict[int, int] = {}
+        # 동률 순서가 실행 순서에 좌우되지 않도록 구간 순서대로 병합합니다
+        ready: Dict[int, Tuple[UploadAnalyzer, int]] = {}
+
+        def _merge(index: int, part: Tuple[UploadAnalyzer, int]) -> None:
+            ready[index] = part
+            job.chunks_done += 1
+            while len(shard_counts) in ready:
+                i = len(shard_counts)
+                analyzer, count = ready.pop(i)
+                merged.merge(analyzer)
+                shard_counts[i] = count
+
+        if executor is None:
+            def _progress(n: int) -> None:
+                job.bytes_done += n
+
+            for i, (start, end) in enumerate(ranges):
+                if job.cancel_event.is_set():
+                    break
+                _merge(i, analyze_chunk(job.spool_path, start, end, job.shard_path(i), on_progress=_progress))
+        else:
+            pending: Dict[Future, Tuple[int, int]] = {
+                executor.submit(analyze_chunk, job.spool_path, start, end, job.shard_path(i)): (i, end - start)
+                for i, (start, end) in enumerate(ranges)
+            }
+            try:
+                while pending and not job.cancel_event.is_set():
+                    done, _ = wait(pending, timeout=_CANCEL_POLL_SEC, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        index, size = pending.pop(fut)
+                        _merge(index, fut.result())
+                        job.bytes_done += size
+            finally:
+                for fut in pending:
+                    fut.cancel()
+
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            return
+
+        shards = _cap_shards(
+            [(job.shard_path(i), shard_counts[i]) for i in range(len(ranges))], UPLOAD_MAX_STORED_ROWS
+        )
+        job.store = UploadRecordStore(shards)
+        os.remove(job.spool_path)
+
+        result = merged.result(top_n)
+        result["upload_id"] = job.id
+        result["record_count"] = job.store.count
+        result["records_truncated"] = job.store.count < merged.parsed_lines
+        result["records"] = job.store.page(0, UPLOAD_PREVIEW_ROWS)
+        job.result = result
+        job.histogram = merged.histogram
+        job.status = COMPLETED
+    except Exception as e:
+        logger.error(f"[traffic_log_upload] Analysis failed for upload {job.id}: {e}")
+        job.status = FAILED
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+
+
+def analyze_upload(job: UploadJob, top_n: int) -> None:
+    """파일 크기에 따라 프로세스 풀 또는 현재 스레드에서 분석합니다."""
+    executor, workers = _pool_for(job.bytes_total)
+    run_upload_analysis(job, top_n, executor, workers)
+
+
+def start_upload_analysis(job: UploadJob, top_n: int) -> None:
+    """분석을 백그라운드 스레드에서 시작합니다. 진행 상황은 job.as_dict()로 확인합니다."""
+    threading.Thread(
+        target=analyze_upload, args=(job, top_n), name=f"traffic-log-upload-{job.id[:8]}", daemon=True
+    ).start()
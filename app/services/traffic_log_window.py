@@ -0,0 +1,208 @@
+"""
+시간 구간(start~end) 트래픽 로그 조회
+
+MWG 접근 로그는 시간순으로 기록되므로 원격 파일에서 구간 시작 위치를 이분 탐색합니다.
+한 번의 SSH 명령으로 여러 위치를 dd로 조금씩 읽어(probe) 각 위치 다음 줄의 시각을 확인하고,
+범위를 (WINDOW_FANOUT+1)등분씩 좁혀 WINDOW_STOP_BYTES 이하가 되면 그 위치부터 읽습니다.
+읽기는 원격 awk가 줄 시각으로 구간을 거르고, 구간 끝을 WINDOW_SLACK_SEC 넘긴 줄을 만나면 종료하므로
+전체 파일 대신 구간 주변 몇 MB만 읽습니다. 로그 기록 순서가 요청 시각과 조금 어긋나는 경우를 위해
+탐색 목표와 종료 조건에 WINDOW_SLACK_SEC만큼 여유를 둡니다.
+"""
+import os
+import shlex
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models.proxy import Proxy
+from app.utils.crypto import decrypt_string_if_encrypted
+from app.utils.ssh import ssh_exec_stream
+from app.utils.time import KST_TZ
+
+# 로그 기록 순서와 요청 시각의 최대 어긋남 (초)
+WINDOW_SLACK_SEC = int(os.getenv("TRAFFIC_LOG_WINDOW_SLACK_SEC", "300"))
+# probe 1회에 읽는 바이트, 한 번에 확인하는 위치 수, 탐색을 멈추는 남은 범위 크기
+WINDOW_PROBE_BYTES = 4096
+WINDOW_FANOUT = 8
+WINDOW_STOP_BYTES = 256 * 1024
+
+_PROBE_MARK = b"\n@@PROBE "
+_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+_KEY_FORMAT = "%Y%m%d%H%M%S"
+
+# 줄 맨 앞 "[05/Jan/2026:09:00:00 +0900]"을 YYYYMMDDhhmmss 키로 바꿔 s~e 구간만 출력, x를 넘으면 종료
+_WINDOW_AWK = r"""BEGIN { M = "JanFebMarAprMayJunJulAugSepOctNovDec" }
+match($0, /^\[?[0-9][0-9]\/[A-Z][a-z][a-z]\/[0-9][0-9][0-9][0-9]:[0-9][0-9]:[0-9][0-9]:[0-9][0-9]/) {
+  t = substr($0, RSTART, RLENGTH); sub(/^\[/, "", t)
+  k = substr(t, 8, 4) sprintf("%02d", (index(M, substr(t, 4, 3)) + 2) / 3) substr(t, 1, 2) substr(t, 13, 2) substr(t, 16, 2) substr(t, 19, 2)
+  if (k > x) exit
+  if (k >= s && k <= e) print
+}"""
+
+# probe 결과: 요청 위치 → (그 위치 이후 첫 줄의 시작 바이트, 줄 시각) 또는 None(줄/시각 없음)
+ProbeResult = Dict[int, Optional[Tuple[int, datetime]]]
+
+
+def parse_log_time(line: bytes) -> Optional[datetime]:
+    """줄 맨 앞 datetime 필드의 시각 (없거나 형식이 다르면 None)"""
+    head = line[:40].decode("ascii", "ignore")
+    s = head.split(" :| ", 1)[0].strip()
+    if s.startswith("["):
+        s = s[1:]
+    end = s.find("]")
+    if end >= 0:
+        s = s[:end]
+    try:
+        return datetime.strptime(s, _TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def probe_command(log_path: str, offsets: List[int], probe_bytes: int = WINDOW_PROBE_BYTES) -> str:
+    """각 위치에서 probe_bytes씩 읽는 원격 명령. 출력은 '\\n@@PROBE <위치>\\n' 뒤에 읽은 바이트."""
+    safe_path = shlex.quote(log_path)
+    reads = "; ".join(
+        f"printf '\\n@@PROBE {int(o)}\\n'; dd if={safe_path} bs={int(probe_bytes)} skip={int(o)} "
+        f"iflag=skip_bytes count=1 2>/dev/null"
+        for o in offsets
+    )
+    return f"timeout 15s nice -n 10 ionice -c2 -n7 sh -c {shlex.quote(reads)}"
+
+
+def parse_probe_output(data: bytes) -> Dict[int, bytes]:
+    chunks: Dict[int, bytes] = {}
+    for part in data.split(_PROBE_MARK)[1:]:
+        header, _, body = part.partition(b"\n")
+        try:
+            chunks[int(header)] = body
+        except ValueError:
+            continue
+    return chunks
+
+
+def first_line_at(offset: int, read_from: int, chunk: bytes) -> Optional[Tuple[int, datetime]]:
+    """chunk(파일의 read_from부터 읽은 바이트)에서 offset 이후 시작하는 첫 줄의 (시작 위치, 시각)"""
+    skip = offset - read_from
+    if offset == 0:
+        start = 0
+    else:
+        nl = chunk.find(b"\n", max(0, skip - 1))
+        if nl < 0:
+            return None
+        start = nl + 1
+    ts = parse_log_time(chunk[start:])
+    return (read_from + start, ts) if ts is not None else None
+
+
+def find_start_offset(probe: Callable[[List[int]], ProbeResult], size: int, target: datetime,
+                      fanout: int = WINDOW_FANOUT, stop_bytes: int = WINDOW_STOP_BYTES) -> Tuple[int, Optional[tzinfo]]:
+    """target 이상 시각의 첫 줄 근처(그 앞 stop_bytes 이내) 바이트 위치와 로그의 시간대.
+
+    반환 위치가 줄 중간일 수 있으므로 읽는 쪽에서 첫 조각 줄을 버려야 합니다.
+    """
+    lo, hi = 0, size
+    tz: Optional[tzinfo] = None
+    while hi - lo > stop_bytes:
+        step = (hi - lo) / (fanout + 1)
+        offsets = sorted({lo + int(step * (i + 1)) for i in range(fanout)})
+        results = probe(offsets)
+        new_lo, new_hi = lo, hi
+        for o in offsets:
+            r = results.get(o)
+            if r is None:
+                continue
+            line_start, ts = r
+            tz = tz or ts.tzinfo
+            if ts < target:
+                new_lo = max(new_lo, line_start + 1)
+            else:
+                new_hi = min(new_hi, line_start)
+        if new_lo > new_hi:
+            # 순서가 크게 어긋난 구간: 더 앞쪽 위치에서 읽기 시작
+            new_lo = new_hi
+        if (new_lo, new_hi) == (lo, hi):
+            break
+        lo, hi = new_lo, new_hi
+    if tz is None:
+        r = probe([lo]).get(lo)
+        tz = r[1].tzinfo if r else None
+    return lo, tz
+
+
+def remote_probe(proxy: Proxy, log_path: str) -> Callable[[List[int]], ProbeResult]:
+    """SSH 1회로 여러 위치를 읽는 probe 함수"""
+    password = decrypt_string_if_encrypted(proxy.password)
+
+    def _probe(offsets: List[int]) -> ProbeResult:
+        read_from = {o: max(0, o - 1) for o in offsets}
+        data = b"".join(ssh_exec_stream(
+            proxy.host, proxy.port or 22, proxy.username, password,
+            probe_command(log_path, sorted(set(read_from.values()))),
+            timeout_sec=15, auth_timeout_sec=5, banner_timeout_sec=5,
+        ))
+        chunks = parse_probe_output(data)
+        return {
+            o: first_line_at(o, read_from[o], chunks[read_from[o]]) if read_from[o] in chunks else None
+            for o in offsets
+        }
+
+    return _probe
+
+
+def _key(dt: datetime, tz: Optional[tzinfo]) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=KST_TZ)
+    return dt.astimezone(tz or KST_TZ).strftime(_KEY_FORMAT)
+
+
+def window_source(log_path: str, offset: int, start: datetime, end: datetime, log_tz: Optional[tzinfo],
+                  timeout_sec: int) -> str:
+    """offset부터 읽어 start~end 줄만 출력하는 원격 명령 (구간 끝+WINDOW_SLACK_SEC를 지나면 종료)"""
+    awk = (
+        f"awk -v s={_key(start, log_tz)} -v e={_key(end, log_tz)} "
+        f"-v x={_key(end + timedelta(seconds=WINDOW_SLACK_SEC), log_tz)} {shlex.quote(_WINDOW_AWK)}"
+    )
+    return (
+        f"timeout {int(timeout_sec)}s nice -n 10 ionice -c2 -n7 "
+        f"tail -c +{int(offset) + 1} {shlex.quote(log_path)} | {awk}"
+    )
+
+
+def _search_stages(q: Optional[str], limit: int, direction: str, max_bytes: int, reverse: bool = False) -> str:
+    stages = f" | grep -F -- {shlex.quote(q)}" if q else ""
+    stages += f" | tail -n {int(limit)}" if direction == "tail" else f" | head -n {int(limit)}"
+    if reverse:
+        # 바이트 상한보다 먼저 뒤집어야 상한에 걸려도 앞쪽(최신) 줄이 남습니다
+        stages += " | tac"
+    return stages + f" | sed -e 's/[^[:print:]\\t]//g' | head -c {int(max_bytes)} | cat"
+
+
+def window_command(log_path: str, offset: int, start: datetime, end: datetime, log_tz: Optional[tzinfo],
+                   q: Optional[str], limit: int, direction: str, max_bytes: int, timeout_sec: int) -> str:
+    """window_source 결과에 q 검색과 limit을 적용하는 조회 명령"""
+    return window_source(log_path, offset, start, end, log_tz, timeout_sec) + _search_stages(q, limit, direction, max_bytes)
+
+
+def plan_window_source(proxy: Proxy, log_path: str, start: datetime, end: datetime, timeout_sec: int,
+                       size: Optional[int] = None) -> str:
+    """원격 파일에서 구간 시작 위치를 찾아 구간의 줄만 출력하는 명령을 만듭니다."""
+    from app.services.traffic_log_collector import stat_remote_log
+
+    if not log_path or ".." in log_path:
+        raise ValueError("invalid traffic_log_path")
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=KST_TZ)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=KST_TZ)
+    if size is None:
+        _, size = stat_remote_log(proxy, log_path)
+    offset, log_tz = find_start_offset(remote_probe(proxy, log_path), size,
+                                       start - timedelta(seconds=WINDOW_SLACK_SEC))
+    return window_source(log_path, offset, start, end, log_tz, timeout_sec)
+
+
+def plan_window_command(proxy: Proxy, log_path: str, start: datetime, end: datetime, q: Optional[str],
+                        limit: int, direction: str, max_bytes: int, timeout_sec: int,
+                        size: Optional[int] = None, reverse: bool = False) -> str:
+    """원격 파일에서 구간 시작 위치를 찾아 구간 조회 명령을 만듭니다 (reverse: 결과를 마지막 줄부터 출력)."""
+    return plan_window_source(proxy, log_path, start, end, timeout_sec, size=size) + _search_stages(
+        q, limit, direction, max_bytes, reverse)
@@ -28,6 +28,7 @@
     let PROXIES = [];
     window.PROXIES = PROXIES; 
     const STORAGE_KEY = 'tl_state_v1';
+    let CURRENT_JOB_ID = null;
     let IS_RESTORING = false;
     let tlGridApi = null;
     let LOG_RECORDS = [];
@@ -120,6 +121,9 @@
                 query: $('#tlQuery').val(),
                 limit: $('#tlLimit').val(),
                 direction: $('#tlDirection').val(),
+                rotatedFiles: $('#tlRotated').val(),
+                start: $('#tlStart').val(),
+                end: $('#tlEnd').val(),
                 timestamp: new Date().getTime()
             };
             localStorage.setItem(STORAGE_KEY, JSON.stringify(state));
@@ -153,6 +157,9 @@
             if (state.query !== undefined) $('#tlQuery').val(state.query);
             if (state.limit !== undefined) $('#tlLimit').val(state.limit);
             if (state.direction !== undefined) $('#tlDirection').val(state.direction);
+            if (state.rotatedFiles !== undefined) $('#tlRotated').val(state.rotatedFiles);
+            if (state.start !== undefined) $('#tlStart').val(state.start);
+            if (state.end !== undefined) $('#tlEnd').val(state.end);
             
             // DeviceSelector가 초기화된 후 상태 복원 수행 (initTrafficLogs에서 처리됨)
             // 여기서는 데이터만 복원
@@ -191,12 +198,26 @@
         $('#tlLoadBtn').addClass('is-loading');
 
         try {
+            // 진행 중인 이전 작업은 취소
+            if (CURRENT_JOB_ID) {
+                await fetch(`${API_BASE}/traffic-logs/jobs/${CURRENT_JOB_ID}`, { method: 'DELETE' }).catch(() => {});
+                CURRENT_JOB_ID = null;
+            }
+
             const query = $('#tlQuery').val() || '';
             const limit = $('#tlLimit').val() || 10000;
             const direction = $('#tlDirection').val() || 'tail';
+            const mode = $('#tlMode').val() || 'replace';
+            const rotatedFiles = $('#tlRotated').val() || 0;
+            const start = $('#tlStart').val() || '';
+            const end = $('#tlEnd').val() || '';
             const pIdsParam = Array.isArray(proxyIds) ? proxyIds.join(',') : proxyIds;
+            // datetime-local 값은 시간대가 없으므로 서버에서 KST로 해석
+            let windowParam = '';
+            if (start) windowParam += `&start=${encodeURIComponent(start)}`;
+            if (start && end) windowParam += `&end=${encodeURIComponent(end)}`;
 
-            const res = await fetch(`${API_BASE}/traffic-logs/collect?proxy_ids=${pIdsParam}&q=${encodeURIComponent(query)}&limit=${limit}&direction=${direction}`, {
+            const res = await fetch(`${API_BASE}/traffic-logs/collect?proxy_ids=${pIdsParam}&q=${encodeURIComponent(query)}&limit=${limit}&direction=${direction}&mode=${mode}&rotated_files=${rotatedFiles}${windowParam}`, {
                 method: 'POST'
             });
 
@@ -205,9 +226,20 @@
                 throw new Error(errData.detail || '수집 요청에 실패했습니다.');
             }
 
-            const data = await res.json();
-            const failMsg = data.failed > 0 ? ` (${data.failed}개 실패)` : '';
-            setStatus(`수집 완료 (${data.succeeded}개 성공${failMsg})`, 'is-primary is-light');
+            const started = await res.json();
+            CURRENT_JOB_ID = started.job_id;
+            const data = await waitForJob(started.job_id);
+            if (CURRENT_JOB_ID !== started.job_id) return;  // 새 작업으로 대체됨
+            CURRENT_JOB_ID = null;
+
+            if (data.status === 'cancelled') {
+                setStatus(`수집 취소됨 (${data.inserted.toLocaleString()}건 저장)`, 'is-light');
+            } else {
+                const failMsg = data.failed > 0 ? ` (${data.failed}개 실패)` : '';
+                setStatus(`수집 완료 (${data.succeeded}개 성공${failMsg}, ${data.inserted.toLocaleString()}건)`, 'is-primary is-light');
+                const errs = Object.entries(data.errors || {});
+                if (errs.length) showError(errs.map(([pid, e]) => `#${pid}: ${e}`).join(' / '));
+            }
 
             // 수집 완료 후 그리드 완전 재생성 (누적 방지)
             destroyTlGrid();
@@ -220,7 +252,47 @@
         }
     }
 
+    function renderJobProgress(job) {
+        const fetched = job.proxies.reduce((s, p) => s + (p.fetched || 0), 0);
+        const done = job.proxies.filter(p => p.status !== 'queued' && p.status !== 'running').length;
+        setStatus(`로그 수집 중... ${done}/${job.proxies.length} 프록시, ${fetched.toLocaleString()}줄 수신 / ${job.inserted.toLocaleString()}건 저장`, 'is-warning is-light');
+    }
+
+    // 작업 완료까지 대기: 웹소켓으로 진행 상황을 받고, 연결 실패 시 상태 API 폴링으로 대체
+    function waitForJob(jobId) {
+        const finished = (s) => s === 'completed' || s === 'failed' || s === 'cancelled';
+        const poll = async (resolve, reject) => {
+            try {
+                const res = await fetch(`${API_BASE}/traffic-logs/jobs/${jobId}`);
+                if (!res.ok) throw new Error('수집 작업 상태를 확인할 수 없습니다.');
+                const job = await res.json();
+                if (finished(job.status)) return resolve(job);
+                renderJobProgress(job);
+                setTimeout(() => poll(resolve, reject), 1000);
+            } catch (e) { reject(e); }
+        };
+        return new Promise((resolve, reject) => {
+            let settled = false;
+            try {
+                const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+                const ws = new WebSocket(`${protocol}//${window.location.host}${API_BASE}/ws/traffic-logs/jobs/${jobId}`);
+                ws.onmessage = (ev) => {
+                    const msg = JSON.parse(ev.data);
+                    if (msg.type !== 'progress') return;
+                    if (finished(msg.data.status)) { settled = true; ws.close(); resolve(msg.data); }
+                    else renderJobProgress(msg.data);
+                };
+                ws.onclose = () => { if (!settled) { settled = true; poll(resolve, reject); } };
+            } catch (e) {
+                poll(resolve, reject);
+            }
+        });
+    }
+
     function getDataSource() {
+        // 블록 시작 행 → 키셋 커서 (정렬/필터/검색 조건이 바뀌면 초기화)
+        let cursors = {};
+        let cursorKey = '';
         return {
             getRows: async (params) => {
                 let proxyIds = [];
@@ -272,13 +344,22 @@
 
                 try {
                     const searchVal = encodeURIComponent($('#tlQuickFilter').val() || '');
-                    const url = `${API_BASE}/traffic-logs?proxy_ids=${pIdsParam}&offset=${offset}&limit=${limit}&sort_col=${sortCol}&sort_dir=${sortDir}&filter_col=${filterCol}&filter_val=${encodeURIComponent(filterVal)}&search=${searchVal}`;
+                    const key = [pIdsParam, sortCol, sortDir, filterCol, filterVal, searchVal].join('|');
+                    if (key !== cursorKey) {
+                        cursors = {};
+                        cursorKey = key;
+                    }
+                    // 이전 블록의 next_cursor가 있으면 OFFSET 대신 키셋 페이징 (깊이와 무관하게 페이지 크기만 조회)
+                    const cursor = cursors[offset];
+                    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+                    const url = `${API_BASE}/traffic-logs?proxy_ids=${pIdsParam}&offset=${offset}&limit=${limit}&sort_col=${sortCol}&sort_dir=${sortDir}&filter_col=${filterCol}&filter_val=${encodeURIComponent(filterVal)}&search=${searchVal}${cursorParam}`;
                     const res = await fetch(url);
                     if (!res.ok) {
                         const errText = await res.text().catch(() => '');
                         throw new Error(`서버 오류 (${res.status}): ${errText.slice(0, 200)}`);
                     }
                     const data = await res.json();
+                    if (data.next_cursor) cursors[params.endRow] = data.next_cursor;
 
                     params.successCallback(data.records, data.total_count);
 
@@ -527,7 +608,7 @@
     }
 
     // ── 실시간 감시 ──────────────────────────────────────────────
-    let _liveInterval = null;
+    let _liveSocket = null;
     let _liveProxyId = null;
     const LIVE_MAX_ROWS = 1000;
 
@@ -623,27 +704,35 @@
         }
     }
 
-    async function fetchLiveLog() {
+    function connectLiveLog() {
         if (!_liveProxyId) return;
-        const initialLines = $('#liveInitialLines').val() || 100;
-        const q = encodeURIComponent($('#liveKeyword').val().trim());
-        const clientIp = encodeURIComponent($('#liveClientIp').val().trim());
-        const urlHost = encodeURIComponent($('#liveUrlHost').val().trim());
-        const url = `${API_BASE}/traffic-logs/live/${_liveProxyId}?initial_lines=${initialLines}&q=${q}&client_ip=${clientIp}&url_host=${urlHost}`;
-        try {
-            const res = await fetch(url);
-            if (!res.ok) {
-                const err = await res.json().catch(() => ({}));
-                setLiveStatus('오류: ' + (err.detail || res.status), 'error');
+        const params = new URLSearchParams({
+            initial_lines: $('#liveInitialLines').val() || 100,
+            q: $('#liveKeyword').val().trim(),
+            client_ip: $('#liveClientIp').val().trim(),
+            url_host: $('#liveUrlHost').val().trim(),
+        });
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const ws = new WebSocket(`${protocol}//${window.location.host}${API_BASE}/ws/traffic-logs/live/${_liveProxyId}?${params}`);
+        let dropped = 0;
+        _liveSocket = ws;
+        ws.onmessage = (ev) => {
+            const msg = JSON.parse(ev.data);
+            if (msg.type === 'error') {
+                setLiveStatus('오류: ' + msg.detail, 'error');
                 return;
             }
-            const data = await res.json();
-            appendLiveRecords(data.records);
-            const newMsg = data.new_lines > 0 ? `, +${data.new_lines}건` : ', 변화 없음';
-            setLiveStatus(`감시 중 (총 ${(data.total_count || 0).toLocaleString()}줄${newMsg})`, 'running');
-        } catch (e) {
-            setLiveStatus('연결 오류', 'error');
-        }
+            appendLiveRecords(msg.data);
+            dropped += msg.dropped || 0;
+            const dropMsg = dropped > 0 ? `, ${dropped.toLocaleString()}건 누락` : '';
+            setLiveStatus(msg.live ? `감시 중 (총 ${(msg.matched || 0).toLocaleString()}건${dropMsg})` : '최근 로그 읽는 중...', msg.live ? 'running' : 'loading');
+        };
+        ws.onclose = () => {
+            if (_liveSocket !== ws) return;
+            _liveSocket = null;
+            if ($('#liveStatus').text().startsWith('감시 중')) setLiveStatus('연결 종료', 'error');
+        };
+        ws.onerror = () => setLiveStatus('연결 오류', 'error');
     }
 
     function startLiveLog() {
@@ -652,10 +741,6 @@
         const keyword = $('#liveKeyword').val().trim();
         if (!keyword) { alert('키워드를 입력해야 시작할 수 있습니다.'); $('#liveKeyword').focus(); return; }
 
-        if (_liveProxyId && _liveProxyId !== proxyId) {
-            fetch(`${API_BASE}/traffic-logs/live/${_liveProxyId}`, { method: 'DELETE' }).catch(() => {});
-        }
-
         _liveProxyId = proxyId;
         $('#liveTableHead').empty();
         $('#liveTableBody').empty().append(
@@ -663,24 +748,22 @@
         );
         $('#liveStartBtn').hide();
         $('#liveStopBtn').show();
-        $('#liveProxySelect, #liveIntervalSelect, #liveInitialLines, #liveKeyword, #liveClientIp, #liveUrlHost').prop('disabled', true);
+        $('#liveProxySelect, #liveInitialLines, #liveKeyword, #liveClientIp, #liveUrlHost').prop('disabled', true);
         setLiveStatus('연결 중...', 'loading');
 
-        fetchLiveLog();
-        const intervalSec = parseInt($('#liveIntervalSelect').val()) || 10;
-        _liveInterval = setInterval(fetchLiveLog, intervalSec * 1000);
+        connectLiveLog();
     }
 
     function stopLiveLog() {
-        clearInterval(_liveInterval);
-        _liveInterval = null;
-        if (_liveProxyId) {
-            fetch(`${API_BASE}/traffic-logs/live/${_liveProxyId}`, { method: 'DELETE' }).catch(() => {});
+        if (_liveSocket) {
+            const ws = _liveSocket;
+            _liveSocket = null;
+            ws.close();
         }
         _liveProxyId = null;
         $('#liveStartBtn').show();
         $('#liveStopBtn').hide();
-        $('#liveProxySelect, #liveIntervalSelect, #liveInitialLines, #liveKeyword, #liveClientIp, #liveUrlHost').prop('disabled', false);
+        $('#liveProxySelect, #liveInitialLines, #liveKeyword, #liveClientIp, #liveUrlHost').prop('disabled', false);
         setLiveStatus('중지됨', '');
     }
 
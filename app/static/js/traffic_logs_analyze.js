@@ -23,11 +23,17 @@
             $('#tlaEmptyState').hide();
             $('#tlaDashboard').hide();
 
-            $.get(`/api/traffic-logs/analyze?proxy_ids=${pIdsParam}`)
+            // db 또는 remote:<줄 수> (프록시에서 직접 집계)
+            const [source, lines] = ($('#tlaSource').val() || 'db').split(':');
+            const remoteParam = source === 'remote' ? `&source=remote&lines=${lines}` : '';
+
+            $.get(`/api/traffic-logs/analyze?proxy_ids=${pIdsParam}${remoteParam}`)
                 .done((data) => {
                     this.lastData = data;
                     this.renderFromServerData(data);
-                    $('#tlaAnalyzeStatus').text(`분석 완료 (${(data.summary.total || 0).toLocaleString()}건)`);
+                    const failed = Object.keys(data.errors || {}).length;
+                    const failMsg = failed ? `, ${failed}대 실패` : '';
+                    $('#tlaAnalyzeStatus').text(`분석 완료 (${(data.summary.total || 0).toLocaleString()}건${failMsg})`);
                     setTimeout(() => $('#tlaAnalyzeStatus').hide(), 4000);
                 })
                 .fail((xhr) => {
@@ -251,24 +257,74 @@
                 formData.append('logfile', fileInput.files[0]);
                 $('#tlaRunBtn').addClass('is-loading');
 
+                const onResult = (res) => {
+                    if (res && res.records) {
+                        // 첫 페이지만 응답에 포함되며, 나머지는 upload_id로 페이지 조회합니다
+                        window.LOG_RECORDS = res.records;
+                        window.TL_UPLOAD = { id: res.upload_id, count: res.record_count };
+                        switchTlTab('analyze');
+                    }
+                };
+                const done = () => { $('#tlaRunBtn').removeClass('is-loading').text('업로드 및 분석 시작'); };
+
+                // 백그라운드 분석: 업로드 후 웹소켓으로 진행률을 받고, 완료 메시지에 결과가 실립니다
                 $.ajax({
-                    url: '/api/traffic-logs/analyze-upload',
+                    url: '/api/traffic-logs/analyze-upload?background=true',
                     method: 'POST',
                     data: formData,
                     processData: false,
                     contentType: false,
-                    success: (res) => {
-                        if (res.records) {
-                            window.LOG_RECORDS = res.records;
-                            switchTlTab('analyze');
-                        }
+                    success: (job) => {
+                        $('#tlaRunBtn').removeClass('is-loading');
+                        this.watchUploadProgress(job.upload_id)
+                            .then(onResult)
+                            .catch((msg) => alert('파일 분석 실패: ' + msg))
+                            .finally(done);
                     },
                     error: (xhr) => {
                         alert('파일 분석 실패: ' + (xhr.responseJSON?.detail || '알 수 없는 오류'));
-                    },
-                    complete: () => { $('#tlaRunBtn').removeClass('is-loading'); }
+                        done();
+                    }
                 });
             });
+        },
+
+        watchUploadProgress(uploadId) {
+            const render = (p) => {
+                const pct = p.bytes_total ? Math.floor(p.bytes_done * 100 / p.bytes_total) : 0;
+                $('#tlaRunBtn').text(`분석 중... ${pct}% (${p.chunks_done}/${p.chunks_total})`);
+            };
+            const fetchResult = () => $.getJSON(`/api/traffic-logs/analyze-upload/${uploadId}`);
+            return new Promise((resolve, reject) => {
+                const settle = (p) => {
+                    if (p.status === 'completed') resolve(p.result);
+                    else reject(p.error || p.status);
+                };
+                const poll = () => {
+                    fetchResult().done((p) => {
+                        render(p);
+                        if (['completed', 'failed', 'cancelled'].includes(p.status)) settle(p);
+                        else setTimeout(poll, 1000);
+                    }).fail(() => reject('상태 조회 실패'));
+                };
+                let settled = false;
+                try {
+                    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+                    const ws = new WebSocket(`${protocol}//${window.location.host}/api/ws/traffic-logs/analyze-upload/${uploadId}`);
+                    ws.onmessage = (ev) => {
+                        const msg = JSON.parse(ev.data);
+                        if (msg.type === 'progress') {
+                            render(msg.data);
+                            if (['failed', 'cancelled'].includes(msg.data.status)) { settled = true; ws.close(); settle(msg.data); }
+                        } else if (msg.type === 'result') {
+                            settled = true; ws.close(); resolve(msg.data);
+                        }
+                    };
+                    ws.onclose = () => { if (!settled) { settled = true; poll(); } };
+                } catch (e) {
+                    poll();
+                }
+            });
         }
     };
 
@@ -16,6 +16,17 @@ from app.utils.time import now_kst
 logger = logging.getLogger(__name__)
 
 
+def _serialize_threshold_events(events: dict) -> dict:
+    """웹소켓 전송용으로 구간 이벤트의 datetime을 ISO 문자열로 변환"""
+    out = {}
+    for kind, items in events.items():
+        out[kind] = [
+            {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in item.items()}
+            for item in items
+        ]
+    return out
+
+
 class BackgroundCollector:
     """백그라운드 수집 작업 관리자"""
     
@@ -26,6 +37,8 @@ class BackgroundCollector:
         self._lock = asyncio.Lock()
         self._retention_task: Optional[asyncio.Task] = None
         self._retention_interval_sec = 3600  # 1시간마다 실행
+        self._rollup_task: Optional[asyncio.Task] = None
+        self._rollup_interval_sec = 300  # 5분마다 종료된 시간 롤업
     
     async def register_websocket(self, websocket):
         """웹소켓 클라이언트 등록"""
@@ -147,7 +160,9 @@ class BackgroundCollector:
                             "failed": result["failed"],
                             "errors": result.get("errors", {}),
                             "duration_sec": round(collect_duration, 2),
-                            "next_collect_at": datetime.fromtimestamp(next_collect_time).isoformat()
+                            "next_collect_at": datetime.fromtimestamp(next_collect_time).isoformat(),
+                            "threshold_events": result.get("threshold_events", {}),
+                            "anomalies": result.get("anomalies", {}),
                         }
                     )
                 except Exception as e:
@@ -180,7 +195,10 @@ class BackgroundCollector:
     ) -> dict:
         """단일 수집 실행 (백그라운드에서 실행)"""
         # 순환 import 방지를 위해 여기서 import
+        from app.services.bulk_insert import insert_mappings
         from app.services.resource_collector import collect_for_proxy, get_interface_config_from_db
+        from app.services.threshold_episodes import record_threshold_samples
+        from app.services.resource_baselines import score_collected_rows
         
         db = SessionLocal()
         try:
@@ -249,7 +267,7 @@ class BackgroundCollector:
             collected_models: list[ResourceUsageModel] = []
             if collected_data:
                 try:
-                    db.bulk_insert_mappings(ResourceUsageModel, collected_data)
+                    insert_mappings(db, ResourceUsageModel, collected_data)
                     db.commit()
                     # Single query for all inserted records instead of N individual queries
                     inserted_proxy_ids = [d["proxy_id"] for d in collected_data]
@@ -278,12 +296,30 @@ class BackgroundCollector:
             # 저장 완료 로그
             logger.info(f"[BackgroundCollector] Saved {len(collected_models)} records to database "
                        f"(requested={len(proxies)}, failed={len(errors)})")
+
+            # 임계치 초과 구간 증분 검출 (샘플당 O(1), 종료된 구간만 저장)
+            threshold_events = {"opened": [], "closed": []}
+            if collected_data:
+                try:
+                    threshold_events = record_threshold_samples(db, collected_data)
+                except Exception as e:
+                    logger.error(f"[BackgroundCollector] Threshold episode detection failed: {e}")
+
+            # 요일-시간 기준선 대비 이상 점수 (캐시 조회, 샘플당 O(1))
+            anomalies = {}
+            if collected_data:
+                try:
+                    anomalies = score_collected_rows(db, collected_data)
+                except Exception as e:
+                    logger.error(f"[BackgroundCollector] Anomaly scoring failed: {e}")
             
             return {
                 "requested": len(proxies),
                 "succeeded": len(collected_models),
                 "failed": len(errors),
-                "errors": errors
+                "errors": errors,
+                "threshold_events": _serialize_threshold_events(threshold_events),
+                "anomalies": anomalies,
             }
         finally:
             db.close()
@@ -376,6 +412,8 @@ class BackgroundCollector:
     async def _periodic_retention(self):
         """주기적으로 보존 정책 실행"""
         from app.services.resource_collector import enforce_resource_usage_retention
+        from app.services.resource_rollups import enforce_rollup_retention
+        from app.services.traffic_log_snapshots import purge_expired_traffic_logs
         from app.database.database import SessionLocal
         
         try:
@@ -389,6 +427,8 @@ class BackgroundCollector:
                         db = SessionLocal()
                         try:
                             enforce_resource_usage_retention(db, days=90)
+                            enforce_rollup_retention(db, days=400)
+                            purge_expired_traffic_logs(db.get_bind())
                         finally:
                             db.close()
                     
@@ -400,6 +440,55 @@ class BackgroundCollector:
             logger.info("[BackgroundCollector] Retention policy task cancelled")
             raise
 
+    async def start_rollup_job(self, interval_sec: int = 300):
+        """시간 롤업/기준선 갱신 백그라운드 작업 시작 (기본 5분마다 실행)"""
+        if self._rollup_task is not None and not self._rollup_task.done():
+            logger.info("[BackgroundCollector] Rollup task already running")
+            return
+
+        self._rollup_interval_sec = interval_sec
+        self._rollup_task = asyncio.create_task(self._periodic_rollup())
+        logger.info(f"[BackgroundCollector] Started rollup task (interval={interval_sec}s)")
+
+    async def stop_rollup_job(self):
+        """시간 롤업/기준선 갱신 백그라운드 작업 중지"""
+        if self._rollup_task is not None:
+            self._rollup_task.cancel()
+            try:
+                await self._rollup_task
+            except asyncio.CancelledError:
+                pass
+            self._rollup_task = None
+            logger.info("[BackgroundCollector] Stopped rollup task")
+
+    async def _periodic_rollup(self):
+        """종료된 시간/날을 롤업하고 요일-시간 기준선과 예측 상태를 증분 갱신 (시작 직후 1회 실행)"""
+        from app.services.resource_baselines import run_baseline_cycle
+        from app.services.resource_forecast import run_forecast_cycle
+
+        def run_cycle():
+            db = SessionLocal()
+            try:
+                count = run_baseline_cycle(db)
+                # 날이 바뀌면 일별 집계와 예측 상태 갱신
+                run_forecast_cycle(db)
+                return count
+            finally:
+                db.close()
+
+        try:
+            while True:
+                try:
+                    count = await asyncio.to_thread(run_cycle)
+                    if count:
+                        logger.info(f"[BackgroundCollector] Rollup completed ({count} proxy/metric hours)")
+                except Exception as e:
+                    logger.error(f"[BackgroundCollector] Rollup error: {e}", exc_info=True)
+                await asyncio.sleep(self._rollup_interval_sec)
+        except asyncio.CancelledError:
+            logger.info("[BackgroundCollector] Rollup task cancelled")
+            raise
+
 
 # 전역 인스턴스
 background_collector = BackgroundCollector()
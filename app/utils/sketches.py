@@ -0,0 +1,105 @@
+"""
+스트리밍 집계용 근사 자료구조
+
+- SpaceSaving: 상위 N개(heavy hitter) 추정. 키 수와 무관하게 capacity의 2배까지만 메모리를 씁니다.
+- HyperLogLog: 고유값 개수 추정. 레지스터 2**precision 바이트, 표준 오차 약 1.04/sqrt(2**precision).
+"""
+import hashlib
+import math
+from typing import Dict, Hashable, List, Tuple
+
+
+class SpaceSaving:
+    """가중치를 지원하는 Space-Saving 상위 N 추정기
+
+    카운터가 2*capacity개를 넘으면 상위 capacity개만 남기고, 버린 카운터의 최댓값을 floor로 기억합니다.
+    이후 처음 보는 키는 floor부터 시작하므로 추정치는 실제값 이상, 실제값+floor 이하입니다
+    (floor ≤ 전체 가중치/capacity). 버린 적이 없으면 결과는 정확합니다.
+    """
+
+    __slots__ = ("capacity", "floor", "_counts")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.floor = 0
+        self._counts: Dict[Hashable, int] = {}
+
+    def add(self, key: Hashable, weight: int = 1) -> None:
+        counts = self._counts
+        current = counts.get(key)
+        if current is not None:
+            counts[key] = current + weight
+            return
+        counts[key] = self.floor + weight
+        if len(counts) > 2 * self.capacity:
+            self._compact()
+
+    def _compact(self) -> None:
+        ranked = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        kept, dropped = ranked[: self.capacity], ranked[self.capacity:]
+        if dropped:
+            self.floor = max(self.floor, dropped[0][1])
+        self._counts = dict(kept)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """다른 요약을 합칩니다. 한쪽에만 있는 키는 다른 쪽 floor를 더해 과대 추정 보장을 유지합니다."""
+        counts = self._counts
+        for key in counts.keys() - other._counts.keys():
+            counts[key] += other.floor
+        for key, value in other._counts.items():
+            counts[key] = counts.get(key, self.floor) + value
+        self.floor += other.floor
+        if len(counts) > 2 * self.capacity:
+            self._compact()
+
+    @property
+    def exact(self) -> bool:
+        return self.floor == 0
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        ranked = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:n]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+class HyperLogLog:
+    """HyperLogLog 고유값 개수 추정기 (작은 집합은 linear counting으로 보정)"""
+
+    __slots__ = ("precision", "_m", "_registers")
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+
+    def add(self, value: str) -> None:
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.precision)
+        rest = (h << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self._registers[idx]:
+            self._registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches with different precision")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def count(self) -> int:
+        m = self._m
+        registers = self._registers
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -3,7 +3,7 @@ import threading
 import time
 import logging
 import socket
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, Iterator, Callable
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +91,9 @@ class SSHPool:
 
 ssh_pool = SSHPool()
 
+# ssh_exec_stream(stop=...)에서 stop()을 확인하는 주기 (초)
+STREAM_STOP_POLL_SEC = 1.0
+
 # 재시도 불가 예외 — 인증 실패, 알 수 없는 호스트 등은 재시도해도 무의미
 _NO_RETRY_EXCEPTIONS = (
     paramiko.AuthenticationException,
@@ -208,3 +211,89 @@ def _ssh_exec_pooled(
     if exit_status != 0 and not stdout_str:
         raise RuntimeError(stderr_str.strip() or f"exit status {exit_status}")
     return stdout_str
+
+
+def ssh_exec_stream(
+    host: str,
+    port: int,
+    username: str,
+    password: Optional[str],
+    command: str,
+    *,
+    timeout_sec: int = 30,
+    auth_timeout_sec: Optional[int] = None,
+    banner_timeout_sec: Optional[int] = None,
+    disabled_algorithms: Optional[Dict[str, Any]] = None,
+    look_for_keys: bool = False,
+    allow_agent: bool = False,
+    chunk_size: int = 65536,
+    max_retries: int = 3,
+    stop: Optional[Callable[[], bool]] = None,
+) -> Iterator[bytes]:
+    """Execute a remote command over SSH and yield stdout incrementally as raw chunks.
+
+    ssh_exec과 달리 전체 출력을 메모리에 모으지 않는다. timeout_sec은 청크 사이의 최대 대기 시간이다.
+    재시도는 채널을 여는 단계까지만 수행하며, 데이터를 받기 시작한 뒤의 오류는 그대로 전파한다
+    (부분 출력이 중복 전달되지 않도록). 제너레이터를 닫으면 채널이 닫혀 원격 명령도 종료된다.
+    stop을 주면 출력이 없어도 timeout 없이 기다리며, 1초마다 stop()을 확인해 참이면 채널을 닫고 끝낸다
+    (tail -F처럼 끝나지 않는 명령용).
+    """
+    channel = None
+    last_exc: Exception = RuntimeError("SSH exec failed")
+    for attempt in range(max_retries):
+        try:
+            client = ssh_pool.get_client(
+                host=host,
+                port=port,
+                username=username,
+                password=password,
+                timeout_sec=timeout_sec,
+                auth_timeout_sec=auth_timeout_sec,
+                banner_timeout_sec=banner_timeout_sec,
+                disabled_algorithms=disabled_algorithms,
+                look_for_keys=look_for_keys,
+                allow_agent=allow_agent,
+            )
+            channel = client.get_transport().open_session()
+            channel.settimeout(STREAM_STOP_POLL_SEC if stop is not None else timeout_sec)
+            channel.exec_command(command)
+            break
+        except _NO_RETRY_EXCEPTIONS:
+            raise
+        except Exception as e:
+            last_exc = e
+            channel = None
+            if attempt < max_retries - 1:
+                wait = 2 ** attempt
+                logger.warning(
+                    "[SSHPool] %s:%s 스트림 연결 실패 (시도 %d/%d), %ds 후 재시도: %s",
+                    host, port, attempt + 1, max_retries, wait, e,
+                )
+                time.sleep(wait)
+    if channel is None:
+        logger.error("[SSHPool] %s:%s 최대 재시도 초과: %s", host, port, last_exc)
+        raise RuntimeError(str(last_exc))
+
+    try:
+        received = False
+        while True:
+            try:
+                data = channel.recv(chunk_size)
+            except socket.timeout:
+                if stop is None:
+                    raise
+                if stop():
+                    return
+                continue
+            if not data:
+                break
+            received = True
+            yield data
+        exit_status = channel.recv_exit_status()
+        if exit_status != 0 and not received:
+            err = b""
+            while channel.recv_stderr_ready():
+                err += channel.recv_stderr(chunk_size)
+            raise RuntimeError(err.decode(errors="ignore").strip() or f"exit status {exit_status}")
+    finally:
+        channel.close()
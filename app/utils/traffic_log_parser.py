@@ -1,4 +1,7 @@
-from typing import Dict, Any, List, Optional
+import calendar
+import sys
+from operator import itemgetter, methodcaller
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Union
 
 
 DELIMITER = " :| "
@@ -50,3 +53,170 @@ def parse_log_line(line: str) -> Dict[str, Any]:
 		record[field_name] = _coerce(field_name, raw)
 	return record
 
+
+# ---------------------------------------------------------------------------
+# Batch parser (column-oriented)
+# ---------------------------------------------------------------------------
+
+# Low-cardinality string columns: identical values share one string object
+INTERN_FIELDS = {
+	"cache_status","url_protocol","action_names","url_categories","url_reputationstring",
+	"mediatype_header","application_name","currentruleset","currentrule","url_geolocation",
+	"ssl_certificate_sigmethod",
+}
+
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_TRUE_VALUES = frozenset({"1","true","yes","y"})
+_count_delimiters = methodcaller("count", DELIMITER)
+
+
+def _to_int(value: str) -> Optional[int]:
+	try:
+		return int(value)
+	except ValueError:
+		return None
+
+
+def _to_float(value: str) -> Optional[float]:
+	try:
+		return float(value)
+	except ValueError:
+		return None
+
+
+def _int_column(values: List[str]) -> List[Optional[int]]:
+	# Whole-column conversion in C; fall back per value only when a column has bad/empty cells
+	try:
+		return list(map(int, values))
+	except ValueError:
+		return list(map(_to_int, values))
+
+
+def _float_column(values: List[str]) -> List[Optional[float]]:
+	try:
+		return list(map(float, values))
+	except ValueError:
+		return list(map(_to_float, values))
+
+
+def _bool_column(values: List[str]) -> List[bool]:
+	return list(map(_TRUE_VALUES.__contains__, map(str.lower, map(str.strip, values))))
+
+
+def _intern_column(values: List[str]) -> List[str]:
+	return list(map(sys.intern, values))
+
+
+def _column_converter(field_name: str):
+	"""Per-column converter (None = keep raw strings)"""
+	if field_name in NUMERIC_INT:
+		return _int_column
+	if field_name in NUMERIC_FLOAT:
+		return _float_column
+	if field_name in BOOL_FIELDS:
+		return _bool_column
+	if field_name in INTERN_FIELDS:
+		return _intern_column
+	return None
+
+
+_COLUMN_CONVERTERS = {name: _column_converter(name) for name in FIELDS}
+
+
+def _split_block(block: Union[str, bytes, bytearray, memoryview]) -> List[str]:
+	if not isinstance(block, str):
+		block = bytes(block).decode("utf-8", "ignore")
+	return block.split("\n")
+
+
+def parse_log_lines(
+	lines: Union[str, bytes, bytearray, memoryview, Iterable[str]],
+	fields: Optional[Sequence[str]] = None,
+) -> Dict[str, List[Any]]:
+	"""Parse many lines at once and return columns {field: [values...]}.
+
+	`lines` may be a text/bytes block (split on newlines) or an iterable of lines.
+	Empty lines are skipped; values match parse_log_line() for every kept line.
+	`fields` projects the result to the given columns (unknown names raise ValueError).
+	"""
+	if isinstance(lines, (str, bytes, bytearray, memoryview)):
+		kept = [ln for ln in _split_block(lines) if ln]
+	else:
+		kept = [ln.rstrip("\n") if ln.endswith("\n") else ln for ln in lines]
+		kept = [ln for ln in kept if ln]
+	names = list(FIELDS) if fields is None else list(fields)
+	unknown = [n for n in names if n not in FIELD_INDEX]
+	if unknown:
+		raise ValueError(f"unknown fields: {unknown}")
+
+	n_fields = len(FIELDS)
+	if kept and set(map(_count_delimiters, kept)) == {n_fields - 1}:
+		# Well-formed block: one split over the whole block, columns are strided slices
+		flat = DELIMITER.join(kept).split(DELIMITER)
+		raw_column = lambda i: flat[i::n_fields]
+	else:
+		pad = [""] * n_fields
+		rows = []
+		for ln in kept:
+			parts = ln.split(DELIMITER)
+			if len(parts) < n_fields:
+				parts += pad[:n_fields - len(parts)]
+			rows.append(parts)
+		raw_column = lambda i: list(map(itemgetter(i), rows))
+
+	columns: Dict[str, List[Any]] = {}
+	for name in names:
+		values = raw_column(FIELD_INDEX[name])
+		conv = _COLUMN_CONVERTERS[name]
+		columns[name] = conv(values) if conv is not None else values
+	return columns
+
+
+def columns_to_records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+	"""Turn parse_log_lines() output back into per-line dicts"""
+	names = list(columns.keys())
+	return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+# ---------------------------------------------------------------------------
+# Event time (epoch seconds)
+# ---------------------------------------------------------------------------
+
+_MONTHS = {m: i for i, m in enumerate(calendar.month_abbr) if m}
+
+
+def parse_epoch(value: str) -> Optional[int]:
+	"""'[05/Jan/2026:09:00:00 +0900]' -> UTC epoch seconds (None when malformed).
+
+	Fixed-position slicing instead of strptime; rejects the same inputs strptime would.
+	"""
+	s = value.strip()
+	if s.startswith("[") and s.endswith("]"):
+		s = s[1:-1]
+	if len(s) != 26 or s[2] != "/" or s[6] != "/" or s[11] != ":" or s[14] != ":" or s[17] != ":" \
+			or s[20] != " " or s[21] not in "+-":
+		return None
+	month = _MONTHS.get(s[3:6])
+	try:
+		day, year = int(s[0:2]), int(s[7:11])
+		hour, minute, second = int(s[12:14]), int(s[15:17]), int(s[18:20])
+		off_h, off_m = int(s[22:24]), int(s[24:26])
+	except ValueError:
+		return None
+	if month is None or hour > 23 or minute > 59 or second > 59 or off_m > 59 \
+			or not 1 <= day <= calendar.monthrange(year, month)[1]:
+		return None
+	offset = (off_h * 3600 + off_m * 60) * (-1 if s[21] == "-" else 1)
+	return calendar.timegm((year, month, day, hour, minute, second, 0, 0, 0)) - offset
+
+
+def epoch_column(values: Iterable[str]) -> List[Optional[int]]:
+	"""parse_epoch() over a datetime column; lines in the same second are parsed once"""
+	cache: Dict[str, Optional[int]] = {}
+	out = []
+	for v in values:
+		ts = cache.get(v, cache)
+		if ts is cache:
+			ts = cache[v] = parse_epoch(v) if v else None
+		out.append(ts)
+	return out
@@ -190,5 +190,8 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # 분석 프로세스 풀(spawn) 워커가 frozen 빌드에서 앱을 다시 실행하지 않도록 처리
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Create the FTS5 trigram search index (traffic_logs_fts) and its sync triggers for traffic_logs,
+then populate it from existing rows. SQLite only.
+This script can be run safely multiple times (idempotent). The app also runs it at startup.
+"""
+import sys
+import os
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import engine
+from app.services.traffic_log_search import ensure_traffic_log_fts
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    logger.info("Starting traffic_logs FTS index migration...")
+    if ensure_traffic_log_fts(engine):
+        logger.info("Migration completed successfully")
+    else:
+        logger.error("FTS5 index is not available for this database (non-SQLite or FTS5/trigram unsupported)")
+        sys.exit(1)
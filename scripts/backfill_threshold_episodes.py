@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Backfill threshold_episodes from existing resource_usage history.
+
+Replays stored samples through the same incremental detector that runs at collection time,
+for the thresholds currently configured in resource_config (__thresholds__ / __interface_thresholds__).
+Existing episodes for the configured (metric, threshold) pairs are replaced, so the script can be re-run.
+Episodes still open at the end of history are stored with is_open set; the app restores them into its
+detector at startup, so run the backfill while the app is stopped (or restart it afterwards).
+The coverage start of each configured pair is moved back to the first sample, so threshold-duration
+queries use the stored episodes for the whole history instead of replaying raw samples.
+"""
+import sys
+import os
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import Base, engine, SessionLocal
+from app.models import proxy, proxy_group  # noqa: F401
+from app.models.resource_usage import ResourceUsage as ResourceUsageModel
+from app.models.threshold_episode import ThresholdEpisode, ThresholdEpisodeCoverage
+from app.services.threshold_episodes import (
+    INTERFACE_METRIC_PREFIX,
+    ThresholdEpisodeDetector,
+    configured_thresholds,
+    ensure_threshold_episode_schema,
+    get_threshold_config,
+    persist_episodes,
+)
+from sqlalchemy import func
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+
+def backfill():
+    Base.metadata.create_all(bind=engine, tables=[ThresholdEpisode.__table__, ThresholdEpisodeCoverage.__table__])
+    ensure_threshold_episode_schema(engine)
+    db = SessionLocal()
+    try:
+        thresholds, interface_thresholds = get_threshold_config(db)
+        if not thresholds and not interface_thresholds:
+            logger.info("No thresholds configured, nothing to backfill")
+            return
+
+        # Replace previously stored episodes for the configured pairs
+        for metric, thr in thresholds.items():
+            db.query(ThresholdEpisode).filter(
+                ThresholdEpisode.metric == metric, ThresholdEpisode.threshold == thr
+            ).delete(synchronize_session=False)
+        for if_name, thr in interface_thresholds.items():
+            db.query(ThresholdEpisode).filter(
+                ThresholdEpisode.metric.like(f"{INTERFACE_METRIC_PREFIX}{if_name}:%"),
+                ThresholdEpisode.threshold == thr,
+            ).delete(synchronize_session=False)
+        db.commit()
+
+        cols = [ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at]
+        cols += [getattr(ResourceUsageModel, m) for m in thresholds if hasattr(ResourceUsageModel, m)]
+        if interface_thresholds:
+            cols.append(ResourceUsageModel.interface_mbps)
+        names = [c.key for c in cols]
+
+        detector = ThresholdEpisodeDetector()
+        # Separate session for writes so commits don't invalidate the streaming read cursor
+        write_db = SessionLocal()
+        q = db.query(*cols).order_by(ResourceUsageModel.proxy_id, ResourceUsageModel.collected_at)
+        pending = []
+        total = 0
+        try:
+            for values in q.yield_per(BATCH_SIZE):
+                _, closed = detector.observe_usage(dict(zip(names, values)), thresholds, interface_thresholds)
+                pending.extend(closed)
+                if len(pending) >= BATCH_SIZE:
+                    persist_episodes(write_db, pending)
+                    total += len(pending)
+                    pending = []
+            persist_episodes(write_db, pending)
+            total += len(pending)
+            # Episodes still open at the end of history: stored as open, restored by the app at startup
+            trailing = detector.drain()
+            for rec in trailing:
+                rec["is_open"] = True
+            persist_episodes(write_db, trailing)
+
+            # Stored episodes now cover the whole history for the configured pairs
+            first = write_db.query(func.min(ResourceUsageModel.collected_at)).scalar()
+            if first is not None:
+                for key, thr in configured_thresholds(thresholds, interface_thresholds).items():
+                    write_db.merge(ThresholdEpisodeCoverage(key=key, threshold=thr, since=first))
+                write_db.commit()
+        finally:
+            write_db.close()
+        logger.info(f"Backfilled {total} threshold episodes ({len(trailing)} still open)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logger.info("Starting threshold episode backfill...")
+    try:
+        backfill()
+        logger.info("Backfill completed successfully")
+    except Exception as e:
+        logger.error(f"Backfill failed: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading parsed traffic-log blocks into traffic_logs.
+
+Runs against a temporary SQLite file with the app's pragmas (WAL, synchronous=NORMAL) and the FTS
+index, and compares the previous ORM path (per-row dicts into insert(TrafficLog) plus a
+TrafficLogRecord per row for the response, one commit per block) with the collector's DBAPI
+executemany path, committed per block and per TRAFFIC_LOG_COMMIT_ROWS. Parsing is done up front so
+only the load side is timed; prints rows/sec for each.
+
+Usage: python scripts/bench_traffic_log_insert.py [--lines 200000] [--block 5000] [--commit-rows 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base, set_sqlite_pragma
+from app.models import proxy, proxy_group  # noqa: F401  (FK targets)
+from app.models.traffic_log import TrafficLog
+from app.schemas.traffic_log import TrafficLogRecord
+from app.services.traffic_log_collector import COLLECT_COMMIT_ROWS, INSERT_FIELDS, _insert_block, _rows_from_columns
+from app.services.traffic_log_dict import encode_columns
+from app.services.traffic_log_search import deferred_fts_index, ensure_traffic_log_fts
+from app.utils.traffic_log_parser import parse_log_lines
+
+from scripts.bench_traffic_log_parser import synthetic_lines
+
+
+def _orm_block(db, columns, collected_at):
+    rows = []
+    for row in _rows_from_columns(columns, 1, collected_at):
+        rec = {k: v for k, v in row.items() if k != "collected_at"}
+        rec["proxy_id"] = "1"
+        TrafficLogRecord(**rec)
+    for row in _rows_from_columns(encode_columns(db, columns), 1, collected_at):
+        row["snapshot_id"] = 1
+        rows.append(row)
+    db.execute(insert(TrafficLog), rows)
+    return len(rows)
+
+
+def _dbapi_block(db, columns, collected_at):
+    return _insert_block(db, columns, {"proxy_id": 1, "snapshot_id": 1, "collected_at": collected_at})
+
+
+def bench(label, insert_block, blocks, n, commit_rows=0):
+    """Loads the blocks into a fresh database file so earlier runs don't affect page/FTS layout."""
+    tmp = tempfile.TemporaryDirectory()
+    engine = create_engine(f"sqlite:///{os.path.join(tmp.name, 'bench.db')}")
+    event.listen(engine, "connect", set_sqlite_pragma)
+    Base.metadata.create_all(bind=engine)
+    ensure_traffic_log_fts(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        collected_at = datetime.utcnow()
+        indexing = ExitStack()
+        pending = 0
+        start = time.perf_counter()
+        for columns in blocks:
+            if not pending:
+                indexing.enter_context(deferred_fts_index(db))
+            pending += insert_block(db, columns, collected_at)
+            if pending >= commit_rows:
+                indexing.close()
+                db.commit()
+                pending = 0
+        if pending:
+            indexing.close()
+            db.commit()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+        engine.dispose()
+        tmp.cleanup()
+    print(f"{label:<40} {elapsed:8.2f}s  {n / elapsed:12,.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--block", type=int, default=5_000)
+    parser.add_argument("--commit-rows", type=int, default=COLLECT_COMMIT_ROWS)
+    args = parser.parse_args()
+
+    print(f"Parsing {args.lines:,} synthetic lines...")
+    lines = synthetic_lines(args.lines)
+    blocks = [parse_log_lines(lines[i:i + args.block], fields=INSERT_FIELDS)
+              for i in range(0, len(lines), args.block)]
+
+    orm = bench("ORM insert + records, commit per block", _orm_block, blocks, args.lines)
+    per_block = bench("DBAPI executemany, commit per block", _dbapi_block, blocks, args.lines)
+    batched = bench(f"DBAPI executemany, {args.commit_rows:,}-row commits", _dbapi_block, blocks, args.lines,
+                    args.commit_rows)
+    print(f"speedup: {orm / per_block:.1f}x (per block), {orm / batched:.1f}x (batched commits)")
+
+
+if __name__ == "__main__":
+    main()
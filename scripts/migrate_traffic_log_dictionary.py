@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Move the repeated traffic_logs string columns (user_agent, url_categories, mediatype_header,
+application_name, currentruleset, currentrule, url_reputationstring) into the traffic_log_values
+lookup table, keeping integer <column>_id references, then rebuild the FTS search index. SQLite only.
+This script can be run safely multiple times (idempotent). The app also runs it at startup.
+Pass --vacuum to run VACUUM afterwards and return the freed pages to the filesystem.
+"""
+import sys
+import os
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database.database import engine
+from app.services.traffic_log_dict import ensure_traffic_log_dictionary
+from app.services.traffic_log_search import ensure_traffic_log_fts
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    logger.info("Starting traffic_logs dictionary encoding migration...")
+    moved = ensure_traffic_log_dictionary(engine)
+    if moved is None:
+        logger.error("Dictionary encoding migration supports SQLite only")
+        sys.exit(1)
+    ensure_traffic_log_fts(engine)
+    if moved and "--vacuum" in sys.argv:
+        logger.info("Running VACUUM...")
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+    logger.info(f"Migration completed successfully ({moved} column(s) encoded)")
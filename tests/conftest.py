@@ -1,10 +1,15 @@
 """공통 테스트 픽스처 — 인메모리 SQLite DB + TestClient"""
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from sqlalchemy.pool import StaticPool
+
+# 교체된 스냅샷은 테스트가 직접 삭제합니다 (공유 인메모리 연결에서 백그라운드 삭제 스레드가 돌지 않도록)
+os.environ.setdefault("TRAFFIC_LOG_SNAPSHOT_PURGE_DELAY_SEC", "-1")
 from app.database.database import get_db, Base
 
 # 모든 모델을 임포트해서 Base.metadata에 등록
@@ -14,6 +19,13 @@ import app.models.resource_usage  # noqa: F401
 import app.models.resource_config  # noqa: F401
 import app.models.session_browser_config  # noqa: F401
 import app.models.traffic_log  # noqa: F401
+import app.models.threshold_episode  # noqa: F401
+import app.models.resource_rollup  # noqa: F401
+import app.models.resource_baseline  # noqa: F401
+import app.models.resource_daily  # noqa: F401
+import app.models.resource_forecast_fit  # noqa: F401
+import app.models.traffic_log_cursor  # noqa: F401
+import app.models.traffic_log_snapshot  # noqa: F401
 
 # StaticPool: 인메모리 SQLite에서 모든 연결이 같은 DB를 공유
 test_engine = create_engine(
@@ -43,6 +55,10 @@ def setup_db():
 def client():
     from app.main import app
     app.dependency_overrides[get_db] = _get_test_db
+    # 요청 제한(분당 60회)은 테스트마다 새로 시작합니다
+    limiter = getattr(app.state, "limiter", None)
+    if limiter is not None:
+        limiter.reset()
     with TestClient(app, raise_server_exceptions=False) as c:
         yield c
     app.dependency_overrides.clear()
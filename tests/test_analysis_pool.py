@@ -0,0 +1,37 @@
+"""분석 작업 실행기 테스트 (인메모리 DB는 스레드 실행으로 대체됨)"""
+import time
+
+from app.services import analysis_pool, resource_analysis
+from app.services.analysis_pool import _partitions
+
+
+def test_partitions_preserve_proxy_order():
+    ids = list(range(1, 12))
+    parts = _partitions(ids, 2)
+    assert len(parts) == 4
+    assert [pid for part in parts for pid in part] == ids
+    # 프록시가 많아도 파티션은 ANALYSIS_CHUNK_PROXIES개 이하
+    parts = _partitions(list(range(100)), 2)
+    assert max(len(p) for p in parts) == analysis_pool.ANALYSIS_CHUNK_PROXIES
+
+
+def test_analysis_runs_off_loop_and_enforces_time_budget(client, monkeypatch):
+    resp = client.get("/api/resource-usage/analysis/percentiles?proxy_ids=999&metrics=cpu")
+    assert resp.status_code == 200
+    assert resp.json()[0]["count"] == 0
+
+    calls = []
+
+    def _slow(db, proxy_ids, *args, **kwargs):
+        calls.append(proxy_ids)
+        time.sleep(0.3)
+        return []
+
+    monkeypatch.setattr(resource_analysis, "compute_percentiles", _slow)
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_TIMEOUT_SEC", 0.05)
+    monkeypatch.setattr(analysis_pool, "ANALYSIS_CHUNK_PROXIES", 1)
+    resp = client.get("/api/resource-usage/analysis/percentiles?proxy_ids=997,998,999&metrics=cpu")
+    assert resp.status_code == 504
+    # 시간 초과 후에는 실행 중이던 파티션만 끝나고 남은 파티션은 실행되지 않음
+    time.sleep(0.8)
+    assert calls == [[997]]
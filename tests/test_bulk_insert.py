@@ -0,0 +1,44 @@
+"""DBAPI 대량 INSERT 테스트"""
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.models.proxy import Proxy
+from app.models.resource_usage import ResourceUsage
+from app.services.bulk_insert import insert_columns, insert_mappings
+from app.utils.time import KST_TZ
+from tests.conftest import TestSessionLocal
+
+
+def test_insert_mappings_stores_values_like_orm_bulk_insert():
+    db = TestSessionLocal()
+    ts = datetime(2026, 1, 5, 9, 30, tzinfo=KST_TZ)
+    try:
+        p = Proxy(host="10.9.7.1", username="u")
+        db.add(p)
+        db.commit()
+        row = {"proxy_id": p.id, "cpu": 12.5, "mem": None, "interface_mbps": json.dumps({"1": {"in_mbps": 1.0}}),
+               "collected_at": ts, "created_at": ts, "updated_at": ts}
+        db.bulk_insert_mappings(ResourceUsage, [{**row, "community": "orm"}])
+        assert insert_mappings(db, ResourceUsage, [{**row, "community": "dbapi"}, {**row, "cpu": 3.0}]) == 2
+        db.commit()
+
+        stored = db.execute(text(
+            "SELECT community, cpu, collected_at, created_at FROM resource_usage WHERE proxy_id = :p ORDER BY id"
+        ), {"p": p.id}).all()
+        assert [r.community for r in stored] == ["orm", "dbapi", None]
+        assert len({(r.collected_at, r.created_at) for r in stored}) == 1
+        # 같은 저장 형식이므로 수집 직후의 collected_at 일치 조회로 모두 다시 읽힘
+        rows = db.query(ResourceUsage).filter(ResourceUsage.collected_at == ts, ResourceUsage.proxy_id == p.id).all()
+        assert sorted(r.cpu for r in rows) == [3.0, 12.5, 12.5]
+
+        assert insert_columns(db, ResourceUsage, {}) == 0
+        assert insert_columns(db, ResourceUsage, {"cpu": [1.0, 2.0]}, {"proxy_id": p.id, "collected_at": ts}) == 2
+        db.commit()
+        assert db.query(ResourceUsage).filter(ResourceUsage.proxy_id == p.id).count() == 5
+    finally:
+        db.query(ResourceUsage).filter(ResourceUsage.collected_at == ts).delete()
+        db.query(Proxy).filter(Proxy.host == "10.9.7.1").delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,103 @@
+"""자원 분석 (상관/동시 초과) 테스트"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.proxy import Proxy
+from app.models.resource_usage import ResourceUsage
+from app.services.resource_analysis import _pairwise_corr, compute_correlation
+from app.utils.time import KST_TZ
+from tests.conftest import TestSessionLocal
+
+T0 = datetime(2026, 1, 5, 0, 0, tzinfo=KST_TZ)
+
+
+def test_pairwise_corr_matches_numpy_and_skips_missing():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(5, 48))
+    r, n = _pairwise_corr(x, min_overlap=6)
+    assert np.allclose(r, np.corrcoef(x))
+    assert (n == 48).all()
+
+    x[0, :10] = np.nan
+    r, n = _pairwise_corr(x, min_overlap=6)
+    assert n[0, 1] == 38
+    assert np.isclose(r[0, 1], np.corrcoef(x[0, 10:], x[1, 10:])[0, 1])
+
+
+def test_compute_correlation_groups_co_saturating_proxies():
+    db = TestSessionLocal()
+    try:
+        proxies = [Proxy(host=f"10.9.8.{i}", username="u") for i in range(3)]
+        db.add_all(proxies)
+        db.commit()
+        ids = [p.id for p in proxies]
+        for h in range(24):
+            load = 90 if h in (10, 11, 12) else 20 + h
+            for k in range(2):
+                ts = T0 + timedelta(hours=h, minutes=30 * k)
+                db.add(ResourceUsage(proxy_id=ids[0], cpu=load, collected_at=ts))
+                db.add(ResourceUsage(proxy_id=ids[1], cpu=load + 2, collected_at=ts))
+                db.add(ResourceUsage(proxy_id=ids[2], cpu=50 - h, collected_at=ts))
+        db.commit()
+
+        res = compute_correlation(db, ids, None, None, "cpu", 80.0)
+        assert res["grid"]["points"] == 24
+        assert res["correlation"][0][1] == 1.0
+        assert res["correlation"][0][2] < 0
+        assert res["co_exceedance"][0][1] == 3 and res["co_exceedance"][0][2] == 0
+        top = res["top_pairs"][0]
+        assert {top["proxy_a"], top["proxy_b"]} == {ids[0], ids[1]}
+        assert top["co_exceed_ratio"] == 1.0
+    finally:
+        db.query(ResourceUsage).delete()
+        db.query(Proxy).filter(Proxy.host.like("10.9.8.%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def test_daily_rollup_feeds_incremental_forecast(monkeypatch):
+    from app.models.resource_daily import ResourceUsageDaily
+    from app.models.resource_forecast_fit import ResourceForecastFit
+    from app.services import resource_analysis
+    from app.services.resource_forecast import refresh_forecast_fits
+    from app.services.resource_rollups import rollup_closed_days
+
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.8.100", username="u")
+        db.add(p)
+        db.commit()
+        # 하루 4샘플, 일별 수준이 매일 1씩 증가
+        for d in range(21):
+            for k in range(4):
+                db.add(ResourceUsage(proxy_id=p.id, cpu=40 + d + k,
+                                     collected_at=T0 + timedelta(days=d, hours=6 * k)))
+        db.commit()
+
+        first = rollup_closed_days(db, now=T0 + timedelta(days=14, hours=1))
+        assert len({r["day"] for r in first}) == 14
+        refresh_forecast_fits(db, first)
+        fit = db.query(ResourceForecastFit).filter_by(proxy_id=p.id, metric="cpu", stat="p95").one()
+        assert fit.n_days == 14
+
+        rest = rollup_closed_days(db, now=T0 + timedelta(days=21, hours=1))
+        assert len({r["day"] for r in rest}) == 7
+        refresh_forecast_fits(db, rest)
+        db.refresh(fit)
+        assert fit.n_days == 21 and fit.trend > 0.5
+
+        monkeypatch.setattr(resource_analysis, "now_kst", lambda: T0 + timedelta(days=21))
+        res = resource_analysis.compute_forecast(db, [p.id], "cpu", "p95", 80.0, 60)[0]
+        assert res["model"] == "holt_winters"
+        assert res["last_value"] == 62.85
+        # 하루 1씩 증가 추세이므로 약 17일 후 80 도달
+        assert 10 <= res["days_to_threshold"] <= 22
+        assert len(res["forecast"]) == 60
+    finally:
+        db.query(ResourceForecastFit).delete()
+        db.query(ResourceUsageDaily).delete()
+        db.query(ResourceUsage).delete()
+        db.query(Proxy).filter(Proxy.host == "10.9.8.100").delete()
+        db.commit()
+        db.close()
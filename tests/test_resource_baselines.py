@@ -0,0 +1,105 @@
+"""시간 롤업 / 요일-시간 기준선 테스트"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.proxy import Proxy
+from app.models.resource_baseline import ResourceBaseline
+from app.models.resource_rollup import ResourceUsageHourly
+from app.models.resource_usage import ResourceUsage
+from app.services import resource_baselines
+from app.services.resource_analysis import compute_heatmap_weekly
+from app.services.resource_baselines import BaselineScorer, hour_of_week, run_baseline_cycle, update_baselines
+from app.services.resource_rollups import rollup_closed_hours
+from app.utils.time import KST_TZ
+from tests.conftest import TestSessionLocal
+
+T0 = datetime(2026, 1, 5, 9, 0, tzinfo=KST_TZ)  # 월요일 09시
+
+
+def test_rollup_heatmap_matches_raw_and_scores_against_baseline(monkeypatch):
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.9.8", username="u")
+        db.add(p)
+        db.commit()
+        # 3시간 동안 10분 간격, 시간마다 다른 수준
+        for i in range(18):
+            db.add(ResourceUsage(proxy_id=p.id, cpu=10 * (i // 6) + (i % 2),
+                                 collected_at=T0 + timedelta(minutes=10 * i)))
+        db.commit()
+
+        start, end = T0 + timedelta(minutes=20), T0 + timedelta(hours=3)
+        raw = compute_heatmap_weekly(db, [p.id], start, end, "cpu")[0]["data"]
+
+        rollups = []
+        assert rollup_closed_hours(db, now=T0 + timedelta(hours=2, minutes=5), on_window=rollups.extend) == 2
+        assert {r["bucket_start"] for r in rollups} == {T0, T0 + timedelta(hours=1)}
+        assert rollup_closed_hours(db, now=T0 + timedelta(hours=2, minutes=5)) == 0
+        # 롤업 + 원시 경계 조합 결과가 원시 데이터만 사용한 결과와 같아야 함
+        assert compute_heatmap_weekly(db, [p.id], start, end, "cpu")[0]["data"] == raw
+
+        cpu_rollups = [r for r in rollups if r["metric"] == "cpu"]
+        monkeypatch.setattr(resource_baselines, "BASELINE_MIN_SAMPLES", 1)
+        scorer = BaselineScorer()
+        scorer.update(update_baselines(db, cpu_rollups))
+        mean, std, count = scorer.baseline(p.id, "cpu", hour_of_week(T0))
+        assert count == 6 and mean == 0.5 and abs(std - 0.5) < 1e-9
+        assert scorer.score(p.id, "cpu", T0 + timedelta(weeks=1), 3.0) == 5.0
+        assert scorer.score(p.id, "cpu", T0 + timedelta(hours=5), 3.0) is None
+    finally:
+        db.query(ResourceBaseline).delete()
+        db.query(ResourceUsageHourly).delete()
+        db.query(ResourceUsage).delete()
+        db.query(Proxy).filter(Proxy.host == "10.9.9.8").delete()
+        db.commit()
+        db.close()
+
+
+def test_baseline_cycle_merges_each_rollup_window_with_its_commit(monkeypatch):
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.9.9", username="u")
+        db.add(p)
+        db.commit()
+        # 서로 다른 날(롤업 창) 두 개에 시간당 3건씩
+        for day in range(2):
+            for i in range(3):
+                db.add(ResourceUsage(proxy_id=p.id, cpu=float(i),
+                                     collected_at=T0 + timedelta(days=day, minutes=10 * i)))
+        db.commit()
+
+        merge = resource_baselines.merge_baselines
+        calls = []
+
+        def failing_merge(session, rollups):
+            calls.append(len(rollups))
+            if len(calls) == 2:
+                raise RuntimeError("boom")
+            return merge(session, rollups)
+
+        monkeypatch.setattr(resource_baselines, "merge_baselines", failing_merge)
+        with pytest.raises(RuntimeError):
+            run_baseline_cycle(db)
+        db.rollback()
+
+        def cpu_count():
+            return sum(b.count for b in db.query(ResourceBaseline)
+                       .filter(ResourceBaseline.proxy_id == p.id, ResourceBaseline.metric == "cpu"))
+
+        # 첫 창은 롤업과 기준선이 함께 커밋되고, 실패한 창은 둘 다 남지 않음
+        assert db.query(ResourceUsageHourly).filter(ResourceUsageHourly.proxy_id == p.id).count() == 1
+        assert cpu_count() == 3
+
+        monkeypatch.setattr(resource_baselines, "merge_baselines", merge)
+        assert run_baseline_cycle(db) == 1
+        assert cpu_count() == 6
+        assert resource_baselines.baseline_scorer.baseline(p.id, "cpu", hour_of_week(T0 + timedelta(days=1)))[2] == 3
+    finally:
+        db.rollback()
+        db.query(ResourceBaseline).delete()
+        db.query(ResourceUsageHourly).delete()
+        db.query(ResourceUsage).delete()
+        db.query(Proxy).filter(Proxy.host == "10.9.9.9").delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,158 @@
+"""임계치 초과 구간 증분 검출기 테스트"""
+import json
+from datetime import datetime, timedelta
+
+from app.models.proxy import Proxy
+from app.models.resource_config import ResourceConfig
+from app.models.resource_usage import ResourceUsage
+from app.models.threshold_episode import ThresholdEpisode, ThresholdEpisodeCoverage
+from app.services import threshold_episodes
+from app.services.resource_analysis import compute_threshold_duration
+from app.services.threshold_episodes import ThresholdEpisodeDetector, record_threshold_samples
+from app.utils.time import KST_TZ
+from tests.conftest import TestSessionLocal
+
+T0 = datetime(2026, 1, 5, 9, 0, tzinfo=KST_TZ)
+
+
+def _feed(detector, values, metric="cpu", threshold=80.0):
+    closed = []
+    for i, v in enumerate(values):
+        _, rec = detector.observe(1, metric, threshold, T0 + timedelta(seconds=30 * i), v)
+        if rec:
+            closed.append(rec)
+    return closed
+
+
+def test_detector_closes_episode_at_last_exceeding_sample():
+    closed = _feed(ThresholdEpisodeDetector(), [10, 85, 95, None, 90, 50, 20])
+    assert len(closed) == 1
+    ep = closed[0]
+    assert ep["start_at"] == T0 + timedelta(seconds=30)
+    assert ep["end_at"] == T0 + timedelta(seconds=120)
+    assert ep["max_value"] == 95
+    assert ep["sample_count"] == 3
+    assert ep["mean_value"] == 90
+
+
+def test_detector_reports_open_then_drains():
+    detector = ThresholdEpisodeDetector()
+    opened, _ = detector.observe(1, "cpu", 80.0, T0, 81)
+    assert opened
+    assert 1 in detector.open_episodes([1], "cpu", 80.0)
+    drained = detector.drain()
+    assert len(drained) == 1 and drained[0]["sample_count"] == 1
+    assert detector.open_episodes([1], "cpu", 80.0) == {}
+
+
+def test_threshold_change_closes_open_episode():
+    detector = ThresholdEpisodeDetector()
+    detector.observe(1, "cpu", 80.0, T0, 90)
+    _, rec = detector.observe(1, "cpu", 95.0, T0 + timedelta(seconds=30), 90)
+    assert rec is not None and rec["threshold"] == 80.0
+    assert detector.open_episodes([1], "cpu", 80.0) == {}
+
+
+def _cleanup(db):
+    db.query(ThresholdEpisode).delete()
+    db.query(ThresholdEpisodeCoverage).delete()
+    db.query(ResourceUsage).delete()
+    db.query(ResourceConfig).delete()
+    db.query(Proxy).filter(Proxy.host == "10.9.9.9").delete()
+    db.commit()
+    db.close()
+
+
+def test_stored_episodes_match_replayed_history(monkeypatch):
+    monkeypatch.setattr(threshold_episodes, "threshold_episode_detector", ThresholdEpisodeDetector())
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.9.9", username="u")
+        db.add(p)
+        db.add(ResourceConfig(community="public", oids_json=json.dumps({"__thresholds__": {"cpu": 80}})))
+        db.commit()
+
+        values = [10, 85, 95, 50, 81, 82, 83, 20, 99]
+        rows = []
+        for i, v in enumerate(values):
+            row = {"proxy_id": p.id, "cpu": v, "collected_at": T0 + timedelta(seconds=30 * i)}
+            db.add(ResourceUsage(**row))
+            rows.append(row)
+        db.commit()
+        for row in rows:
+            record_threshold_samples(db, [row])
+
+        assert db.query(ThresholdEpisode).filter(ThresholdEpisode.proxy_id == p.id).count() == 2
+        stored = compute_threshold_duration(db, [p.id], None, None, "cpu", 80.0)[0]
+        replayed = compute_threshold_duration(db, [p.id], None, None, "cpu", 80.5)[0]
+
+        # 마지막 구간은 진행 중 (메모리 상태)
+        assert stored["episode_count"] == 3
+        assert stored["episodes"][-1]["ongoing"] is True
+        assert [e["sample_count"] for e in stored["episodes"]] == [2, 3, 1]
+        assert [e["sample_count"] for e in replayed["episodes"]] == [2, 3, 1]
+        assert stored["total_duration_min"] == replayed["total_duration_min"]
+    finally:
+        _cleanup(db)
+
+
+def test_history_before_coverage_is_replayed(monkeypatch):
+    monkeypatch.setattr(threshold_episodes, "threshold_episode_detector", ThresholdEpisodeDetector())
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.9.9", username="u")
+        db.add(p)
+        db.add(ResourceConfig(community="public", oids_json=json.dumps({"__thresholds__": {"cpu": 80}})))
+        db.commit()
+
+        # 임계치 설정 전 이력 4개, 이후 수집분 5개. 3번째 샘플에서 시작한 구간이 저장 시작 시점에 걸침
+        values = [10, 85, 50, 90, 95, 92, 20, 85, 30]
+        rows = []
+        for i, v in enumerate(values):
+            row = {"proxy_id": p.id, "cpu": v, "collected_at": T0 + timedelta(seconds=30 * i)}
+            db.add(ResourceUsage(**row))
+            rows.append(row)
+        db.commit()
+        for row in rows[4:]:
+            record_threshold_samples(db, [row])
+
+        assert threshold_episodes.tracked_since(db, "cpu", 80.0) is not None
+        stored = compute_threshold_duration(db, [p.id], None, None, "cpu", 80.0)[0]
+        replayed = compute_threshold_duration(db, [p.id], None, None, "cpu", 80.5)[0]
+        assert [e["sample_count"] for e in stored["episodes"]] == [1, 3, 1]
+        assert [e["start"] for e in stored["episodes"]] == [e["start"] for e in replayed["episodes"]]
+        assert stored["total_duration_min"] == replayed["total_duration_min"]
+    finally:
+        _cleanup(db)
+
+
+def test_open_episode_continues_across_restart(monkeypatch):
+    monkeypatch.setattr(threshold_episodes, "threshold_episode_detector", ThresholdEpisodeDetector())
+    db = TestSessionLocal()
+    try:
+        p = Proxy(host="10.9.9.9", username="u")
+        db.add(p)
+        db.add(ResourceConfig(community="public", oids_json=json.dumps({"__thresholds__": {"cpu": 80}})))
+        db.commit()
+
+        rows = [{"proxy_id": p.id, "cpu": v, "collected_at": T0 + timedelta(seconds=30 * i)}
+                for i, v in enumerate([90, 91, 92, 93, 10])]
+        for row in rows[:2]:
+            record_threshold_samples(db, [row])
+        assert threshold_episodes.flush_open_episodes(db) == 1
+        # 열린 행은 조회 결과에 포함되지 않음
+        assert threshold_episodes.query_episodes(db, [p.id], "cpu", 80.0, None, None) == {}
+
+        # 재시작: 새 검출기로 복원 후 이어서 수집
+        monkeypatch.setattr(threshold_episodes, "threshold_episode_detector", ThresholdEpisodeDetector())
+        assert threshold_episodes.load_open_episodes(db) == 1
+        for row in rows[2:]:
+            record_threshold_samples(db, [row])
+
+        episodes = db.query(ThresholdEpisode).filter(ThresholdEpisode.proxy_id == p.id).all()
+        assert len(episodes) == 1
+        assert episodes[0].is_open is False
+        assert episodes[0].sample_count == 4
+        assert episodes[0].start_at.replace(tzinfo=None) == T0.replace(tzinfo=None)
+    finally:
+        _cleanup(db)
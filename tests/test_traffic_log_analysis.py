@@ -0,0 +1,151 @@
+"""트래픽 로그 분석 테스트 (저장된 로그 / 원격 사전 집계)"""
+import shutil
+import subprocess
+
+import pytest
+
+from app.models.proxy import Proxy
+from app.models.traffic_log import TrafficLog
+from app.services import traffic_log_analysis
+from tests.conftest import TestSessionLocal
+from tests.test_traffic_log_parser import _line
+
+
+def test_analyze_aggregates_in_sql(client):
+    db = TestSessionLocal()
+    p = Proxy(host="10.8.8.1", username="u")
+    db.add(p)
+    db.commit()
+    pid = p.id
+    rows = [
+        ("10.0.0.1", "a.com", 200, 100, 10, "allow"),
+        ("10.0.0.1", "a.com", 403, -5, 20, " Block "),
+        ("10.0.0.1", "b.com", 503, None, 5, "block"),
+        ("10.0.0.2", "a.com", None, 50, None, None),
+        ("", "", 0, 7, 1, "allow"),
+    ]
+    db.add_all(TrafficLog(proxy_id=pid, client_ip=ip, url_host=h, response_statuscode=sc,
+                          recv_byte=r, sent_byte=s, action_names=a) for ip, h, sc, r, s, a in rows)
+    db.commit()
+    try:
+        res = client.get("/api/traffic-logs/analyze", params={"proxy_ids": str(pid)})
+        assert res.status_code == 200
+        data = res.json()
+        assert data["summary"] == {
+            "total": 5, "blocked": 2, "unique_clients": 2, "unique_hosts": 2,
+            "total_recv_bytes": 157, "total_sent_bytes": 36,
+        }
+        assert data["hosts"][0] == {"host": "a.com", "requests": 3, "recv_bytes": 150, "sent_bytes": 30}
+        assert data["clients"][0] == {"client_ip": "10.0.0.1", "requests": 3, "recv_bytes": 100, "sent_bytes": 35}
+        assert {s["status"]: s["count"] for s in data["statuses"]} == {"Unknown": 2, "200": 1, "403": 1, "503": 1}
+        assert data["statuses"][0]["status"] == "Unknown"
+        assert data["proxies"] == [{"proxy": "10.8.8.1", "count": 5}]
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id == pid).delete()
+        db.query(Proxy).filter(Proxy.id == pid).delete()
+        db.commit()
+        db.close()
+
+
+def test_histogram_buckets_by_interval_and_proxy(client):
+    db = TestSessionLocal()
+    p1, p2 = Proxy(host="10.8.8.2", username="u"), Proxy(host="10.8.8.3", username="u")
+    db.add_all([p1, p2])
+    db.commit()
+    ids = [p1.id, p2.id]
+    base = 1767571200  # 2026-01-05 09:00:00 KST
+    rows = [
+        (p1.id, base + 1, 200, 100, 10, "allow"),
+        (p1.id, base + 59, 404, -5, 20, " Block "),
+        (p1.id, base + 61, 503, 7, None, "blocked-by-policy"),
+        (p2.id, base + 5, 502, 1, 1, "block"),
+        (p2.id, base + 185, 200, 2, 2, "allow"),
+        (p2.id, None, 500, 9, 9, "block"),
+    ]
+    db.add_all(TrafficLog(proxy_id=pid, event_ts=ts, response_statuscode=sc, recv_byte=r, sent_byte=s,
+                          action_names=a) for pid, ts, sc, r, s, a in rows)
+    db.commit()
+    try:
+        params = {"proxy_ids": ",".join(map(str, ids)), "interval": "1m"}
+        data = client.get("/api/traffic-logs/histogram", params=params).json()
+        assert data["interval_sec"] == 60
+        assert data["timestamps"] == [(base + 60 * i) * 1000 for i in range(4)]
+        assert data["total"] == {
+            "requests": [3, 1, 0, 1], "recv_bytes": [101, 7, 0, 2], "sent_bytes": [31, 0, 0, 2],
+            "blocked": [2, 0, 0, 0], "status_4xx": [1, 0, 0, 0], "status_5xx": [1, 1, 0, 0],
+        }
+        s1, s2 = data["series"]
+        assert (s1["proxy_id"], s1["proxy"], s1["requests"]) == (p1.id, "10.8.8.2", [2, 1, 0, 0])
+        assert (s2["proxy_id"], s2["requests"]) == (p2.id, [1, 0, 0, 1])
+
+        data = client.get("/api/traffic-logs/histogram", params={
+            **params, "interval": "30s", "start": "2026-01-05T09:00:30", "end": "2026-01-05T09:01:59",
+        }).json()
+        assert data["timestamps"][0] == (base + 30) * 1000 and len(data["timestamps"]) == 3
+        assert data["total"]["requests"] == [1, 1, 0]
+
+        # 하루 구간은 KST 자정부터 (09:00 KST 데이터 → 같은 날 00:00 KST 구간)
+        data = client.get("/api/traffic-logs/histogram", params={**params, "interval": "1d"}).json()
+        assert data["timestamps"] == [(base - 9 * 3600) * 1000]
+        assert data["total"]["requests"] == [5]
+
+        assert client.get("/api/traffic-logs/histogram", params={**params, "interval": "0s"}).status_code == 400
+        too_many = {**params, "interval": "1s", "start": "2026-01-01T00:00:00", "end": "2026-01-05T00:00:00"}
+        assert client.get("/api/traffic-logs/histogram", params=too_many).status_code == 400
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id.in_(ids)).delete()
+        db.query(Proxy).filter(Proxy.id.in_(ids)).delete()
+        db.commit()
+        db.close()
+
+
+@pytest.mark.skipif(not all(shutil.which(c) for c in ("timeout", "ionice", "awk")), reason="needs coreutils")
+def test_remote_aggregation_matches_stored_analysis(client, monkeypatch, tmp_path):
+    rows = [
+        ("10.0.0.1", "a.com", "200", "100", "10", "allow"),
+        ("10.0.0.1", "a.com", "403", "-5", "20", " Block "),
+        ("10.0.0.1", "b.com", "503", "", "5", "block"),
+        ("10.0.0.2", "a.com", "", "50", "", ""),
+        ("", "", "0", "7", "1", "allow"),
+    ]
+    log = tmp_path / "access.log"
+    log.write_text("skipped old line\n" + "".join(
+        _line(client_ip=ip, url_host=h, response_statuscode=sc, recv_byte=r, sent_byte=s, action_names=a) + "\n"
+        for ip, h, sc, r, s, a in rows
+    ))
+    db = TestSessionLocal()
+    proxies = [Proxy(host=f"10.8.9.{i}", username="u", traffic_log_path=str(log)) for i in (1, 2)]
+    db.add_all(proxies)
+    db.commit()
+    ids = [p.id for p in proxies]
+    db.close()
+    commands = []
+
+    def local_exec(host, port, username, password, command, **kwargs):
+        commands.append(command)
+        return subprocess.run(command, shell=True, capture_output=True, text=True).stdout
+
+    monkeypatch.setattr(traffic_log_analysis, "ssh_exec", local_exec)
+    try:
+        data = client.get("/api/traffic-logs/analyze", params={
+            "proxy_ids": ",".join(map(str, ids)), "source": "remote", "lines": len(rows),
+        }).json()
+        assert data["errors"] == {}
+        assert data["summary"] == {
+            "total": 10, "blocked": 4, "unique_clients": 2, "unique_hosts": 2,
+            "total_recv_bytes": 314, "total_sent_bytes": 72,
+        }
+        assert data["hosts"][0] == {"host": "a.com", "requests": 6, "recv_bytes": 300, "sent_bytes": 60}
+        assert data["clients"][0] == {"client_ip": "10.0.0.1", "requests": 6, "recv_bytes": 200, "sent_bytes": 70}
+        assert {s["status"]: s["count"] for s in data["statuses"]} == {"Unknown": 4, "200": 2, "403": 2, "503": 2}
+        assert data["proxies"] == [{"proxy": "10.8.9.1", "count": 5}, {"proxy": "10.8.9.2", "count": 5}]
+        assert [a["type"] for a in data["anomalies"]] == [
+            a["type"] for a in traffic_log_analysis.detect_traffic_anomalies(
+                data["clients"], {"10.0.0.1": 4}, {"10.0.0.1": 4})
+        ]
+        assert len(commands) == 2 and all(f"tail -n {len(rows)}" in c for c in commands)
+    finally:
+        db = TestSessionLocal()
+        db.query(Proxy).filter(Proxy.id.in_(ids)).delete()
+        db.commit()
+        db.close()
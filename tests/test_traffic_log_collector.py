@@ -0,0 +1,487 @@
+"""트래픽 로그 스트리밍 수집 테스트"""
+import gzip
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models.proxy import Proxy
+from app.models.traffic_log import TrafficLog
+from app.models.traffic_log_snapshot import TrafficLogSnapshot
+from app.api import traffic_logs as traffic_logs_api
+from app.services import traffic_log_collector
+from app.services.traffic_log_collector import CollectProgress, iter_line_blocks, stream_collect
+from app.services.traffic_log_search import search_clause
+from app.services.traffic_log_snapshots import purge_retired_snapshots, visible_clause
+from tests.conftest import TestSessionLocal, test_engine
+from app.utils.traffic_log_parser import DELIMITER, FIELDS
+from tests.test_traffic_log_parser import _line
+
+
+def _chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_iter_line_blocks_handles_split_lines_and_multibyte():
+    data = "가나다\n\nabc\n한글줄\nlast".encode()
+    blocks = list(iter_line_blocks(_chunked(data, 4), block_lines=2))
+    assert blocks == [["가나다", "abc"], ["한글줄", "last"]]
+
+
+@pytest.fixture()
+def proxy():
+    db = TestSessionLocal()
+    p = Proxy(host="10.7.7.1", username="u", traffic_log_path="/var/log/access.log")
+    db.add(p)
+    db.commit()
+    db.refresh(p)
+    db.expunge(p)
+    db.close()
+    yield p
+    db = TestSessionLocal()
+    db.query(TrafficLog).filter(TrafficLog.proxy_id == p.id).delete()
+    db.query(TrafficLogSnapshot).filter(TrafficLogSnapshot.proxy_id == p.id).delete()
+    db.query(Proxy).filter(Proxy.id == p.id).delete()
+    db.commit()
+    db.close()
+
+
+def test_stream_collect_inserts_blocks(monkeypatch, proxy):
+    body = ("\n".join(_line(client_ip=f"10.0.0.{i}") for i in range(25)) + "\n").encode()
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", lambda *a, **k: _chunked(body, 700))
+
+    db = TestSessionLocal()
+    try:
+        db.add(TrafficLog(proxy_id=proxy.id, client_ip="stale"))
+        db.commit()
+        seen = []
+        progress = stream_collect(db, proxy, "cmd", block_lines=10, on_block=lambda lines, rows: seen.append(len(rows)))
+        assert seen == [10, 10, 5]
+        assert progress.inserted == 25 and progress.bytes_read == len(body)
+        rows = db.query(TrafficLog).filter(visible_clause(db, [proxy.id])).all()
+        assert len(rows) == 25
+        assert rows[0].proxy_id == proxy.id and rows[0].recv_byte == 1234
+        # 이전 로그는 교체 후 백그라운드 삭제 대상
+        purge_retired_snapshots(test_engine)
+        assert db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy.id).count() == 25
+    finally:
+        db.close()
+
+
+def test_append_collect_commits_in_row_batches_and_count_only_skips_records(monkeypatch, client, proxy):
+    lines = [_line(client_ip=f"10.0.0.{i}") + "\n" for i in range(25)]
+    body = "".join(lines).encode()
+    db = TestSessionLocal()
+    raw = db.connection().connection.driver_connection
+    waiting_in_transaction = []
+
+    def _slow_stream(*a, **k):
+        # 블록마다 끊어 보내고, 다음 청크를 기다리는 동안 적재 쪽이 쓰기 트랜잭션을 열어 두는지 확인
+        for i in range(0, 25, 10):
+            if i:
+                time.sleep(0.3)
+                waiting_in_transaction.append(raw.in_transaction)
+            yield "".join(lines[i:i + 10]).encode()
+
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _slow_stream)
+    monkeypatch.setattr(traffic_log_collector, "COLLECT_COMMIT_ROWS", 15)
+
+    try:
+        progress = CollectProgress()
+        commits = []
+        event.listen(db, "after_commit", lambda s: commits.append(progress.inserted))
+        stream_collect(db, proxy, "cmd", replace=False, progress=progress, block_lines=10)
+        # 10행 블록 2개를 한 트랜잭션으로 묶고, 남은 5행은 끝에서 커밋
+        assert commits == [20, 25] and progress.committed_bytes == len(body)
+        assert waiting_in_transaction == [False, False]
+        assert db.query(TrafficLog).filter(search_clause(db, "10.0.0.2")).count() == 6
+    finally:
+        db.close()
+
+    monkeypatch.setattr(traffic_logs_api, "remote_compression", lambda p: None)
+    data = client.get(f"/api/traffic-logs/{proxy.id}", params={"parsed": True, "count_only": True}).json()
+    assert data["records"] is None and data["count"] == 25
+
+
+def test_stream_collect_keeps_existing_rows_on_connect_failure(monkeypatch, proxy):
+    def _fail(*a, **k):
+        raise RuntimeError("connection refused")
+        yield b""
+
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _fail)
+    db = TestSessionLocal()
+    try:
+        db.add(TrafficLog(proxy_id=proxy.id, client_ip="kept"))
+        db.commit()
+        with pytest.raises(RuntimeError):
+            stream_collect(db, proxy, "cmd")
+        assert db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy.id).count() == 1
+    finally:
+        db.close()
+
+
+def test_replace_collect_swaps_snapshot_atomically(monkeypatch, proxy):
+    def _stream(fail):
+        def fake(*a, **k):
+            yield ("\n".join(_line(client_ip=f"10.1.0.{i}") for i in range(10)) + "\n").encode()
+            if fail:
+                raise ConnectionError("channel closed")
+            yield ("\n".join(_line(client_ip=f"10.1.1.{i}") for i in range(5)) + "\n").encode()
+        return fake
+
+    def visible_ips(db):
+        return sorted(r.client_ip for r in db.query(TrafficLog).filter(visible_clause(db, [proxy.id])))
+
+    db = TestSessionLocal()
+    try:
+        db.add(TrafficLog(proxy_id=proxy.id, client_ip="old"))
+        db.commit()
+        # 적재 중(블록 커밋 후)에도 조회에는 이전 로그만 보임
+        seen = []
+        monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream(fail=False))
+        stream_collect(db, proxy, "cmd", block_lines=10, on_block=lambda lines, rows: seen.append(visible_ips(db)))
+        assert seen == [["old"], ["old"]]
+        assert len(visible_ips(db)) == 15
+
+        # 중간에 실패하면 새 스냅샷을 버리고 직전 로그를 유지
+        monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream(fail=True))
+        with pytest.raises(ConnectionError):
+            stream_collect(db, proxy, "cmd", block_lines=10)
+        assert len(visible_ips(db)) == 15
+
+        # 취소해도 일부만 적재된 스냅샷으로 교체하지 않음
+        cancel = threading.Event()
+        monkeypatch.setattr(traffic_log_collector, "COLLECT_COMMIT_ROWS", 5)
+        monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream(fail=False))
+        progress = stream_collect(db, proxy, "cmd", block_lines=5, cancel=cancel,
+                                  on_block=lambda lines, rows: cancel.set())
+        assert progress.discarded and progress.inserted == 5 and progress.committed_bytes == 0
+        assert len(visible_ips(db)) == 15
+        purge_retired_snapshots(test_engine, chunk=4)
+        assert db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy.id).count() == 15
+    finally:
+        db.close()
+
+
+def test_job_manager_reports_progress_and_limits_per_proxy(monkeypatch, proxy):
+    import threading
+
+    from app.services.traffic_log_jobs import ProxyBusyError, TrafficLogJobManager
+
+    release = threading.Event()
+    body = ("\n".join(_line() for _ in range(12)) + "\n").encode()
+
+    def _slow_stream(*a, **k):
+        yield body[:len(body) // 2]
+        release.wait(5)
+        yield body[len(body) // 2:]
+
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _slow_stream)
+    manager = TrafficLogJobManager(max_workers=2, per_proxy=1)
+
+    def collect(db, p, progress, cancel):
+        stream_collect(db, p, "cmd", progress=progress, cancel=cancel)
+
+    try:
+        def _wait(job_id):
+            for _ in range(100):
+                if manager.get(job_id).finished_at is not None:
+                    break
+                threading.Event().wait(0.05)
+            return manager.get(job_id).as_dict()
+
+        job = manager.submit([proxy], collect, TestSessionLocal, params={"limit": 12})
+        with pytest.raises(ProxyBusyError):
+            manager.submit([proxy], collect, TestSessionLocal)
+        release.set()
+        snap = _wait(job.id)
+        assert snap["status"] == "completed" and snap["inserted"] == 12
+        assert snap["proxies"][0]["fetched"] == 12
+        # 완료 후에는 같은 프록시로 새 작업을 등록할 수 있음
+        again = manager.submit([proxy], collect, TestSessionLocal)
+        assert manager.cancel(again.id) is again
+        assert _wait(again.id)["status"] in ("cancelled", "completed")
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_incremental_collect_follows_offset_and_rotation(monkeypatch, proxy):
+    import gzip
+    import re
+
+    from app.models.traffic_log_cursor import TrafficLogCursor
+    from app.services.traffic_log_collector import collect_incremental
+
+    remote = {"inode": 100, "data": b""}
+
+    def _stream(host, port, username, password, command, **kw):
+        start, length = map(int, re.search(r"tail -c \+(\d+) .* head -c (\d+)", command).groups())
+        data = remote["data"][start - 1:start - 1 + length]
+        assert command.endswith("gzip -1 -c")
+        data = gzip.compress(data)
+        for i in range(0, len(data), 50):
+            yield data[i:i + 50]
+
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream)
+    monkeypatch.setattr(traffic_log_collector, "remote_compression", lambda p: "gzip")
+    monkeypatch.setattr(traffic_log_collector, "stat_remote_log", lambda p, path: (remote["inode"], len(remote["data"])))
+
+    db = TestSessionLocal()
+    try:
+        first = "\n".join(_line(client_ip=f"10.1.0.{i}") for i in range(3)) + "\n"
+        remote["data"] = first.encode() + _line(client_ip="10.1.0.99")[:40].encode()  # 쓰는 중인 줄
+        collect_incremental(db, proxy)
+        cur = db.query(TrafficLogCursor).filter_by(proxy_id=proxy.id).one()
+        assert cur.offset == len(first.encode())
+        assert db.query(TrafficLog).filter_by(proxy_id=proxy.id).count() == 3
+
+        # 잘린 줄이 완성되고 한 줄 추가 → 두 줄만 추가
+        remote["data"] = (first + _line(client_ip="10.1.0.99") + "\n" + _line(client_ip="10.2.0.1") + "\n").encode()
+        p = collect_incremental(db, proxy)
+        assert p.fetched == 2 and p.inserted == 2
+        assert db.query(TrafficLog).filter_by(proxy_id=proxy.id).count() == 5
+        db.refresh(cur)
+        assert cur.offset == len(remote["data"])
+
+        # 로테이션: inode 변경 시 새 파일 처음부터 추가
+        remote.update(inode=101, data=(_line(client_ip="10.3.0.1") + "\n").encode())
+        collect_incremental(db, proxy)
+        db.refresh(cur)
+        assert cur.inode == 101 and cur.offset == len(remote["data"])
+        assert db.query(TrafficLog).filter_by(proxy_id=proxy.id).count() == 6
+    finally:
+        db.query(TrafficLogCursor).delete()
+        db.commit()
+        db.close()
+
+
+def test_incremental_collect_rejects_line_filter(client, proxy):
+    res = client.post("/api/traffic-logs/collect",
+                      params={"proxy_ids": str(proxy.id), "mode": "incremental", "q": "example.com"})
+    assert res.status_code == 400
+
+
+def test_retention_purges_only_current_snapshot_of_incremental_proxies(proxy):
+    from datetime import datetime, timedelta
+
+    from app.models.traffic_log_cursor import TrafficLogCursor
+    from app.services.traffic_log_snapshots import begin_snapshot, publish_snapshot, purge_expired_traffic_logs
+
+    db = TestSessionLocal()
+    try:
+        old, new = datetime.utcnow() - timedelta(hours=30), datetime.utcnow()
+        current = begin_snapshot(db, proxy.id)
+        publish_snapshot(db, proxy.id, current)
+        building = begin_snapshot(db, proxy.id)
+        db.add_all([TrafficLog(proxy_id=proxy.id, snapshot_id=current, collected_at=t, client_ip=ip)
+                    for t, ip in ((old, "expired"), (new, "fresh"))])
+        db.add(TrafficLog(proxy_id=proxy.id, snapshot_id=building, collected_at=old, client_ip="loading"))
+        db.commit()
+
+        # 커서가 없으면 (교체 수집만 하는 프록시) 삭제하지 않음
+        assert purge_expired_traffic_logs(test_engine, retention_hours=24) == 0
+        db.add(TrafficLogCursor(proxy_id=proxy.id, log_path="/var/log/access.log", inode=1, offset=0, size=0))
+        db.commit()
+        assert purge_expired_traffic_logs(test_engine, retention_hours=24, chunk=1) == 1
+        ips = sorted(r.client_ip for r in db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy.id))
+        assert ips == ["fresh", "loading"]
+    finally:
+        db.query(TrafficLogCursor).delete()
+        db.commit()
+        db.close()
+
+
+def test_remote_compression_is_probed_once_and_capped(monkeypatch, proxy):
+    import gzip
+
+    from app.services.traffic_log_collector import decompress_chunks, remote_compression
+
+    calls = []
+
+    def _probe(*a, **k):
+        calls.append(a[4])
+        return "gzip\n"
+
+    monkeypatch.setattr(traffic_log_collector, "TRAFFIC_LOG_COMPRESSION", "auto")
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec", _probe)
+    monkeypatch.setattr(traffic_log_collector, "_compression_cache", {})
+    assert remote_compression(proxy) == "gzip"
+    assert remote_compression(proxy) == "gzip"
+    assert len(calls) == 1
+
+    packed = gzip.compress(b"x" * 10000)
+    out = b"".join(decompress_chunks(_chunked(packed, 100), "gzip", max_bytes=2500))
+    assert out == b"x" * 2500
+
+
+@pytest.mark.skipif(not all(shutil.which(c) for c in ("timeout", "ionice", "tac", "gzip")), reason="needs coreutils")
+def test_rotated_search_is_newest_first_and_stops_at_limit(tmp_path):
+    from app.api.traffic_logs import _build_rotated_command
+
+    log = tmp_path / "access.log"
+    log.write_text("".join(f"cur {i} hit\nskip\n" for i in range(1, 4)))
+    (tmp_path / "access.log.1").write_text("r1 1 hit\nr1 2 hit\n")
+    (tmp_path / "access.log.2.gz").write_bytes(gzip.compress(b"r2 1 hit\nr2 2 hit\n"))
+    (tmp_path / "access20260101.log.gz").write_bytes(gzip.compress(b"old 1 hit\n"))
+    now = time.time()
+    for age, name in enumerate(["access.log", "access.log.1", "access.log.2.gz", "access20260101.log.gz"]):
+        os.utime(tmp_path / name, (now - age * 3600, now - age * 3600))
+
+    def run(limit, direction, files=5):
+        cmd = _build_rotated_command(str(log), "hit", limit, direction, files)
+        return subprocess.run(cmd, shell=True, capture_output=True, text=True).stdout.splitlines()
+
+    assert run(4, "tail") == ["cur 3 hit", "cur 2 hit", "cur 1 hit", "r1 2 hit"]
+    assert run(50, "tail") == ["cur 3 hit", "cur 2 hit", "cur 1 hit", "r1 2 hit", "r1 1 hit",
+                               "r2 2 hit", "r2 1 hit", "old 1 hit"]
+    assert run(2, "head") == ["old 1 hit", "r2 1 hit"]
+    assert run(50, "tail", files=1) == ["cur 3 hit", "cur 2 hit", "cur 1 hit", "r1 2 hit", "r1 1 hit"]
+
+
+@pytest.mark.skipif(not all(shutil.which(c) for c in ("timeout", "ionice", "dd", "awk")), reason="needs coreutils")
+def test_time_window_binary_searches_start_and_reads_only_range(tmp_path):
+    from datetime import datetime, timedelta
+
+    from app.services.traffic_log_window import (
+        find_start_offset, first_line_at, parse_probe_output, probe_command, window_command,
+    )
+    from app.utils.time import KST_TZ
+
+    base = datetime(2026, 1, 5, 0, 0, tzinfo=KST_TZ)
+    times = [base + timedelta(minutes=i) for i in range(3000)]
+    log = tmp_path / "access.log"
+    log.write_text("".join(
+        _line(datetime=t.strftime("[%d/%b/%Y:%H:%M:%S %z]"), client_ip=f"10.0.{i // 256}.{i % 256}",
+              url_path="/hit" if i % 2 else "/") + "\n"
+        for i, t in enumerate(times)
+    ))
+    size = log.stat().st_size
+    rounds = []
+
+    def probe(offsets):
+        rounds.append(offsets)
+        read_from = {o: max(0, o - 1) for o in offsets}
+        out = subprocess.run(probe_command(str(log), sorted(set(read_from.values()))), shell=True, capture_output=True).stdout
+        chunks = parse_probe_output(out)
+        return {o: first_line_at(o, read_from[o], chunks[read_from[o]]) for o in offsets}
+
+    start, end = base + timedelta(hours=30), base + timedelta(hours=30, minutes=9)
+    offset, tz = find_start_offset(probe, size, start - timedelta(minutes=5), stop_bytes=8192)
+    assert len(rounds) <= 6 and tz.utcoffset(None) == timedelta(hours=9)
+    assert 0 < offset and size - offset > size // 4
+
+    def run(q, limit, direction):
+        cmd = window_command(str(log), offset, start, end, tz, q, limit, direction, 10485760, 15)
+        return subprocess.run(cmd, shell=True, capture_output=True, text=True).stdout.splitlines()
+
+    expected = [i for i, t in enumerate(times) if start <= t <= end]
+    lines = run(None, 100, "head")
+    assert [ln.split(DELIMITER)[FIELDS.index("client_ip")] for ln in lines] == [f"10.0.{i // 256}.{i % 256}" for i in expected]
+    assert len(run("/hit", 2, "tail")) == 2
+    assert run("/hit", 2, "tail")[-1].split(DELIMITER)[FIELDS.index("client_ip")] == f"10.0.{expected[-1] // 256}.{expected[-1] % 256}"
+
+
+def test_incremental_collect_saves_cursor_when_reader_fails_midway(monkeypatch, proxy):
+    import functools
+    import re
+
+    from app.models.traffic_log_cursor import TrafficLogCursor
+    from app.services.traffic_log_collector import collect_incremental
+
+    lines = [(_line(client_ip=f"10.4.0.{i}") + "\n").encode() for i in range(20)]
+    remote = {"data": b"".join(lines[:10]), "fail_after": None}
+
+    def _stream(host, port, username, password, command, **kw):
+        start, length = map(int, re.search(r"tail -c \+(\d+) .* head -c (\d+)", command).groups())
+        data = remote["data"][start - 1:start - 1 + length]
+        if remote["fail_after"] is None:
+            yield data
+            return
+        yield b"".join(data.splitlines(keepends=True)[:remote["fail_after"]])
+        raise ConnectionError("channel closed")
+
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream)
+    monkeypatch.setattr(traffic_log_collector, "remote_compression", lambda p: None)
+    monkeypatch.setattr(traffic_log_collector, "stat_remote_log", lambda p, path: (7, len(remote["data"])))
+    monkeypatch.setattr(traffic_log_collector, "stream_collect", functools.partial(stream_collect, block_lines=2))
+    monkeypatch.setattr(traffic_log_collector, "COLLECT_COMMIT_ROWS", 2)
+
+    db = TestSessionLocal()
+    try:
+        def count():
+            return db.query(TrafficLog).filter(visible_clause(db, [proxy.id])).count()
+
+        collect_incremental(db, proxy)
+        assert count() == 10
+
+        # 추가된 10줄 중 6줄(2줄 블록 3개)을 커밋한 뒤 SSH가 끊김 → 커서는 커밋된 위치까지 전진
+        remote.update(data=b"".join(lines), fail_after=6)
+        with pytest.raises(ConnectionError):
+            collect_incremental(db, proxy)
+        assert count() == 16
+        cur = db.query(TrafficLogCursor).filter_by(proxy_id=proxy.id).one()
+        assert cur.offset == sum(map(len, lines[:16]))
+
+        # 재시도는 나머지 4줄만 추가 (중복 없음)
+        remote["fail_after"] = None
+        collect_incremental(db, proxy)
+        assert count() == 20
+        db.refresh(cur)
+        assert cur.offset == len(remote["data"])
+        assert sorted(r.client_ip for r in db.query(TrafficLog).filter_by(proxy_id=proxy.id)) == \
+            sorted(f"10.4.0.{i}" for i in range(20))
+    finally:
+        db.query(TrafficLogCursor).delete()
+        db.commit()
+        db.close()
+
+
+def test_cancelled_replace_job_keeps_previous_logs(monkeypatch, client, proxy):
+    import functools
+
+    from app.database import database
+
+    release = threading.Event()
+
+    def _stream(*a, **k):
+        yield ("\n".join(_line(client_ip=f"10.5.0.{i}") for i in range(5)) + "\n").encode()
+        release.wait(5)
+        yield ("\n".join(_line(client_ip=f"10.5.1.{i}") for i in range(5)) + "\n").encode()
+
+    monkeypatch.setattr(database, "SessionLocal", TestSessionLocal)
+    monkeypatch.setattr(traffic_logs_api, "remote_compression", lambda p: None)
+    monkeypatch.setattr(traffic_logs_api, "stream_collect", functools.partial(stream_collect, block_lines=5))
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", _stream)
+    monkeypatch.setattr(traffic_log_collector, "COLLECT_COMMIT_ROWS", 5)
+
+    db = TestSessionLocal()
+    try:
+        db.add(TrafficLog(proxy_id=proxy.id, client_ip="old"))
+        db.commit()
+        job_id = client.post("/api/traffic-logs/collect", params={"proxy_ids": str(proxy.id)}).json()["job_id"]
+
+        def _poll(done):
+            for _ in range(100):
+                snap = client.get(f"/api/traffic-logs/jobs/{job_id}").json()
+                if done(snap):
+                    return snap
+                time.sleep(0.05)
+            raise AssertionError(snap)
+
+        _poll(lambda snap: snap["inserted"] == 5)
+        cancelled = client.delete(f"/api/traffic-logs/jobs/{job_id}").json()
+        assert cancelled["message"] == "cancelled, previous logs kept"
+        release.set()
+        snap = _poll(lambda snap: snap["finished_at"] is not None)
+        assert snap["status"] == "cancelled"
+        assert snap["proxies"][0]["note"] == "cancelled, previous logs kept"
+        assert [r.client_ip for r in db.query(TrafficLog).filter(visible_clause(db, [proxy.id]))] == ["old"]
+    finally:
+        release.set()
+        db.close()
@@ -0,0 +1,128 @@
+"""트래픽 로그 사전 인코딩 컬럼 테스트"""
+import csv
+import io
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models.proxy import Proxy
+from app.models.traffic_log import RECORD_COLUMNS, TrafficLog, TrafficLogValue
+from app.models.traffic_log_snapshot import TrafficLogSnapshot
+from app.services import traffic_log_collector, traffic_log_dict
+from app.services.traffic_log_collector import stream_collect
+from app.services.traffic_log_dict import ensure_traffic_log_dictionary, value_ids
+from app.services.traffic_log_search import ensure_traffic_log_fts, search_clause
+from tests.conftest import TestSessionLocal
+from tests.test_traffic_log_parser import _line
+
+
+def test_collect_stores_ids_and_reads_strings(client, monkeypatch):
+    db = TestSessionLocal()
+    p = Proxy(host="10.7.7.3", username="u", traffic_log_path="/var/log/access.log")
+    db.add(p)
+    db.commit()
+    proxy_id = p.id
+    body = "".join(
+        _line(client_ip=f"10.4.0.{i}", user_agent=f"Agent/{i % 2}", url_categories="Streaming Media",
+              currentrule="" if i == 0 else "Allow All") + "\n"
+        for i in range(6)
+    ).encode()
+    monkeypatch.setattr(traffic_log_collector, "ssh_exec_stream", lambda *a, **k: (c for c in [body]))
+    try:
+        kept = []
+        stream_collect(db, p, "cmd", block_lines=4, on_block=lambda lines, rows: kept.extend(rows))
+        assert kept[1]["user_agent"] == "Agent/1"
+        stored = db.query(TrafficLogValue).filter(TrafficLogValue.field == "user_agent").all()
+        assert sorted(v.value for v in stored if v.value.startswith("Agent/")) == ["Agent/0", "Agent/1"]
+        row = db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy_id, TrafficLog.client_ip == "10.4.0.0").one()
+        assert isinstance(row.user_agent_id, int) and row.user_agent == "Agent/0" and row.currentrule == ""
+
+        base = {"proxy_ids": str(proxy_id), "limit": 100}
+        data = client.get("/api/traffic-logs", params={**base, "sort_col": "user_agent", "sort_dir": "desc"}).json()
+        assert [r["user_agent"] for r in data["records"]][:3] == ["Agent/1"] * 3
+        data = client.get("/api/traffic-logs", params={**base, "filter_col": "user_agent", "filter_val": "t/0"}).json()
+        assert data["total_count"] == 3
+        data = client.get("/api/traffic-logs", params={**base, "search": "streaming"}).json()
+        assert data["total_count"] == 6 and data["records"][0]["url_categories"] == "Streaming Media"
+
+        exported = list(csv.reader(io.StringIO(client.get("/api/traffic-logs/export", params=base).text)))
+        assert exported[0] == RECORD_COLUMNS
+        assert exported[1][RECORD_COLUMNS.index("user_agent")] == "Agent/1"
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id == proxy_id).delete()
+        db.query(TrafficLogSnapshot).filter(TrafficLogSnapshot.proxy_id == proxy_id).delete()
+        db.query(Proxy).filter(Proxy.id == proxy_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_rolled_back_ids_are_not_cached():
+    db = TestSessionLocal()
+    try:
+        first = value_ids(db, "currentruleset", ["Rolled Back"])["Rolled Back"]
+        db.rollback()
+        assert not any(k[1:] == ("currentruleset", "Rolled Back") for k in traffic_log_dict._cache)
+        again = value_ids(db, "currentruleset", ["Rolled Back"])["Rolled Back"]
+        db.commit()
+        assert db.get(TrafficLogValue, again).value == "Rolled Back"
+        assert first == again or db.get(TrafficLogValue, first) is None
+        assert value_ids(db, "currentruleset", ["Rolled Back"]) == {"Rolled Back": again}
+    finally:
+        db.close()
+
+
+def test_legacy_string_columns_are_migrated(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    cols = [c for c in RECORD_COLUMNS if c != "id"]
+    search = "url_host, client_ip, url_path, username, action_names, url_categories, comm_name"
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE traffic_logs (id INTEGER PRIMARY KEY, snapshot_id INTEGER NOT NULL DEFAULT 0, "
+                          + ", ".join(f"{c} TEXT" for c in cols) + ")"))
+        conn.execute(text(f"CREATE VIRTUAL TABLE traffic_logs_fts USING fts5({search}, "
+                          "content='traffic_logs', content_rowid='id', tokenize='trigram')"))
+        for i in range(4):
+            conn.execute(text(
+                "INSERT INTO traffic_logs (proxy_id, collected_at, client_ip, user_agent, url_categories) "
+                "VALUES (1, '2026-01-01 00:00:00', :ip, :ua, :cat)"
+            ), {"ip": f"10.0.0.{i}", "ua": f"UA-{i % 2}", "cat": None if i == 3 else "Streaming Media"})
+        conn.execute(text("INSERT INTO traffic_logs_fts(traffic_logs_fts) VALUES ('rebuild')"))
+
+    assert ensure_traffic_log_dictionary(engine) == 7
+    assert ensure_traffic_log_fts(engine)
+    assert ensure_traffic_log_dictionary(engine) == 0
+    with engine.connect() as conn:
+        names = {r[1] for r in conn.execute(text("PRAGMA table_info(traffic_logs)"))}
+    assert "user_agent" not in names and "user_agent_id" in names
+
+    with Session(engine) as db:
+        hits = db.query(TrafficLog).filter(search_clause(db, "streaming")).order_by(TrafficLog.id).all()
+        assert [(r.client_ip, r.user_agent) for r in hits] == [("10.0.0.0", "UA-0"), ("10.0.0.1", "UA-1"),
+                                                               ("10.0.0.2", "UA-0")]
+        db.query(TrafficLog).filter(TrafficLog.id == hits[0].id).delete()
+        db.commit()
+        assert db.query(TrafficLog).filter(search_clause(db, "streaming")).count() == 2
+
+
+def test_legacy_column_that_cannot_be_dropped_is_cleared_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    cols = [c for c in RECORD_COLUMNS if c != "id"]
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE traffic_logs (id INTEGER PRIMARY KEY, snapshot_id INTEGER NOT NULL DEFAULT 0, "
+                          + ", ".join(f"{c} TEXT" for c in cols) + ")"))
+        # 인덱스가 걸린 컬럼은 DROP COLUMN이 실패하므로 값만 비우는 경로로 감
+        conn.execute(text("CREATE INDEX ix_legacy_user_agent ON traffic_logs (user_agent)"))
+        conn.execute(text("INSERT INTO traffic_logs (proxy_id, collected_at, user_agent) "
+                          "VALUES (1, '2026-01-01 00:00:00', 'UA-0')"))
+
+    assert ensure_traffic_log_dictionary(engine) == 7
+    with engine.begin() as conn:
+        names = {r[1] for r in conn.execute(text("PRAGMA table_info(traffic_logs)"))}
+        assert "user_agent" in names and "url_categories" not in names
+        assert conn.execute(text("SELECT user_agent FROM traffic_logs")).scalar() is None
+        # 이후 남은 값이 생겨도 다음 시작 때 테이블을 다시 훑지 않음
+        conn.execute(text("UPDATE traffic_logs SET user_agent = 'stale'"))
+    assert ensure_traffic_log_dictionary(engine) == 0
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT user_agent FROM traffic_logs")).scalar() == "stale"
+    with Session(engine) as db:
+        assert db.query(TrafficLog).one().user_agent == "UA-0"
@@ -0,0 +1,100 @@
+"""여러 프록시 동시 검색(k-way merge) 테스트"""
+import json
+import time
+
+from app.models.proxy import Proxy
+from app.services import traffic_log_federated
+from app.services.traffic_log_federated import federated_search
+from tests.conftest import TestSessionLocal
+from tests.test_traffic_log_parser import _line
+
+
+def _stamp(minute: int) -> str:
+    return f"[05/Jan/2026:10:{minute:02d}:00 +0900]"
+
+
+def _fake_stream(minutes_by_host, slow_host=None):
+    def fake(host, port, username, password, command, stop=None, **kwargs):
+        if host == slow_host:
+            while not stop():
+                time.sleep(0.02)
+            return
+        body = "".join(_line(datetime=_stamp(m), client_ip=f"{host}-{m}") + "\n" for m in minutes_by_host[host])
+        yield body.encode()
+    return fake
+
+
+def test_federated_search_merges_by_time_and_reports_timeouts(monkeypatch):
+    monkeypatch.setattr(traffic_log_federated, "ssh_exec_stream", _fake_stream(
+        {"a": [9, 5, 3, 1], "b": [8, 4, 2]}, slow_host="c",
+    ))
+    proxies = [Proxy(id=i, host=h, username="u", traffic_log_path="/l") for i, h in enumerate("abc", 1)]
+    messages = list(federated_search(proxies, lambda p: "cmd", 5, concurrency=2, deadline_sec=0.5))
+    assert [m["data"]["client_ip"] for m in messages[:-1]] == ["a-9", "b-8", "a-5", "b-4", "a-3"]
+    assert messages[-1]["type"] == "summary"
+    summary = messages[-1]["data"]
+    assert summary["count"] == 5 and summary["truncated"]
+    assert summary["proxies"]["3"]["status"] == "timeout"
+    assert messages[0]["data"]["proxy_id"] == "1"
+
+
+def test_federated_search_endpoint_streams_ndjson(client, monkeypatch):
+    db = TestSessionLocal()
+    proxies = [Proxy(host=h, username="u", traffic_log_path="/var/log/access.log") for h in ("a", "b")]
+    db.add_all(proxies)
+    db.commit()
+    ids = [p.id for p in proxies]
+    db.close()
+    commands = []
+    fake = _fake_stream({"a": [1, 3], "b": [2, 4]})
+    monkeypatch.setattr(traffic_log_federated, "ssh_exec_stream",
+                        lambda *a, **k: commands.append(a[4]) or fake(*a, **k))
+    try:
+        resp = client.get("/api/traffic-logs/search", params={
+            "proxy_ids": ",".join(map(str, ids)), "q": "hit", "direction": "head", "limit": 10,
+        })
+        assert resp.status_code == 200
+        lines = [json.loads(ln) for ln in resp.text.splitlines()]
+        assert [m["data"]["client_ip"] for m in lines[:-1]] == ["a-1", "b-2", "a-3", "b-4"]
+        assert lines[-1]["data"]["truncated"] is False
+        assert all("grep -F -- hit" in c and "tac" not in c for c in commands)
+
+        # tail: 원격에서 바이트 상한(head -c) 전에 뒤집어 최신 줄부터
+        commands.clear()
+        monkeypatch.setattr(traffic_log_federated, "ssh_exec_stream", lambda *a, **k: commands.append(a[4]) or
+                            _fake_stream({"a": [3, 1], "b": [4, 2]})(*a, **k))
+        resp = client.get("/api/traffic-logs/search", params={
+            "proxy_ids": ",".join(map(str, ids)), "q": "hit", "direction": "tail", "limit": 10,
+        })
+        lines = [json.loads(ln) for ln in resp.text.splitlines()]
+        assert [m["data"]["client_ip"] for m in lines[:-1]] == ["b-4", "a-3", "b-2", "a-1"]
+        assert all(c.index("| tac") < c.index("head -c") for c in commands)
+    finally:
+        db = TestSessionLocal()
+        db.query(Proxy).filter(Proxy.id.in_(ids)).delete()
+        db.commit()
+        db.close()
+
+
+def test_federated_search_backpressure_bounds_queued_blocks(monkeypatch):
+    produced = []
+
+    def fake(host, port, username, password, command, stop=None, **kwargs):
+        for m in range(60):
+            if stop():
+                return
+            produced.append(m)
+            yield (_line(datetime=_stamp(59 - m), client_ip=f"{host}-{m}") + "\n").encode()
+
+    monkeypatch.setattr(traffic_log_federated, "ssh_exec_stream", fake)
+    monkeypatch.setattr(traffic_log_federated, "FEDERATED_BLOCK_LINES", 2)
+    monkeypatch.setattr(traffic_log_federated, "FEDERATED_QUEUE_BLOCKS", 2)
+    gen = federated_search([Proxy(id=1, host="a", username="u", traffic_log_path="/l")], lambda p: "cmd", 100)
+    assert next(gen)["data"]["client_ip"] == "a-0"
+    time.sleep(0.3)
+    # 병합이 멈춘 동안 작업 스레드는 큐(2블록) + 꺼낸 블록 + 만들던 블록 정도만 읽고 대기
+    assert len(produced) <= 10
+    # 연결 종료: 대기 중인 작업 스레드도 취소되어 나머지를 읽지 않음
+    gen.close()
+    time.sleep(0.7)
+    assert len(produced) <= 10
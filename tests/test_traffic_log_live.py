@@ -0,0 +1,75 @@
+"""트래픽 로그 실시간 감시(tail -F 공유 채널) 테스트"""
+import threading
+import time
+
+from app.models.proxy import Proxy
+from app.services import traffic_log_live
+from app.services.traffic_log_live import LiveSubscriber, live_tails
+from tests.conftest import TestSessionLocal
+from tests.test_traffic_log_parser import _line
+
+
+def test_subscriber_buffer_drops_oldest_and_reports():
+    sub = LiveSubscriber(client_ip="10.0.0.", max_records=3)
+    sub.offer([{"client_ip": f"10.0.0.{i}"} for i in range(5)] + [{"client_ip": "192.168.0.1"}])
+    records, dropped = sub.drain(10)
+    assert [r["client_ip"] for r in records] == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert dropped == 2
+    assert sub.drain(10) == ([], 0)
+
+
+def _receive_until(ws, predicate):
+    got = []
+    while True:
+        msg = ws.receive_json()
+        assert msg["type"] == "records", msg
+        got.extend(r["client_ip"] for r in msg["data"])
+        if predicate(got):
+            return got
+
+
+def test_live_tail_shares_one_channel_across_subscribers(client, monkeypatch):
+    db = TestSessionLocal()
+    p = Proxy(host="10.7.7.2", username="u", traffic_log_path="/var/log/access.log")
+    db.add(p)
+    db.commit()
+    proxy_id = p.id
+    db.close()
+
+    calls = []
+    new_lines = threading.Event()
+
+    def fake_stream(*args, stop=None, **kwargs):
+        calls.append(args[4])
+        backlog = "".join(_line(client_ip=f"10.0.0.{i}") + "\n" for i in range(5))
+        yield (backlog + "@@LI").encode()
+        yield b"VE\n"
+        new_lines.wait(5)
+        yield (_line(client_ip="10.0.1.1") + "\n" + _line(client_ip="10.0.2.1")[:30]).encode()
+        yield (_line(client_ip="10.0.2.1")[30:] + "\n").encode()
+        while not stop():
+            time.sleep(0.05)
+
+    monkeypatch.setattr(traffic_log_live, "ssh_exec_stream", fake_stream)
+    base = f"/api/ws/traffic-logs/live/{proxy_id}?q=hit"
+    try:
+        with client.websocket_connect(f"{base}&initial_lines=2") as ws_all:
+            assert _receive_until(ws_all, lambda got: len(got) >= 2) == ["10.0.0.3", "10.0.0.4"]
+            with client.websocket_connect(f"{base}&initial_lines=10&client_ip=10.0.2") as ws_filtered:
+                new_lines.set()
+                assert _receive_until(ws_filtered, lambda got: got) == ["10.0.2.1"]
+            assert _receive_until(ws_all, lambda got: len(got) >= 2) == ["10.0.1.1", "10.0.2.1"]
+        assert len(calls) == 1 and "tail -c +$((s + 1)) -F" in calls[0]
+        for _ in range(50):
+            if not live_tails._tails:
+                break
+            time.sleep(0.05)
+        assert not live_tails._tails
+
+        with client.websocket_connect(f"/api/ws/traffic-logs/live/{proxy_id}") as ws:
+            assert ws.receive_json()["type"] == "error"
+    finally:
+        db = TestSessionLocal()
+        db.query(Proxy).filter(Proxy.id == proxy_id).delete()
+        db.commit()
+        db.close()
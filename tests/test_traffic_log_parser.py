@@ -0,0 +1,73 @@
+"""트래픽 로그 배치 파서 테스트"""
+import pytest
+
+from app.utils.traffic_log_parser import (
+    DELIMITER,
+    FIELDS,
+    columns_to_records,
+    epoch_column,
+    parse_epoch,
+    parse_log_line,
+    parse_log_lines,
+)
+
+
+def _line(**overrides):
+    values = {f: "" for f in FIELDS}
+    values.update({
+        "datetime": "[05/Jan/2026:09:00:00 +0900]", "client_ip": "10.0.0.1",
+        "response_statuscode": "200", "cache_status": "TCP_MISS", "url_host": "example.com",
+        "url_port": "443", "recv_byte": "1234", "sent_byte": "56", "timeintransaction": "0.25",
+        "action_names": "allow", "web_socket": "true",
+    })
+    values.update(overrides)
+    return DELIMITER.join(values[f] for f in FIELDS)
+
+
+def test_batch_matches_per_line_parser():
+    lines = [
+        _line(),
+        _line(response_statuscode="", recv_byte="-", timeintransaction="x", web_socket="0"),
+        "short :| line",
+        _line() + DELIMITER + "extra :| fields",
+        "",
+    ]
+    expected = [parse_log_line(ln) for ln in lines if ln]
+    assert columns_to_records(parse_log_lines(lines)) == expected
+    # 정상 블록(빠른 경로)도 동일
+    good = [_line(), _line(url_port="80", cache_status="TCP_HIT")]
+    assert columns_to_records(parse_log_lines("\n".join(good).encode())) == [parse_log_line(ln) for ln in good]
+
+
+def test_projection_and_interning():
+    block = "\n".join([_line(), _line(recv_byte="")]) + "\n"
+    cols = parse_log_lines(block, fields=["client_ip", "recv_byte", "cache_status"])
+    assert list(cols) == ["client_ip", "recv_byte", "cache_status"]
+    assert cols["recv_byte"] == [1234, None]
+    assert cols["cache_status"][0] is cols["cache_status"][1]
+    with pytest.raises(ValueError):
+        parse_log_lines(block, fields=["nope"])
+
+
+def test_parse_epoch_matches_strptime():
+    from datetime import datetime
+
+    for value in ("[05/Jan/2026:09:00:00 +0900]", "29/Feb/2024:23:59:59 -0130", "[31/Dec/1999:00:00:01 +0000]"):
+        expected = datetime.strptime(value.strip("[]"), "%d/%b/%Y:%H:%M:%S %z").timestamp()
+        assert parse_epoch(value) == int(expected)
+    for bad in ("", "-", "[31/Apr/2026:00:00:00 +0000]", "[05/Foo/2026:09:00:00 +0900]", "[05/Jan/2026:24:00:00 +0900]"):
+        assert parse_epoch(bad) is None
+    assert epoch_column(["[05/Jan/2026:09:00:00 +0900]", "", "[05/Jan/2026:09:00:00 +0900]"]) == [
+        1767571200, None, 1767571200]
+
+
+def test_analyze_upload_uses_batch_parser(client):
+    body = "\n".join([_line(), _line(client_ip="10.0.0.2", action_names="block", recv_byte="100")])
+    resp = client.post("/api/traffic-logs/analyze-upload", files={"logfile": ("t.log", body.encode())})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["summary"]["parsed_lines"] == 2
+    assert data["summary"]["blocked_requests"] == 1
+    assert data["summary"]["total_recv_bytes"] == 1334
+    assert data["summary"]["time_range_start"] == "2026-01-05T09:00:00+09:00"
+    assert len(data["records"]) == 2
@@ -0,0 +1,180 @@
+"""트래픽 로그 FTS 검색 테스트"""
+from sqlalchemy.dialects import sqlite
+
+from sqlalchemy import event, insert, text
+
+from app.models.traffic_log import FTS_DEFER_TABLE, TrafficLog
+from app.services.traffic_log_search import deferred_fts_index, search_clause
+from tests.conftest import TestSessionLocal, test_engine
+
+
+def _seed(db):
+    rows = [
+        TrafficLog(proxy_id=901, url_host="www.example.com", client_ip="10.0.0.1", url_path="/a"),
+        TrafficLog(proxy_id=901, url_host="cdn.other.net", client_ip="10.0.0.2", url_path="/Example/b"),
+        TrafficLog(proxy_id=901, url_host="api.test.io", client_ip="192.168.1.5", username='say "hi"'),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_search_uses_fts_and_tracks_deletes(client):
+    db = TestSessionLocal()
+    try:
+        rows = _seed(db)
+        compiled = str(search_clause(db, "example").compile(dialect=sqlite.dialect()))
+        assert "MATCH" in compiled
+
+        def ids(term):
+            res = client.get("/api/traffic-logs", params={"proxy_ids": "901", "search": term, "limit": 100})
+            assert res.status_code == 200
+            return sorted(r["client_ip"] for r in res.json()["records"])
+
+        # 대소문자 무시 부분 문자열 (LIKE와 동일)
+        assert ids("EXAMPLE") == ["10.0.0.1", "10.0.0.2"]
+        assert ids("168.1") == ["192.168.1.5"]
+        assert ids('"hi"') == ["192.168.1.5"]
+        # 3자 미만은 LIKE 대체
+        assert ids(".5") == ["192.168.1.5"]
+
+        db.delete(rows[0])
+        db.commit()
+        assert ids("example") == ["10.0.0.2"]
+
+        # 블록 적재 경로: 트리거 대신 INSERT ... SELECT로 색인하며 스키마는 바꾸지 않음
+        schema_version = db.execute(text("PRAGMA schema_version")).scalar()
+        with deferred_fts_index(db):
+            db.execute(insert(TrafficLog), [{"proxy_id": 901, "url_host": "bulk.example.org", "client_ip": "10.9.9.9"}])
+        db.commit()
+        assert ids("example") == ["10.0.0.2", "10.9.9.9"]
+        assert db.execute(text("PRAGMA schema_version")).scalar() == schema_version
+        assert db.execute(text(f"SELECT COUNT(*) FROM {FTS_DEFER_TABLE}")).scalar() == 0
+        # 롤백하면 플래그 행도 되돌아감
+        with deferred_fts_index(db):
+            db.execute(insert(TrafficLog), [{"proxy_id": 901, "url_host": "gone.example.org", "client_ip": "10.9.9.8"}])
+        db.rollback()
+        # 이후 ORM INSERT는 다시 트리거로 색인
+        db.add(TrafficLog(proxy_id=901, url_host="late.example.org", client_ip="10.9.9.10"))
+        db.commit()
+        assert ids("example") == ["10.0.0.2", "10.9.9.10", "10.9.9.9"]
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id == 901).delete()
+        db.commit()
+        db.close()
+
+
+def test_cursor_pagination_matches_full_order_with_ties_and_nulls(client):
+    from app.services.traffic_log_query import count_cache
+
+    db = TestSessionLocal()
+    try:
+        statuses = [200, None, 404, 200, None, 500, 200, 404, None, 200, 302]
+        db.add_all(TrafficLog(proxy_id=902, response_statuscode=s, client_ip=f"10.2.0.{i}")
+                   for i, s in enumerate(statuses))
+        db.commit()
+
+        def walk(sort_col, sort_dir):
+            base = {"proxy_ids": "902", "sort_col": sort_col, "sort_dir": sort_dir}
+            full = client.get("/api/traffic-logs", params={**base, "limit": 100}).json()["records"]
+            paged, cursor = [], None
+            while True:
+                params = {**base, "limit": 3, **({"cursor": cursor} if cursor else {})}
+                data = client.get("/api/traffic-logs", params=params).json()
+                paged += data["records"]
+                cursor = data["next_cursor"]
+                if not cursor:
+                    break
+            assert [r["client_ip"] for r in paged] == [r["client_ip"] for r in full]
+            return data
+
+        for col in ("id", "response_statuscode", "client_ip", "collected_at"):
+            for direction in ("asc", "desc"):
+                walk(col, direction)
+
+        count_cache.clear()
+        data = client.get("/api/traffic-logs", params={"proxy_ids": "902", "count_mode": "estimated"}).json()
+        assert data["total_count"] == len(statuses) and data["count_estimated"] is False
+        assert client.get("/api/traffic-logs", params={"proxy_ids": "902", "cursor": "!!"}).status_code == 400
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id == 902).delete()
+        db.commit()
+        db.close()
+
+
+def test_event_ts_backfill_range_filter_and_time_order(client):
+    from app.services.traffic_log_query import ensure_traffic_log_event_ts
+
+    db = TestSessionLocal()
+    try:
+        # 사전 순과 시각 순이 다른 datetime 값 (event_ts 없는 기존 행)
+        stamps = ["[10/Jan/2026:00:00:00 +0900]", "[02/Feb/2026:00:00:00 +0900]",
+                  "[09/Jan/2026:23:00:00 +0000]", "bad", None]
+        db.add_all(TrafficLog(proxy_id=903, datetime=s, url_host="backfill.example.com", client_ip=f"10.3.0.{i}")
+                   for i, s in enumerate(stamps))
+        db.commit()
+        assert ensure_traffic_log_event_ts(test_engine) == 3
+        # 완료가 기록되어 파싱할 수 없는 행("bad", NULL)을 다시 훑지 않음
+        statements = []
+        listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+        event.listen(test_engine, "before_cursor_execute", listener)
+        try:
+            assert ensure_traffic_log_event_ts(test_engine) == 0
+        finally:
+            event.remove(test_engine, "before_cursor_execute", listener)
+        assert not any("SELECT DISTINCT datetime" in s for s in statements)
+        # event_ts UPDATE는 FTS를 재색인하지 않지만 색인은 그대로 유효
+        res = client.get("/api/traffic-logs", params={"proxy_ids": "903", "search": "backfill", "limit": 100})
+        assert res.json()["total_count"] == 5
+
+        def ips(**params):
+            res = client.get("/api/traffic-logs", params={"proxy_ids": "903", "limit": 2, **params})
+            assert res.status_code == 200
+            data = res.json()
+            out = [r["client_ip"] for r in data["records"]]
+            while data["next_cursor"]:
+                data = client.get("/api/traffic-logs", params={
+                    "proxy_ids": "903", "limit": 2, "cursor": data["next_cursor"], **params}).json()
+                out += [r["client_ip"] for r in data["records"]]
+            return out
+
+        assert ips(sort_col="datetime", sort_dir="asc") == ["10.3.0.3", "10.3.0.4", "10.3.0.0", "10.3.0.2", "10.3.0.1"]
+        assert ips(start="2026-01-10T00:00:00", end="2026-01-31T00:00:00") == ["10.3.0.2", "10.3.0.0"]
+        assert ips(start="2026-01-09T20:00:00Z", end="2026-01-31T00:00:00Z") == ["10.3.0.2"]
+        assert ips(start="2026-01-10T00:00:00+09:00", sort_col="datetime", sort_dir="desc") == [
+            "10.3.0.1", "10.3.0.2", "10.3.0.0"]
+        bad = client.get("/api/traffic-logs", params={
+            "proxy_ids": "903", "start": "2026-02-01T00:00:00", "end": "2026-01-01T00:00:00"})
+        assert bad.status_code == 400
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id == 903).delete()
+        db.commit()
+        db.close()
+
+
+def test_default_sort_pages_read_in_rowid_order():
+    from app.services.traffic_log_query import filtered_query, keyset_clause, ordered
+
+    db = TestSessionLocal()
+    try:
+        db.add_all(TrafficLog(proxy_id=904 + i % 3, client_ip=f"10.4.0.{i}") for i in range(300))
+        db.commit()
+        last_id = db.query(TrafficLog.id).filter(TrafficLog.proxy_id == 904).order_by(TrafficLog.id.desc()).first()[0]
+
+        def plan(proxy_ids, sort_col):
+            query = filtered_query(db, proxy_ids).filter(keyset_clause(sort_col, "desc", None, last_id))
+            stmt = ordered(query, sort_col, "desc").limit(50).statement
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            return [row[3] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+        # 기본 정렬 다음 페이지: 한 프록시든 여러 프록시든 rowid 범위에서 순서대로 읽고 정렬 단계가 없음
+        for proxy_ids in ([904], [904, 905]):
+            steps = plan(proxy_ids, "id")
+            assert not any("TEMP B-TREE" in s for s in steps), steps
+            assert any("rowid<?" in s for s in steps if "traffic_logs " in s), steps
+        # 사전 인코딩 컬럼은 값 테이블 서브쿼리로 정렬하므로 임시 B-tree가 필요 (문서화된 제약)
+        assert any("TEMP B-TREE" in s for s in plan([904, 905], "url_categories"))
+    finally:
+        db.query(TrafficLog).filter(TrafficLog.proxy_id.in_([904, 905, 906])).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,125 @@
+"""업로드 로그 스트리밍 분석 테스트"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.traffic_log_upload import run_upload_analysis, spool_upload, upload_registry
+from app.utils.sketches import HyperLogLog, SpaceSaving
+from app.utils.traffic_log_parser import DELIMITER, FIELDS
+
+
+def _line(**overrides):
+    values = {f: "" for f in FIELDS}
+    values.update({
+        "datetime": "[05/Jan/2026:09:00:00 +0900]", "client_ip": "10.0.0.1",
+        "response_statuscode": "200", "url_host": "example.com", "url_path": "/",
+        "recv_byte": "100", "sent_byte": "10", "action_names": "allow",
+    })
+    values.update(overrides)
+    return DELIMITER.join(values[f] for f in FIELDS)
+
+
+def test_sketches_bounded_and_accurate():
+    ss = SpaceSaving(capacity=10)
+    for i in range(5000):
+        ss.add(f"rare-{i}")
+        if i % 10 == 0:
+            ss.add("hot", 5)
+    assert len(ss) <= 20
+    assert not ss.exact
+    key, count = ss.top(1)[0]
+    assert key == "hot"
+    assert 2500 <= count <= 2500 + ss.floor
+
+    hll = HyperLogLog()
+    for i in range(50000):
+        hll.add(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}")
+    assert abs(hll.count() - 50000) < 50000 * 0.03
+
+
+def _chunked_result(tmp_path, lines, **kwargs):
+    path = tmp_path / "t.log"
+    path.write_bytes(("\n".join(lines) + "\n").encode())
+    with open(path, "rb") as f:
+        job = spool_upload(f, "t.log")
+    try:
+        run_upload_analysis(job, 5, **kwargs)
+        assert job.status == "completed", job.error
+        return job.result, job.chunks_total, job.store.page(0, len(lines)), job.histogram
+    finally:
+        upload_registry.discard(job.id)
+
+
+def test_chunked_analysis_merges_partials(tmp_path):
+    lines = [
+        _line(datetime=f"[{d:02d}/{m}/2026:00:00:00 +0900]", client_ip=f"10.0.0.{i % 7}",
+              url_host=f"h{i % 3}.com", action_names="block" if i % 5 == 0 else "allow")
+        for i, (d, m) in enumerate([(2, "Jan"), (1, "Feb"), (15, "Jan")] * 40)
+    ]
+    single, single_chunks, _, histogram = _chunked_result(tmp_path, lines)
+    chunked, n_chunks, records, chunked_histogram = _chunked_result(tmp_path, lines, chunk_bytes=1000)
+    assert single_chunks == 1 and n_chunks > 10
+    assert chunked["summary"] == single["summary"]
+    assert chunked["top"] == single["top"]
+    assert chunked["summary"]["time_range_start"].startswith("2026-01-02")
+    assert chunked["summary"]["time_range_end"].startswith("2026-02-01")
+    assert chunked["summary"]["unique_clients"] == 7
+    assert [r["client_ip"] for r in records] == [f"10.0.0.{i % 7}" for i in range(len(lines))]
+    assert chunked_histogram == histogram
+    assert sorted(v[0] for v in histogram.values()) == [40, 40, 40]
+    assert sum(v[3] for v in histogram.values()) == 24
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pooled, _, _, pooled_histogram = _chunked_result(tmp_path, lines, executor=pool, workers=2, chunk_bytes=4000)
+    assert pooled["summary"] == single["summary"]
+    assert pooled["top"] == single["top"]
+    assert pooled_histogram == histogram
+
+
+def test_upload_records_paged_from_spill(client):
+    body = "\n".join(_line(client_ip=f"10.0.1.{i}") for i in range(250))
+    resp = client.post("/api/traffic-logs/analyze-upload", files={"logfile": ("t.log", body.encode())})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["record_count"] == 250
+    assert len(data["records"]) == 100
+    assert data["top"]["hosts_by_requests"] == [["example.com", 250]]
+    try:
+        page = client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}/records",
+                          params={"offset": 200, "limit": 100}).json()
+        assert page["total_count"] == 250
+        assert [r["client_ip"] for r in page["records"]] == [f"10.0.1.{i}" for i in range(200, 250)]
+        hist = client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}/histogram",
+                          params={"interval": "1d"}).json()
+        # 2026-01-05 09:00 KST → KST 자정 구간
+        assert hist["timestamps"] == [1767538800 * 1000]
+        hist = client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}/histogram",
+                          params={"interval": "5m"}).json()
+        assert hist["interval_sec"] == 300 and len(hist["timestamps"]) == 1
+        assert hist["total"]["requests"] == [250] and hist["total"]["recv_bytes"] == [25000]
+        assert client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}/histogram",
+                          params={"interval": "15s"}).status_code == 400
+        status = client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}").json()
+        assert status["status"] == "completed"
+        assert status["bytes_done"] == status["bytes_total"] == len(body)
+    finally:
+        client.delete(f"/api/traffic-logs/analyze-upload/{data['upload_id']}")
+    assert client.get(f"/api/traffic-logs/analyze-upload/{data['upload_id']}/records").status_code == 404
+
+
+def test_background_upload_reports_progress_over_websocket(client):
+    body = "\n".join(_line(client_ip=f"10.0.2.{i}") for i in range(20))
+    job = client.post("/api/traffic-logs/analyze-upload", params={"background": "true"},
+                      files={"logfile": ("t.log", body.encode())}).json()
+    assert job["bytes_total"] == len(body)
+    try:
+        with client.websocket_connect(f"/api/ws/traffic-logs/analyze-upload/{job['upload_id']}") as ws:
+            msg = ws.receive_json()
+            while msg["type"] == "progress" and msg["data"]["status"] != "completed":
+                msg = ws.receive_json()
+            if msg["type"] == "progress":
+                msg = ws.receive_json()
+        assert msg["type"] == "result"
+        assert msg["data"]["summary"]["unique_clients"] == 20
+        assert msg["data"]["record_count"] == 20
+    finally:
+        client.delete(f"/api/traffic-logs/analyze-upload/{job['upload_id']}")